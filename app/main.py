@@ -25,6 +25,8 @@ from app.utils.errors import ApiError
 from app.utils.validation import validate_payload
 
 from core.db.conn import init_db
+from core.db.repo_drift_rollup import flush_drift_counts
+from core.db.repo_ops_rollup import flush_ops_rollup
 from core.db.repo_features_store import get_features_by_id
 from core.db.repo_prod_requests import insert_prod_request
 
@@ -70,6 +72,7 @@ async def lifespan(_app: FastAPI):
     Gère le cycle de vie de l'application FastAPI :
     - Charge le modèle et les artefacts au démarrage
     - Initialise la base de données
+    - Écrit les agrégats et compteurs de drift encore en mémoire à l'arrêt
     """
     # Gestion du cycle de vie de l'application :
     # - Chargement du modèle et des artefacts
@@ -106,6 +109,12 @@ async def lifespan(_app: FastAPI):
 
     yield
 
+    for flush in (flush_ops_rollup, flush_drift_counts):
+        try:
+            flush()
+        except Exception:
+            pass
+
 
 def create_app(*, enable_lifespan: bool = True) -> FastAPI:
     """
@@ -0,0 +1,209 @@
+"""
+Benchmark de bout en bout de POST /predict, en processus (sans déploiement) :
+- l'application create_app() est servie par httpx.ASGITransport (pas de réseau, pas d'uvicorn)
+- la base est soit Postgres (--db postgres, DATABASE_URL, features_store rempli), soit un substitut en mémoire
+  (--db memory) avec latences injectées (--db-latency-ms pour la lecture des features, --log-latency-ms
+  pour l'écriture du log) ; les appels sont bloquants, comme ceux de psycopg
+- la charge est générée par run_load (scripts/03_simulate_requests.py) : --n requêtes, --concurrency en vol,
+  boucle ouverte si --rate > 0
+Rapport : débit, latence de bout en bout, et temps par étape (db_ms, validation_ms, inference_ms, total_ms
+issus du timing de l'endpoint, logging_ms et serialization_ms mesurés autour du log et du rendu JSON).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))  # en tête : un paquet tiers "benchmarks" peut masquer celui du dépôt
+
+import app.main as mainmod  # noqa: E402
+from benchmarks.bench_hot_path import DummyModel, load_catboost, synthetic_inputs  # noqa: E402
+from scripts.input_readers import iter_frames  # noqa: E402
+
+loadgen = importlib.import_module("scripts.03_simulate_requests")
+
+STAGES = ["db_ms", "validation_ms", "inference_ms", "total_ms", "logging_ms", "serialization_ms"]
+
+
+class StageRecorder:
+    """
+    Histogrammes par étape (LatencyHistogram du générateur de charge), alimentés par l'application instrumentée.
+    """
+
+    def __init__(self) -> None:
+        self.hists = {stage: loadgen.LatencyHistogram() for stage in STAGES}
+
+    def record_ms(self, stage: str, ms: Optional[float]) -> None:
+        if ms is not None:
+            self.hists[stage].record(float(ms) / 1000.0)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: h.summary() for stage, h in self.hists.items() if h.n}
+
+
+class MemoryFeatureStore:
+    """
+    Substitut en mémoire de features_store : dictionnaire {sk_id_curr: features}, latence injectée (bloquante).
+    """
+
+    def __init__(self, rows: Dict[int, Dict[str, Any]], latency_ms: float = 0.0) -> None:
+        self.rows = rows
+        self.latency_s = latency_ms / 1000.0
+
+    def get_features_by_id(self, sk_id_curr: int) -> Optional[Dict[str, Any]]:
+        if self.latency_s > 0:
+            time.sleep(self.latency_s)
+        row = self.rows.get(int(sk_id_curr))
+        return dict(row) if row is not None else None  # copie : l'endpoint ajoute SK_ID_CURR
+
+
+def memory_rows_from_file(path: Path, kept: List[str], limit: int) -> Dict[int, Dict[str, Any]]:
+    """
+    Charge jusqu'à `limit` clients d'un fichier API-ready (mêmes conversions que le chargeur : NaN -> None).
+    """
+    frames = []
+    n = 0
+    for chunk in iter_frames(path, columns=["SK_ID_CURR", *kept], chunksize=10_000):
+        frames.append(chunk)
+        n += len(chunk)
+        if n >= limit:
+            break
+    df = pd.concat(frames, ignore_index=True).head(limit)
+    records = df.astype(object).where(df.notna(), None).to_dict("records")
+    return {int(r.pop("SK_ID_CURR")): r for r in records}
+
+
+def memory_rows_synthetic(kept: List[str], cat: List[str], n: int, seed: int = 42) -> Dict[int, Dict[str, Any]]:
+    """
+    Génère n clients synthétiques valides pour les features de synthetic_inputs().
+    """
+    rng = np.random.default_rng(seed)
+    cat_set = set(cat)
+    num = [f for f in kept if f not in cat_set]
+    values = rng.lognormal(8.0, 2.0, size=(n, len(num)))
+    rows = {}
+    for i in range(n):
+        row: Dict[str, Any] = {f: float(v) for f, v in zip(num, values[i])}
+        row.update({f: str(rng.choice(["Cash loans", "Working", "XNA"])) for f in cat})
+        rows[100_000 + i] = row
+    return rows
+
+
+def instrument(recorder: StageRecorder, log_fn: Callable[[Dict[str, Any]], None], log_latency_ms: float) -> None:
+    """
+    Remplace le log de l'application par une version chronométrée (et la réponse JSON par un rendu chronométré).
+    Les temps par étape de l'endpoint sont relevés dans l'événement de log.
+    """
+    log_latency_s = log_latency_ms / 1000.0
+
+    def _timed_log(event: Dict[str, Any]) -> None:
+        t0 = time.perf_counter()
+        if log_latency_s > 0:
+            time.sleep(log_latency_s)
+        log_fn(event)
+        recorder.record_ms("logging_ms", (time.perf_counter() - t0) * 1000)
+        timing = (event.get("outputs") or {}).get("timing") or {}
+        for stage in ("db_ms", "validation_ms", "inference_ms", "total_ms"):
+            recorder.record_ms(stage, timing.get(stage))
+
+    class _TimedJSONResponse(mainmod.JSONResponse):
+        def render(self, content: Any) -> bytes:
+            t0 = time.perf_counter()
+            body = super().render(content)
+            recorder.record_ms("serialization_ms", (time.perf_counter() - t0) * 1000)
+            return body
+
+    mainmod.insert_prod_request = _timed_log
+    mainmod.JSONResponse = _TimedJSONResponse
+
+
+def main() -> None:
+    """
+    Point d'entrée : prépare l'application (modèle, base), envoie la charge, affiche le rapport.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", choices=["memory", "postgres"], default="memory")
+    ap.add_argument("--db-latency-ms", type=float, default=1.0, help="Latence injectée par lecture (--db memory)")
+    ap.add_argument("--log-latency-ms", type=float, default=1.0, help="Latence injectée par log (--db memory)")
+    ap.add_argument("--model", choices=["dummy", "catboost"], default="catboost")
+    ap.add_argument("--input", default=None, help="Fichier API-ready : clients chargés en mémoire / ids envoyés")
+    ap.add_argument("--clients", type=int, default=10_000, help="Clients en mémoire (--db memory)")
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rate", type=float, default=0.0, help="Requêtes/s en boucle ouverte (0 = boucle fermée)")
+    ap.add_argument("--distribution", choices=loadgen.DISTRIBUTIONS, default="uniform")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=None, help="Chemin du rapport JSON")
+    args = ap.parse_args()
+
+    # 1) Modèle et artefacts (mêmes variables globales que le lifespan)
+    kept, cat, _ = synthetic_inputs(args.seed)
+    if args.model == "dummy":
+        model, variant = DummyModel(), "dummy"
+    else:
+        model, kept, cat, variant = load_catboost(kept, cat, args.seed)
+    mainmod.MODEL, mainmod.KEPT_FEATURES, mainmod.CAT_FEATURES, mainmod.THRESHOLD = model, kept, cat, 0.5
+    mainmod.CAT_COLS = [c for c in cat if c in kept]
+
+    # 2) Base : Postgres réel ou substitut en mémoire
+    recorder = StageRecorder()
+    if args.db == "memory":
+        if args.input:
+            rows = memory_rows_from_file(Path(args.input), kept, args.clients)
+        else:
+            rows = memory_rows_synthetic(kept, cat, args.clients, args.seed)
+        store = MemoryFeatureStore(rows, args.db_latency_ms)
+        mainmod.get_features_by_id = store.get_features_by_id
+        instrument(recorder, lambda event: None, args.log_latency_ms)
+        ids = np.array(sorted(rows), dtype=np.int64)
+    else:
+        if not os.getenv("DATABASE_URL"):
+            raise RuntimeError("DATABASE_URL manquante (--db postgres).")
+        if not args.input:
+            raise ValueError("--input est requis avec --db postgres (SK_ID_CURR présents dans features_store).")
+        mainmod.init_db()
+        instrument(recorder, mainmod.insert_prod_request, 0.0)
+        ids = loadgen.load_ids(Path(args.input))
+
+    # 3) Charge en processus
+    app = mainmod.create_app(enable_lifespan=False)
+    transport = httpx.ASGITransport(app=app)
+    picked = loadgen.pick_ids(ids, args.n, args.distribution, seed=args.seed)
+    report = asyncio.run(
+        loadgen.run_load(
+            "http://bench/predict", picked, rate=args.rate, concurrency=args.concurrency, transport=transport
+        )
+    )
+    report.update(
+        {
+            "db": args.db,
+            "db_latency_ms": args.db_latency_ms if args.db == "memory" else None,
+            "log_latency_ms": args.log_latency_ms if args.db == "memory" else None,
+            "model": variant,
+            "stages": recorder.summary(),
+        }
+    )
+
+    # 4) Rapport
+    loadgen.print_report(report)
+    for stage, s in report["stages"].items():
+        print(f"  {stage:<17} mean={s['mean_ms']:.3f}  p50={s['p50_ms']:.3f}  p99={s['p99_ms']:.3f}  max={s['max_ms']:.3f}")
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"OK: écrit {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark de la conversion CSV -> payloads JSON du chargeur de features (scripts/01_load_features_store.py) :
+- baseline : iterrows + conversion cellule par cellule + json.dumps (ancien chemin)
+- vectorized : conversion colonne par colonne + JSON canonique orjson (si installé) + empreinte sha256,
+  un seul processus
+- pool : même conversion répartie sur --workers processus (parsing CSV inclus)
+Le CSV synthétique (--rows lignes, --features colonnes, ~5 % de NaN, ~10 % de catégorielles) est généré
+dans un fichier temporaire, sauf si --csv est fourni. Aucune base n'est nécessaire : seul l'encodage est mesuré.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import core.db.repo_features_store as repo_fs  # noqa: E402
+
+loader = importlib.import_module("scripts.01_load_features_store")
+
+
+def write_synthetic_csv(path: Path, n_rows: int, n_features: int, seed: int, block: int = 100_000) -> None:
+    """
+    Écrit un CSV API-ready synthétique par blocs (mémoire bornée).
+    """
+    rng = np.random.default_rng(seed)
+    n_cat = max(1, n_features // 10)
+    n_num = n_features - n_cat
+    for start in range(0, n_rows, block):
+        n = min(block, n_rows - start)
+        num = rng.lognormal(mean=8.0, sigma=2.0, size=(n, n_num))
+        num[rng.random(size=num.shape) < 0.05] = np.nan
+        df = pd.DataFrame(num, columns=[f"NUM_{j:03d}" for j in range(n_num)])
+        for j in range(0, n_num, 3):  # un tiers de colonnes entières
+            df[f"NUM_{j:03d}"] = np.floor(np.nan_to_num(df[f"NUM_{j:03d}"].to_numpy())).astype(np.int64)
+        cats = rng.choice(["Cash loans", "Revolving loans", "Working", "Pensioner", "XNA"], size=(n, n_cat))
+        for j in range(n_cat):
+            df[f"CAT_{j:03d}"] = cats[:, j]
+        df.insert(0, "SK_ID_CURR", np.arange(start, start + n) + 100_000)
+        df.to_csv(path, mode="a" if start else "w", header=start == 0, index=False)
+
+
+def _baseline(csv_path: Path, chunksize: int) -> int:
+    """Ancien chemin : iterrows + pd.isna / .item() par cellule + json.dumps."""
+    n = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        for _, r in chunk.iterrows():
+            payload: Dict[str, Any] = {}
+            for k, v in r.to_dict().items():
+                payload[k] = None if pd.isna(v) else (v.item() if hasattr(v, "item") else v)
+            json.dumps(payload)
+            n += 1
+    return n
+
+
+def _encode(csv_path: Path, chunksize: int, workers: int) -> int:
+    """Nouveau chemin (celui de copy_to_staging, sans la base)."""
+    return sum(n for n, _ in loader.iter_copy_blocks(csv_path, chunksize, workers))
+
+
+def main() -> None:
+    """
+    Point d'entrée : génère le CSV si besoin, mesure le débit (lignes/s) de chaque variante.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--features", type=int, default=125)
+    ap.add_argument("--csv", default=None, help="CSV existant à la place du CSV synthétique")
+    ap.add_argument("--chunksize", type=int, default=2000)
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    ap.add_argument("--baseline-rows", type=int, default=50_000, help="Lignes mesurées pour la baseline (lente)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=None, help="Chemin du rapport JSON")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.csv:
+            csv_path = Path(args.csv)
+        else:
+            csv_path = Path(tmp) / "features.csv"
+            t0 = time.perf_counter()
+            write_synthetic_csv(csv_path, args.rows, args.features, args.seed)
+            print(f"CSV synthétique : {args.rows} lignes, {csv_path.stat().st_size / 1e6:.0f} Mo "
+                  f"({time.perf_counter() - t0:.1f} s)")
+
+        # Baseline sur un sous-ensemble (plusieurs minutes sur 1M lignes)
+        head_path = Path(tmp) / "head.csv"
+        pd.read_csv(csv_path, nrows=args.baseline_rows).to_csv(head_path, index=False)
+
+        report: Dict[str, Any] = {"orjson": repo_fs.orjson is not None, "workers": args.workers}
+        variants = [
+            ("baseline", lambda: _baseline(head_path, args.chunksize)),
+            ("vectorized", lambda: _encode(csv_path, args.chunksize, 1)),
+        ]
+        if args.workers > 1:
+            variants.append((f"pool_{args.workers}", lambda: _encode(csv_path, args.chunksize, args.workers)))
+
+        for name, fn in variants:
+            t0 = time.perf_counter()
+            n = fn()
+            seconds = time.perf_counter() - t0
+            report[name] = {"rows": n, "seconds": seconds, "rows_per_s": n / seconds}
+            print(f"{name:<12} {n:>9} lignes  {seconds:8.2f} s  {n / seconds:>10,.0f} lignes/s")
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"OK: écrit {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Micro-benchmarks du chemin chaud de service et des helpers PSI, avec baselines versionnées :
+- build_row, validate_payload, _extract_proba_class1, predict_score (app.model / app.utils)
+- psi_from_dists, DriftReference.counts / DriftReference.psi (monitoring/lib/drift.py, moteur partagé avec
+  scripts/04_analyze_prod_logs.py)
+- DriftBinner.bin_payload (core/db/repo_drift_rollup.py : compteurs de drift, exécuté par le log writer)
+Pour chaque fonction : temps par appel (meilleur de --repeat séries, nombre d'appels calibré)
+et pic d'allocation par appel (tracemalloc).
+Modèles : --model dummy (predict_proba constant) ou catboost (artefacts locaux app.config s'ils existent,
+sinon petit CatBoostClassifier entraîné sur des données synthétiques de même forme : 125 features, 10 catégorielles).
+--update-baseline écrit benchmarks/baselines/hot_path.json ; --check compare à la baseline et sort en code 1
+si une fonction dépasse la tolérance (--time-tolerance, --alloc-tolerance).
+Les temps sont comparés relativement à une boucle de calibration (calibration_loop) mesurée dans le même run et
+enregistrée avec la baseline : une machine 2x plus lente a une calibration 2x plus longue et les temps attendus
+sont mis à l'échelle. Les écarts de rapport Python / NumPy entre machines restent : pour un seuil serré,
+régénérer la baseline sur la machine de CI.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))  # en tête : un paquet tiers "benchmarks" peut masquer celui du dépôt
+
+from app.model.predict import _extract_proba_class1, build_row, predict_score  # noqa: E402
+from app.utils.validation import validate_payload  # noqa: E402
+from core.db.repo_drift_rollup import DriftBinner  # noqa: E402
+from monitoring.lib.drift import DriftReference, psi_from_dists  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "hot_path.json"
+
+N_FEATURES = 125
+N_CAT = 10
+ALLOC_SLACK_BYTES = 1024  # écart absolu toléré sur les petites allocations
+
+
+class DummyModel:
+    """
+    Modèle factice : predict_proba constant (mesure le coût du chemin hors inférence).
+    """
+
+    def predict_proba(self, X, thread_count=None):
+        return np.array([[0.7, 0.3]])
+
+
+def synthetic_inputs(seed: int = 42) -> Tuple[List[str], List[str], Dict[str, Any]]:
+    """
+    Features conservées / catégorielles et payload valide de même forme que la production.
+    """
+    rng = np.random.default_rng(seed)
+    num = [f"NUM_{j:03d}" for j in range(N_FEATURES - N_CAT)]
+    cat = [f"CAT_{j:03d}" for j in range(N_CAT)]
+    kept = num + cat
+    payload: Dict[str, Any] = {"SK_ID_CURR": 100002}
+    payload.update({f: float(v) for f, v in zip(num, rng.lognormal(8.0, 2.0, len(num)))})
+    payload.update({f: str(rng.choice(["Cash loans", "Working", "XNA"])) for f in cat})
+    payload[num[0]] = None  # une valeur manquante
+    return kept, cat, payload
+
+
+def load_catboost(kept: List[str], cat: List[str], seed: int = 42) -> Tuple[Any, List[str], List[str], str]:
+    """
+    Charge le modèle local (app.config) s'il existe, sinon entraîne un CatBoostClassifier synthétique.
+    Retour : (modèle, kept, cat, nom de variante)
+    """
+    from app import config
+
+    if Path(config.LOCAL_MODEL_PATH).exists():
+        from app.model.loader import load_bundle_from_local
+
+        model, kept, cat, _ = load_bundle_from_local(
+            model_path=Path(config.LOCAL_MODEL_PATH),
+            kept_path=Path(config.LOCAL_KEPT_PATH),
+            cat_path=Path(config.LOCAL_CAT_PATH),
+            threshold_path=Path(config.LOCAL_THRESHOLD_PATH),
+        )
+        return model, kept, cat, "catboost_local"
+
+    from catboost import CatBoostClassifier
+
+    rng = np.random.default_rng(seed)
+    n = 2000
+    df = pd.DataFrame(rng.lognormal(8.0, 2.0, size=(n, len(kept) - len(cat))), columns=kept[: len(kept) - len(cat)])
+    for c in cat:
+        df[c] = rng.choice(["Cash loans", "Working", "XNA", "__MISSING__"], size=n)
+    y = (rng.random(n) < 0.1).astype(int)
+    model = CatBoostClassifier(
+        iterations=300, depth=6, verbose=False, random_seed=seed, thread_count=1, allow_writing_files=False
+    )
+    model.fit(df[kept], y, cat_features=[kept.index(c) for c in cat])
+    return model, kept, cat, "catboost_synthetic"
+
+
+def calibration_loop() -> float:
+    """
+    Travail de référence au profil du chemin chaud (dictionnaires Python, petits appels NumPy) : son temps
+    sert d'unité pour comparer des mesures prises sur des machines différentes.
+    """
+    d = {f"k{i}": i * 1.5 for i in range(200)}
+    a = np.arange(256, dtype=float)
+    return float(np.sum(a * a)) + sum(d.values())
+
+
+def measure(fn: Callable[[], Any], repeat: int = 7, min_time: float = 0.5) -> Dict[str, float]:
+    """
+    Mesure une fonction sans argument.
+
+    Retour :
+        dict : us_per_call (meilleure série), alloc_bytes_per_call (pic tracemalloc d'un appel, hors warm-up),
+        number (appels par série).
+    """
+    fn()  # warm-up (caches, imports paresseux)
+
+    number = 1
+    while True:
+        t = timeit.timeit(fn, number=number)
+        if t >= min_time / repeat or number >= 1 << 20:
+            break
+        number *= 2
+    best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(3):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            fn()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+
+    return {"us_per_call": best * 1e6, "alloc_bytes_per_call": float(min(peaks)), "number": number}
+
+
+def cases(model: Any, kept: List[str], cat: List[str], payload: Dict[str, Any], seed: int = 42) -> Dict[str, Callable[[], Any]]:
+    """
+    Fonctions mesurées (fermetures sans argument).
+    """
+    rng = np.random.default_rng(seed)
+    ref_p = np.full(10, 0.1)
+    prod_p = rng.dirichlet(np.ones(10))
+    values = pd.Series(rng.lognormal(8.0, 2.0, 1000))
+    edges = [float(e) for e in np.quantile(values, np.linspace(0, 1, 11))]
+    cats = pd.Series(rng.choice(["Cash loans", "Working", "XNA", "Pensioner", None], size=1000))
+    cat_labels = ["Cash loans", "Working", "XNA", "__MISSING__", "__OTHER__"]
+    engine = DriftReference([
+        {"feature": "num", "kind": "numeric", "bins_json": {"edges": edges},
+         "ref_dist_json": {"labels": [str(i) for i in range(10)], "p": list(ref_p)}},
+        {"feature": "cat", "kind": "categorical", "bins_json": {},
+         "ref_dist_json": {"labels": cat_labels, "p": [0.2] * 5}},
+    ])
+    batch = pd.DataFrame({"num": values, "cat": cats})
+    batch_counts = engine.counts(batch)
+    binner = DriftBinner([
+        {"feature": f, "kind": "categorical", "bins_json": {},
+         "ref_dist_json": {"labels": cat_labels, "p": [0.2] * 5}} if f in cat else
+        {"feature": f, "kind": "numeric", "bins_json": {"edges": edges},
+         "ref_dist_json": {"labels": [str(i) for i in range(10)], "p": list(ref_p)}}
+        for f in kept
+    ])
+    proba = np.array([[0.7, 0.3]])
+
+    return {
+        "build_row": lambda: build_row(payload, kept, cat),
+        "validate_payload": lambda: validate_payload(payload, kept, cat),
+        "extract_proba_class1": lambda: _extract_proba_class1(proba),
+        "predict_score": lambda: predict_score(model, payload, kept, cat, 0.5, thread_count=1),
+        "psi_from_dists": lambda: psi_from_dists(ref_p, prod_p),
+        "drift_counts_1k": lambda: engine.counts(batch),
+        "drift_psi": lambda: engine.psi(batch_counts),
+        "drift_bin_payload": lambda: binner.bin_payload(payload),
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            time_tol: float, alloc_tol: float, scale: float = 1.0) -> List[str]:
+    """
+    Retourne la liste des régressions (temps ou allocation au-delà de la tolérance relative).
+    Les temps de la baseline sont multipliés par `scale` (rapport des calibrations : run courant / baseline).
+    """
+    regressions = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if b is None:
+            continue
+        expected = b["us_per_call"] * scale
+        if r["us_per_call"] > expected * (1 + time_tol):
+            regressions.append(
+                f"{name}: {r['us_per_call']:.2f} us > {expected:.2f} us attendus "
+                f"(baseline {b['us_per_call']:.2f} us x {scale:.2f}, +{time_tol:.0%})"
+            )
+        if r["alloc_bytes_per_call"] > b["alloc_bytes_per_call"] * (1 + alloc_tol) + ALLOC_SLACK_BYTES:
+            regressions.append(
+                f"{name}: {r['alloc_bytes_per_call']:.0f} B > {b['alloc_bytes_per_call']:.0f} B (+{alloc_tol:.0%})"
+            )
+    return regressions
+
+
+def main() -> None:
+    """
+    Point d'entrée : mesure chaque fonction, affiche le tableau, met à jour ou vérifie la baseline.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", choices=["dummy", "catboost", "all"], default="all")
+    ap.add_argument("--repeat", type=int, default=7)
+    ap.add_argument("--min-time", type=float, default=0.5, help="Durée minimale d'une série (s)")
+    ap.add_argument("--baseline", default=str(BASELINE_PATH))
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--check", action="store_true", help="Code retour 1 en cas de régression")
+    ap.add_argument("--time-tolerance", type=float, default=0.50)
+    ap.add_argument("--alloc-tolerance", type=float, default=0.10)
+    ap.add_argument("--out", default=None, help="Chemin du rapport JSON")
+    args = ap.parse_args()
+
+    calibration_us = measure(calibration_loop, repeat=args.repeat, min_time=args.min_time)["us_per_call"]
+    print(f"{'calibration':<53} {calibration_us:>10.2f} us/appel")
+
+    kept, cat, payload = synthetic_inputs()
+    variants = []
+    if args.model in ("dummy", "all"):
+        variants.append(("dummy", DummyModel(), kept, cat))
+    if args.model in ("catboost", "all"):
+        t0 = time.perf_counter()
+        model, kept_cb, cat_cb, name = load_catboost(kept, cat)
+        print(f"{name} prêt ({time.perf_counter() - t0:.1f} s)")
+        variants.append((name, model, kept_cb, cat_cb))
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for variant, model, kept_v, cat_v in variants:
+        payload_v = payload if kept_v == kept else {f: payload.get(f) for f in ["SK_ID_CURR", *kept_v]}
+        results[variant] = {}
+        for name, fn in cases(model, kept_v, cat_v, payload_v).items():
+            if variant != "dummy" and not name.startswith("predict_score"):
+                continue  # seul predict_score dépend du modèle
+            r = measure(fn, repeat=args.repeat, min_time=args.min_time)
+            results[variant][name] = r
+            print(f"{variant:<20} {name:<32} {r['us_per_call']:>10.2f} us/appel  {r['alloc_bytes_per_call']:>9.0f} B/appel")
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "calibration_us": calibration_us,
+        "results": results,
+    }
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"OK: baseline écrite {baseline_path}")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"OK: écrit {args.out}")
+
+    if args.check:
+        if not baseline_path.exists():
+            raise FileNotFoundError(f"Baseline introuvable: {baseline_path} (lancer avec --update-baseline)")
+        stored = json.loads(baseline_path.read_text(encoding="utf-8"))
+        baseline = stored["results"]
+        scale = calibration_us / stored["calibration_us"] if stored.get("calibration_us") else 1.0
+        print(f"Échelle machine (calibration run / baseline) : x{scale:.2f}")
+        regressions = []
+        for variant, res in results.items():
+            regressions += [f"{variant}/{r}" for r in compare(res, baseline.get(variant, {}),
+                                                               args.time_tolerance, args.alloc_tolerance, scale)]
+        for r in regressions:
+            print(f"RÉGRESSION {r}")
+        if regressions:
+            raise SystemExit(1)
+        print("OK: aucune régression par rapport à la baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark des formats d'entrée des scripts de données (scripts/input_readers.py) : CSV vs Parquet vs Arrow IPC.
+Pour chaque format, mesure dans un processus séparé (pic RSS isolé) :
+- loader   : parcours par blocs de SK_ID_CURR + features conservées (script 01, sans encodage ni base)
+- refdist  : parcours feature par feature des features conservées (script 02, sans calcul)
+- full     : ancien chemin du script 02, pd.read_csv de tout le fichier (CSV seulement)
+Le fichier synthétique a --features colonnes, dont --kept sont "conservées" (projection).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))  # en tête : un paquet tiers "benchmarks" peut masquer celui du dépôt
+
+from benchmarks.bench_features_loader import write_synthetic_csv  # noqa: E402
+from scripts import input_readers  # noqa: E402
+
+
+def _peak_rss_mb() -> float:
+    """
+    Pic de mémoire résidente du processus courant (Mo).
+    VmHWM en priorité : sous Linux, ru_maxrss survit à exec et hériterait du pic du processus parent.
+    """
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _child(mode: str, path: Path, columns: List[str], chunksize: int) -> Dict[str, Any]:
+    """Exécute une mesure dans le processus courant (appelé via --child)."""
+    t0 = time.perf_counter()
+    n = 0
+    if mode == "loader":
+        for chunk in input_readers.iter_frames(path, columns=columns, chunksize=chunksize):
+            n += len(chunk)
+    elif mode == "refdist":
+        for _, s in input_readers.iter_columns(path, [c for c in columns if c != "SK_ID_CURR"]):
+            n += int(s.notna().sum())
+    else:
+        df = pd.read_csv(path)
+        n = int(df.shape[0])
+    return {"seconds": time.perf_counter() - t0, "peak_rss_mb": _peak_rss_mb(), "n": n}
+
+
+def _run_child(mode: str, path: Path, columns_file: Path, chunksize: int) -> Dict[str, Any]:
+    """Lance une mesure dans un sous-processus et relit son résultat JSON."""
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode, "--path", str(path),
+         "--columns-file", str(columns_file), "--chunksize", str(chunksize)],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    """
+    Point d'entrée : génère le CSV synthétique, le convertit en Parquet / IPC, mesure chaque format.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--features", type=int, default=300)
+    ap.add_argument("--kept", type=int, default=125, help="Nombre de features conservées (projection)")
+    ap.add_argument("--chunksize", type=int, default=2000)
+    ap.add_argument("--row-group-size", type=int, default=65_536)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=None, help="Chemin du rapport JSON")
+    ap.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--path", default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--columns-file", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        columns = json.loads(Path(args.columns_file).read_text(encoding="utf-8"))
+        print(json.dumps(_child(args.child, Path(args.path), columns, args.chunksize)))
+        return
+
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        csv_path = tmp_dir / "features.csv"
+        write_synthetic_csv(csv_path, args.rows, args.features, args.seed)
+
+        table = pa.Table.from_pandas(pd.read_csv(csv_path), preserve_index=False)
+        parquet_path = tmp_dir / "features.parquet"
+        ipc_path = tmp_dir / "features.arrow"
+        pq.write_table(table, parquet_path, row_group_size=args.row_group_size)
+        feather.write_feather(table, ipc_path, compression="uncompressed", chunksize=args.row_group_size)
+        del table
+
+        all_columns = input_readers.read_columns(csv_path)
+        columns = ["SK_ID_CURR", *[c for c in all_columns if c != "SK_ID_CURR"][: args.kept]]
+        columns_file = tmp_dir / "columns.json"
+        columns_file.write_text(json.dumps(columns), encoding="utf-8")
+
+        report: Dict[str, Any] = {
+            "rows": args.rows,
+            "features": args.features,
+            "kept": args.kept,
+            "size_mb": {p.suffix: p.stat().st_size / 1e6 for p in [csv_path, parquet_path, ipc_path]},
+        }
+        runs = [
+            ("csv", "full", csv_path),
+            ("csv", "loader", csv_path),
+            ("parquet", "loader", parquet_path),
+            ("ipc", "loader", ipc_path),
+            ("csv", "refdist", csv_path),
+            ("parquet", "refdist", parquet_path),
+            ("ipc", "refdist", ipc_path),
+        ]
+        for fmt, mode, path in runs:
+            res = _run_child(mode, path, columns_file, args.chunksize)
+            report[f"{mode}_{fmt}"] = res
+            print(f"{mode:<8} {fmt:<8} {res['seconds']:8.2f} s  pic RSS {res['peak_rss_mb']:8.0f} Mo")
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"OK: écrit {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark de l'encodage des inputs loggés dans prod_requests (LOG_INPUTS_ENCODING) :
+- Taille par ligne : dictionnaire JSON complet vs tableau de valeurs aligné sur un schéma
+  (texte JSON ; avec --pg, taille JSONB réelle via pg_column_size)
+- Temps de chargement côté client : décodage JSON + construction du DataFrame des inputs (_inputs_frame),
+  pour chacun des deux encodages
+Les payloads sont synthétiques (125 features, ~10 % de catégorielles) ou lus depuis un CSV API-ready (--csv).
+"""
+from __future__ import annotations
+from dotenv import load_dotenv
+load_dotenv()
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+def _synthetic_payloads(n_rows: int, n_features: int, seed: int) -> List[Dict[str, Any]]:
+    """
+    Génère des payloads proches de ceux de l'API : noms longs, flottants, entiers, quelques catégorielles.
+    """
+    rng = np.random.default_rng(seed)
+    names = [f"FEATURE_{i:03d}_AMT_MEAN_PREV_APPLICATION"[: 18 + (i % 20)] for i in range(n_features)]
+    n_cat = max(1, n_features // 10)
+    num = rng.lognormal(mean=8.0, sigma=2.0, size=(n_rows, n_features - n_cat))
+    cats = rng.choice(["Cash loans", "Revolving loans", "Working", "Pensioner", "XNA"], size=(n_rows, n_cat))
+
+    payloads = []
+    for i in range(n_rows):
+        row: Dict[str, Any] = {}
+        for j, name in enumerate(names[: n_features - n_cat]):
+            row[name] = float(num[i, j]) if j % 3 else int(num[i, j])
+        for j, name in enumerate(names[n_features - n_cat :]):
+            row[name] = str(cats[i, j])
+        payloads.append(row)
+    return payloads
+
+
+def _csv_payloads(csv_path: Path, n_rows: int) -> List[Dict[str, Any]]:
+    """Lit n_rows payloads depuis un CSV API-ready (NaN -> null, comme après validation)."""
+    df = pd.read_csv(csv_path, nrows=n_rows)
+    df = df.astype(object).where(pd.notna(df), None)
+    return df.to_dict(orient="records")
+
+
+def _inputs_frame(batch: List[Dict[str, Any]], columns: List[str], compact: bool) -> pd.DataFrame:
+    """
+    DataFrame des inputs d'un lot : tableau de valeurs aligné sur le schéma (compact) ou dictionnaires (json).
+    """
+    if compact:
+        return pd.DataFrame([r["inputs_values"] for r in batch], columns=columns)
+    return pd.DataFrame([r["inputs"] for r in batch])
+
+
+def _pg_sizes(texts: List[str]) -> float:
+    """Taille JSONB moyenne (octets) mesurée par Postgres (pg_column_size), ou NaN sans DB."""
+    from core.db.conn import get_conn
+
+    conn = get_conn()
+    if conn is None:
+        return float("nan")
+    sample = texts[:1000]
+    cur = conn.execute("SELECT avg(pg_column_size(x::jsonb)) FROM unnest(%s::text[]) AS x;", (sample,))
+    return float(cur.fetchone()[0])
+
+
+def _load_time(texts: List[str], compact: bool, columns: List[str], batch_size: int, repeat: int) -> float:
+    """
+    Temps (s) de décodage JSON + construction du DataFrame des inputs, par lots comme iter_prod_request_batches.
+    Meilleur de `repeat` essais.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        parts = []
+        for start in range(0, len(texts), batch_size):
+            chunk = texts[start : start + batch_size]
+            if compact:
+                batch = [{"inputs_schema_id": 1, "inputs_values": json.loads(t)} for t in chunk]
+            else:
+                batch = [{"inputs": json.loads(t)} for t in chunk]
+            parts.append(_inputs_frame(batch, columns, compact))
+        pd.concat(parts, ignore_index=True)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    """
+    Point d'entrée : mesure taille et temps de chargement pour les deux encodages, écrit un JSON optionnel.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=20000, help="Nombre de payloads")
+    ap.add_argument("--features", type=int, default=125, help="Nombre de features (payloads synthétiques)")
+    ap.add_argument("--csv", default=None, help="CSV API-ready à la place des payloads synthétiques")
+    ap.add_argument("--batch-size", type=int, default=5000, help="Taille de lot (comme iter_prod_request_batches)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--pg", action="store_true", help="Mesure aussi la taille JSONB via DATABASE_URL")
+    ap.add_argument("--out", default=None, help="Chemin du rapport JSON")
+    args = ap.parse_args()
+
+    if args.csv:
+        payloads = _csv_payloads(Path(args.csv), args.rows)
+    else:
+        payloads = _synthetic_payloads(args.rows, args.features, args.seed)
+    columns = list(payloads[0].keys())
+
+    json_texts = [json.dumps(p) for p in payloads]
+    compact_texts = [json.dumps(list(p.values())) for p in payloads]
+
+    report: Dict[str, Any] = {"rows": len(payloads), "features": len(columns)}
+    for name, texts, compact in [("json", json_texts, False), ("compact", compact_texts, True)]:
+        entry = {
+            "bytes_per_row_text": float(np.mean([len(t.encode("utf-8")) for t in texts])),
+            "load_s": _load_time(texts, compact, columns, args.batch_size, args.repeat),
+        }
+        if args.pg:
+            entry["bytes_per_row_jsonb"] = _pg_sizes(texts)
+        entry["rows_per_s"] = len(texts) / entry["load_s"]
+        report[name] = entry
+
+    report["size_ratio"] = report["compact"]["bytes_per_row_text"] / report["json"]["bytes_per_row_text"]
+    report["load_speedup"] = report["json"]["load_s"] / report["compact"]["load_s"]
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"OK: écrit {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Benchmark du chargement des logs de production en DataFrames :
+- dicts   : chemin historique du dashboard (dicts_frames) : lots de iter_prod_request_batches en dictionnaires
+            (JSONB décodé par json.loads, comme le chargeur psycopg), DataFrames construits ligne à ligne,
+            timings via json_normalize
+- copy    : export colonne par colonne (core.db.repo_prod_export) : flux CSV de COPY TO STDOUT, champs JSONB
+            projetés côté serveur, lu par le parseur C de pandas en colonnes typées
+Deux sources :
+- --db memory (défaut) : sans Postgres ; les lignes décodées (dicts) et le flux CSV (celui que renverrait COPY)
+  sont générés à partir d'un pool de --pool lignes synthétiques répétées, seule la conversion côté client est mesurée
+- --db postgres : DATABASE_URL ; --rows lignes insérées sous un endpoint dédié (--endpoint), lues par les deux
+  chemins (transfert compris), puis supprimées
+Pour chaque taille (--rows 100000 1000000) : temps de chargement et pic mémoire Python (tracemalloc, mesure séparée).
+"""
+from __future__ import annotations
+from dotenv import load_dotenv
+load_dotenv()
+import argparse
+import gc
+import io
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))  # en tête : un paquet tiers "benchmarks" peut masquer celui du dépôt
+
+import monitoring.lib.data as data  # noqa: E402
+from core.db.repo_prod_export import EXPORT_NULL, OUTPUT_FIELDS, frame_from_export_csv  # noqa: E402
+from core.db.repo_prod_requests import DEFAULT_BATCH_SIZE, iter_prod_request_batches  # noqa: E402
+from monitoring.lib.timings import extract_timings  # noqa: E402
+
+MODALITIES = ["Cash loans", "Revolving loans", "Working", "Pensioner", "XNA"]
+
+
+def synthetic_pool(n: int, n_features: int, n_cat: int, seed: int) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+    """
+    Pool de n événements de log (inputs validés, outputs avec timings) de forme proche de l'API.
+    """
+    rng = np.random.default_rng(seed)
+    num_names = [f"NUM_{j:03d}" for j in range(n_features - n_cat)]
+    cat_names = [f"CAT_{j:03d}" for j in range(n_cat)]
+    num = rng.lognormal(8.0, 2.0, size=(n, len(num_names)))
+    num[rng.random(size=num.shape) < 0.05] = np.nan
+    events = []
+    for i in range(n):
+        inputs: Dict[str, Any] = {f: (None if np.isnan(v) else float(v)) for f, v in zip(num_names, num[i])}
+        inputs.update({f: str(rng.choice(MODALITIES)) for f in cat_names})
+        proba = float(rng.random())
+        events.append({
+            "status_code": 200,
+            "latency_ms": float(rng.lognormal(3.0, 0.5)),
+            "sk_id_curr": str(100_000 + i),
+            "inputs": inputs,
+            "outputs": {
+                "proba_default": proba, "score": round(proba * 100, 2), "decision": "REFUSED" if proba > 0.5 else "ACCEPTED",
+                "threshold": 0.5, "timing": {"db_ms": 1.2, "validation_ms": 0.4, "inference_ms": 3.1, "total_ms": 5.0},
+            },
+        })
+    return num_names + cat_names, cat_names, events
+
+
+def memory_batches(events: List[Dict[str, Any]], n_rows: int, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Lots de lignes telles que les renvoie iter_prod_request_batches (JSONB décodé par json.loads à chaque ligne).
+    """
+    texts = [(json.dumps(e["inputs"]), json.dumps(e["outputs"])) for e in events]
+    ts = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for start in range(0, n_rows, batch_size):
+        batch = []
+        for i in range(start, min(n_rows, start + batch_size)):
+            e = events[i % len(events)]
+            inputs_text, outputs_text = texts[i % len(events)]
+            batch.append({
+                "ts": ts, "endpoint": "/predict", "status_code": e["status_code"], "latency_ms": e["latency_ms"],
+                "sk_id_curr": e["sk_id_curr"], "inputs": json.loads(inputs_text), "outputs": json.loads(outputs_text),
+                "error": None, "message": None, "inputs_schema_id": None, "inputs_values": None,
+            })
+        yield batch
+
+
+def dicts_frames(batches: Iterator[List[Dict[str, Any]]]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Chemin historique : métadonnées, inputs et timings construits lot par lot depuis des lignes en dictionnaires.
+    """
+    meta_parts, inputs_parts, outputs_parts = [], [], []
+    for batch in batches:
+        meta_parts.append(pd.DataFrame([{k: r.get(k) for k in ("ts", "endpoint", "status_code", "latency_ms")}
+                                        for r in batch]))
+        inputs_parts.append(pd.DataFrame([r.get("inputs") or {} for r in batch]))
+        outputs_parts.append(pd.DataFrame([r.get("outputs") or {} for r in batch]))
+    if not meta_parts:
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    outputs = pd.concat(outputs_parts, ignore_index=True)
+    return pd.concat(meta_parts, ignore_index=True), pd.concat(inputs_parts, ignore_index=True), extract_timings(outputs)
+
+
+def memory_csv(events: List[Dict[str, Any]], features: List[str], n_rows: int, path: Path) -> None:
+    """
+    Écrit le flux CSV que produirait la requête d'export pour n_rows lignes (pool répété).
+    """
+    rows = []
+    for i, e in enumerate(events):
+        row = {"id": i + 1, "ts": 1767225600.0, "status_code": e["status_code"], "latency_ms": e["latency_ms"], "sk_id_curr": e["sk_id_curr"]}
+        for name, (field_path, _) in OUTPUT_FIELDS.items():
+            v: Any = e["outputs"]
+            for key in field_path:
+                v = v.get(key) if isinstance(v, dict) else None
+            row[name] = v
+        row.update({f"in.{f}": e["inputs"].get(f) for f in features})
+        rows.append(row)
+    pool = pd.DataFrame(rows)
+    header = ",".join(pool.columns) + "\n"
+    block = pool.to_csv(index=False, header=False, na_rep=EXPORT_NULL)
+    with path.open("w", encoding="utf-8") as fh:
+        fh.write(header)
+        for _ in range(n_rows // len(events)):
+            fh.write(block)
+        rest = n_rows % len(events)
+        if rest:
+            fh.write(pool.head(rest).to_csv(index=False, header=False, na_rep=EXPORT_NULL))
+
+
+def seed_postgres(events: List[Dict[str, Any]], n_rows: int, endpoint: str) -> None:
+    """
+    Insère n_rows logs (pool répété) sous `endpoint` par COPY FROM STDIN.
+    """
+    from core.db.conn import get_conn
+
+    conn = get_conn()
+    with conn.cursor() as cur:
+        with cur.copy(
+            "COPY prod_requests (endpoint, status_code, latency_ms, sk_id_curr, inputs, outputs) FROM STDIN"
+        ) as copy:
+            for i in range(n_rows):
+                e = events[i % len(events)]
+                copy.write_row((endpoint, e["status_code"], e["latency_ms"], e["sk_id_curr"],
+                                json.dumps(e["inputs"]), json.dumps(e["outputs"])))
+
+
+def delete_postgres(endpoint: str) -> None:
+    from core.db.conn import get_conn
+
+    get_conn().execute("DELETE FROM prod_requests WHERE endpoint = %s", (endpoint,))
+
+
+def measure(fn: Callable[[], Any]) -> Dict[str, float]:
+    """
+    Temps d'un appel, puis pic mémoire Python d'un second appel (tracemalloc ralentit l'exécution).
+    """
+    gc.collect()
+    t0 = time.perf_counter()
+    out = fn()
+    seconds = time.perf_counter() - t0
+    del out
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": seconds, "peak_mb": peak / 1e6}
+
+
+def main() -> None:
+    """
+    Point d'entrée : pour chaque taille, mesure les deux chemins et affiche le rapport.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", choices=["memory", "postgres"], default="memory")
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--features", type=int, default=125)
+    ap.add_argument("--cat", type=int, default=10)
+    ap.add_argument("--pool", type=int, default=2000, help="Lignes synthétiques distinctes (répétées)")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    ap.add_argument("--endpoint", default="/bench_export", help="Endpoint des lignes insérées (--db postgres)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=None, help="Chemin du rapport JSON")
+    args = ap.parse_args()
+
+    features, cat_features, events = synthetic_pool(args.pool, args.features, args.cat, args.seed)
+    ref_rows = [{"feature": f, "kind": "categorical" if f in cat_features else "numeric"} for f in features]
+    report: Dict[str, Any] = {"db": args.db, "features": args.features, "cat": args.cat, "sizes": {}}
+
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            if args.db == "memory":
+                csv_path = Path(tmp) / "export.csv"
+                memory_csv(events, features, n_rows, csv_path)
+
+                def dicts_path() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+                    return dicts_frames(memory_batches(events, n_rows, args.batch_size))
+
+                def copy_path() -> pd.DataFrame:
+                    with csv_path.open("rb") as fh:
+                        return frame_from_export_csv(io.BufferedReader(fh), features, set(cat_features), True)
+            else:
+                delete_postgres(args.endpoint)
+                seed_postgres(events, n_rows, args.endpoint)
+
+                def dicts_path() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+                    return dicts_frames(iter_prod_request_batches(endpoint=args.endpoint, batch_size=args.batch_size))
+
+                def copy_path() -> pd.DataFrame:
+                    return data.load_prod_frame(endpoint=args.endpoint, limit=None, time_window="all",
+                                                ref_rows=ref_rows, excluded_features=set(), outputs=True)
+
+            sizes: Dict[str, Any] = {}
+            for name, fn in [("dicts", dicts_path), ("copy", copy_path)]:
+                sizes[name] = measure(fn)
+                print(f"{n_rows:>9} lignes  {name:<6} {sizes[name]['seconds']:8.2f} s  pic {sizes[name]['peak_mb']:9.1f} Mo")
+            sizes["speedup"] = sizes["dicts"]["seconds"] / sizes["copy"]["seconds"]
+            print(f"{'':>16}accélération x{sizes['speedup']:.1f}")
+            report["sizes"][str(n_rows)] = sizes
+            if args.db == "postgres":
+                delete_postgres(args.endpoint)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"OK: écrit {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark du calcul des distributions de référence (scripts/02_build_reference_dist.py), mode exact :
+- sequential : exact_ref_dists, une feature après l'autre dans un seul processus
+- pool       : parallel_ref_dists, features numériques réparties sur --workers processus
+               (colonnes passées par mémoire partagée)
+Pour chaque nombre de features (--features, ex. 125,1600), un Parquet synthétique (--rows lignes,
+~5 % de NaN, ~10 % de catégorielles) est généré dans un fichier temporaire. Aucune base n'est nécessaire.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))  # en tête : un paquet tiers "benchmarks" peut masquer celui du dépôt
+
+refdist = importlib.import_module("scripts.02_build_reference_dist")
+
+
+def write_synthetic_parquet(path: Path, n_rows: int, n_features: int, seed: int, block: int = 10_000) -> None:
+    """
+    Écrit un Parquet synthétique par row groups de `block` lignes (mémoire bornée).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rng = np.random.default_rng(seed)
+    n_cat = max(1, n_features // 10)
+    n_num = n_features - n_cat
+    names = [f"NUM_{j:04d}" for j in range(n_num)] + [f"CAT_{j:04d}" for j in range(n_cat)]
+    modalities = np.array(["Cash loans", "Revolving loans", "Working", "Pensioner", "XNA"])
+
+    writer = None
+    try:
+        for start in range(0, n_rows, block):
+            n = min(block, n_rows - start)
+            num = rng.lognormal(mean=8.0, sigma=2.0, size=(n, n_num))
+            num[rng.random(size=num.shape) < 0.05] = np.nan
+            arrays = [pa.array(num[:, j]) for j in range(n_num)]
+            arrays += [pa.array(modalities[rng.integers(0, len(modalities), size=n)]) for _ in range(n_cat)]
+            table = pa.Table.from_arrays(arrays, names=names)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def main() -> None:
+    """
+    Point d'entrée : pour chaque nombre de features, génère le Parquet et mesure chaque variante.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--features", default="125,1600", help="Nombres de features, séparés par des virgules")
+    ap.add_argument("--workers", type=int, default=max(2, os.cpu_count() or 2))
+    ap.add_argument("--bins", type=int, default=10)
+    ap.add_argument("--topk", type=int, default=30)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=None, help="Chemin du rapport JSON")
+    args = ap.parse_args()
+
+    report: Dict[str, Any] = {"rows": args.rows, "workers": args.workers, "cpus": os.cpu_count()}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_features in [int(v) for v in args.features.split(",")]:
+            path = Path(tmp) / f"ref_{n_features}.parquet"
+            write_synthetic_parquet(path, args.rows, n_features, args.seed)
+            columns = refdist.read_columns(path)
+
+            variants = [
+                ("sequential", lambda: refdist.exact_ref_dists(path, columns, args.bins, args.topk)),
+                (f"pool_{args.workers}",
+                 lambda: refdist.parallel_ref_dists(path, columns, args.bins, args.topk, args.workers)),
+            ]
+            results = {}
+            for name, fn in variants:
+                t0 = time.perf_counter()
+                dists = fn()
+                seconds = time.perf_counter() - t0
+                results[name] = dists
+                report[f"{name}_{n_features}"] = {"features": len(dists), "seconds": seconds}
+                print(f"{n_features:>5} features  {name:<10} {seconds:8.2f} s  "
+                      f"{len(dists) / seconds:8.1f} features/s")
+
+            same = json.dumps(results["sequential"], sort_keys=True) == json.dumps(
+                results[f"pool_{args.workers}"], sort_keys=True
+            )
+            report[f"identical_{n_features}"] = same
+            print(f"{n_features:>5} features  résultats identiques : {same}")
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"OK: écrit {args.out}")
+
+
+if __name__ == "__main__":
+    main()
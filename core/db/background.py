@@ -0,0 +1,78 @@
+# Module des tâches de fond du log writer :
+# Un thread démon par processus exécute périodiquement les tâches enregistrées (écriture des compteurs
+# tamponnés, rechargement des références de drift), pour que le chemin des requêtes ne fasse que des
+# opérations en mémoire. Une tâche en échec est simplement retentée à l'intervalle suivant.
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Période de réveil du thread (s) : borne basse des intervalles des tâches
+TICK_S = 0.5
+
+_LOCK = threading.Lock()
+_TASKS: Dict[str, Dict[str, Any]] = {}
+_WORKER: Optional[threading.Thread] = None
+
+
+def register_task(name: str, fn: Callable[[], Any], interval_s: Callable[[], float]) -> None:
+    """
+    Enregistre (une fois par nom) une tâche périodique et démarre le thread de fond si besoin.
+    La première exécution a lieu au prochain réveil du thread.
+
+    Paramètres :
+        name (str) : Nom unique de la tâche.
+        fn (callable) : Fonction sans argument à exécuter.
+        interval_s (callable) : Intervalle entre deux exécutions (relu à chaque exécution).
+    """
+    with _LOCK:
+        _TASKS.setdefault(name, {"fn": fn, "interval_s": interval_s, "next_at": float("-inf")})
+    _ensure_worker()
+
+
+def run_due_tasks(now: Optional[float] = None) -> List[str]:
+    """
+    Exécute les tâches dont l'échéance est atteinte. L'échéance suivante est fixée après l'exécution
+    (intervalle relu à ce moment : une tâche peut allonger ou raccourcir son délai selon son résultat) ;
+    une tâche en échec n'est donc retentée qu'après son intervalle.
+
+    Retour :
+        list[str] : Noms des tâches exécutées sans erreur.
+    """
+    now = time.monotonic() if now is None else now
+    with _LOCK:
+        due = [(name, task) for name, task in _TASKS.items() if now >= task["next_at"]]
+        for _, task in due:
+            task["next_at"] = float("inf")  # en cours
+
+    done: List[str] = []
+    for name, task in due:
+        try:
+            task["fn"]()
+            done.append(name)
+        except Exception:
+            pass
+        finally:
+            with _LOCK:
+                task["next_at"] = now + max(TICK_S, float(task["interval_s"]()))
+    return done
+
+
+def _worker_loop() -> None:
+    while True:
+        run_due_tasks()
+        time.sleep(TICK_S)
+
+
+def _ensure_worker() -> None:
+    """
+    Démarre (une fois par processus) le thread des tâches de fond.
+    """
+    global _WORKER
+    if _WORKER is not None and _WORKER.is_alive():
+        return
+    with _LOCK:
+        if _WORKER is None or not _WORKER.is_alive():
+            _WORKER = threading.Thread(target=_worker_loop, name="db-background", daemon=True)
+            _WORKER.start()
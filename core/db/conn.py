@@ -1,18 +1,65 @@
 """
 Gestion de la connexion à la base de données PostgreSQL et application des migrations SQL.
  - Fournit une connexion unique réutilisable
- - Applique les migrations au démarrage de l'application
+ - Route les lectures vers une réplique optionnelle (DATABASE_READ_URL), avec repli sur le primaire ;
+   la réplique est contrôlée par un thread de fond (connexion de contrôle dédiée), le chemin des requêtes
+   ne lit que le dernier verdict ; les lectures longues (curseurs serveur) ouvrent leur propre connexion
+ - Applique les migrations au démarrage de l'application, une seule fois chacune
+   (table schema_migrations + checksum, sous verrou consultatif)
 """
 from __future__ import annotations
 from dotenv import load_dotenv
 load_dotenv()
+import hashlib
 import os
+import threading
+import time
+import warnings
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import psycopg
 
 _CONN: Optional[psycopg.Connection] = None
+_READ_CONN: Optional[psycopg.Connection] = None
+# Connexion du seul thread de contrôle : la requête de retard ne partage jamais la transaction d'une lecture
+_PROBE_CONN: Optional[psycopg.Connection] = None
+
+# État de la réplique : dernier contrôle (monotonic) et verdict (joignable + retard acceptable),
+# écrit par le thread de contrôle et lu par les requêtes sous _READ_LOCK
+_READ_STATE: Dict[str, float | bool] = {"checked_at": float("-inf"), "usable": False}
+_READ_LOCK = threading.Lock()
+_MONITOR: Optional[threading.Thread] = None
+
+# Retard de réplication (s) : 0 si la réplique reçoit le WAL en continu et a tout rejoué ; NULL (= inutilisable)
+# sur une instance qui n'est pas en recovery (DATABASE_READ_URL pointant par erreur sur un primaire ou une base
+# autonome, ex. une base vide) ou si aucun WAL receiver ne streame (réplique coupée du primaire). Sans le rôle
+# pg_read_all_stats, status est masqué (NULL) : la simple présence du receiver vaut alors streaming.
+_REPLICA_LAG_SQL = """
+SELECT CASE
+  WHEN NOT pg_is_in_recovery() THEN NULL
+  WHEN NOT EXISTS (
+    SELECT 1 FROM pg_stat_wal_receiver WHERE COALESCE(status, 'streaming') = 'streaming'
+  ) THEN NULL
+  WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+  ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END;
+"""
+
+_MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+# Clé arbitraire (constante) du verrou consultatif qui sérialise les migrations entre processus
+_MIGRATIONS_LOCK_KEY = 7_201_027
+
+_SCHEMA_MIGRATIONS_DDL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version TEXT PRIMARY KEY,
+  checksum TEXT NOT NULL,
+  applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+_SELECT_APPLIED_SQL = "SELECT version, checksum FROM schema_migrations;"
+_INSERT_APPLIED_SQL = "INSERT INTO schema_migrations (version, checksum) VALUES (%s, %s);"
 
 
 def get_conn() -> Optional[psycopg.Connection]:
@@ -31,27 +78,293 @@ def get_conn() -> Optional[psycopg.Connection]:
     return _CONN
 
 
-def _apply_migrations(conn: psycopg.Connection) -> None:
+def _env_float(key: str, default: float) -> float:
+    """
+    Lit une variable d'environnement numérique (valeur par défaut si absente ou invalide).
+    """
+    try:
+        return float(os.getenv(key) or default)
+    except ValueError:
+        return default
+
+
+def _read_url() -> Optional[str]:
+    """
+    URL de la réplique (DATABASE_READ_URL), ou None si absente ou identique à DATABASE_URL :
+    les lectures vont alors sur le primaire, sans contrôle de réplication.
+    """
+    read_url = (os.getenv("DATABASE_READ_URL") or "").strip()
+    if not read_url or read_url == (os.getenv("DATABASE_URL") or "").strip():
+        return None
+    return read_url
+
+
+def _connect_replica(read_url: str) -> psycopg.Connection:
+    return psycopg.connect(
+        read_url,
+        autocommit=True,
+        connect_timeout=int(_env_float("DATABASE_READ_CONNECT_TIMEOUT_S", 2.0)),
+    )
+
+
+def _close_quietly(conn: Optional[psycopg.Connection]) -> None:
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _close_read_conn() -> None:
+    """
+    Ferme et oublie la connexion réplique des lectures (elle sera recréée au prochain contrôle favorable).
+    """
+    global _READ_CONN
+    _close_quietly(_READ_CONN)
+    _READ_CONN = None
+
+
+def _probe_replica(read_url: str) -> bool:
+    """
+    Mesure le retard de la réplique sur la connexion de contrôle (jamais sur celle des lectures, qui peut porter
+    une transaction ouverte où now() est figé) et vérifie qu'il reste sous DATABASE_READ_MAX_LAG_S.
+    Une instance hors recovery ou une réplique qui ne reçoit plus le WAL (retard NULL) est inutilisable.
+    Si le verdict est favorable, ouvre au besoin la connexion des lectures (ici, hors du chemin des requêtes).
+    """
+    global _PROBE_CONN, _READ_CONN
+    max_lag_s = _env_float("DATABASE_READ_MAX_LAG_S", 5.0)
+    try:
+        if _PROBE_CONN is None or _PROBE_CONN.closed:
+            _PROBE_CONN = _connect_replica(read_url)
+        row = _PROBE_CONN.execute(_REPLICA_LAG_SQL).fetchone()
+    except psycopg.Error:
+        _close_quietly(_PROBE_CONN)
+        _PROBE_CONN = None
+        return False
+
+    if row is None or row[0] is None or float(row[0]) > max_lag_s:
+        return False
+    if _READ_CONN is None or _READ_CONN.closed:
+        try:
+            _READ_CONN = _connect_replica(read_url)
+        except psycopg.Error:
+            return False
+    return True
+
+
+def refresh_replica_state() -> bool:
+    """
+    Contrôle la réplique (joignabilité, réception du WAL, retard) et publie le verdict pour les lectures.
+    Appelé par le thread de contrôle toutes les DATABASE_READ_CHECK_INTERVAL_S secondes, jamais par les requêtes.
+
+    Retour :
+        bool : True si les lectures peuvent être servies par la réplique.
+    """
+    read_url = _read_url()
+    usable = _probe_replica(read_url) if read_url else False
+    with _READ_LOCK:
+        _READ_STATE["usable"] = usable
+        _READ_STATE["checked_at"] = time.monotonic()
+    return usable
+
+
+def _replica_monitor_loop() -> None:
+    """
+    Boucle du thread de contrôle : s'arrête si DATABASE_READ_URL disparaît.
+    """
+    while _read_url():
+        try:
+            refresh_replica_state()
+        except Exception:
+            with _READ_LOCK:
+                _READ_STATE["usable"] = False
+        time.sleep(max(0.1, _env_float("DATABASE_READ_CHECK_INTERVAL_S", 5.0)))
+
+
+def _ensure_replica_monitor() -> None:
+    """
+    Démarre (une fois par processus) le thread de contrôle de la réplique.
+    """
+    global _MONITOR
+    if _MONITOR is not None and _MONITOR.is_alive():
+        return
+    with _READ_LOCK:
+        if _MONITOR is None or not _MONITOR.is_alive():
+            _MONITOR = threading.Thread(target=_replica_monitor_loop, name="replica-monitor", daemon=True)
+            _MONITOR.start()
+
+
+def _mark_replica_down() -> None:
+    """
+    Écarte la réplique jusqu'au prochain contrôle périodique.
+    """
+    with _READ_LOCK:
+        _READ_STATE["usable"] = False
+        _READ_STATE["checked_at"] = time.monotonic()
+    _close_read_conn()
+
+
+def get_read_conn() -> Optional[psycopg.Connection]:
+    """
+    Retourne la connexion à utiliser pour les lectures.
+
+    - Si DATABASE_READ_URL est défini : la réplique, tant que le dernier contrôle du thread de fond
+      (toutes les DATABASE_READ_CHECK_INTERVAL_S secondes) l'a jugée joignable, alimentée en WAL et
+      en retard <= DATABASE_READ_MAX_LAG_S. Aucune requête de contrôle sur le chemin des requêtes.
+    - Sinon (ou réplique indisponible / trop en retard / pas encore contrôlée, ou DATABASE_READ_URL identique à
+      DATABASE_URL) : la connexion primaire (get_conn).
+    """
+    if not _read_url():
+        return get_conn()
+
+    _ensure_replica_monitor()
+    with _READ_LOCK:
+        replica = _READ_CONN if _READ_STATE["usable"] else None
+    if replica is not None and not replica.closed:
+        return replica
+    return get_conn()
+
+
+def open_read_conn() -> Optional[psycopg.Connection]:
+    """
+    Ouvre une connexion de lecture dédiée, à fermer par l'appelant : réplique si le dernier contrôle l'a jugée
+    utilisable, sinon primaire. Pour les lectures longues (curseur serveur dans une transaction), qui
+    n'occupent ainsi ni la connexion partagée des lectures ni celle du contrôle de la réplique.
+
+    Retour :
+        Connexion psycopg (autocommit), ou None si aucune base n'est configurée.
+    """
+    read_url = _read_url()
+    if read_url:
+        _ensure_replica_monitor()
+        with _READ_LOCK:
+            usable = bool(_READ_STATE["usable"])
+        if usable:
+            try:
+                return _connect_replica(read_url)
+            except psycopg.OperationalError:
+                _mark_replica_down()
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        return None
+    return psycopg.connect(db_url, autocommit=True)
+
+
+def execute_read(sql: str, params: Any = None) -> Optional[psycopg.Cursor]:
+    """
+    Exécute une requête en lecture seule sur la connexion de lecture (réplique ou primaire).
+    En cas d'erreur de connexion sur la réplique, celle-ci est écartée et la requête rejouée sur le primaire.
+
+    Retour :
+        Curseur psycopg (fetchone/fetchall), ou None si aucune base n'est configurée.
+    """
+    conn = get_read_conn()
+    if conn is None:
+        return None
+
+    if conn is not _READ_CONN:
+        return conn.execute(sql, params)
+
+    try:
+        return conn.execute(sql, params)
+    except psycopg.OperationalError:
+        _mark_replica_down()
+        primary = get_conn()
+        if primary is None:
+            return None
+        return primary.execute(sql, params)
+
+
+def _list_migrations() -> List[Tuple[str, str, str]]:
     """
-    Applique toutes les migrations SQL présentes dans le dossier migrations/.
+    Liste les migrations SQL du dossier migrations/, triées par nom.
+
+    Retour :
+        Liste de tuples (version, checksum sha256, sql), version = nom du fichier sans extension.
     """
-    mig_dir = Path(__file__).resolve().parent / "migrations"
-    files = sorted(mig_dir.glob("*.sql"))
+    files = sorted(_MIGRATIONS_DIR.glob("*.sql"))
     if not files:
-        raise FileNotFoundError(f"No migrations found in: {mig_dir}")
+        raise FileNotFoundError(f"No migrations found in: {_MIGRATIONS_DIR}")
 
+    out: List[Tuple[str, str, str]] = []
     for f in files:
-        sql = f.read_text(encoding="utf-8")
-        conn.execute(sql)
+        raw = f.read_bytes()
+        out.append((f.stem, hashlib.sha256(raw).hexdigest(), raw.decode("utf-8")))
+    return out
+
+
+def _applied_migrations(conn: psycopg.Connection) -> Optional[Dict[str, str]]:
+    """
+    Retourne les migrations déjà appliquées {version: checksum}, ou None si schema_migrations n'existe pas encore.
+    """
+    try:
+        rows = conn.execute(_SELECT_APPLIED_SQL).fetchall()
+    except psycopg.errors.UndefinedTable:
+        return None
+    return {version: checksum for (version, checksum) in rows}
+
+
+def _warn_checksum_mismatch(migrations: List[Tuple[str, str, str]], applied: Dict[str, str]) -> None:
+    """
+    Signale les migrations déjà appliquées dont le fichier a été modifié depuis (elles ne sont pas rejouées).
+    """
+    changed = [v for (v, checksum, _) in migrations if v in applied and applied[v] != checksum]
+    if changed:
+        warnings.warn(
+            f"Migrations modifiées après application (non rejouées) : {', '.join(changed)}",
+            RuntimeWarning,
+            stacklevel=3,
+        )
+
+
+def apply_migrations(conn: psycopg.Connection) -> List[str]:
+    """
+    Applique les migrations SQL de migrations/ qui ne l'ont pas encore été.
+
+    - Régime établi : une seule requête (lecture de schema_migrations), aucun verrou.
+    - Sinon : verrou consultatif transactionnel (un seul processus migre à la fois),
+      puis chaque migration manquante est exécutée et enregistrée avec son checksum,
+      dans une même transaction.
+
+    Paramètres :
+        conn (psycopg.Connection) : Connexion PostgreSQL.
+
+    Retour :
+        Liste des versions appliquées lors de cet appel (vide si rien à faire).
+    """
+    migrations = _list_migrations()
+
+    applied = _applied_migrations(conn)
+    if applied is not None and all(v in applied for (v, _, _) in migrations):
+        _warn_checksum_mismatch(migrations, applied)
+        return []
+
+    done: List[str] = []
+    with conn.transaction():
+        conn.execute("SELECT pg_advisory_xact_lock(%s);", (_MIGRATIONS_LOCK_KEY,))
+        conn.execute(_SCHEMA_MIGRATIONS_DDL)
+
+        # relu sous verrou : un autre processus a pu migrer entre-temps
+        applied = _applied_migrations(conn) or {}
+        _warn_checksum_mismatch(migrations, applied)
+
+        for version, checksum, sql in migrations:
+            if version in applied:
+                continue
+            conn.execute(sql)
+            conn.execute(_INSERT_APPLIED_SQL, (version, checksum))
+            done.append(version)
+
+    return done
 
 
 def init_db() -> None:
     """
-    Initialise la base de données : applique les migrations si possible.
+    Initialise la base de données : applique les migrations manquantes si possible.
     Si DATABASE_URL est absent, ne fait rien (API reste UP).
     """
     conn = get_conn()
     if conn is None:
         return
 
-    _apply_migrations(conn)
\ No newline at end of file
+    apply_migrations(conn)
\ No newline at end of file
@@ -0,0 +1,48 @@
+-- 004_init_ops_rollup.sql
+-- Agrégats opérationnels par minute x endpoint, maintenus par le log writer (insert_prod_request).
+-- Une ligne par (minute, endpoint, métrique, clé) :
+--   metric = 'status'      key = code HTTP
+--   metric = 'decision'    key = ACCEPTED / REFUSED
+--   metric = 'latency_ms'  key = index de bin d'histogramme (idem db_ms, validation_ms, inference_ms, total_ms)
+-- total = somme des valeurs observées (histogrammes) -> moyenne exacte.
+
+CREATE TABLE IF NOT EXISTS ops_rollup_1m (
+  bucket TIMESTAMPTZ NOT NULL,
+  endpoint TEXT NOT NULL,
+  metric TEXT NOT NULL,
+  key TEXT NOT NULL,
+  n BIGINT NOT NULL DEFAULT 0,
+  total DOUBLE PRECISION NOT NULL DEFAULT 0,
+  PRIMARY KEY (bucket, endpoint, metric, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ops_rollup_1m_endpoint_bucket
+ON ops_rollup_1m(endpoint, bucket);
+
+-- Bins log-linéaires : 4 par octave à partir de 0.01 ms (identique à core.db.repo_ops_rollup.latency_bin)
+CREATE OR REPLACE FUNCTION ops_latency_bin(x DOUBLE PRECISION)
+RETURNS INTEGER AS $f$
+  SELECT CASE
+    WHEN x IS NULL THEN NULL
+    WHEN x < 0.01 THEN 0
+    ELSE LEAST(floor(4 * log(2.0, (x / 0.01)::numeric))::integer + 1, 94)
+  END;
+$f$ LANGUAGE sql IMMUTABLE;
+
+-- Reprise de l'historique existant (une seule fois, la migration n'est appliquée qu'une fois)
+INSERT INTO ops_rollup_1m (bucket, endpoint, metric, key, n, total)
+SELECT date_trunc('minute', p.ts), p.endpoint, m.metric, m.key, count(*), COALESCE(sum(m.v), 0)
+FROM prod_requests p
+CROSS JOIN LATERAL (
+  VALUES
+    ('status', p.status_code::text, NULL::double precision),
+    ('decision', p.outputs->>'decision', NULL::double precision),
+    ('latency_ms', ops_latency_bin(p.latency_ms)::text, p.latency_ms),
+    ('db_ms', ops_latency_bin((p.outputs->'timing'->>'db_ms')::double precision)::text, (p.outputs->'timing'->>'db_ms')::double precision),
+    ('validation_ms', ops_latency_bin((p.outputs->'timing'->>'validation_ms')::double precision)::text, (p.outputs->'timing'->>'validation_ms')::double precision),
+    ('inference_ms', ops_latency_bin((p.outputs->'timing'->>'inference_ms')::double precision)::text, (p.outputs->'timing'->>'inference_ms')::double precision),
+    ('total_ms', ops_latency_bin((p.outputs->'timing'->>'total_ms')::double precision)::text, (p.outputs->'timing'->>'total_ms')::double precision)
+) AS m(metric, key, v)
+WHERE m.key IS NOT NULL
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (bucket, endpoint, metric, key) DO NOTHING;
\ No newline at end of file
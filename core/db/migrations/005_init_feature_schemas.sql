@@ -0,0 +1,16 @@
+-- 005_init_feature_schemas.sql
+-- Encodage compact des inputs loggés : la liste ordonnée des features est enregistrée une fois
+-- dans feature_schemas, chaque requête ne stocke plus que le tableau des valeurs aligné sur ce schéma.
+--   prod_requests.inputs          : JSONB {feature: valeur} (encodage historique, par défaut)
+--   prod_requests.inputs_schema_id + inputs_values : encodage compact (LOG_INPUTS_ENCODING=compact)
+
+CREATE TABLE IF NOT EXISTS feature_schemas (
+  id SERIAL PRIMARY KEY,
+  columns_hash TEXT NOT NULL UNIQUE,
+  columns JSONB NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+ALTER TABLE prod_requests
+  ADD COLUMN IF NOT EXISTS inputs_schema_id INTEGER REFERENCES feature_schemas(id),
+  ADD COLUMN IF NOT EXISTS inputs_values JSONB;
@@ -0,0 +1,7 @@
+-- 006_features_store_data_hash.sql
+-- Empreinte du contenu de chaque ligne (core.db.repo_features_store.features_hash) :
+-- le chargeur ne réécrit que les clients dont l'empreinte a changé.
+-- Les lignes existantes restent à NULL et seront réécrites une fois au prochain chargement.
+
+ALTER TABLE features_store
+  ADD COLUMN IF NOT EXISTS data_hash TEXT;
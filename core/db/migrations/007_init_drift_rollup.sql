@@ -0,0 +1,18 @@
+-- 007_init_drift_rollup.sql
+-- Compteurs de drift par heure x endpoint x version de référence, maintenus par le log writer
+-- (core.db.repo_drift_rollup) : une ligne par (heure, feature, bin), n = nombre de requêtes réussies
+-- dont la valeur tombe dans ce bin de référence.
+--   bin = index du bin / libellé de ref_feature_dist, -1 = hors référence (manquant ou hors bornes
+--   pour une numérique, modalité inconnue sans '__OTHER__' pour une catégorielle)
+--   ref_version = empreinte des bornes / libellés (une référence reconstruite ouvre une nouvelle série)
+-- Pas de reprise d'historique : les fenêtres antérieures restent calculées depuis prod_requests.
+
+CREATE TABLE IF NOT EXISTS drift_rollup_1h (
+  bucket TIMESTAMPTZ NOT NULL,
+  endpoint TEXT NOT NULL,
+  ref_version TEXT NOT NULL,
+  feature TEXT NOT NULL,
+  bin INTEGER NOT NULL,
+  n BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (ref_version, endpoint, bucket, feature, bin)
+);
@@ -0,0 +1,14 @@
+-- 008_json_label.sql
+-- Libellé d'une valeur JSON pour les features catégorielles, identique à str() sur la valeur décodée en Python
+-- (pandas : astype(str)) : booléens 'True' / 'False', nombres et chaînes en texte brut, null -> NULL.
+-- Seul endroit où les requêtes SQL (références calculées dans Postgres, drift des logs) convertissent
+-- une modalité JSON en libellé.
+
+CREATE OR REPLACE FUNCTION json_label(v JSONB)
+RETURNS TEXT AS $f$
+  SELECT CASE jsonb_typeof(v)
+    WHEN 'null' THEN NULL
+    WHEN 'boolean' THEN CASE WHEN v = 'true'::jsonb THEN 'True' ELSE 'False' END
+    ELSE v #>> '{}'
+  END;
+$f$ LANGUAGE sql IMMUTABLE;
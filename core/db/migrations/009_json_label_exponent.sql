@@ -0,0 +1,21 @@
+-- 009_json_label_exponent.sql
+-- json_label : nombres hors de [1e-4, 1e16) au format de str() Python ('1e+20', '1.5e-07').
+-- JSONB normalise le texte des nombres ('1e+20' est relu '100000000000000000000') alors que Python écrit ces
+-- flottants en notation scientifique ; la sortie float8 (plus courte représentation exacte) utilise la même
+-- notation sur ces plages. Écart résiduel : un entier JSON de 16 chiffres ou plus (int Python) est libellé
+-- comme un flottant.
+
+CREATE OR REPLACE FUNCTION json_label(v JSONB)
+RETURNS TEXT AS $f$
+  SELECT CASE jsonb_typeof(v)
+    WHEN 'null' THEN NULL
+    WHEN 'boolean' THEN CASE WHEN v = 'true'::jsonb THEN 'True' ELSE 'False' END
+    WHEN 'number' THEN CASE
+      WHEN abs((v #>> '{}')::numeric) >= 1e16
+        OR ((v #>> '{}')::numeric <> 0 AND abs((v #>> '{}')::numeric) < 1e-4)
+      THEN (v #>> '{}')::double precision::text
+      ELSE v #>> '{}'
+    END
+    ELSE v #>> '{}'
+  END;
+$f$ LANGUAGE sql IMMUTABLE;
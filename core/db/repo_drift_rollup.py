@@ -0,0 +1,412 @@
+# Module des compteurs de drift par heure (table drift_rollup_1h) :
+# Le log writer bine chaque payload validé sur les bornes de référence (ref_feature_dist, mises en cache)
+# et incrémente des compteurs (heure, endpoint, version de référence, feature, bin), tamponnés en mémoire
+# puis écrits par lots. Rechargement des références et écriture du tampon sont faits par le thread de fond
+# (core.db.background) : le chemin des requêtes ne touche jamais la base.
+# Le PSI d'une fenêtre se calcule en sommant ces compteurs (features x bins lignes)
+# au lieu de relire et re-biner tous les inputs loggés.
+# Sans compteurs (historique, autre référence), select_prod_drift_bins bine les inputs loggés dans Postgres
+# et ne renvoie que les comptes (même format).
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.db.background import register_task
+from core.db.conn import execute_read, get_conn
+from core.db.repo_ref_dist import load_all_ref
+from core.drift_ref import MISSING_LABEL, OTHER_LABEL, OVERFLOW_BIN, parse_ref
+
+_SQL_DIR = Path(__file__).resolve().parent / "sql"
+_UPSERT_SQL = (_SQL_DIR / "drift_rollup_upsert.sql").read_text(encoding="utf-8")
+_SELECT_SQL = (_SQL_DIR / "drift_rollup_select.sql").read_text(encoding="utf-8")
+_SELECT_SERIES_SQL = (_SQL_DIR / "drift_rollup_select_series.sql").read_text(encoding="utf-8")
+_COVERAGE_SQL = (_SQL_DIR / "drift_rollup_coverage.sql").read_text(encoding="utf-8")
+_LOGS_BINS_SQL = (_SQL_DIR / "prod_requests_drift_bins.sql").read_text(encoding="utf-8")
+
+# Périodes des séries PSI (date_trunc)
+SERIES_PERIODS = ("hour", "day")
+
+# Clé de tampon : (heure, endpoint, version de référence, feature, bin)
+_BufferKey = Tuple[datetime, str, str, str, int]
+
+_LOCK = threading.Lock()
+_BUFFER: Dict[_BufferKey, int] = {}
+_STATE: Dict[str, Any] = {"binner": None, "loaded_at": float("-inf"), "load_failed": False}
+
+
+def _env_float(key: str, default: float) -> float:
+    """
+    Lit une variable d'environnement numérique (valeur par défaut si absente ou invalide).
+    """
+    try:
+        return float(os.getenv(key) or default)
+    except ValueError:
+        return default
+
+
+def drift_counters_enabled() -> bool:
+    """
+    Compteurs de drift actifs sauf si DRIFT_COUNTERS=0.
+    """
+    return (os.getenv("DRIFT_COUNTERS") or "1").strip() != "0"
+
+
+def ref_version(ref_rows: List[Dict[str, Any]]) -> str:
+    """
+    Empreinte des bornes / libellés de référence : les compteurs ne sont additionnés qu'à version égale
+    (une référence reconstruite ouvre une nouvelle série de compteurs).
+    """
+    payload = sorted(
+        (str(r.get("feature")), str(r.get("kind")), (r.get("bins_json") or {}).get("edges"),
+         (r.get("ref_dist_json") or {}).get("labels"))
+        for r in ref_rows
+    )
+    return hashlib.sha256(json.dumps(payload, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def _to_float(v: Any) -> float:
+    try:
+        return float(v) if v is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class DriftBinner:
+    """
+    Bornes et libellés de référence pré-chargés pour biner un payload à la volée.
+
+    Numériques : une matrice de bornes complétée (+inf) -> tous les bins d'un payload en une comparaison
+    vectorisée. Catégorielles : un dictionnaire libellé -> code par feature.
+    """
+
+    def __init__(self, ref_rows: List[Dict[str, Any]]) -> None:
+        self.version = ref_version(ref_rows)
+        self.num_features: List[str] = []
+        self.cat_features: List[str] = []
+        self._cat_codes: List[Tuple[Dict[str, int], int]] = []
+        edges: List[np.ndarray] = []
+
+        for ref in ref_rows:
+            note, e, labels, _ = parse_ref(ref)
+            if note is not None:
+                continue
+            if ref.get("kind") == "numeric":
+                self.num_features.append(str(ref["feature"]))
+                edges.append(e)
+            else:
+                lookup = {lbl: i for i, lbl in enumerate(labels)}
+                self.cat_features.append(str(ref["feature"]))
+                self._cat_codes.append((lookup, lookup.get(OTHER_LABEL, OVERFLOW_BIN)))
+
+        self._n_bins = np.array([len(e) - 1 for e in edges], dtype=np.int64)
+        width = max((len(e) for e in edges), default=1)
+        self._edges = np.full((len(edges), width), np.inf)
+        for i, e in enumerate(edges):
+            self._edges[i, : len(e)] = e
+
+    def bin_payload(self, inputs: Dict[str, Any]) -> Tuple[List[str], List[int]]:
+        """
+        Bins d'un payload pour toutes les features de référence : une feature absente du payload est manquante
+        (numérique : OVERFLOW_BIN, catégorielle : '__MISSING__'), comme une colonne vide côté pandas.
+
+        Retour :
+            Deux listes alignées (features, bins) ; OVERFLOW_BIN pour les valeurs hors référence.
+        """
+        features: List[str] = list(self.num_features)
+        bins: List[int] = []
+
+        if self.num_features:
+            x = np.array([_to_float(inputs.get(f)) for f in self.num_features])
+            e = self._edges
+            b = (x[:, None] > e).sum(axis=1) - 1
+            b[x == e[:, 0]] = 0
+            b[(b < 0) | (b >= self._n_bins)] = OVERFLOW_BIN
+            bins.extend(b.tolist())
+
+        for feat, (lookup, unknown) in zip(self.cat_features, self._cat_codes):
+            v = inputs.get(feat)
+            key = MISSING_LABEL if v is None or (isinstance(v, float) and math.isnan(v)) else str(v)
+            features.append(feat)
+            bins.append(lookup.get(key, unknown))
+
+        return features, bins
+
+
+def reload_drift_binner() -> Optional[DriftBinner]:
+    """
+    Recharge le binner depuis ref_feature_dist (tâche de fond, toutes les DRIFT_REF_TTL_S secondes, 300 par défaut).
+    En cas d'échec, le binner précédent est conservé et un nouvel essai a lieu après DRIFT_REF_RETRY_S secondes
+    (30 par défaut).
+
+    Retour :
+        DriftBinner|None : Binner chargé (None sans référence disponible).
+    """
+    try:
+        refs = load_all_ref()
+    except Exception:
+        _STATE["load_failed"] = True
+        raise
+    binner = DriftBinner(refs) if refs else None
+    with _LOCK:
+        _STATE["binner"] = binner
+        _STATE["loaded_at"] = time.monotonic()
+        _STATE["load_failed"] = False
+    return binner
+
+
+def _reload_interval_s() -> float:
+    """
+    Délai avant le prochain rechargement : DRIFT_REF_TTL_S, ou DRIFT_REF_RETRY_S après un échec.
+    """
+    ttl = _env_float("DRIFT_REF_TTL_S", 300.0)
+    return min(ttl, _env_float("DRIFT_REF_RETRY_S", 30.0)) if _STATE["load_failed"] else ttl
+
+
+def _start_background_tasks() -> None:
+    """
+    Enregistre (une fois) le rechargement des références et l'écriture du tampon auprès du thread de fond.
+    """
+    register_task("drift_ref_reload", reload_drift_binner, _reload_interval_s)
+    register_task("drift_flush", flush_drift_counts, lambda: _env_float("DRIFT_FLUSH_INTERVAL_S", 10.0))
+
+
+def record_drift_counts(event: Dict[str, Any], ts: Optional[datetime] = None) -> None:
+    """
+    Bine les inputs d'une requête réussie et incrémente les compteurs en mémoire (aucun accès base).
+    Le binner est celui chargé par le thread de fond : tant qu'aucune référence n'est chargée, rien n'est compté.
+    Le tampon est écrit toutes les DRIFT_FLUSH_INTERVAL_S secondes (10 par défaut) par le thread de fond.
+
+    Paramètres :
+        event (dict) : Événement passé à insert_prod_request (seuls les status 200 avec inputs sont comptés).
+        ts (datetime|None) : Horodatage de la requête (défaut : maintenant, UTC).
+    """
+    inputs = event.get("inputs") or {}
+    if int(event.get("status_code") or 0) != 200 or not inputs or not drift_counters_enabled():
+        return
+
+    _start_background_tasks()
+    binner = _STATE["binner"]
+    if binner is None:
+        return
+
+    features, bins = binner.bin_payload(inputs)
+    bucket = (ts or datetime.now(timezone.utc)).replace(minute=0, second=0, microsecond=0)
+    endpoint = str(event.get("endpoint"))
+    with _LOCK:
+        for feat, b in zip(features, bins):
+            key = (bucket, endpoint, binner.version, feat, int(b))
+            _BUFFER[key] = _BUFFER.get(key, 0) + 1
+
+
+def flush_drift_counts(conn: Any = None) -> int:
+    """
+    Écrit le tampon de compteurs en une requête (tableaux + unnest, incréments additionnés en base).
+    En cas d'erreur, les compteurs sont remis dans le tampon pour la prochaine écriture.
+
+    Paramètres :
+        conn (Connection|None) : Connexion à utiliser ; défaut : get_conn().
+
+    Retour :
+        int : Nombre de compteurs écrits (0 sans connexion ou tampon vide).
+    """
+    conn = conn if conn is not None else get_conn()
+    with _LOCK:
+        if conn is None or not _BUFFER:
+            return 0
+        items = list(_BUFFER.items())
+        _BUFFER.clear()
+
+    try:
+        conn.execute(
+            _UPSERT_SQL,
+            {
+                "buckets": [k[0] for k, _ in items],
+                "endpoints": [k[1] for k, _ in items],
+                "versions": [k[2] for k, _ in items],
+                "features": [k[3] for k, _ in items],
+                "bins": [k[4] for k, _ in items],
+                "counts": [n for _, n in items],
+            },
+        )
+    except Exception:
+        with _LOCK:
+            for key, n in items:
+                _BUFFER[key] = _BUFFER.get(key, 0) + n
+        raise
+    return len(items)
+
+
+def select_drift_rollup(
+    ref_version: str,
+    endpoint: str = "/predict",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Récupère les compteurs de drift (sommés sur la fenêtre) d'un endpoint pour une version de référence.
+
+    Paramètres :
+        ref_version (str) : Version de référence (ref_version des lignes de ref_feature_dist).
+        endpoint (str) : Nom de l'endpoint.
+        since (datetime|None) : Début de fenêtre (inclus, arrondi à l'heure) ; None = depuis le début.
+        until (datetime|None) : Fin de fenêtre (exclue) ; None = jusqu'à maintenant.
+
+    Retour :
+        Liste de dictionnaires {feature, bin, n}.
+    """
+    cur = execute_read(
+        _SELECT_SQL, {"ref_version": ref_version, "endpoint": endpoint, "since": since, "until": until}
+    )
+    if cur is None:
+        return []
+
+    return [{"feature": feature, "bin": int(b), "n": int(n)} for (feature, b, n) in cur.fetchall()]
+
+
+def drift_rollup_covers(ref_version: str, endpoint: str = "/predict", since: Optional[datetime] = None) -> bool:
+    """
+    Indique si les compteurs d'une version de référence couvrent toute la fenêtre : ils ne sont tenus qu'à partir
+    du déploiement de cette version (pas de reprise d'historique), le premier compteur doit donc précéder
+    (à l'heure près) la première requête réussie loggée de la fenêtre.
+
+    Contrôle partiel, les compteurs restent un minorant : les requêtes servies avant le premier rechargement du
+    binner (référence pas encore chargée) et les buffers perdus sur un crash de l'API ne sont pas comptés, et
+    un trou après le premier compteur n'est pas détecté.
+
+    Paramètres :
+        ref_version (str) : Version de référence.
+        endpoint (str) : Nom de l'endpoint.
+        since (datetime|None) : Début de fenêtre ; None = depuis le début.
+
+    Retour :
+        bool : False sans compteur pour cette version (ou sans base).
+    """
+    cur = execute_read(_COVERAGE_SQL, {"ref_version": ref_version, "endpoint": endpoint, "since": since})
+    if cur is None:
+        return False
+    row = cur.fetchone()
+    first_bucket, first_log = (row or (None, None))[:2]
+    if first_bucket is None:
+        return False
+    return first_log is None or first_bucket <= first_log
+
+
+def _check_period(period: str) -> str:
+    if period not in SERIES_PERIODS:
+        raise ValueError(f"Période inconnue : {period!r} (attendu : {', '.join(SERIES_PERIODS)})")
+    return period
+
+
+def select_drift_rollup_series(
+    ref_version: str,
+    endpoint: str = "/predict",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    period: str = "hour",
+) -> List[Dict[str, Any]]:
+    """
+    Récupère les compteurs de drift d'un endpoint par période (heure ou jour), pour une version de référence.
+
+    Paramètres :
+        ref_version (str) : Version de référence.
+        endpoint (str) : Nom de l'endpoint.
+        since (datetime|None) : Début de fenêtre (inclus, arrondi à l'heure) ; None = depuis le début.
+        until (datetime|None) : Fin de fenêtre (exclue) ; None = jusqu'à maintenant.
+        period (str) : 'hour' ou 'day'.
+
+    Retour :
+        Liste de dictionnaires {bucket, feature, bin, n}, par période croissante.
+    """
+    cur = execute_read(
+        _SELECT_SERIES_SQL,
+        {"ref_version": ref_version, "endpoint": endpoint, "since": since, "until": until,
+         "period": _check_period(period)},
+    )
+    if cur is None:
+        return []
+
+    return [
+        {"bucket": bucket, "feature": feature, "bin": int(b), "n": int(n)} for (bucket, feature, b, n) in cur.fetchall()
+    ]
+
+
+def _sql_refs(ref_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Références exploitables au format attendu par prod_requests_drift_bins.sql
+    (bornes négées triées pour width_bucket, libellés, bin des modalités inconnues).
+    """
+    out: List[Dict[str, Any]] = []
+    for ref in ref_rows:
+        note, edges, labels, _ = parse_ref(ref)
+        if note is not None:
+            continue
+        if ref.get("kind") == "numeric":
+            out.append({
+                "feature": str(ref["feature"]), "kind": "numeric", "n_bins": len(edges) - 1, "lo": float(edges[0]),
+                "neg_edges": sorted(-float(e) for e in edges), "labels": [], "unknown_bin": OVERFLOW_BIN,
+            })
+        else:
+            out.append({
+                "feature": str(ref["feature"]), "kind": "categorical", "n_bins": len(labels), "lo": None,
+                "neg_edges": [], "labels": labels,
+                "unknown_bin": labels.index(OTHER_LABEL) if OTHER_LABEL in labels else OVERFLOW_BIN,
+            })
+    return out
+
+
+def select_prod_drift_bins(
+    ref_rows: List[Dict[str, Any]],
+    endpoint: str = "/predict",
+    since: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    period: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Bine dans Postgres les inputs loggés d'une fenêtre sur les références, en une requête :
+    seuls les comptes (feature, bin) sont transférés, pas les payloads JSONB.
+
+    Paramètres :
+        ref_rows (list[dict]) : Lignes de ref_feature_dist.
+        endpoint (str) : Nom de l'endpoint.
+        since (datetime|None) : Début de fenêtre (inclus) ; None = depuis le début.
+        limit (int|None) : Nombre maximum de requêtes (les plus récentes) ; None = toutes.
+        period (str|None) : 'hour' / 'day' pour ventiler les comptes par période ; None = fenêtre entière.
+
+    Retour :
+        Liste de dictionnaires {feature, bin, n} (même format que select_drift_rollup),
+        avec une clé 'bucket' si period est renseignée.
+    """
+    refs = _sql_refs(ref_rows)
+    if not refs:
+        return []
+
+    cur = execute_read(
+        _LOGS_BINS_SQL,
+        {
+            "refs": json.dumps(refs),
+            "endpoint": endpoint,
+            "since": since,
+            "limit": None if limit is None else int(limit),
+            "offset": max(0, int(limit or 0) - 1),
+            "period": None if period is None else _check_period(period),
+        },
+    )
+    if cur is None:
+        return []
+
+    if period is None:
+        return [{"feature": feature, "bin": int(b), "n": int(n)} for (feature, b, n, _) in cur.fetchall()]
+    return [
+        {"bucket": bucket, "feature": feature, "bin": int(b), "n": int(n)}
+        for (feature, b, n, bucket) in cur.fetchall()
+    ]
@@ -0,0 +1,97 @@
+# Module des schémas de features (table feature_schemas) :
+# Enregistre la liste ordonnée des features d'un payload une seule fois, pour que les logs
+# de production ne stockent plus que le tableau des valeurs (encodage compact des inputs).
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from psycopg.types.json import Jsonb
+
+from core.db.conn import execute_read, get_conn
+
+_SQL_DIR = Path(__file__).resolve().parent / "sql"
+_UPSERT_SQL = (_SQL_DIR / "feature_schemas_upsert.sql").read_text(encoding="utf-8")
+_SELECT_SQL = (_SQL_DIR / "feature_schemas_select.sql").read_text(encoding="utf-8")
+
+# Les schémas sont immuables : caches process (id <-> colonnes), jamais invalidés
+_ID_BY_COLUMNS: Dict[Tuple[str, ...], int] = {}
+_COLUMNS_BY_ID: Dict[int, List[str]] = {}
+
+
+def columns_hash(columns: Sequence[str]) -> str:
+    """
+    Retourne l'empreinte sha256 d'une liste ordonnée de noms de features.
+    """
+    return hashlib.sha256("\x1f".join(columns).encode("utf-8")).hexdigest()
+
+
+def register_feature_schema(columns: Sequence[str]) -> Optional[int]:
+    """
+    Enregistre (si besoin) un schéma de features et retourne son identifiant.
+
+    Paramètres :
+        columns (list[str]) : Noms des features, dans l'ordre des valeurs loggées.
+
+    Retour :
+        int ou None : Identifiant du schéma, None si la base est inaccessible.
+    """
+    key = tuple(columns)
+    schema_id = _ID_BY_COLUMNS.get(key)
+    if schema_id is not None:
+        return schema_id
+
+    conn = get_conn()
+    if conn is None:
+        return None
+
+    row = conn.execute(_UPSERT_SQL, {"columns_hash": columns_hash(key), "columns": Jsonb(list(key))}).fetchone()
+    schema_id = int(row[0])
+    _ID_BY_COLUMNS[key] = schema_id
+    _COLUMNS_BY_ID[schema_id] = list(key)
+    return schema_id
+
+
+def _fetch_schemas(cur: Any) -> None:
+    """Alimente le cache à partir d'un curseur (id, columns)."""
+    for schema_id, columns in cur.fetchall():
+        _COLUMNS_BY_ID[int(schema_id)] = list(columns or [])
+
+
+def get_feature_schemas(ids: Iterable[int], conn: Any = None) -> Dict[int, List[str]]:
+    """
+    Retourne les colonnes des schémas demandés (une requête pour les identifiants non encore en cache).
+
+    Paramètres :
+        ids (iterable[int]) : Identifiants de schémas.
+        conn (Connection|None) : Connexion à réutiliser (ex. celle d'un curseur serveur en cours).
+
+    Retour :
+        dict : {schema_id: [colonnes]} (les identifiants introuvables sont absents).
+    Lecture routée vers la réplique si configurée, puis sur le primaire pour un schéma pas encore répliqué.
+    """
+    wanted = {int(i) for i in ids if i is not None}
+    missing = sorted(wanted - _COLUMNS_BY_ID.keys())
+
+    if missing:
+        cur = conn.execute(_SELECT_SQL, {"ids": missing}) if conn is not None else execute_read(_SELECT_SQL, {"ids": missing})
+        if cur is not None:
+            _fetch_schemas(cur)
+        missing = [i for i in missing if i not in _COLUMNS_BY_ID]
+
+    if missing:
+        primary = get_conn()
+        if primary is not None:
+            _fetch_schemas(primary.execute(_SELECT_SQL, {"ids": missing}))
+
+    return {i: _COLUMNS_BY_ID[i] for i in wanted if i in _COLUMNS_BY_ID}
+
+
+def inputs_from_values(columns: Optional[List[str]], values: Optional[List[Any]]) -> Dict[str, Any]:
+    """
+    Reconstitue le dictionnaire {feature: valeur} d'un input encodé en tableau.
+    """
+    if not columns or values is None:
+        return {}
+    return dict(zip(columns, values))
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 
 from psycopg.types.json import Jsonb
 
-from core.db.conn import get_conn
+from core.db.conn import execute_read, get_conn
+
+try:
+    import orjson
+except ImportError:  # optionnel : repli sur json (plus lent)
+    orjson = None
 
 _SQL_DIR = Path(__file__).resolve().parent / "sql"
 _SELECT_SQL = (_SQL_DIR / "features_store_select_by_id.sql").read_text(encoding="utf-8")
@@ -21,21 +28,48 @@ def get_features_by_id(sk_id_curr: int) -> Optional[Dict[str, Any]]:
     
     Retour :
         dict ou None : Dictionnaire des features si trouvé, sinon None.
+    Lecture routée vers la réplique si configurée (voir core.db.conn.get_read_conn).
     """
-    conn = get_conn()
-    if conn is None:
+    cur = execute_read(_SELECT_SQL, {"sk_id_curr": int(sk_id_curr)})
+    if cur is None:
         return None
 
-    row = conn.execute(_SELECT_SQL, {"sk_id_curr": int(sk_id_curr)}).fetchone()
+    row = cur.fetchone()
     if not row:
         return None
 
     return row[0]  # JSONB -> dict
 
 
+def features_json(data: Dict[str, Any]) -> str:
+    """
+    Sérialise les features en JSON canonique (clés triées, sans espaces), base de l'empreinte de contenu.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def features_hash(data: Union[Dict[str, Any], str]) -> str:
+    """
+    Retourne l'empreinte (sha256 hex) du contenu d'une ligne de features.
+
+    Paramètres :
+        data (dict|str) : Features, ou leur JSON canonique déjà calculé (features_json) pour éviter
+            une seconde sérialisation.
+
+    Retour :
+        str : Empreinte stockée dans features_store.data_hash. Deux environnements qui sérialisent
+        différemment (orjson absent) ne provoquent au pire qu'une réécriture inutile, jamais un oubli.
+    """
+    text = data if isinstance(data, str) else features_json(data)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 def upsert_features(sk_id_curr: int, data: Dict[str, Any]) -> None:
     """
     Insère ou met à jour les features d'un client dans la base de données.
+    La ligne n'est pas réécrite si son empreinte de contenu (data_hash) est inchangée.
     
     Paramètres :
         sk_id_curr (int) : Identifiant du client.
@@ -45,4 +79,7 @@ def upsert_features(sk_id_curr: int, data: Dict[str, Any]) -> None:
     if conn is None:
         return
 
-    conn.execute(_UPSERT_SQL, {"sk_id_curr": int(sk_id_curr), "data": Jsonb(data)})
\ No newline at end of file
+    conn.execute(
+        _UPSERT_SQL,
+        {"sk_id_curr": int(sk_id_curr), "data": Jsonb(data), "data_hash": features_hash(data)},
+    )
\ No newline at end of file
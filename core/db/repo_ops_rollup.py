@@ -0,0 +1,208 @@
+# Module des agrégats opérationnels par minute (table ops_rollup_1m) :
+# Définit les bins d'histogramme de latence partagés par le log writer et le monitoring,
+# et permet de relire les agrégats d'une fenêtre sans parcourir prod_requests.
+# Le log writer n'écrit pas la table à chaque requête : les incréments sont additionnés en mémoire
+# (minute, endpoint, métrique, clé) puis écrits par lots depuis le thread de fond (core.db.background),
+# ce qui évite la contention sur les quelques lignes chaudes de la minute courante.
+from __future__ import annotations
+
+import math
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.db.background import register_task
+from core.db.conn import execute_read, get_conn
+
+_SQL_DIR = Path(__file__).resolve().parent / "sql"
+_SELECT_SQL = (_SQL_DIR / "ops_rollup_select.sql").read_text(encoding="utf-8")
+_UPSERT_SQL = (_SQL_DIR / "ops_rollup_upsert.sql").read_text(encoding="utf-8")
+
+# Histogrammes log-linéaires : bin 0 = [0, 0.01 ms), puis 4 bins par octave, dernier bin ouvert (>= ~100 s).
+# Doit rester identique à la fonction SQL ops_latency_bin (migration 004).
+LATENCY_HIST_MIN_MS = 0.01
+LATENCY_HIST_BINS_PER_OCTAVE = 4
+LATENCY_HIST_N_BINS = 95
+
+TIMING_METRICS = ["db_ms", "validation_ms", "inference_ms", "total_ms"]
+
+# Clé de tampon : (minute, endpoint, métrique, clé) -> [n, total]
+_BufferKey = Tuple[datetime, str, str, str]
+
+_LOCK = threading.Lock()
+_BUFFER: Dict[_BufferKey, List[float]] = {}
+
+
+def _flush_interval_s() -> float:
+    """
+    Intervalle d'écriture du tampon (OPS_ROLLUP_FLUSH_INTERVAL_S, 5 s par défaut).
+    """
+    try:
+        return float(os.getenv("OPS_ROLLUP_FLUSH_INTERVAL_S") or 5.0)
+    except ValueError:
+        return 5.0
+
+
+def latency_bin(value_ms: float) -> int:
+    """
+    Retourne l'index de bin d'histogramme d'une durée en millisecondes.
+
+    Paramètres :
+        value_ms (float) : Durée en ms (>= 0).
+
+    Retour :
+        int : Index dans [0, LATENCY_HIST_N_BINS - 1].
+    """
+    v = float(value_ms)
+    if not v >= LATENCY_HIST_MIN_MS:
+        return 0
+    i = math.floor(LATENCY_HIST_BINS_PER_OCTAVE * math.log2(v / LATENCY_HIST_MIN_MS)) + 1
+    return min(i, LATENCY_HIST_N_BINS - 1)
+
+
+def latency_bin_bounds(i: int) -> Tuple[float, float]:
+    """
+    Retourne les bornes [bas, haut) en ms du bin i (haut = bas pour le dernier bin, ouvert).
+    """
+    if i <= 0:
+        return 0.0, LATENCY_HIST_MIN_MS
+    lo = LATENCY_HIST_MIN_MS * 2 ** ((i - 1) / LATENCY_HIST_BINS_PER_OCTAVE)
+    if i >= LATENCY_HIST_N_BINS - 1:
+        return lo, lo
+    return lo, LATENCY_HIST_MIN_MS * 2 ** (i / LATENCY_HIST_BINS_PER_OCTAVE)
+
+
+def rollup_entries(event: Dict[str, Any]) -> Tuple[List[str], List[str], List[float]]:
+    """
+    Traduit un événement de log en incréments d'agrégats (métrique, clé, valeur).
+
+    Paramètres :
+        event (dict) : Événement passé à insert_prod_request.
+
+    Retour :
+        Trois listes alignées (metrics, keys, totals) ; une durée invalide est ignorée seule
+        (le reste de l'événement est compté).
+    """
+    metrics: List[str] = ["status"]
+    keys: List[str] = [str(int(event.get("status_code") or 0))]
+    totals: List[float] = [0.0]
+
+    outputs = event.get("outputs") or {}
+    decision = outputs.get("decision")
+    if decision is not None:
+        metrics.append("decision")
+        keys.append(str(decision))
+        totals.append(0.0)
+
+    values = {"latency_ms": event.get("latency_ms")}
+    timing = outputs.get("timing") or {}
+    values.update({m: timing.get(m) for m in TIMING_METRICS})
+
+    for metric, v in values.items():
+        x = _to_duration(v)
+        if x is None:
+            continue
+        metrics.append(metric)
+        keys.append(str(latency_bin(x)))
+        totals.append(x)
+
+    return metrics, keys, totals
+
+
+def _to_duration(v: Any) -> Optional[float]:
+    """
+    Convertit une durée loggée en float ; None si absente, non numérique ou non finie (valeur ignorée).
+    """
+    try:
+        x = float(v) if v is not None else math.nan
+    except (TypeError, ValueError):
+        return None
+    return x if math.isfinite(x) else None
+
+
+def record_ops_rollup(event: Dict[str, Any], ts: Optional[datetime] = None) -> None:
+    """
+    Ajoute les incréments d'un événement au tampon (aucun accès base) ; l'écriture est faite
+    toutes les OPS_ROLLUP_FLUSH_INTERVAL_S secondes par le thread de fond.
+
+    Paramètres :
+        event (dict) : Événement passé à insert_prod_request.
+        ts (datetime|None) : Horodatage de la requête (défaut : maintenant, UTC).
+    """
+    metrics, keys, totals = rollup_entries(event)
+    bucket = (ts or datetime.now(timezone.utc)).replace(second=0, microsecond=0)
+    endpoint = str(event.get("endpoint"))
+    with _LOCK:
+        for metric, key, total in zip(metrics, keys, totals):
+            acc = _BUFFER.setdefault((bucket, endpoint, metric, key), [0, 0.0])
+            acc[0] += 1
+            acc[1] += total
+    register_task("ops_rollup_flush", flush_ops_rollup, _flush_interval_s)
+
+
+def flush_ops_rollup(conn: Any = None) -> int:
+    """
+    Écrit le tampon d'agrégats en une requête (tableaux + unnest, incréments additionnés en base).
+    En cas d'erreur, les incréments sont remis dans le tampon pour la prochaine écriture.
+
+    Paramètres :
+        conn (Connection|None) : Connexion à utiliser ; défaut : get_conn().
+
+    Retour :
+        int : Nombre de lignes d'agrégats écrites (0 sans connexion ou tampon vide).
+    """
+    conn = conn if conn is not None else get_conn()
+    with _LOCK:
+        if conn is None or not _BUFFER:
+            return 0
+        items = list(_BUFFER.items())
+        _BUFFER.clear()
+
+    try:
+        conn.execute(
+            _UPSERT_SQL,
+            {
+                "buckets": [k[0] for k, _ in items],
+                "endpoints": [k[1] for k, _ in items],
+                "metrics": [k[2] for k, _ in items],
+                "keys": [k[3] for k, _ in items],
+                "counts": [int(acc[0]) for _, acc in items],
+                "totals": [float(acc[1]) for _, acc in items],
+            },
+        )
+    except Exception:
+        with _LOCK:
+            for key, (n, total) in items:
+                acc = _BUFFER.setdefault(key, [0, 0.0])
+                acc[0] += n
+                acc[1] += total
+        raise
+    return len(items)
+
+
+def select_ops_rollup(
+    endpoint: str = "/predict",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Récupère les agrégats (sommés sur la fenêtre) d'un endpoint.
+
+    Paramètres :
+        endpoint (str) : Nom de l'endpoint.
+        since (datetime|None) : Début de fenêtre (inclus, arrondi à la minute) ; None = depuis le début.
+        until (datetime|None) : Fin de fenêtre (exclue) ; None = jusqu'à maintenant.
+
+    Retour :
+        Liste de dictionnaires {metric, key, n, total}.
+    """
+    cur = execute_read(_SELECT_SQL, {"endpoint": endpoint, "since": since, "until": until})
+    if cur is None:
+        return []
+
+    return [
+        {"metric": metric, "key": key, "n": int(n), "total": float(total or 0.0)}
+        for (metric, key, n, total) in cur.fetchall()
+    ]
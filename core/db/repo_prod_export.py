@@ -0,0 +1,175 @@
+# Module d'export colonne par colonne des logs de production (prod_requests) :
+# COPY (SELECT ...) TO STDOUT au format CSV, champs JSONB (inputs JSON ou compacts, outputs, timings)
+# projetés en colonnes côté serveur, puis lus par le parseur C de pandas en colonnes typées
+# (float64 / texte), sans dictionnaire intermédiaire par ligne.
+# Le flux COPY est tamponné en mémoire puis sur disque au-delà de EXPORT_SPOOL_MAX_BYTES.
+from __future__ import annotations
+
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Collection, Dict, List, Optional, Sequence
+
+import pandas as pd
+from psycopg import sql
+
+from core.db.conn import get_read_conn
+
+_SQL_DIR = Path(__file__).resolve().parent / "sql"
+_EXPORT_SQL = (_SQL_DIR / "prod_requests_export.sql").read_text(encoding="utf-8")
+
+# Marqueur NULL du flux COPY (option NULL de prod_requests_export.sql)
+EXPORT_NULL = r"\N"
+
+# Tampon du flux COPY : en mémoire jusqu'à cette taille, puis fichier temporaire
+EXPORT_SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+# Colonnes de métadonnées (toujours exportées) : id (rafraîchissement incrémental), ts en secondes epoch
+# (conversion vectorisée côté client)
+META_COLUMNS: Dict[str, str] = {
+    "id": "p.id",
+    "ts": "EXTRACT(EPOCH FROM p.ts)",
+    "status_code": "p.status_code",
+    "latency_ms": "p.latency_ms",
+    "sk_id_curr": "p.sk_id_curr",
+}
+
+# Champs d'outputs exportés : nom de colonne -> (chemin JSONB, numérique)
+OUTPUT_FIELDS: Dict[str, tuple] = {
+    "proba_default": (("proba_default",), True),
+    "score": (("score",), True),
+    "decision": (("decision",), False),
+    "threshold": (("threshold",), True),
+    "db_ms": (("timing", "db_ms"), True),
+    "validation_ms": (("timing", "validation_ms"), True),
+    "inference_ms": (("timing", "inference_ms"), True),
+    "total_ms": (("timing", "total_ms"), True),
+}
+
+# Valeur JSONB -> texte numérique (nombre, booléen 1/0, chaîne numérique), NULL sinon : même coercition que
+# pd.to_numeric(errors='coerce'), la colonne se lit donc toujours en float64
+_NUMERIC_TEXT = sql.SQL(
+    "CASE jsonb_typeof({v})"
+    " WHEN 'number' THEN {v} #>> '{{}}'"
+    " WHEN 'boolean' THEN CASE WHEN {v} = 'true'::jsonb THEN '1' ELSE '0' END"
+    " WHEN 'string' THEN CASE WHEN ({v} #>> '{{}}') ~ '^\\s*[-+]?([0-9]+(\\.[0-9]*)?|\\.[0-9]+)([eE][-+]?[0-9]+)?\\s*$'"
+    " THEN btrim({v} #>> '{{}}') END"
+    " END"
+)
+
+
+def _input_value(feature: str) -> sql.Composed:
+    """
+    Valeur JSONB d'une feature, que la requête ait été loggée en JSON (inputs) ou en tableau (inputs_values).
+    """
+    return sql.SQL("COALESCE(p.inputs -> {f}, p.inputs_values -> (sp.pos ->> {f})::integer)").format(
+        f=sql.Literal(feature)
+    )
+
+
+def _text_expr(value: sql.Composable, numeric: bool) -> sql.Composed:
+    if numeric:
+        return _NUMERIC_TEXT.format(v=value)
+    # Libellé identique à str() côté Python (booléens 'True' / 'False'), comme les références et le drift SQL
+    return sql.SQL("json_label({v})").format(v=value)
+
+
+def build_export_query(
+    features: Sequence[str] = (),
+    categorical: Collection[str] = (),
+    outputs: bool = True,
+) -> sql.Composed:
+    """
+    Compose la requête COPY : métadonnées, puis outputs (si demandés), puis une colonne par feature.
+    Les features de `categorical` sont exportées en texte, les autres en nombre (NULL si non numérique).
+    """
+    columns: List[sql.Composable] = [
+        sql.SQL("{} AS {}").format(sql.SQL(expr), sql.Identifier(name)) for name, expr in META_COLUMNS.items()
+    ]
+    # (nom de colonne, valeur JSONB, numérique) ; valeurs extraites une fois dans la sous-requête v
+    fields: List[tuple] = []
+    if outputs:
+        for name, (path, numeric) in OUTPUT_FIELDS.items():
+            fields.append((name, sql.SQL("p.outputs #> {}").format(sql.Literal(list(path))), numeric))
+    for feat in features:
+        fields.append((f"in.{feat}", _input_value(feat), feat not in categorical))
+
+    values: List[sql.Composable] = [sql.SQL("NULL::jsonb AS v_none")]
+    for k, (name, value, numeric) in enumerate(fields):
+        ref = sql.Identifier("v", f"v{k}")
+        values.append(sql.SQL("{} AS {}").format(value, sql.Identifier(f"v{k}")))
+        columns.append(sql.SQL("{} AS {}").format(_text_expr(ref, numeric), sql.Identifier(name)))
+    return sql.SQL(_EXPORT_SQL).format(columns=sql.SQL(", ").join(columns), values=sql.SQL(", ").join(values))
+
+
+def _export_dtypes(features: Sequence[str], categorical: Collection[str], outputs: bool) -> Dict[str, str]:
+    dtypes = {"id": "int64", "ts": "float64", "status_code": "int64", "latency_ms": "float64", "sk_id_curr": "str"}
+    if outputs:
+        dtypes.update({name: "float64" if numeric else "str" for name, (_, numeric) in OUTPUT_FIELDS.items()})
+    dtypes.update({f"in.{f}": "str" if f in categorical else "float64" for f in features})
+    return dtypes
+
+
+def export_prod_frame(
+    endpoint: str = "/predict",
+    since: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    features: Sequence[str] = (),
+    categorical: Collection[str] = (),
+    outputs: bool = True,
+    after_id: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Exporte les logs d'un endpoint en un DataFrame typé, via COPY TO STDOUT (CSV).
+
+    Paramètres :
+        endpoint (str) : Nom de l'endpoint.
+        since (datetime|None) : Début de fenêtre (inclus) ; None = depuis le début.
+        limit (int|None) : Nombre maximum de requêtes (les plus récentes) ; None = toutes.
+        features (list[str]) : Features d'entrée à exporter (une colonne chacune, inputs JSON ou compacts).
+        categorical (set[str]) : Features exportées en texte ; les autres en float64.
+        outputs (bool) : Exporte aussi proba_default, score, decision, threshold et les timings.
+        after_id (int|None) : Ne renvoie que les requêtes d'identifiant > after_id (dans la même fenêtre).
+
+    Retour :
+        DataFrame dans l'ordre chronologique : id, ts (datetime UTC), status_code, latency_ms, sk_id_curr,
+        outputs éventuels, puis une colonne par feature (nom de la feature) ; vide si aucune base.
+    """
+    features = list(dict.fromkeys(str(f) for f in features))
+    conn = get_read_conn()
+    if conn is None:
+        return pd.DataFrame()
+
+    params = {
+        "endpoint": endpoint,
+        "since": since,
+        "limit": None if limit is None else int(limit),
+        "offset": max(0, int(limit or 0) - 1),
+        "after_id": None if after_id is None else int(after_id),
+    }
+    query = build_export_query(features, categorical, outputs)
+
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES) as buf:
+        with conn.cursor() as cur:
+            with cur.copy(query, params) as copy:
+                for block in copy:
+                    buf.write(block)
+        buf.seek(0)
+        return frame_from_export_csv(buf, features, categorical, outputs)
+
+
+def frame_from_export_csv(
+    stream: IO[bytes],
+    features: Sequence[str] = (),
+    categorical: Collection[str] = (),
+    outputs: bool = True,
+) -> pd.DataFrame:
+    """
+    Lit un flux CSV produit par la requête d'export (build_export_query) en colonnes typées.
+    Seul '\\N' (NULL de l'export) est manquant : '', 'NA', 'null'... restent des libellés catégoriels.
+    """
+    df = pd.read_csv(
+        stream, dtype=_export_dtypes(features, categorical, outputs), keep_default_na=False, na_values=[EXPORT_NULL]
+    )
+    df["ts"] = pd.to_datetime(df["ts"], unit="s", utc=True)
+    return df.rename(columns={f"in.{f}": f for f in features})
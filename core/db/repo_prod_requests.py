@@ -3,21 +3,104 @@
 # Permet d'insérer et de récupérer les requêtes faites à l'API en base de données pour le suivi et la traçabilité.
 from __future__ import annotations
 
+import os
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 
 from psycopg.types.json import Jsonb
 
-from core.db.conn import get_conn
+from core.db.conn import execute_read, get_conn, open_read_conn
+from core.db.repo_drift_rollup import record_drift_counts
+from core.db.repo_feature_schemas import get_feature_schemas, inputs_from_values, register_feature_schema
+from core.db.repo_ops_rollup import record_ops_rollup
 
 _SQL_DIR = Path(__file__).resolve().parent / "sql"
 _INSERT_SQL = (_SQL_DIR / "prod_requests_insert.sql").read_text(encoding="utf-8")
 _SELECT_SQL = (_SQL_DIR / "prod_requests_select.sql").read_text(encoding="utf-8")
+_SELECT_STREAM_SQL = (_SQL_DIR / "prod_requests_select_stream.sql").read_text(encoding="utf-8")
+_LAST_ID_SQL = (_SQL_DIR / "prod_requests_last_id.sql").read_text(encoding="utf-8")
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Encodage des inputs loggés : "json" (dictionnaire complet) ou "compact" (tableau de valeurs + schéma)
+INPUTS_ENCODINGS = ("json", "compact")
+
+
+def _inputs_encoding() -> str:
+    """
+    Retourne l'encodage des inputs loggés (variable LOG_INPUTS_ENCODING, "json" par défaut).
+    """
+    enc = (os.getenv("LOG_INPUTS_ENCODING") or "json").strip().lower()
+    return enc if enc in INPUTS_ENCODINGS else "json"
+
+
+def _row_to_dict(
+    row: tuple,
+    schemas: Optional[Dict[int, List[str]]] = None,
+    decode: bool = True,
+) -> Dict[str, Any]:
+    """
+    Convertit une ligne SQL (ts, endpoint, status_code, ..., inputs_schema_id, inputs_values) en dictionnaire.
+
+    Si decode=True, un input compact est reconstitué en dictionnaire ({feature: valeur}) via `schemas`.
+    Sinon il est laissé tel quel (clés 'inputs_schema_id' / 'inputs_values') pour une reconstitution
+    colonne par colonne côté lecteur.
+    """
+    (ts, ep, status, latency, sk, inputs, outputs, error, message) = row[:9]
+    schema_id, values = (row[9], row[10]) if len(row) > 9 else (None, None)
+
+    out = {
+        "ts": ts,
+        "endpoint": ep,
+        "status_code": status,
+        "latency_ms": latency,
+        "sk_id_curr": sk,
+        "inputs": inputs or {},
+        "outputs": outputs or {},
+        "error": error,
+        "message": message,
+    }
+    if schema_id is not None:
+        if decode:
+            out["inputs"] = inputs_from_values((schemas or {}).get(schema_id), values)
+        else:
+            out["inputs_schema_id"] = schema_id
+            out["inputs_values"] = values
+    return out
+
+
+def _rows_to_dicts(rows: List[tuple], decode: bool = True, conn: Any = None) -> List[Dict[str, Any]]:
+    """
+    Convertit un lot de lignes SQL, en résolvant en une requête les schémas d'inputs compacts du lot.
+    """
+    schemas: Dict[int, List[str]] = {}
+    if decode:
+        ids = {row[9] for row in rows if len(row) > 9 and row[9] is not None}
+        if ids:
+            schemas = get_feature_schemas(ids, conn=conn)
+    return [_row_to_dict(row, schemas, decode) for row in rows]
+
+
+def _inputs_params(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Prépare les colonnes d'inputs selon l'encodage configuré.
+    En mode compact, repli sur l'encodage JSON si le schéma ne peut pas être enregistré.
+    """
+    if inputs and _inputs_encoding() == "compact":
+        schema_id = register_feature_schema(list(inputs.keys()))
+        if schema_id is not None:
+            return {"inputs": None, "inputs_schema_id": schema_id, "inputs_values": Jsonb(list(inputs.values()))}
+    return {"inputs": Jsonb(inputs), "inputs_schema_id": None, "inputs_values": None}
 
 
 def insert_prod_request(event: Dict[str, Any]) -> None:
     """
     Insère une requête de production dans la base de données.
+    Incrémente les agrégats par minute (ops_rollup_1m) et, pour une requête réussie, les compteurs de drift
+    (drift_rollup_1h) : tous deux tamponnés en mémoire et écrits par lots en tâche de fond.
+    Avec LOG_INPUTS_ENCODING=compact, les inputs sont stockés en tableau de valeurs aligné sur un schéma
+    enregistré (feature_schemas), au lieu du dictionnaire complet.
     
     Paramètres :
         event (dict) : Dictionnaire contenant les informations de la requête (endpoint, status_code, latency_ms, sk_id_curr, inputs, outputs, error, message).
@@ -31,12 +114,14 @@ def insert_prod_request(event: Dict[str, Any]) -> None:
         "status_code": int(event.get("status_code") or 0),
         "latency_ms": event.get("latency_ms"),
         "sk_id_curr": None if event.get("sk_id_curr") is None else str(event.get("sk_id_curr")),
-        "inputs": Jsonb(event.get("inputs") or {}),
+        **_inputs_params(event.get("inputs") or {}),
         "outputs": Jsonb(event.get("outputs") or {}),
         "error": event.get("error"),
         "message": event.get("message"),
     }
     conn.execute(_INSERT_SQL, params)
+    record_ops_rollup(event)
+    record_drift_counts(event)
 
 
 def select_prod_requests(endpoint: str = "/predict", limit: int = 1000) -> List[Dict[str, Any]]:
@@ -49,28 +134,97 @@ def select_prod_requests(endpoint: str = "/predict", limit: int = 1000) -> List[
     
     Retour :
         Liste de dictionnaires contenant les informations des requêtes.
+    Lecture routée vers la réplique si configurée.
     """
-    conn = get_conn()
-    if conn is None:
+    cur = execute_read(_SELECT_SQL, {"endpoint": endpoint, "limit": int(limit)})
+    if cur is None:
         return []
 
-    rows = conn.execute(_SELECT_SQL, {"endpoint": endpoint, "limit": int(limit)}).fetchall()
-
-    out: List[Dict[str, Any]] = []
-    for (ts, ep, status, latency, sk, inputs, outputs, error, message) in rows:
-        out.append(
-            {
-                "ts": ts,
-                "endpoint": ep,
-                "status_code": status,
-                "latency_ms": latency,
-                "sk_id_curr": sk,
-                "inputs": inputs or {},
-                "outputs": outputs or {},
-                "error": error,
-                "message": message,
-            }
-        )
+    rows = cur.fetchall()
+
+    out: List[Dict[str, Any]] = _rows_to_dicts(rows)
 
     out.reverse()  # chrono
-    return out
\ No newline at end of file
+    return out
+
+
+def select_last_prod_request_id(endpoint: str = "/predict") -> Optional[int]:
+    """
+    Retourne le dernier identifiant loggé pour un endpoint (curseur du mode live du dashboard).
+
+    Paramètres :
+        endpoint (str) : Nom de l'endpoint.
+
+    Retour :
+        int|None : Identifiant maximal, None si aucune requête ou aucune base.
+    """
+    cur = execute_read(_LAST_ID_SQL, {"endpoint": endpoint})
+    if cur is None:
+        return None
+    row = cur.fetchone()
+    return None if row is None or row[0] is None else int(row[0])
+
+
+def iter_prod_request_batches(
+    endpoint: str = "/predict",
+    limit: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    decode_inputs: bool = True,
+    with_inputs: bool = True,
+    since: Optional[datetime] = None,
+    with_outputs: bool = True,
+    features: Optional[Sequence[str]] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Parcourt les requêtes de production par lots, via un curseur serveur nommé.
+
+    Contrairement à select_prod_requests, les lignes ne sont jamais toutes chargées en mémoire :
+    Postgres renvoie `batch_size` lignes à la fois, dans l'ordre chronologique (id croissant).
+    La mémoire consommée côté Python dépend donc de la taille du lot, pas de la fenêtre analysée.
+    Lecture sur une connexion dédiée, fermée en fin de parcours : réplique si configurée et utilisable, sinon
+    primaire (choix fait à l'ouverture). La transaction du curseur n'occupe donc pas la connexion partagée.
+
+    Paramètres :
+        endpoint (str) : Nom de l'endpoint à filtrer (par défaut '/predict').
+        limit (int|None) : Nombre maximum de requêtes (les plus récentes) ; None = toutes.
+        batch_size (int) : Nombre de lignes récupérées par aller-retour serveur.
+        decode_inputs (bool) : Reconstitue les inputs compacts en dictionnaires ; si False, ils restent
+            sous forme 'inputs_schema_id' / 'inputs_values' (reconstitution colonne par colonne côté lecteur).
+        with_inputs (bool) : Si False, les inputs ne sont pas lus (colonnes NULL côté serveur, 'inputs' = {}) :
+            pour les lecteurs qui n'ont besoin que des métadonnées / outputs (ex. drift calculé dans Postgres).
+        since (datetime|None) : Début de fenêtre (inclus), filtré dans la requête ; None = depuis le début.
+        with_outputs (bool) : Si False, les outputs ne sont pas lus ('outputs' = {}).
+        features (list[str]|None) : Projection des inputs sur ces features (objet JSON, quel que soit l'encodage) ;
+            None = inputs complets.
+
+    Retour :
+        Itérateur de listes de dictionnaires (même format que select_prod_requests).
+    """
+    conn = open_read_conn()
+    if conn is None:
+        return
+
+    batch_size = max(1, int(batch_size))
+    params = {
+        "endpoint": endpoint,
+        "limit": None if limit is None else int(limit),
+        "offset": max(0, int(limit or 0) - 1),
+        "since": since,
+        "with_inputs": bool(with_inputs),
+        "with_outputs": bool(with_outputs),
+        "features": None if features is None else [str(f) for f in features],
+    }
+
+    # Un curseur nommé (server-side) doit vivre dans une transaction explicite, la connexion étant en autocommit.
+    try:
+        with conn.transaction():
+            with conn.cursor(name=f"prod_requests_stream_{id(params)}") as cur:
+                cur.itersize = batch_size
+                cur.execute(_SELECT_STREAM_SQL, params)
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield _rows_to_dicts(rows, decode=decode_inputs, conn=conn)
+    finally:
+        conn.close()
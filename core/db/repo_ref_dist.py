@@ -3,15 +3,17 @@
 # Permet d'insérer, de mettre à jour et de récupérer les distributions de référence pour le suivi de la dérive des données.
 from __future__ import annotations
 
+import json
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from psycopg.types.json import Jsonb
 
-from core.db.conn import get_conn
+from core.db.conn import execute_read, get_conn
 
 _SQL_DIR = Path(__file__).resolve().parent / "sql"
 _UPSERT_SQL = (_SQL_DIR / "ref_feature_dist_upsert.sql").read_text(encoding="utf-8")
+_UPSERT_BATCH_SQL = (_SQL_DIR / "ref_feature_dist_upsert_batch.sql").read_text(encoding="utf-8")
 _SELECT_ALL_SQL = (_SQL_DIR / "ref_feature_dist_select_all.sql").read_text(encoding="utf-8")
 _SELECT_ONE_SQL = (_SQL_DIR / "ref_feature_dist_select_one.sql").read_text(encoding="utf-8")
 
@@ -45,18 +47,52 @@ def upsert_ref_feature_dist(
     )
 
 
+def upsert_ref_feature_dists(rows: Iterable[Dict[str, Any]], conn: Any = None) -> int:
+    """
+    Insère ou met à jour plusieurs distributions de référence en une seule requête (tableaux + unnest).
+
+    Paramètres :
+        rows (iterable[dict]) : Dictionnaires {feature, kind, bins_json, ref_dist_json, n_ref} ;
+            les JSON peuvent être des dict ou des chaînes déjà sérialisées.
+        conn (Connection|None) : Connexion à utiliser (ex. celle d'un script) ; défaut : get_conn().
+
+    Retour :
+        int : Nombre de lignes insérées / mises à jour (0 sans connexion).
+    """
+    rows = list(rows)
+    conn = conn if conn is not None else get_conn()
+    if conn is None or not rows:
+        return 0
+
+    def _text(v: Any) -> Optional[str]:
+        return v if v is None or isinstance(v, str) else json.dumps(v)
+
+    cur = conn.execute(
+        _UPSERT_BATCH_SQL,
+        {
+            "features": [r["feature"] for r in rows],
+            "kinds": [r["kind"] for r in rows],
+            "bins_json": [_text(r["bins_json"]) for r in rows],
+            "ref_dist_json": [_text(r["ref_dist_json"]) for r in rows],
+            "n_ref": [int(r["n_ref"]) for r in rows],
+        },
+    )
+    return int(cur.rowcount)
+
+
 def load_all_ref() -> List[Dict[str, Any]]:
     """
     Récupère toutes les distributions de référence enregistrées en base de données.
     
     Retour :
         Liste de dictionnaires contenant les informations de chaque distribution de référence.
+    Lecture routée vers la réplique si configurée.
     """
-    conn = get_conn()
-    if conn is None:
+    cur = execute_read(_SELECT_ALL_SQL)
+    if cur is None:
         return []
 
-    rows = conn.execute(_SELECT_ALL_SQL).fetchall()
+    rows = cur.fetchall()
     out: List[Dict[str, Any]] = []
     for (feature, kind, bins_json, ref_dist_json, n_ref, created_at) in rows:
         out.append(
@@ -81,12 +117,13 @@ def load_one_ref(feature: str) -> Optional[Dict[str, Any]]:
     
     Retour :
         Dictionnaire des informations de la distribution de référence, ou None si non trouvée.
+    Lecture routée vers la réplique si configurée.
     """
-    conn = get_conn()
-    if conn is None:
+    cur = execute_read(_SELECT_ONE_SQL, {"feature": feature})
+    if cur is None:
         return None
 
-    row = conn.execute(_SELECT_ONE_SQL, {"feature": feature}).fetchone()
+    row = cur.fetchone()
     if not row:
         return None
 
@@ -0,0 +1,8 @@
+-- Couverture des compteurs d'une version de référence : premier compteur, et heure de la première requête
+-- réussie loggée dans la fenêtre (les compteurs ne comptent que les réponses 200).
+SELECT
+  (SELECT min(bucket) FROM drift_rollup_1h
+   WHERE ref_version = %(ref_version)s AND endpoint = %(endpoint)s) AS first_bucket,
+  (SELECT date_trunc('hour', min(ts)) FROM prod_requests
+   WHERE endpoint = %(endpoint)s AND status_code = 200
+     AND (%(since)s::timestamptz IS NULL OR ts >= %(since)s::timestamptz)) AS first_log;
\ No newline at end of file
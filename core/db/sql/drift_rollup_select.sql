@@ -0,0 +1,7 @@
+SELECT feature, bin, SUM(n)::bigint AS n
+FROM drift_rollup_1h
+WHERE ref_version = %(ref_version)s
+  AND endpoint = %(endpoint)s
+  AND (%(since)s::timestamptz IS NULL OR bucket >= date_trunc('hour', %(since)s::timestamptz))
+  AND (%(until)s::timestamptz IS NULL OR bucket < %(until)s::timestamptz)
+GROUP BY feature, bin;
\ No newline at end of file
@@ -0,0 +1,9 @@
+-- Compteurs de drift par période (heure ou jour) : séries PSI calculées sans relire les inputs loggés.
+SELECT date_trunc(%(period)s, bucket) AS bucket, feature, bin, SUM(n)::bigint AS n
+FROM drift_rollup_1h
+WHERE ref_version = %(ref_version)s
+  AND endpoint = %(endpoint)s
+  AND (%(since)s::timestamptz IS NULL OR bucket >= date_trunc('hour', %(since)s::timestamptz))
+  AND (%(until)s::timestamptz IS NULL OR bucket < %(until)s::timestamptz)
+GROUP BY 1, feature, bin
+ORDER BY 1;
\ No newline at end of file
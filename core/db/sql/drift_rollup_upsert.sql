@@ -0,0 +1,7 @@
+INSERT INTO drift_rollup_1h AS d (bucket, endpoint, ref_version, feature, bin, n)
+SELECT * FROM unnest(
+  %(buckets)s::timestamptz[], %(endpoints)s::text[], %(versions)s::text[],
+  %(features)s::text[], %(bins)s::integer[], %(counts)s::bigint[]
+)
+ON CONFLICT (ref_version, endpoint, bucket, feature, bin) DO UPDATE SET
+  n = d.n + EXCLUDED.n;
\ No newline at end of file
@@ -0,0 +1,3 @@
+SELECT id, columns
+FROM feature_schemas
+WHERE id = ANY(%(ids)s::int[]);
\ No newline at end of file
@@ -0,0 +1,4 @@
+INSERT INTO feature_schemas (columns_hash, columns)
+VALUES (%(columns_hash)s, %(columns)s)
+ON CONFLICT (columns_hash) DO UPDATE SET columns_hash = EXCLUDED.columns_hash
+RETURNING id;
\ No newline at end of file
@@ -0,0 +1,4 @@
+DELETE FROM features_store f
+WHERE NOT EXISTS (
+  SELECT 1 FROM features_store_staging s WHERE s.sk_id_curr = f.sk_id_curr
+);
\ No newline at end of file
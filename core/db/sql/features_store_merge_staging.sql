@@ -0,0 +1,22 @@
+-- Ne réécrit que les clients nouveaux ou dont l'empreinte a changé ; (xmax = 0) <=> ligne insérée
+WITH src AS (
+  SELECT DISTINCT ON (sk_id_curr) sk_id_curr, data, data_hash
+  FROM features_store_staging
+  ORDER BY sk_id_curr, seq DESC
+),
+changed AS (
+  INSERT INTO features_store (sk_id_curr, data, data_hash)
+  SELECT s.sk_id_curr, s.data, s.data_hash
+  FROM src s
+  LEFT JOIN features_store f USING (sk_id_curr)
+  WHERE f.data_hash IS DISTINCT FROM s.data_hash
+  ON CONFLICT (sk_id_curr) DO UPDATE SET
+    data = EXCLUDED.data,
+    data_hash = EXCLUDED.data_hash,
+    updated_at = now()
+  RETURNING (xmax = 0) AS inserted
+)
+SELECT
+  (SELECT count(*) FROM changed WHERE inserted) AS inserted,
+  (SELECT count(*) FROM changed WHERE NOT inserted) AS updated,
+  (SELECT count(*) FROM src) - (SELECT count(*) FROM changed) AS unchanged;
\ No newline at end of file
@@ -0,0 +1,7 @@
+DROP TABLE IF EXISTS features_store_staging;
+CREATE UNLOGGED TABLE features_store_staging (
+  seq BIGSERIAL,
+  sk_id_curr BIGINT NOT NULL,
+  data JSONB NOT NULL,
+  data_hash TEXT NOT NULL
+);
\ No newline at end of file
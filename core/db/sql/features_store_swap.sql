@@ -0,0 +1,9 @@
+LOCK TABLE features_store IN ACCESS EXCLUSIVE MODE;
+DROP TABLE features_store;
+ALTER TABLE features_store_new RENAME TO features_store;
+ALTER INDEX features_store_new_pkey RENAME TO features_store_pkey;
+ALTER INDEX idx_features_store_new_data_gin RENAME TO idx_features_store_data_gin;
+CREATE TRIGGER trg_features_store_updated_at
+BEFORE UPDATE ON features_store
+FOR EACH ROW
+EXECUTE FUNCTION features_store_set_updated_at();
\ No newline at end of file
@@ -0,0 +1,21 @@
+DROP TABLE IF EXISTS features_store_new;
+CREATE TABLE features_store_new (
+  sk_id_curr BIGINT NOT NULL,
+  data JSONB NOT NULL,
+  data_hash TEXT,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+INSERT INTO features_store_new (sk_id_curr, data, data_hash, created_at, updated_at)
+SELECT
+  s.sk_id_curr,
+  s.data,
+  s.data_hash,
+  COALESCE(f.created_at, now()),
+  CASE WHEN f.data_hash = s.data_hash THEN f.updated_at ELSE now() END
+FROM (
+  SELECT DISTINCT ON (sk_id_curr) sk_id_curr, data, data_hash
+  FROM features_store_staging
+  ORDER BY sk_id_curr, seq DESC
+) s
+LEFT JOIN features_store f USING (sk_id_curr);
\ No newline at end of file
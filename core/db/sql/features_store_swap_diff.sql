@@ -0,0 +1,11 @@
+SELECT
+  count(*) FILTER (WHERE f.sk_id_curr IS NULL) AS inserted,
+  count(*) FILTER (WHERE f.sk_id_curr IS NOT NULL AND f.data_hash IS DISTINCT FROM s.data_hash) AS updated,
+  count(*) FILTER (WHERE f.data_hash = s.data_hash) AS unchanged,
+  (SELECT count(*) FROM features_store) - count(f.sk_id_curr) AS deleted
+FROM (
+  SELECT DISTINCT ON (sk_id_curr) sk_id_curr, data_hash
+  FROM features_store_staging
+  ORDER BY sk_id_curr, seq DESC
+) s
+LEFT JOIN features_store f USING (sk_id_curr);
\ No newline at end of file
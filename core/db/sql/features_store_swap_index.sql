@@ -0,0 +1,3 @@
+ALTER TABLE features_store_new ADD CONSTRAINT features_store_new_pkey PRIMARY KEY (sk_id_curr);
+CREATE INDEX idx_features_store_new_data_gin ON features_store_new USING GIN (data);
+ANALYZE features_store_new;
\ No newline at end of file
@@ -1,5 +1,7 @@
-INSERT INTO features_store (sk_id_curr, data)
-VALUES (%(sk_id_curr)s, %(data)s)
+INSERT INTO features_store (sk_id_curr, data, data_hash)
+VALUES (%(sk_id_curr)s, %(data)s, %(data_hash)s)
 ON CONFLICT (sk_id_curr) DO UPDATE SET
   data = EXCLUDED.data,
-  updated_at = now();
\ No newline at end of file
+  data_hash = EXCLUDED.data_hash,
+  updated_at = now()
+WHERE features_store.data_hash IS DISTINCT FROM EXCLUDED.data_hash;
\ No newline at end of file
@@ -0,0 +1,6 @@
+SELECT metric, key, SUM(n)::bigint AS n, SUM(total) AS total
+FROM ops_rollup_1m
+WHERE endpoint = %(endpoint)s
+  AND (%(since)s::timestamptz IS NULL OR bucket >= date_trunc('minute', %(since)s::timestamptz))
+  AND (%(until)s::timestamptz IS NULL OR bucket < %(until)s::timestamptz)
+GROUP BY metric, key;
\ No newline at end of file
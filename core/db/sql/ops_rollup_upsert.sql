@@ -0,0 +1,8 @@
+INSERT INTO ops_rollup_1m AS r (bucket, endpoint, metric, key, n, total)
+SELECT * FROM unnest(
+  %(buckets)s::timestamptz[], %(endpoints)s::text[], %(metrics)s::text[],
+  %(keys)s::text[], %(counts)s::bigint[], %(totals)s::double precision[]
+)
+ON CONFLICT (bucket, endpoint, metric, key) DO UPDATE SET
+  n = r.n + EXCLUDED.n,
+  total = r.total + EXCLUDED.total;
\ No newline at end of file
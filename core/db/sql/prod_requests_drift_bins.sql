@@ -0,0 +1,84 @@
+-- Comptes par (feature, bin) des inputs loggés d'une fenêtre, binés dans Postgres sur les références :
+-- seuls features x bins lignes reviennent au client (mêmes règles que monitoring.lib.drift / DriftBinner).
+-- Population des compteurs : requêtes réussies (status 200), chacune comptée une fois par feature de
+-- référence ; une feature absente du payload est manquante.
+--   numériques : bins fermés à droite (width_bucket sur valeurs et bornes négées), borne basse dans le
+--                premier bin, manquants / hors bornes -> -1
+--   catégorielles : libellé de référence (json_label), manquants -> '__MISSING__', inconnues -> unknown_bin
+--                   ('__OTHER__' si présent, sinon -1)
+-- Les inputs JSON (inputs) et compacts (inputs_schema_id + inputs_values) sont lus tous les deux.
+-- Avec le paramètre period ('hour' / 'day'), les comptes sont aussi ventilés par période (NULL sinon).
+WITH refs AS (
+  SELECT r.feature,
+         r.kind,
+         r.n_bins,
+         r.lo,
+         ARRAY(SELECT x::double precision FROM jsonb_array_elements_text(r.neg_edges) AS x) AS neg_edges,
+         ARRAY(SELECT x FROM jsonb_array_elements_text(r.labels) AS x) AS labels,
+         r.unknown_bin
+  FROM jsonb_to_recordset(%(refs)s::jsonb)
+    AS r(feature text, kind text, n_bins integer, lo double precision, neg_edges jsonb, labels jsonb, unknown_bin integer)
+),
+cutoff AS (
+  SELECT id
+  FROM prod_requests
+  WHERE endpoint = %(endpoint)s
+  ORDER BY id DESC
+  OFFSET %(offset)s
+  LIMIT 1
+),
+win AS (
+  SELECT p.id, p.inputs, p.inputs_schema_id, p.inputs_values,
+         CASE WHEN %(period)s::text IS NOT NULL THEN date_trunc(%(period)s::text, p.ts) END AS bucket
+  FROM prod_requests p
+  WHERE p.endpoint = %(endpoint)s
+    AND p.status_code = 200
+    AND (%(since)s::timestamptz IS NULL OR p.ts >= %(since)s::timestamptz)
+    AND (%(limit)s::bigint IS NULL OR p.id >= COALESCE((SELECT id FROM cutoff), 0))
+),
+kv AS (
+  SELECT win.id, e.key AS feature, e.value
+  FROM win
+  CROSS JOIN LATERAL jsonb_each(win.inputs) AS e
+  WHERE win.inputs IS NOT NULL AND jsonb_typeof(win.inputs) = 'object'
+  UNION ALL
+  SELECT win.id, s.columns ->> (v.ord::integer - 1) AS feature, v.value
+  FROM win
+  JOIN feature_schemas s ON s.id = win.inputs_schema_id
+  CROSS JOIN LATERAL jsonb_array_elements(win.inputs_values) WITH ORDINALITY AS v(value, ord)
+),
+binned AS (
+  SELECT win.bucket,
+         refs.feature,
+         refs.n_bins,
+         CASE
+           WHEN refs.kind = 'numeric' THEN
+             CASE
+               WHEN x.num IS NULL THEN -1
+               WHEN x.num = refs.lo THEN 0
+               ELSE refs.n_bins - width_bucket(-x.num, refs.neg_edges)
+             END
+           ELSE COALESCE(array_position(refs.labels, COALESCE(json_label(kv.value), '__MISSING__')) - 1, refs.unknown_bin)
+         END AS bin
+  FROM win
+  CROSS JOIN refs
+  LEFT JOIN kv ON kv.id = win.id AND kv.feature = refs.feature
+  CROSS JOIN LATERAL (
+    SELECT CASE WHEN refs.kind = 'numeric' THEN
+             CASE jsonb_typeof(kv.value)
+               WHEN 'number' THEN (kv.value #>> '{}')::double precision
+               WHEN 'boolean' THEN CASE WHEN kv.value = 'true'::jsonb THEN 1.0 ELSE 0.0 END
+               WHEN 'string' THEN CASE
+                 WHEN (kv.value #>> '{}') ~ '^\s*[-+]?([0-9]+(\.[0-9]*)?|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$'
+                 THEN (kv.value #>> '{}')::double precision
+               END
+             END
+           END AS num
+  ) AS x
+)
+SELECT feature,
+       CASE WHEN bin >= 0 AND bin < n_bins THEN bin ELSE -1 END AS bin,
+       count(*) AS n,
+       bucket
+FROM binned
+GROUP BY 1, 2, 4;
\ No newline at end of file
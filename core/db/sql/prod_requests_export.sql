@@ -0,0 +1,32 @@
+-- Export colonne par colonne des logs d'un endpoint (COPY ... TO STDOUT, CSV) : les champs JSONB
+-- (inputs JSON ou compacts, outputs) sont projetés en colonnes côté serveur (liste de colonnes composée par
+-- core.db.repo_prod_export). Même fenêtre que la lecture en flux : since, N requêtes les plus récentes ;
+-- after_id ne renvoie que les requêtes postérieures au dernier identifiant déjà chargé (rafraîchissement incrémental).
+-- NULL est écrit \N : une chaîne vide ou 'NA' loggée reste une modalité (lecture sans les NA par défaut de pandas).
+-- Chaque valeur JSONB est extraite une fois (sous-requête LATERAL, OFFSET 0 : pas d'inlining qui la
+-- recopierait dans chaque branche des conversions).
+COPY (
+  WITH cutoff AS (
+    SELECT id
+    FROM prod_requests
+    WHERE endpoint = %(endpoint)s
+    ORDER BY id DESC
+    OFFSET %(offset)s
+    LIMIT 1
+  ),
+  schema_pos AS (
+    SELECT s.id, jsonb_object_agg(c.name, c.ord - 1) AS pos
+    FROM feature_schemas s
+    CROSS JOIN LATERAL jsonb_array_elements_text(s.columns) WITH ORDINALITY AS c(name, ord)
+    GROUP BY s.id
+  )
+  SELECT {columns}
+  FROM prod_requests p
+  LEFT JOIN schema_pos sp ON sp.id = p.inputs_schema_id
+  CROSS JOIN LATERAL (SELECT {values} OFFSET 0) AS v
+  WHERE p.endpoint = %(endpoint)s
+    AND (%(since)s::timestamptz IS NULL OR p.ts >= %(since)s::timestamptz)
+    AND (%(limit)s::bigint IS NULL OR p.id >= COALESCE((SELECT id FROM cutoff), 0))
+    AND (%(after_id)s::bigint IS NULL OR p.id > %(after_id)s::bigint)
+  ORDER BY p.id ASC
+) TO STDOUT WITH (FORMAT csv, HEADER true, NULL '\N')
\ No newline at end of file
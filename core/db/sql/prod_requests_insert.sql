@@ -1,2 +1,2 @@
-INSERT INTO prod_requests (endpoint, status_code, latency_ms, sk_id_curr, inputs, outputs, error, message)
-VALUES (%(endpoint)s, %(status_code)s, %(latency_ms)s, %(sk_id_curr)s, %(inputs)s, %(outputs)s, %(error)s, %(message)s);
\ No newline at end of file
+INSERT INTO prod_requests (endpoint, status_code, latency_ms, sk_id_curr, inputs, inputs_schema_id, inputs_values, outputs, error, message)
+VALUES (%(endpoint)s, %(status_code)s, %(latency_ms)s, %(sk_id_curr)s, %(inputs)s, %(inputs_schema_id)s, %(inputs_values)s, %(outputs)s, %(error)s, %(message)s);
\ No newline at end of file
@@ -0,0 +1,4 @@
+-- Curseur du mode live : dernier identifiant loggé pour un endpoint (parcours arrière de la clé primaire).
+SELECT max(id)
+FROM prod_requests
+WHERE endpoint = %(endpoint)s;
\ No newline at end of file
@@ -7,7 +7,9 @@ SELECT
   inputs,
   outputs,
   error,
-  message
+  message,
+  inputs_schema_id,
+  inputs_values
 FROM prod_requests
 WHERE endpoint = %(endpoint)s
 ORDER BY id DESC
@@ -0,0 +1,40 @@
+-- Lecture en flux des logs d'un endpoint (ordre chronologique), fenêtre et colonnes choisies côté serveur :
+--   since : début de fenêtre (NULL = tout) ; limit : N requêtes les plus récentes (NULL = toutes)
+--   with_inputs / with_outputs : colonnes renvoyées à NULL sinon (payloads JSONB non lus)
+--   features : projection des inputs sur quelques features, renvoyées en objet JSON quel que soit l'encodage
+WITH cutoff AS (
+  SELECT id
+  FROM prod_requests
+  WHERE endpoint = %(endpoint)s
+  ORDER BY id DESC
+  OFFSET %(offset)s
+  LIMIT 1
+)
+SELECT
+  p.ts,
+  p.endpoint,
+  p.status_code,
+  p.latency_ms,
+  p.sk_id_curr,
+  CASE
+    WHEN NOT %(with_inputs)s::boolean THEN NULL
+    WHEN %(features)s::text[] IS NULL THEN p.inputs
+    ELSE COALESCE(proj.inputs, '{}'::jsonb)
+  END AS inputs,
+  CASE WHEN %(with_outputs)s::boolean THEN p.outputs END AS outputs,
+  p.error,
+  p.message,
+  CASE WHEN %(with_inputs)s::boolean AND %(features)s::text[] IS NULL THEN p.inputs_schema_id END AS inputs_schema_id,
+  CASE WHEN %(with_inputs)s::boolean AND %(features)s::text[] IS NULL THEN p.inputs_values END AS inputs_values
+FROM prod_requests p
+LEFT JOIN LATERAL (
+  SELECT jsonb_object_agg(f.name, COALESCE(p.inputs -> f.name, p.inputs_values -> (c.ord::integer - 1))) AS inputs
+  FROM unnest(%(features)s::text[]) AS f(name)
+  LEFT JOIN feature_schemas s ON s.id = p.inputs_schema_id
+  LEFT JOIN LATERAL jsonb_array_elements_text(s.columns) WITH ORDINALITY AS c(name, ord) ON c.name = f.name
+  WHERE p.inputs ? f.name OR c.ord IS NOT NULL
+) AS proj ON %(with_inputs)s::boolean AND %(features)s::text[] IS NOT NULL
+WHERE p.endpoint = %(endpoint)s
+  AND (%(since)s::timestamptz IS NULL OR p.ts >= %(since)s::timestamptz)
+  AND (%(limit)s::bigint IS NULL OR p.id >= COALESCE((SELECT id FROM cutoff), 0))
+ORDER BY p.id ASC;
\ No newline at end of file
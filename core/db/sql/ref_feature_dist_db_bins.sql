@@ -0,0 +1,26 @@
+-- Comptes par bin des features numériques, bins fermés à droite comme pd.cut(include_lowest=True) :
+-- width_bucket (fermé à gauche) sur les valeurs et bornes négées, la borne basse rejoint le premier bin.
+WITH edges AS (
+  SELECT j.key AS feature,
+         ARRAY(SELECT -x::double precision FROM jsonb_array_elements_text(j.value) AS x ORDER BY -x::double precision) AS neg_edges,
+         jsonb_array_length(j.value) - 1 AS n_bins
+  FROM jsonb_each(%(edges)s::jsonb) AS j
+),
+kv AS (
+  SELECT e.key AS feature,
+         CASE jsonb_typeof(e.value)
+           WHEN 'number' THEN (e.value #>> '{}')::double precision
+           WHEN 'boolean' THEN CASE WHEN e.value = 'true'::jsonb THEN 1.0 ELSE 0.0 END
+         END AS num
+  FROM features_store fs
+  CROSS JOIN LATERAL jsonb_each(fs.data) AS e
+  WHERE e.key IN (SELECT feature FROM edges)
+)
+SELECT kv.feature,
+       CASE WHEN b.wb > edges.n_bins THEN 0 ELSE edges.n_bins - b.wb END AS bin,
+       count(*) AS n
+FROM kv
+JOIN edges ON edges.feature = kv.feature
+CROSS JOIN LATERAL (SELECT width_bucket(-kv.num, edges.neg_edges) AS wb) AS b
+WHERE kv.num IS NOT NULL
+GROUP BY 1, 2
\ No newline at end of file
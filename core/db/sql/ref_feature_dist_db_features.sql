@@ -0,0 +1,3 @@
+SELECT DISTINCT jsonb_object_keys(data) AS feature
+FROM features_store
+ORDER BY 1
\ No newline at end of file
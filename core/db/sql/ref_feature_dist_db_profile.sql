@@ -0,0 +1,22 @@
+-- Profil des features de features_store (une passe) : type des valeurs, min / max et quantiles numériques
+WITH kv AS (
+  SELECT e.key AS feature,
+         jsonb_typeof(e.value) AS t,
+         CASE jsonb_typeof(e.value)
+           WHEN 'number' THEN (e.value #>> '{}')::double precision
+           WHEN 'boolean' THEN CASE WHEN e.value = 'true'::jsonb THEN 1.0 ELSE 0.0 END
+         END AS num
+  FROM features_store fs
+  CROSS JOIN LATERAL jsonb_each(fs.data) AS e
+  WHERE e.key = ANY(%(features)s::text[])
+)
+SELECT feature,
+       count(num) AS n_num,
+       count(*) FILTER (WHERE t = 'string') AS n_str,
+       count(*) FILTER (WHERE t = 'boolean') AS n_bool,
+       min(num) AS min_num,
+       max(num) AS max_num,
+       percentile_cont(%(qs)s::double precision[]) WITHIN GROUP (ORDER BY num) AS quantiles,
+       (SELECT count(*) FROM features_store) AS n_rows
+FROM kv
+GROUP BY feature
\ No newline at end of file
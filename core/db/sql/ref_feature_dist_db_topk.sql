@@ -0,0 +1,19 @@
+-- Modalités les plus fréquentes des features catégorielles (valeurs non nulles, libellés json_label)
+WITH counts AS (
+  SELECT e.key AS feature, json_label(e.value) AS label, count(*) AS n
+  FROM features_store fs
+  CROSS JOIN LATERAL jsonb_each(fs.data) AS e
+  WHERE e.key = ANY(%(features)s::text[])
+    AND jsonb_typeof(e.value) <> 'null'
+  GROUP BY 1, 2
+),
+ranked AS (
+  SELECT feature, label, n,
+         sum(n) OVER (PARTITION BY feature) AS n_non_null,
+         row_number() OVER (PARTITION BY feature ORDER BY n DESC, label) AS rk
+  FROM counts
+)
+SELECT feature, label, n, n_non_null
+FROM ranked
+WHERE rk <= %(topk)s
+ORDER BY feature, rk
\ No newline at end of file
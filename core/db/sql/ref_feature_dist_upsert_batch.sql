@@ -0,0 +1,15 @@
+INSERT INTO ref_feature_dist(feature, kind, bins_json, ref_dist_json, n_ref)
+SELECT t.feature, t.kind, t.bins_json::jsonb, t.ref_dist_json::jsonb, t.n_ref
+FROM unnest(
+  %(features)s::text[],
+  %(kinds)s::text[],
+  %(bins_json)s::text[],
+  %(ref_dist_json)s::text[],
+  %(n_ref)s::bigint[]
+) AS t(feature, kind, bins_json, ref_dist_json, n_ref)
+ON CONFLICT (feature) DO UPDATE SET
+  kind = EXCLUDED.kind,
+  bins_json = EXCLUDED.bins_json,
+  ref_dist_json = EXCLUDED.ref_dist_json,
+  n_ref = EXCLUDED.n_ref,
+  created_at = now();
\ No newline at end of file
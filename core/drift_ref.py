@@ -0,0 +1,46 @@
+"""
+Conventions des références de drift (ref_feature_dist), partagées par le log writer (core.db.repo_drift_rollup)
+et le moteur PSI du monitoring (monitoring.lib.drift) :
+ - Libellés réservés des features catégorielles ('__MISSING__', '__OTHER__')
+ - Bin des valeurs hors référence (OVERFLOW_BIN)
+ - Lecture d'une ligne de référence (parse_ref) : bornes / libellés / probabilités, ou motif d'inexploitabilité
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+MISSING_LABEL = "__MISSING__"
+OTHER_LABEL = "__OTHER__"
+
+# Bin des valeurs hors référence : numériques manquantes / hors bornes, modalités inconnues sans '__OTHER__'
+OVERFLOW_BIN = -1
+
+
+def parse_ref(ref: Dict[str, Any]) -> Tuple[Optional[str], np.ndarray, List[str], np.ndarray]:
+    """
+    Interprète une ligne de ref_feature_dist (mêmes règles pour le binning à la volée et le moteur PSI).
+
+    Retour :
+        (note, edges, labels, p) : note = None si la référence est exploitable, sinon
+        'empty_ref' / 'bad_ref_bins' / 'bad_ref_labels' ; edges triées sans doublon
+        (une feature constante [v, v] garde un seul bin).
+    """
+    ref_dist = ref.get("ref_dist_json") or {}
+    labels = [str(v) for v in (ref_dist.get("labels") or [])]
+    p = np.asarray(ref_dist.get("p") or [], dtype=float)
+    edges = np.zeros(0)
+
+    if labels == ["__EMPTY__"]:
+        return "empty_ref", edges, labels, p
+    if ref.get("kind") == "numeric":
+        edges = np.unique(np.asarray((ref.get("bins_json") or {}).get("edges") or [], dtype=float))
+        if len(edges) == 1:
+            edges = np.repeat(edges, 2)
+        if len(edges) < 2 or p.size != len(edges) - 1:
+            return "bad_ref_bins", edges, labels, p
+    elif not labels or p.size != len(labels):
+        return "bad_ref_labels", edges, labels, p
+    return None, edges, labels, p
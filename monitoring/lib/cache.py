@@ -0,0 +1,176 @@
+"""
+Module de cache des données de production pour le dashboard de monitoring.
+
+Streamlit ré-exécute tout le script à chaque interaction : sans cache, chaque clic relit Postgres.
+Ce module fournit :
+- IncrementalFrameCache : cache de DataFrames de logs par clé (endpoint, limit, fenêtre, colonnes), avec TTL.
+  À l'expiration, seules les requêtes récentes sont relues : id > dernier id chargé - overlap_ids. Le
+  recouvrement rattrape les transactions validées dans le désordre (un id plus petit visible après un plus
+  grand) ; les id déjà en cache sont écartés, puis la fenêtre temporelle (glissante) et la limite
+  (N plus récentes) sont ré-appliquées.
+- trim_frame : applique fenêtre temporelle et limite à un DataFrame de logs (colonnes id, ts).
+
+Les DataFrames renvoyés sont partagés entre sessions : ils doivent être traités en lecture seule.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+
+import pandas as pd
+
+from monitoring.lib.constants import DEFAULTS
+from monitoring.lib.filters import time_window_start
+
+
+def trim_frame(frame: pd.DataFrame, time_window: str, limit: int | None) -> pd.DataFrame:
+    """
+    Garde les requêtes de la fenêtre temporelle, puis les `limit` plus récentes (ordre des id).
+
+    Paramètres
+    ----------
+    frame : pd.DataFrame
+        Logs triés par id croissant (colonnes 'id' et 'ts').
+    time_window : str
+        Fenêtre temporelle ('all', '24h', '7d', '30d', '90d').
+    limit : int | None
+        Nombre maximum de requêtes ; None = toutes.
+
+    Retourne
+    -------
+    pd.DataFrame
+        DataFrame filtré (le même objet si rien n'est retiré).
+    """
+    if frame.empty:
+        return frame
+    cutoff = time_window_start(time_window)
+    if cutoff is not None and "ts" in frame.columns:
+        keep = frame["ts"] >= cutoff
+        if not keep.all():
+            frame = frame.loc[keep]
+    if limit is not None and len(frame) > limit:
+        frame = frame.iloc[-int(limit):]
+    if not frame.index.equals(pd.RangeIndex(len(frame))):
+        frame = frame.reset_index(drop=True)
+    return frame
+
+
+def merge_new_rows(frame: pd.DataFrame, new: pd.DataFrame, after_id: int | None) -> pd.DataFrame:
+    """
+    Ajoute à `frame` les requêtes relues (id > after_id) qui n'y sont pas encore, sur les colonnes de `frame`.
+
+    Paramètres
+    ----------
+    frame : pd.DataFrame
+        Logs en cache, triés par id croissant.
+    new : pd.DataFrame
+        Logs relus d'id > after_id (recouvrement compris), triés par id croissant.
+    after_id : int | None
+        Borne de la relecture ; seuls les id de `frame` au-delà peuvent être en double.
+
+    Retourne
+    -------
+    pd.DataFrame
+        Logs triés par id croissant, sans doublon (`frame` lui-même si rien de nouveau).
+    """
+    if new.empty:
+        return frame
+    if frame.empty:
+        return new
+    new = new.reindex(columns=frame.columns)
+    ids = frame["id"]
+    tail = ids.iloc[ids.searchsorted(after_id, side="right") if after_id is not None else 0:]
+    new = new.loc[~new["id"].isin(tail)]
+    if new.empty:
+        return frame
+    merged = pd.concat([frame, new], ignore_index=True, sort=False)
+    if new["id"].iloc[0] < ids.iloc[-1]:
+        # transaction validée après une requête d'id supérieur déjà chargée : on rétablit l'ordre des id
+        merged = merged.sort_values("id", kind="stable", ignore_index=True)
+    return merged
+
+
+class IncrementalFrameCache:
+    """
+    Cache de DataFrames de logs rafraîchis de façon incrémentale (par id croissant).
+
+    Exemple
+    -------
+    >>> cache = IncrementalFrameCache(ttl_s=30)
+    >>> frame = cache.get(("/predict", None, "7d"), lambda after_id: load_prod_frame(..., after_id=after_id),
+    ...                   time_window="7d", limit=None)
+    """
+
+    def __init__(
+        self,
+        ttl_s: float = DEFAULTS["cache_ttl_s"],
+        max_entries: int = DEFAULTS["cache_max_entries"],
+        clock: Callable[[], float] = time.monotonic,
+        overlap_ids: int = DEFAULTS["cache_overlap_ids"],
+    ) -> None:
+        self.ttl_s = float(ttl_s)
+        self.max_entries = int(max_entries)
+        self.overlap_ids = int(overlap_ids)
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, Dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        key: Hashable,
+        load: Callable[[int | None], pd.DataFrame],
+        *,
+        time_window: str,
+        limit: int | None,
+    ) -> pd.DataFrame:
+        """
+        Retourne le DataFrame en cache pour `key`, chargé ou complété si le TTL est écoulé.
+
+        Paramètres
+        ----------
+        key : Hashable
+            Clé du cache (endpoint, limit, fenêtre, colonnes demandées...).
+        load : Callable[[int | None], pd.DataFrame]
+            Chargement des logs d'identifiant > after_id (None = chargement complet), triés par id croissant.
+        time_window : str
+            Fenêtre temporelle ré-appliquée après chaque ajout.
+        limit : int | None
+            Nombre maximum de requêtes conservées ; None = toutes.
+
+        Retourne
+        -------
+        pd.DataFrame
+            Logs de la fenêtre (partagé : lecture seule).
+        """
+        with self._lock:
+            now = self._clock()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if now - entry["refreshed_at"] < self.ttl_s:
+                    return entry["frame"]
+
+            last_id = None if entry is None else entry["last_id"]
+            after_id = None if last_id is None else max(0, last_id - self.overlap_ids)
+            new = load(after_id)
+            frame = new if entry is None else merge_new_rows(entry["frame"], new, after_id)
+            frame = trim_frame(frame, time_window, limit)
+
+            if not new.empty and "id" in new.columns:
+                new_max = int(new["id"].max())
+                last_id = new_max if last_id is None else max(last_id, new_max)
+
+            self._entries[key] = {"frame": frame, "last_id": last_id, "refreshed_at": now}
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return frame
+
+    def clear(self) -> None:
+        """
+        Vide le cache (prochain accès = chargement complet).
+        """
+        with self._lock:
+            self._entries.clear()
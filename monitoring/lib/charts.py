@@ -1,12 +1,91 @@
 from __future__ import annotations
 
+from typing import Tuple
+
+import numpy as np
 import pandas as pd
 import plotly.express as px
 
+from core.db.repo_ops_rollup import latency_bin_bounds
+
+
+def log_bins(values, nbins: int = 30) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Histogramme NumPy sur une échelle logarithmique (bornes géométriques entre le minimum positif et le maximum).
+
+    Paramètres
+    ----------
+    values : array-like
+        Durées (ms) ; valeurs non numériques ignorées, valeurs <= 0 comptées dans le premier bin.
+    nbins : int, optionnel
+        Nombre de bins. Par défaut : 30.
+
+    Retourne
+    --------
+    Tuple[np.ndarray, np.ndarray]
+        Bornes (nbins + 1) et comptes (nbins) ; tableaux vides si aucune valeur.
+
+    Exemple
+    -------
+    >>> from monitoring.lib.charts import log_bins
+    >>> edges, counts = log_bins([1, 10, 100], nbins=2)
+    >>> counts.tolist()
+    [1, 2]
+    """
+    v = pd.to_numeric(pd.Series(np.asarray(values).ravel()), errors="coerce").to_numpy(dtype=float)
+    v = v[np.isfinite(v)]
+    if not v.size:
+        return np.array([]), np.array([], dtype=np.int64)
+    pos = v[v > 0]
+    lo = float(pos.min()) if pos.size else 1.0
+    hi = max(float(v.max()), lo)
+    if hi <= lo:
+        hi = lo * 2.0
+    edges = np.geomspace(lo, hi, int(nbins) + 1)
+    counts, _ = np.histogram(np.clip(v, lo, hi), bins=edges)
+    return edges, counts
+
+
+def bar_hist(edges: np.ndarray, counts: np.ndarray, title: str, xlabel: str = "ms"):
+    """
+    Génère un histogramme à partir de bins déjà calculés (NumPy ou agrégats) : la taille du graphique
+    ne dépend que du nombre de bins, pas du nombre de valeurs.
+
+    Paramètres
+    ----------
+    edges : np.ndarray
+        Bornes des bins (len(counts) + 1 valeurs croissantes).
+    counts : np.ndarray
+        Comptes par bin.
+    title : str
+        Titre du graphique.
+    xlabel : str, optionnel
+        Unité de l'axe des abscisses. Par défaut : "ms".
+
+    Retourne
+    --------
+    plotly.graph_objs._figure.Figure
+        Barres du premier au dernier bin non vide, libellées par leur borne basse.
+    """
+    counts = np.asarray(counts, dtype=float)
+    nz = np.flatnonzero(counts)
+    idx = np.arange(nz[0], nz[-1] + 1) if nz.size else np.arange(0)
+    lows = np.asarray(edges, dtype=float)[idx]
+    digits = 3
+    labels = [f"{x:.{digits}g}" for x in lows]
+    while len(set(labels)) < len(labels) and digits < 12:
+        digits += 1
+        labels = [f"{x:.{digits}g}" for x in lows]
+    fig = px.bar(pd.DataFrame({xlabel: labels, "n": counts[idx]}), x=xlabel, y="n", title=title)
+    fig.update_xaxes(type="category", title=f"{xlabel} (borne basse, échelle log)")
+    fig.update_layout(yaxis_title=None, bargap=0.05)
+    return fig
+
 
 def hist_latency(lat: pd.Series, title: str, nbins: int = 30):
     """
-    Génère un histogramme des latences.
+    Génère un histogramme des latences, binées côté serveur (NumPy, échelle log) : seuls nbins comptes
+    sont transmis au navigateur, quelle que soit la taille de la fenêtre.
 
     Paramètres
     ----------
@@ -24,8 +103,8 @@ def hist_latency(lat: pd.Series, title: str, nbins: int = 30):
 
     Notes
     -----
-    - Les valeurs non numériques sont converties en NaN puis supprimées.
-    - Utilise Plotly Express pour la visualisation.
+    - Les valeurs non numériques sont ignorées.
+    - Bornes géométriques (log_bins) : les queues de latence restent lisibles.
 
     Exemple
     -------
@@ -35,7 +114,86 @@ def hist_latency(lat: pd.Series, title: str, nbins: int = 30):
     >>> fig = hist_latency(latences, title="Distribution des latences API", nbins=20)
     >>> fig.show()
     """
-    return px.histogram(pd.to_numeric(lat, errors="coerce").dropna(), nbins=nbins, title=title)
+    edges, counts = log_bins(lat, nbins=nbins)
+    return bar_hist(edges, counts, title)
+
+
+def bar_latency_bins(counts: np.ndarray, title: str):
+    """
+    Génère un histogramme de latence à partir de comptes déjà agrégés sur les bins log-linéaires partagés
+    (core.db.repo_ops_rollup : 4 bins par octave), sans transmettre les valeurs brutes au navigateur.
+
+    Paramètres
+    ----------
+    counts : np.ndarray
+        Comptes par bin (LATENCY_HIST_N_BINS valeurs, voir monitoring.lib.ops.rollup_hist).
+    title : str
+        Titre du graphique.
+
+    Retourne
+    --------
+    plotly.graph_objs._figure.Figure
+        Barres du premier au dernier bin non vide, libellées par leur borne basse (ms).
+
+    Exemple
+    -------
+    >>> import numpy as np
+    >>> from monitoring.lib.charts import bar_latency_bins
+    >>> counts = np.zeros(95); counts[60:64] = [3, 10, 6, 1]
+    >>> fig = bar_latency_bins(counts, "Latence (ms)")
+    """
+    counts = np.asarray(counts, dtype=float)
+    edges = np.array([latency_bin_bounds(i)[0] for i in range(len(counts))] + [np.inf])
+    return bar_hist(edges, counts, title)
+
+
+def downsample_series(
+    df: pd.DataFrame, x: str, y: str, max_points: int = 500, by: str | None = None, agg: str = "mean"
+) -> pd.DataFrame:
+    """
+    Réduit une série temporelle à au plus max_points points (par groupe), par tranches de temps égales.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Série longue (colonnes x, y et éventuellement by).
+    x : str
+        Colonne temporelle (ou numérique), croissante par groupe.
+    y : str
+        Colonne de valeurs.
+    max_points : int, optionnel
+        Nombre maximal de points par groupe. Par défaut : 500.
+    by : str | None, optionnel
+        Colonne de groupe (une courbe par valeur), ex. 'feature'.
+    agg : str, optionnel
+        Agrégation des valeurs d'une tranche ('mean', 'max', 'sum'...). Par défaut : 'mean'.
+
+    Retourne
+    --------
+    pd.DataFrame
+        Colonnes x, y (et by) ; x = début de la tranche (première valeur). Inchangé si déjà assez court.
+    """
+    cols = [c for c in (x, y, by) if c is not None]
+    if df is None or df.empty:
+        return df
+    groups = [df] if by is None else [g for _, g in df.groupby(by, sort=False)]
+    if all(len(g) <= max_points for g in groups):
+        return df
+    out = []
+    for g in groups:
+        if len(g) <= max_points:
+            out.append(g[cols])
+            continue
+        t = g[x]
+        span = t.iloc[-1] - t.iloc[0]
+        pos = np.zeros(len(g), dtype=np.int64) if not span else np.minimum(
+            ((t - t.iloc[0]) / span * max_points).to_numpy(dtype=float).astype(np.int64), max_points - 1
+        )
+        aggs = {x: "first", y: agg}
+        if by is not None:
+            aggs[by] = "first"
+        out.append(g[cols].groupby(pos, sort=True).agg(aggs))
+    return pd.concat(out, ignore_index=True)[cols]
 
 
 def bar_status_codes(status_counts: pd.Series, title: str = "Codes HTTP"):
@@ -112,6 +270,71 @@ def bar_top_drift(topk_df: pd.DataFrame, title: str = "Top PSI (drift)"):
     return fig
 
 
+def line_psi_series(
+    series_df: pd.DataFrame,
+    title: str = "PSI dans le temps",
+    threshold: float | None = None,
+    max_points: int = 500,
+):
+    """
+    Génère un graphique en lignes du PSI par période, une courbe par variable.
+
+    Paramètres
+    ----------
+    series_df : pd.DataFrame
+        DataFrame long contenant au moins les colonnes 'bucket' (début de période), 'feature' et 'psi'.
+    title : str, optionnel
+        Titre du graphique. Par défaut : "PSI dans le temps".
+    threshold : float | None, optionnel
+        Seuil de drift tracé en ligne horizontale (aucun si None).
+    max_points : int, optionnel
+        Points par courbe au plus (tranches de temps égales, PSI maximal de la tranche : les pics restent visibles).
+
+    Retourne
+    --------
+    plotly.graph_objs._figure.Figure
+        Objet Figure Plotly représentant les séries PSI.
+
+    Exemple
+    -------
+    >>> import pandas as pd
+    >>> from monitoring.lib.charts import line_psi_series
+    >>> df = pd.DataFrame({'bucket': pd.to_datetime(['2024-02-01', '2024-02-02']), 'feature': ['age', 'age'], 'psi': [0.05, 0.3]})
+    >>> fig = line_psi_series(df, threshold=0.25)
+    >>> fig.show()
+    """
+    series_df = downsample_series(series_df, "bucket", "psi", max_points=max_points, by="feature", agg="max")
+    fig = px.line(series_df, x="bucket", y="psi", color="feature", title=title, markers=True)
+    if threshold is not None:
+        fig.add_hline(y=threshold, line_dash="dash", line_color="red")
+    fig.update_layout(xaxis_title=None)
+    return fig
+
+
+def line_throughput(throughput_df: pd.DataFrame, title: str = "Requêtes", max_points: int = 500):
+    """
+    Génère un graphique en lignes du nombre de requêtes par tranche de temps.
+
+    Paramètres
+    ----------
+    throughput_df : pd.DataFrame
+        DataFrame contenant les colonnes 'bucket' (début de tranche) et 'n' (nombre de requêtes).
+    title : str, optionnel
+        Titre du graphique. Par défaut : "Requêtes".
+    max_points : int, optionnel
+        Points au plus (moyenne par tranche de temps au-delà).
+
+    Retourne
+    --------
+    plotly.graph_objs._figure.Figure
+        Objet Figure Plotly représentant le débit.
+    """
+    throughput_df = downsample_series(throughput_df, "bucket", "n", max_points=max_points)
+    fig = px.line(throughput_df, x="bucket", y="n", title=title, markers=True)
+    fig.update_layout(xaxis_title=None, yaxis_title=None)
+    return fig
+
+
 def bar_ref_vs_prod(df_plot: pd.DataFrame, feature_name: str):
     """
     Génère un graphique en barres comparant la distribution d'une variable entre la référence (ref) et la production (prod).
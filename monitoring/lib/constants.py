@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-TIME_WINDOWS = ["all", "24h", "7d", "30d"]
+TIME_WINDOWS = ["all", "24h", "7d", "30d", "90d"]
 
 PSI_THRESHOLDS = {
     "ok": 0.10,
@@ -14,4 +14,13 @@ DEFAULTS = {
     "drift_threshold": 0.25,
     "max_limit_fetch": 1_000_000,
     "topk_drift": 20,
+    "psi_series_features": 5,
+    "cache_ttl_s": 30,
+    "cache_max_entries": 16,
+    "cache_overlap_ids": 1_000,
+    "live_interval_s": 5,
+    "live_history_s": 900,
+    "live_bucket_s": 10,
+    "live_max_rows": 50_000,
+    "live_overlap_ids": 1_000,
 }
\ No newline at end of file
@@ -7,7 +7,14 @@ Ce module fournit des fonctions utilitaires pour :
 - Exclure certaines colonnes sensibles ou inutiles des jeux de données.
 
 Fonctions principales :
-- load_prod_data : charge les données de production pour un endpoint donné, avec filtrage temporel et exclusion de colonnes.
+- load_prod_frame : exporte les logs d'une fenêtre en colonnes typées (COPY TO STDOUT, JSONB projeté côté serveur),
+  sans dictionnaire par ligne ; features typées d'après la référence (numérique / catégorielle) ;
+  after_id ne lit que les nouvelles requêtes (cache incrémental du dashboard, monitoring/lib/cache.py).
+- drift_population : restreint des logs exportés aux requêtes réussies (population des calculs de drift).
+- load_ops_rollup : récupère les agrégats opérationnels par minute (ops_rollup_1m) sommés sur une fenêtre.
+- load_drift_rollup : récupère les compteurs de drift par heure (drift_rollup_1h) sommés sur une fenêtre.
+- load_drift_bins : bine dans Postgres les inputs loggés d'une fenêtre (seuls les comptes par bin sont transférés).
+- load_drift_series : comptes par bin ventilés par heure / jour (séries PSI), depuis les compteurs ou les logs.
 - load_reference : récupère toutes les distributions de référence des features.
 - load_reference_one : récupère la distribution de référence d'un feature spécifique.
 
@@ -16,76 +23,246 @@ Ces fonctions sont utilisées pour l'analyse de la dérive, la comparaison entre
 
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import Dict, List
 
 import pandas as pd
 
-from core.db.repo_prod_requests import select_prod_requests
+from core.db.repo_drift_rollup import (
+    drift_rollup_covers,
+    ref_version,
+    select_drift_rollup,
+    select_drift_rollup_series,
+    select_prod_drift_bins,
+)
+from core.db.repo_ops_rollup import select_ops_rollup
+from core.db.repo_prod_export import export_prod_frame
 from core.db.repo_ref_dist import load_all_ref, load_one_ref
 
-from monitoring.lib.filters import apply_time_filter, filter_rows_by_meta_ts
-from monitoring.lib.security import drop_excluded_columns
+from monitoring.lib.filters import drift_window_start, time_window_start
 
 
-def load_prod_data(
+def load_prod_frame(
     *,
     endpoint: str,
     limit: int | None,
     time_window: str,
+    ref_rows: List[Dict],
     excluded_features: set[str],
-) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, List[Dict]]:
+    features: List[str] | None = None,
+    outputs: bool = False,
+    after_id: int | None = None,
+) -> pd.DataFrame:
     """
-    Charge et filtre les données de production pour un endpoint donné.
+    Exporte les logs d'une fenêtre en un DataFrame typé (une colonne par feature), via COPY TO STDOUT.
 
     Paramètres
     ----------
     endpoint : str
-        Nom de l'endpoint à interroger.
+        Nom de l'endpoint.
     limit : int | None
-        Nombre maximum de requêtes à charger (None pour tout charger).
+        Nombre maximum de requêtes (les plus récentes) ; None = toutes.
     time_window : str
-        Fenêtre temporelle à appliquer pour filtrer les données (ex: '7d', '30d').
+        Fenêtre temporelle ('all', '24h', '7d', '30d', '90d').
+    ref_rows : List[Dict]
+        Distributions de référence (load_reference) : features exportées et leur type.
     excluded_features : set[str]
-        Ensemble des noms de colonnes à exclure des inputs.
+        Features jamais exportées.
+    features : List[str] | None, optionnel
+        Sous-ensemble des features de référence à exporter ; None = toutes.
+    outputs : bool, optionnel
+        Exporte aussi les outputs (proba_default, score, decision, threshold, timings).
+    after_id : int | None, optionnel
+        Ne renvoie que les requêtes d'identifiant > after_id (rafraîchissement incrémental, voir cache.py).
 
     Retourne
     -------
-    Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, List[Dict]]
-        - prod_meta_df : DataFrame des métadonnées (timestamp, endpoint, status_code, etc.)
-        - prod_inputs_df : DataFrame des features d'entrée (inputs)
-        - prod_outputs_df : DataFrame des features de sortie (outputs)
-        - raw_rows_filtered : Liste des requêtes filtrées (dictionnaires bruts)
+    pd.DataFrame
+        Colonnes id, ts, status_code, latency_ms, sk_id_curr, outputs éventuels, puis toutes les features demandées,
+        y compris sans valeur dans la fenêtre (float64 pour les numériques, texte pour les catégorielles).
 
     Exemple
     -------
-    >>> from monitoring.lib.data import load_prod_data
-    >>> meta, inputs, outputs, rows = load_prod_data(
-    ...     endpoint="predict",
-    ...     limit=1000,
-    ...     time_window="7d",
-    ...     excluded_features={"user_id", "ip"}
-    ... )
-    >>> print(meta.head())
-    >>> print(inputs.head())
-    >>> print(outputs.head())
-    """
-    rows = select_prod_requests(endpoint=endpoint, limit=(limit or 1_000_000))
-    if not rows:
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), []
-
-    prod_meta = pd.DataFrame(
-        [{k: r.get(k) for k in ["ts", "endpoint", "status_code", "latency_ms", "error", "message"]} for r in rows]
+    >>> from monitoring.lib.data import load_prod_frame, load_reference
+    >>> frame = load_prod_frame(endpoint="/predict", limit=None, time_window="7d", ref_rows=load_reference(),
+    ...                         excluded_features={"SK_ID_CURR"})
+    """
+    wanted = None if features is None else set(features)
+    kinds = {
+        r["feature"]: r.get("kind")
+        for r in ref_rows
+        if r.get("feature") not in excluded_features and (wanted is None or r.get("feature") in wanted)
+    }
+    frame = export_prod_frame(
+        endpoint=endpoint,
+        since=time_window_start(time_window),
+        limit=limit,
+        features=list(kinds),
+        categorical={f for f, kind in kinds.items() if kind != "numeric"},
+        outputs=outputs,
+        after_id=after_id,
     )
+    # Schéma complet, même pour une feature sans valeur dans la fenêtre : un rafraîchissement incrémental
+    # (cache.py) se concatène toujours sur les mêmes colonnes
+    return frame.reindex(columns=list(dict.fromkeys([*frame.columns, *kinds])))
 
-    prod_meta = apply_time_filter(prod_meta, time_window)
-    rows = filter_rows_by_meta_ts(rows, prod_meta)
 
-    prod_inputs = pd.DataFrame([r.get("inputs") or {} for r in rows])
-    prod_outputs = pd.DataFrame([r.get("outputs") or {} for r in rows])
+def drift_population(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Restreint des logs exportés (load_prod_frame) aux requêtes réussies (status 200) : même population que les
+    compteurs drift_rollup_1h et le binning SQL, pour que tous les PSI d'une feature concordent.
+
+    Paramètres
+    ----------
+    frame : pd.DataFrame
+        Logs exportés (colonne status_code).
 
-    prod_inputs = drop_excluded_columns(prod_inputs, excluded_features)
+    Retourne
+    -------
+    pd.DataFrame
+        Lignes de status 200 (le DataFrame tel quel s'il n'a pas de colonne status_code).
+    """
+    if "status_code" not in frame.columns:
+        return frame
+    return frame.loc[frame["status_code"] == 200]
 
-    return prod_meta, prod_inputs, prod_outputs, rows
+
+def load_ops_rollup(*, endpoint: str, time_window: str) -> pd.DataFrame:
+    """
+    Charge les agrégats opérationnels (codes HTTP, décisions, histogrammes de latence) d'une fenêtre.
+
+    Paramètres
+    ----------
+    endpoint : str
+        Nom de l'endpoint.
+    time_window : str
+        Fenêtre temporelle ('all', '24h', '7d', '30d'), à la minute près.
+
+    Retourne
+    -------
+    pd.DataFrame
+        Colonnes 'metric', 'key', 'n', 'total' (vide si la table est vide ou la DB inaccessible).
+
+    Exemple
+    -------
+    >>> from monitoring.lib.data import load_ops_rollup
+    >>> rollup = load_ops_rollup(endpoint="/predict", time_window="24h")
+    """
+    rows = select_ops_rollup(endpoint=endpoint, since=time_window_start(time_window))
+    return pd.DataFrame(rows, columns=["metric", "key", "n", "total"])
+
+
+def load_drift_rollup(*, endpoint: str, time_window: str, ref_rows: List[Dict]) -> pd.DataFrame:
+    """
+    Charge les compteurs de drift (feature x bin) d'une fenêtre, pour la version courante de la référence.
+
+    Paramètres
+    ----------
+    endpoint : str
+        Nom de l'endpoint.
+    time_window : str
+        Fenêtre temporelle ('all', '24h', '7d', '30d'), à l'heure près.
+    ref_rows : List[Dict]
+        Distributions de référence (load_reference) : seule leur version est comptée.
+
+    Retourne
+    -------
+    pd.DataFrame
+        Colonnes 'feature', 'bin', 'n' (vide si les compteurs de cette référence ne couvrent pas toute la fenêtre,
+        cf. drift_rollup_covers, ou DB inaccessible).
+
+    Exemple
+    -------
+    >>> from monitoring.lib.data import load_drift_rollup, load_reference
+    >>> ref_rows = load_reference()
+    >>> counters = load_drift_rollup(endpoint="/predict", time_window="7d", ref_rows=ref_rows)
+    """
+    if not ref_rows:
+        return pd.DataFrame(columns=["feature", "bin", "n"])
+    version, since = ref_version(ref_rows), drift_window_start(time_window)
+    if not drift_rollup_covers(version, endpoint=endpoint, since=since):
+        return pd.DataFrame(columns=["feature", "bin", "n"])
+    rows = select_drift_rollup(version, endpoint=endpoint, since=since)
+    return pd.DataFrame(rows, columns=["feature", "bin", "n"])
+
+
+def load_drift_bins(*, endpoint: str, limit: int | None, time_window: str, ref_rows: List[Dict]) -> pd.DataFrame:
+    """
+    Bine dans Postgres les inputs loggés d'une fenêtre sur les références et retourne les comptes (feature x bin),
+    sans transférer les payloads JSONB.
+
+    Paramètres
+    ----------
+    endpoint : str
+        Nom de l'endpoint.
+    limit : int | None
+        Nombre maximum de requêtes (les plus récentes) ; None = toutes.
+    time_window : str
+        Fenêtre temporelle ('all', '24h', '7d', '30d'), à l'heure près comme load_drift_rollup (drift_window_start).
+    ref_rows : List[Dict]
+        Distributions de référence (load_reference).
+
+    Retourne
+    -------
+    pd.DataFrame
+        Colonnes 'feature', 'bin', 'n' (même format que load_drift_rollup ; vide si aucun log ou DB inaccessible).
+
+    Exemple
+    -------
+    >>> from monitoring.lib.data import load_drift_bins, load_reference
+    >>> ref_rows = load_reference()
+    >>> bins = load_drift_bins(endpoint="/predict", limit=5000, time_window="all", ref_rows=ref_rows)
+    """
+    if not ref_rows:
+        return pd.DataFrame(columns=["feature", "bin", "n"])
+    rows = select_prod_drift_bins(ref_rows, endpoint=endpoint, since=drift_window_start(time_window), limit=limit)
+    return pd.DataFrame(rows, columns=["feature", "bin", "n"])
+
+
+def load_drift_series(
+    *, endpoint: str, limit: int | None, time_window: str, ref_rows: List[Dict], period: str = "hour"
+) -> pd.DataFrame:
+    """
+    Charge les comptes de drift (feature x bin) par période, pour les séries PSI.
+    Sur toute la fenêtre (limit=None), ils viennent des compteurs drift_rollup_1h de la référence courante s'ils
+    couvrent la fenêtre ; sinon, les inputs loggés sont binés et ventilés par période dans Postgres.
+
+    Paramètres
+    ----------
+    endpoint : str
+        Nom de l'endpoint.
+    limit : int | None
+        Nombre maximum de requêtes (les plus récentes) ; None = toutes.
+    time_window : str
+        Fenêtre temporelle ('all', '24h', '7d', '30d', '90d'), à l'heure près (drift_window_start).
+    ref_rows : List[Dict]
+        Distributions de référence (load_reference).
+    period : str
+        'hour' ou 'day'.
+
+    Retourne
+    -------
+    pd.DataFrame
+        Colonnes 'bucket', 'feature', 'bin', 'n' (vide si aucun log ou DB inaccessible).
+
+    Exemple
+    -------
+    >>> from monitoring.lib.data import load_drift_series, load_reference
+    >>> ref_rows = load_reference()
+    >>> counts = load_drift_series(endpoint="/predict", limit=None, time_window="90d", ref_rows=ref_rows, period="day")
+    """
+    columns = ["bucket", "feature", "bin", "n"]
+    if not ref_rows:
+        return pd.DataFrame(columns=columns)
+    since = drift_window_start(time_window)
+    version = ref_version(ref_rows)
+    rows = (
+        select_drift_rollup_series(version, endpoint=endpoint, since=since, period=period)
+        if limit is None and drift_rollup_covers(version, endpoint=endpoint, since=since)
+        else []
+    )
+    if not rows:
+        rows = select_prod_drift_bins(ref_rows, endpoint=endpoint, since=since, limit=limit, period=period)
+    return pd.DataFrame(rows, columns=columns)
 
 
 def load_reference() -> List[Dict]:
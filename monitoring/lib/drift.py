@@ -1,10 +1,39 @@
+"""
+Module de calcul du drift (PSI) entre les distributions de référence (ref_feature_dist) et la production.
+
+Moteur vectorisé partagé par le dashboard (compute_drift_table) et scripts/04_analyze_prod_logs.py :
+- DriftReference charge une fois toutes les références : bornes numériques dans une matrice complétée
+  (F x (L+1), +inf en bourrage), tables libellé -> code catégorielles, probabilités de référence (F x L)
+- counts() compte toutes les colonnes d'un lot sans index par valeur (comptes cumulés #(x <= e) sur les bornes
+  numériques, value_counts puis codage des modalités distinctes : dictionnaire si elles sont peu nombreuses,
+  get_indexer sinon) et retourne une matrice de comptes F x (L+1)
+  additive d'un lot à l'autre
+- psi() calcule tous les PSI d'un coup à partir des comptes (psi_from_counts)
+- counts_from_rollup() reconstitue la même matrice à partir des compteurs maintenus par le log writer
+  (drift_rollup_1h, core.db.repo_drift_rollup : mêmes règles de binning, conventions partagées dans core.drift_ref)
+- séries temporelles : counts_series_from_rollup() range les comptes par période (T x F x (L+1)) et psi_series()
+  calcule le PSI de chaque fenêtre glissante par différence de sommes cumulées (données binées une seule fois)
+
+Conventions (identiques à pd.cut(include_lowest=True) / value_counts) :
+- population : requêtes réussies (status 200) ; chaque requête compte une fois par feature de référence,
+  une feature absente du payload (ou du lot) étant manquante
+- numérique : intervalles fermés à droite, le premier inclut sa borne basse ; valeurs manquantes ou hors
+  bornes ignorées (colonne L, hors dénominateur)
+- catégoriel : manquants -> '__MISSING__', modalités inconnues -> '__OTHER__' si la référence le prévoit,
+  sinon comptées en colonne L (dans le dénominateur : elles font baisser les autres proportions)
+"""
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
 
+from core.drift_ref import MISSING_LABEL, OTHER_LABEL, OVERFLOW_BIN, parse_ref
+
+# Période SQL (date_trunc) -> fréquence pandas des séries PSI
+PERIOD_FREQS = {"hour": "h", "day": "D"}
+
 
 def psi_from_dists(ref_p: np.ndarray, prod_p: np.ndarray, eps: float = 1e-6) -> float:
     r = np.clip(ref_p, eps, 1)
@@ -12,29 +41,234 @@ def psi_from_dists(ref_p: np.ndarray, prod_p: np.ndarray, eps: float = 1e-6) ->
     return float(np.sum((p - r) * np.log(p / r)))
 
 
-from typing import List, Tuple
-import numpy as np
-import pandas as pd
+def psi_from_counts(ref_p: np.ndarray, prod_p: np.ndarray, eps: float = 1e-6) -> np.ndarray:
+    """
+    PSI ligne à ligne de deux matrices de probabilités F x L (même écrêtage que psi_from_dists) ;
+    prod_p peut porter des dimensions en tête (T x F x L, diffusion sur ref_p).
+    Les bins de bourrage (0 des deux côtés) contribuent exactement 0.
+    """
+    r = np.clip(ref_p, eps, 1)
+    p = np.clip(prod_p, eps, 1)
+    return np.sum((p - r) * np.log(p / r), axis=-1)
 
 
-def prod_dist_numeric(prod_s: pd.Series, edges: List[float], labels: List[str]) -> Tuple[List[str], np.ndarray]:
-    x = pd.to_numeric(prod_s, errors="coerce").dropna()
-    if len(x) == 0:
-        return labels, np.zeros(len(labels), dtype=float)
+def numeric_counts(x: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Effectifs par bin (intervalles fermés à droite, premier bin fermé à gauche) + une case finale pour les
+    valeurs manquantes ou hors [edges[0], edges[-1]].
+    Comptes cumulés #(x <= e) sur les bornes de référence : aucun index par valeur n'est matérialisé.
+    """
+    le = np.array([np.count_nonzero(x <= e) for e in edges], dtype=np.int64)
+    below = np.count_nonzero(x < edges[0])
+    c = np.empty(len(edges), dtype=np.int64)
+    c[:-1] = np.diff(le)
+    c[0] += le[0] - below  # valeurs égales à la borne basse
+    c[-1] = len(x) - (le[-1] - below)
+    return c
 
-    # IMPORTANT: si labels est fourni, on les impose à pd.cut
-    b = pd.cut(
-        x,
-        bins=np.array(edges, dtype=float),
-        labels=labels,
-        include_lowest=True,
-        duplicates="drop",
-    )
 
-    # value_counts -> index = labels (donc "0-1", "1-2", etc.)
-    dist = b.value_counts(normalize=True).reindex(labels).fillna(0.0)
+# Au-delà de ce nombre de modalités distinctes dans un lot, codage vectorisé (get_indexer) plutôt que dictionnaire
+DICT_LOOKUP_MAX_KEYS = 64
+
+CodeTable = Tuple[pd.Index, Dict[str, int], int]
+
+
+def label_code_table(labels: Sequence[str]) -> CodeTable:
+    """
+    Table libellé -> code d'une référence catégorielle, précalculée une fois.
+    Retour : (index des libellés, dictionnaire libellé -> code, code des modalités inconnues :
+    '__OTHER__' si présent, sinon len(labels)).
+    """
+    table = pd.Index([str(v) for v in labels], dtype=object)
+    lookup = {lbl: i for i, lbl in enumerate(table)}
+    return table, lookup, lookup.get(OTHER_LABEL, len(table))
+
+
+def categorical_counts(s: pd.Series, code_table: CodeTable) -> np.ndarray:
+    """
+    Effectifs par libellé de référence + une case finale (manquants -> '__MISSING__',
+    inconnues -> '__OTHER__' si présent, sinon case finale).
+    Les modalités distinctes du lot (value_counts) sont codées par le dictionnaire tant qu'elles sont peu
+    nombreuses (coût fixe minimal), sinon en une recherche vectorisée (get_indexer) dans la table.
+    """
+    table, lookup, unknown = code_table
+    vc = s.value_counts(dropna=False)
+    c = np.zeros(len(table) + 1, dtype=np.int64)
+    if len(vc) <= DICT_LOOKUP_MAX_KEYS:
+        for v, n in vc.items():
+            c[lookup.get(MISSING_LABEL if pd.isna(v) else str(v), unknown)] += n
+        return c
+
+    keys = vc.index
+    codes = table.get_indexer(keys.astype(str))
+    codes[codes < 0] = unknown
+    codes[keys.isna()] = lookup.get(MISSING_LABEL, unknown)
+    return np.bincount(codes, weights=vc.to_numpy(dtype=float), minlength=len(table) + 1).astype(np.int64)
+
+
+def _to_float(s: pd.Series) -> np.ndarray:
+    if pd.api.types.is_bool_dtype(s) or str(s.dtype).lower() == "boolean":
+        s = s.astype("Int64")
+    # copie contiguë : une colonne d'un bloc pandas est souvent une vue à pas non unitaire (lente à comparer)
+    return np.ascontiguousarray(pd.to_numeric(s, errors="coerce").to_numpy(dtype=float, na_value=np.nan))
+
+
+class DriftReference:
+    """
+    Références de toutes les features, chargées une fois sous forme de tableaux NumPy.
+
+    Attributs :
+        features (list[str]) : Features calculables, dans l'ordre des références.
+        kinds (list[str]) : 'numeric' / 'categorical', aligné sur features.
+        ref_p (np.ndarray) : Probabilités de référence F x L (0 en bourrage).
+        notes (dict) : Features de référence non calculables -> motif ('bad_ref_bins', 'bad_ref_labels', 'empty_ref').
+    """
+
+    def __init__(self, ref_rows: Iterable[Dict[str, Any]], excluded_features: Iterable[str] = ()) -> None:
+        excluded = set(excluded_features)
+        self.features: List[str] = []
+        self.kinds: List[str] = []
+        self.notes: Dict[str, str] = {}
+        self._code_tables: List[CodeTable] = []
+        ref_edges: List[np.ndarray] = []
+        ref_ps: List[np.ndarray] = []
+
+        for ref in ref_rows:
+            feat = ref.get("feature")
+            if feat is None or feat in excluded:
+                continue
+            note, edges, labels, p = parse_ref(ref)
+            if note is not None:
+                self.notes[feat] = note
+                continue
+
+            self.features.append(feat)
+            self.kinds.append("numeric" if ref.get("kind") == "numeric" else "categorical")
+            ref_edges.append(edges)
+            self._code_tables.append(label_code_table(labels))
+            ref_ps.append(p)
+
+        self.n_bins = np.array([len(p) for p in ref_ps], dtype=np.int64)
+        self.max_bins = int(self.n_bins.max()) if len(self.n_bins) else 0
+        self.ref_p = np.zeros((len(ref_ps), self.max_bins), dtype=float)
+        for i, p in enumerate(ref_ps):
+            self.ref_p[i, : len(p)] = p
+        # Bornes complétées (+inf) : forme F x (L+1), lignes catégorielles entièrement à +inf
+        self.edges = np.full((len(ref_ps), self.max_bins + 1), np.inf)
+        for i, e in enumerate(ref_edges):
+            self.edges[i, : len(e)] = e
+        # Comptes hors bins inclus au dénominateur : modalités inconnues (catégoriel) uniquement
+        self._overflow_in_den = np.array([k == "categorical" for k in self.kinds], dtype=bool)
+
+    def counts(self, prod_inputs: pd.DataFrame) -> np.ndarray:
+        """
+        Comptes d'un lot de production : matrice F x (L+1), colonne L = manquants / hors bornes / inconnues.
+        Chaque requête compte une fois par feature : une colonne absente du lot est manquante ('__MISSING__' si
+        catégorielle, colonne L si numérique), comme une feature absente du payload pour les compteurs et le SQL.
+        """
+        n = len(prod_inputs)
+        out = np.zeros((len(self.features), self.max_bins + 1), dtype=np.int64)
+        for i, (feat, kind) in enumerate(zip(self.features, self.kinds)):
+            k = int(self.n_bins[i])
+            if kind == "numeric":
+                if feat not in prod_inputs.columns:
+                    out[i, -1] = n
+                    continue
+                c = numeric_counts(_to_float(prod_inputs[feat]), self.edges[i, : k + 1])
+            else:
+                s = prod_inputs[feat] if feat in prod_inputs.columns else pd.Series([None] * n, dtype=object)
+                c = categorical_counts(s, self._code_tables[i])
+            out[i, :k] = c[:k]
+            out[i, -1] = c[k]
+        return out
+
+    def _denominators(self, counts: np.ndarray) -> np.ndarray:
+        return counts[..., : self.max_bins].sum(axis=-1) + np.where(self._overflow_in_den, counts[..., self.max_bins], 0)
+
+    def observed(self, counts: np.ndarray) -> set[str]:
+        """
+        Features ayant au moins une valeur comptée au dénominateur du PSI (une feature toujours manquante n'en a pas).
+        """
+        return {f for f, den in zip(self.features, self._denominators(counts)) if den > 0}
+
+    def distributions(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Proportions de production F x L (ou T x F x L) à partir des comptes (0 pour une feature sans valeur).
+        """
+        den = self._denominators(counts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            p = counts[..., : self.max_bins] / den[..., None]
+        return np.nan_to_num(p, nan=0.0)
+
+    def psi(self, counts: np.ndarray, eps: float = 1e-6) -> np.ndarray:
+        """
+        PSI de toutes les features (ordre de self.features).
+        """
+        return psi_from_counts(self.ref_p, self.distributions(counts), eps=eps)
+
+    def _rollup_cells(self, rollup: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Position (ligne feature, colonne bin) de chaque compteur ; masque des features connues du moteur.
+        """
+        row = rollup["feature"].map({f: i for i, f in enumerate(self.features)})
+        keep = row.notna().to_numpy()
+        rows = row.to_numpy()[keep].astype(np.int64)
+        bins = rollup["bin"].to_numpy(dtype=np.int64)[keep]
+        cols = np.where((bins == OVERFLOW_BIN) | (bins >= self.n_bins[rows]), self.max_bins, bins)
+        return keep, rows, cols, rollup["n"].to_numpy(dtype=np.int64)[keep]
+
+    def counts_from_rollup(self, rollup: pd.DataFrame) -> np.ndarray:
+        """
+        Matrice de comptes F x (L+1) à partir des compteurs de drift_rollup_1h (colonnes feature, bin, n) ;
+        le bin OVERFLOW_BIN va dans la dernière colonne, les features hors moteur sont ignorées.
+        """
+        out = np.zeros((len(self.features), self.max_bins + 1), dtype=np.int64)
+        if rollup is None or rollup.empty:
+            return out
+        _, rows, cols, n = self._rollup_cells(rollup)
+        np.add.at(out, (rows, cols), n)
+        return out
 
-    p = dist.to_numpy(dtype=float)
+    def counts_series_from_rollup(self, rollup: pd.DataFrame, freq: str = "h") -> Tuple[pd.DatetimeIndex, np.ndarray]:
+        """
+        Comptes par période T x F x (L+1) à partir de compteurs datés (colonnes bucket, feature, bin, n).
+        Les périodes sans trafic entre la première et la dernière sont présentes (comptes nuls), de sorte
+        qu'une fenêtre glissante de k périodes couvre toujours la même durée.
+        """
+        if rollup is None or rollup.empty:
+            return pd.DatetimeIndex([], tz="UTC"), np.zeros((0, len(self.features), self.max_bins + 1), dtype=np.int64)
+        ts = pd.to_datetime(rollup["bucket"], utc=True).dt.floor(freq)
+        buckets = pd.date_range(ts.min(), ts.max(), freq=freq)
+        out = np.zeros((len(buckets), len(self.features), self.max_bins + 1), dtype=np.int64)
+        keep, rows, cols, n = self._rollup_cells(rollup)
+        t = buckets.get_indexer(ts[keep])
+        np.add.at(out, (t, rows, cols), n)
+        return buckets, out
+
+    def psi_series(self, counts_t: np.ndarray, window: int = 1, eps: float = 1e-6) -> np.ndarray:
+        """
+        PSI T x F sur fenêtres glissantes de `window` périodes (la période courante et les window-1 précédentes).
+        Les comptes de chaque fenêtre sont obtenus par différence de sommes cumulées (un seul passage sur T) ;
+        NaN pour une fenêtre sans valeur exploitable.
+        """
+        window = max(1, int(window))
+        cum = np.cumsum(counts_t, axis=0)
+        win = cum.copy()
+        win[window:] -= cum[:-window]
+        psi = psi_from_counts(self.ref_p, self.distributions(win), eps=eps)
+        psi[self._denominators(win) == 0] = np.nan
+        return psi
+
+
+def prod_dist_numeric(prod_s: pd.Series, edges: List[float], labels: List[str]) -> Tuple[List[str], np.ndarray]:
+    x = _to_float(prod_s)
+    e = np.unique(np.asarray(edges, dtype=float))
+    if len(e) < 2 or np.isnan(x).all():
+        return labels, np.zeros(len(labels), dtype=float)
+
+    c = numeric_counts(x, e)[: len(e) - 1][: len(labels)].astype(float)
+    p = np.zeros(len(labels), dtype=float)
+    p[: len(c)] = c
 
     # sécurité (si arrondis/NaN)
     s = float(p.sum())
@@ -45,23 +279,10 @@ def prod_dist_numeric(prod_s: pd.Series, edges: List[float], labels: List[str])
 
 
 def prod_dist_categorical(prod_s: pd.Series, labels_ref: List[str]) -> Tuple[List[str], np.ndarray]:
-    x = prod_s.fillna("__MISSING__").astype(str)
-
-    has_other = "__OTHER__" in labels_ref
-    allowed = set(labels_ref)
-
-    mapped = []
-    for v in x.tolist():
-        if v in allowed:
-            mapped.append(v)
-        else:
-            mapped.append("__OTHER__" if has_other else v)
-
-    vc = pd.Series(mapped).value_counts(normalize=True)
-    prod_map = {k: float(v) for k, v in vc.items()}
-
-    p = np.array([prod_map.get(lab, 0.0) for lab in labels_ref], dtype=float)
-    return labels_ref, p
+    if len(prod_s) == 0:
+        return labels_ref, np.zeros(len(labels_ref), dtype=float)
+    c = categorical_counts(prod_s, label_code_table(labels_ref))[: len(labels_ref)].astype(float)
+    return labels_ref, c / len(prod_s)
 
 
 def compute_drift_table(
@@ -76,43 +297,100 @@ def compute_drift_table(
     if prod_inputs is None or prod_inputs.empty or not ref_rows:
         return pd.DataFrame(columns=["feature", "psi", "type"])
 
-    ref_map = {r["feature"]: r for r in ref_rows}
-    ref_features = [r["feature"] for r in ref_rows if r.get("feature") not in excluded_features]
-
-    common = [c for c in ref_features if c in prod_inputs.columns]
+    engine = DriftReference(ref_rows, excluded_features=excluded_features)
+    counts = engine.counts(prod_inputs)
+    psi_by_feature = dict(zip(engine.features, engine.psi(counts)))
+    shown = engine.observed(counts) | (set(engine.notes) & set(prod_inputs.columns))
 
     psi_rows: List[Dict[str, Any]] = []
-    for feat in common:
-        if feat in excluded_features:
+    for ref in ref_rows:
+        feat = ref.get("feature")
+        if feat in excluded_features or feat not in shown:
             continue
+        psi_rows.append({"feature": feat, "psi": float(psi_by_feature.get(feat, np.nan)), "type": ref.get("kind")})
 
-        ref = ref_map[feat]
-        kind = ref.get("kind")
-        ref_dist = ref.get("ref_dist_json") or {}
-        labels_ref = ref_dist.get("labels") or []
-        ref_p = np.array(ref_dist.get("p") or [], dtype=float)
-
-        prod_s = prod_inputs[feat]
-
-        v = np.nan
-        if kind == "numeric":
-            bins = ref.get("bins_json") or {}
-            edges = bins.get("edges") or []
-            if edges and labels_ref and ref_p.size:
-                _, prod_p = prod_dist_numeric(prod_s, edges=edges, labels=labels_ref)
-                v = psi_from_dists(ref_p, prod_p)
-        else:
-            if labels_ref and ref_p.size:
-                _, prod_p = prod_dist_categorical(prod_s, labels_ref=labels_ref)
-                v = psi_from_dists(ref_p, prod_p)
-
-        psi_rows.append({"feature": feat, "psi": v, "type": kind})
-
-    drift = pd.DataFrame(psi_rows).sort_values("psi", ascending=False)
+    drift = pd.DataFrame(psi_rows, columns=["feature", "psi", "type"]).sort_values("psi", ascending=False)
     return drift
 
 
+def compute_drift_table_from_rollup(
+    *,
+    rollup: pd.DataFrame,
+    ref_rows: List[Dict[str, Any]],
+    excluded_features: set[str],
+) -> pd.DataFrame:
+    """
+    Variante de compute_drift_table à partir des compteurs de drift (drift_rollup_1h) d'une fenêtre :
+    features x bins lignes sommées en base, sans relire les inputs loggés.
+    """
+    if rollup is None or rollup.empty or not ref_rows:
+        return pd.DataFrame(columns=["feature", "psi", "type"])
+
+    engine = DriftReference(ref_rows, excluded_features=excluded_features)
+    counts = engine.counts_from_rollup(rollup)
+    psi_by_feature = dict(zip(engine.features, engine.psi(counts)))
+    shown = engine.observed(counts) | (set(engine.notes) & set(rollup["feature"]))
+
+    psi_rows: List[Dict[str, Any]] = []
+    for ref in ref_rows:
+        feat = ref.get("feature")
+        if feat in excluded_features or feat not in shown:
+            continue
+        psi_rows.append({"feature": feat, "psi": float(psi_by_feature.get(feat, np.nan)), "type": ref.get("kind")})
+
+    return pd.DataFrame(psi_rows, columns=["feature", "psi", "type"]).sort_values("psi", ascending=False)
+
+
+def psi_series_table(
+    engine: DriftReference,
+    buckets: pd.DatetimeIndex,
+    counts_t: np.ndarray,
+    *,
+    window: int = 1,
+    features: set[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Table longue bucket | feature | psi | type des PSI glissants (psi_series) d'une série de comptes T x F x (L+1),
+    restreinte à `features` si fourni.
+    """
+    psi = engine.psi_series(counts_t, window=window)
+    keep = [i for i, feat in enumerate(engine.features) if features is None or feat in features]
+    return pd.DataFrame(
+        {
+            "bucket": np.repeat(buckets, len(keep)),
+            "feature": np.tile(np.asarray(engine.features, dtype=object)[keep], len(buckets)),
+            "psi": psi[:, keep].ravel(),
+            "type": np.tile(np.asarray(engine.kinds, dtype=object)[keep], len(buckets)),
+        },
+        columns=["bucket", "feature", "psi", "type"],
+    )
+
+
+def compute_psi_series_from_rollup(
+    *,
+    rollup: pd.DataFrame,
+    ref_rows: List[Dict[str, Any]],
+    excluded_features: set[str],
+    period: str = "hour",
+    window: int = 1,
+) -> pd.DataFrame:
+    """
+    Séries PSI par feature à partir de compteurs datés (colonnes bucket, feature, bin, n : drift_rollup_1h par
+    période ou binning des logs dans Postgres) : PSI de chaque période sur une fenêtre glissante de `window`
+    périodes (ex. period='day', window=7 : PSI sur 7 jours glissants, un point par jour).
+
+    Retour :
+        Table longue : bucket | feature | psi | type (features observées dans les compteurs uniquement).
+    """
+    if rollup is None or rollup.empty or not ref_rows:
+        return pd.DataFrame(columns=["bucket", "feature", "psi", "type"])
+
+    engine = DriftReference(ref_rows, excluded_features=excluded_features)
+    buckets, counts_t = engine.counts_series_from_rollup(rollup, freq=PERIOD_FREQS[period])
+    return psi_series_table(engine, buckets, counts_t, window=window, features=engine.observed(counts_t.sum(axis=0)))
+
+
 def count_drift(drift_df: pd.DataFrame, threshold: float = 0.25) -> int:
     if drift_df is None or drift_df.empty or "psi" not in drift_df.columns:
         return 0
-    return int((drift_df["psi"] > threshold).sum())
\ No newline at end of file
+    return int((drift_df["psi"] > threshold).sum())
@@ -2,11 +2,11 @@
 Module de filtres pour le monitoring.
 
 Ce module fournit des fonctions utilitaires pour :
-- Filtrer un DataFrame de métadonnées selon une fenêtre temporelle (24h, 7d, 30d, all).
-- Refiltrer une liste de requêtes pour rester cohérent avec un DataFrame filtré sur les timestamps.
+- Filtrer un DataFrame de métadonnées selon une fenêtre temporelle (24h, 7d, 30d, 90d, all).
 fonctions principales : 
+- time_window_start : convertit une fenêtre temporelle en date de début (UTC).
+- drift_window_start : date de début arrondie à l'heure, commune aux compteurs de drift et au binning SQL.
 - apply_time_filter : filtre un DataFrame de métadonnées selon une fenêtre temporelle.
-- filter_rows_by_meta_ts : refiltre une liste de requêtes pour rester cohérent avec un DataFrame de métadonnées filtré sur les timestamps.
 """
 
 from __future__ import annotations
@@ -16,17 +16,84 @@ from datetime import datetime, timedelta, timezone
 import pandas as pd
 
 
+_WINDOW_DELTAS = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+    "90d": timedelta(days=90),
+}
+
+
+def time_window_start(time_window: str, now: datetime | None = None) -> datetime | None:
+    """
+    Convertit une fenêtre temporelle ('all', '24h', '7d', '30d', '90d') en date de début UTC.
+
+    Paramètres
+    ----------
+    time_window : str
+        Fenêtre temporelle.
+    now : datetime | None
+        Instant de référence (par défaut : maintenant, UTC).
+
+    Retourne
+    -------
+    datetime | None
+        Date de début, ou None pour 'all' (ou une fenêtre inconnue).
+
+    Exemple
+    -------
+    >>> from monitoring.lib.filters import time_window_start
+    >>> time_window_start("all") is None
+    True
+    """
+    delta = _WINDOW_DELTAS.get(time_window)
+    if delta is None:
+        return None
+    return (now or datetime.now(timezone.utc)) - delta
+
+
+def drift_window_start(time_window: str, now: datetime | None = None) -> datetime | None:
+    """
+    Date de début d'une fenêtre de drift, arrondie à l'heure inférieure : les compteurs drift_rollup_1h ne
+    peuvent pas découper une heure, le binning SQL des logs part donc de la même heure pleine pour compter
+    la même population (une fenêtre '24h' couvre jusqu'à 59 minutes de plus).
+
+    Paramètres
+    ----------
+    time_window : str
+        Fenêtre temporelle.
+    now : datetime | None
+        Instant de référence (par défaut : maintenant, UTC).
+
+    Retourne
+    -------
+    datetime | None
+        Début de l'heure contenant time_window_start, ou None pour 'all'.
+
+    Exemple
+    -------
+    >>> from datetime import datetime, timezone
+    >>> from monitoring.lib.filters import drift_window_start
+    >>> drift_window_start("24h", now=datetime(2024, 1, 2, 10, 42, tzinfo=timezone.utc)).isoformat()
+    '2024-01-01T10:00:00+00:00'
+    """
+    since = time_window_start(time_window, now=now)
+    if since is None:
+        return None
+    return since.replace(minute=0, second=0, microsecond=0)
+
+
 def apply_time_filter(meta_df: pd.DataFrame, time_window: str) -> pd.DataFrame:
     """
     Filtre un DataFrame sur la colonne 'ts' selon une fenêtre temporelle.
-    Accepte 'all', '24h', '7d', '30d'.
+    Accepte 'all', '24h', '7d', '30d', '90d'.
 
     Paramètres
     ----------
     meta_df : pd.DataFrame
         DataFrame contenant une colonne 'ts' (timestamps).
     time_window : str
-        Fenêtre temporelle à appliquer ('all', '24h', '7d', '30d').
+        Fenêtre temporelle à appliquer ('all', '24h', '7d', '30d', '90d').
 
     Retourne
     -------
@@ -46,55 +113,11 @@ def apply_time_filter(meta_df: pd.DataFrame, time_window: str) -> pd.DataFrame:
     if time_window == "all":
         return meta_df
 
-    ts = pd.to_datetime(meta_df["ts"], errors="coerce", utc=True)
-
-    now = datetime.now(timezone.utc)
-    if time_window == "24h":
-        cutoff = now - timedelta(hours=24)
-    elif time_window == "7d":
-        cutoff = now - timedelta(days=7)
-    elif time_window == "30d":
-        cutoff = now - timedelta(days=30)
-    else:
+    cutoff = time_window_start(time_window)
+    if cutoff is None:
         return meta_df
 
+    ts = pd.to_datetime(meta_df["ts"], errors="coerce", utc=True)
+
     mask = ts >= cutoff
     return meta_df.loc[mask].copy()
-
-
-def filter_rows_by_meta_ts(rows: list[dict], meta_df: pd.DataFrame) -> list[dict]:
-    """
-    Refiltre une liste de requêtes (rows) pour rester cohérent avec un DataFrame de métadonnées filtré sur les timestamps.
-
-    Paramètres
-    ----------
-    rows : list[dict]
-        Liste de dictionnaires représentant les requêtes (doivent contenir une clé 'ts').
-    meta_df : pd.DataFrame
-        DataFrame filtré contenant la colonne 'ts'.
-
-    Retourne
-    -------
-    list[dict]
-        Liste filtrée de requêtes, cohérente avec les timestamps du DataFrame.
-
-    Exemple
-    -------
-    >>> import pandas as pd
-    >>> from monitoring.lib.filters import filter_rows_by_meta_ts
-    >>> rows = [{'ts': '2024-02-01T12:00:00Z'}, {'ts': '2024-02-20T12:00:00Z'}]
-    >>> meta_df = pd.DataFrame({'ts': ['2024-02-20T12:00:00Z']})
-    >>> rows_filtrees = filter_rows_by_meta_ts(rows, meta_df)
-    >>> print(rows_filtrees)
-    [{'ts': '2024-02-20T12:00:00Z'}]
-    """
-    if not rows or meta_df is None or meta_df.empty:
-        return []
-
-    kept = set(pd.to_datetime(meta_df["ts"], errors="coerce", utc=True).astype(str).tolist())
-    out = []
-    for r in rows:
-        ts = pd.to_datetime(r.get("ts"), errors="coerce", utc=True)
-        if str(ts) in kept:
-            out.append(r)
-    return out
\ No newline at end of file
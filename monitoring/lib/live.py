@@ -0,0 +1,168 @@
+"""
+Module du mode live du dashboard de monitoring (suivi du trafic pendant un incident).
+
+LiveTail interroge périodiquement prod_requests à partir d'un curseur (dernier id lu) : seules les requêtes
+récentes sont exportées (COPY, colonnes typées), avec un recouvrement de overlap_ids identifiants sous le curseur
+pour rattraper les transactions validées dans le désordre (id déjà agrégés écartés), puis agrégées en mémoire
+au format des agrégats
+ops_rollup_1m (metric, key, n, total). Les indicateurs (taux de succès / d'erreur, p50 / p95 / p99,
+histogrammes de latence, répartition des décisions) se calculent donc avec les fonctions de monitoring.lib.ops,
+sans relire la fenêtre. Le débit est compté par tranches de bucket_s secondes sur les history_s dernières secondes.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from core.db.repo_ops_rollup import LATENCY_HIST_N_BINS, TIMING_METRICS
+from core.db.repo_prod_export import export_prod_frame
+from core.db.repo_prod_requests import select_last_prod_request_id
+from monitoring.lib.constants import DEFAULTS
+from monitoring.lib.ops import latency_bins
+
+DURATION_METRICS = ["latency_ms"] + TIMING_METRICS
+
+
+def rollup_increments(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Traduit des logs exportés (export_prod_frame, outputs inclus) en incréments d'agrégats, de façon vectorisée.
+
+    Paramètres
+    ----------
+    frame : pd.DataFrame
+        Logs (colonnes status_code, latency_ms, decision et timings si présentes).
+
+    Retourne
+    -------
+    pd.DataFrame
+        Colonnes 'metric', 'key', 'n', 'total' (mêmes clés que core.db.repo_ops_rollup.rollup_entries).
+    """
+    parts = []
+    if "status_code" in frame.columns:
+        status = pd.to_numeric(frame["status_code"], errors="coerce").fillna(0).astype("int64").astype(str)
+        counts = status.value_counts()
+        parts.append(pd.DataFrame({"metric": "status", "key": counts.index, "n": counts.values, "total": 0.0}))
+    if "decision" in frame.columns:
+        counts = frame["decision"].dropna().astype(str).value_counts()
+        parts.append(pd.DataFrame({"metric": "decision", "key": counts.index, "n": counts.values, "total": 0.0}))
+    for metric in DURATION_METRICS:
+        if metric not in frame.columns:
+            continue
+        v = pd.to_numeric(frame[metric], errors="coerce").dropna().to_numpy(dtype=float)
+        if not v.size:
+            continue
+        bins = latency_bins(v)
+        n = np.bincount(bins, minlength=LATENCY_HIST_N_BINS)
+        total = np.bincount(bins, weights=v, minlength=LATENCY_HIST_N_BINS)
+        nz = np.flatnonzero(n)
+        parts.append(pd.DataFrame({"metric": metric, "key": nz.astype(str), "n": n[nz], "total": total[nz]}))
+    if not parts:
+        return pd.DataFrame(columns=["metric", "key", "n", "total"])
+    return pd.concat(parts, ignore_index=True)
+
+
+class LiveTail:
+    """
+    Agrégats en mémoire des requêtes arrivées depuis l'ouverture du mode live (curseur sur prod_requests.id).
+
+    Exemple
+    -------
+    >>> tail = LiveTail("/predict")
+    >>> tail.poll()          # nouvelles requêtes depuis le dernier appel
+    >>> tail.rollup()        # agrégats au format ops_rollup_1m
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        *,
+        history_s: int = DEFAULTS["live_history_s"],
+        bucket_s: int = DEFAULTS["live_bucket_s"],
+        max_rows: int = DEFAULTS["live_max_rows"],
+        overlap_ids: int = DEFAULTS["live_overlap_ids"],
+        fetch: Callable[..., pd.DataFrame] = export_prod_frame,
+        last_id: Callable[[str], Optional[int]] = select_last_prod_request_id,
+    ) -> None:
+        self.endpoint = endpoint
+        self.history_s = int(history_s)
+        self.bucket_s = int(bucket_s)
+        self.max_rows = int(max_rows)
+        self.overlap_ids = int(overlap_ids)
+        self._fetch = fetch
+        self._last_id = last_id
+        self.cursor: Optional[int] = None
+        self.n_requests = 0
+        # True dès qu'un rafraîchissement a dépassé max_rows : des requêtes plus anciennes n'ont pas été agrégées
+        self.truncated = False
+        self._start_id = 0
+        self._recent_ids: Set[int] = set()
+        self.started_at = datetime.now(timezone.utc)
+        self._rollup: Optional[pd.DataFrame] = None
+        self._throughput = pd.Series(dtype="int64")
+
+    def poll(self) -> int:
+        """
+        Lit les requêtes d'id > curseur - overlap_ids et agrège celles qui ne l'ont pas encore été.
+
+        Le premier appel place le curseur sur la dernière requête loggée (le live démarre maintenant).
+        Au-delà de max_rows requêtes relues, seules les plus récentes sont agrégées : si des requêtes d'id
+        supérieur au curseur ont pu être écartées, `truncated` passe à True (signalé dans le dashboard).
+
+        Retourne
+        -------
+        int
+            Nombre de requêtes agrégées.
+        """
+        if self.cursor is None:
+            self.cursor = self._start_id = self._last_id(self.endpoint) or 0
+            return 0
+        after_id = max(self._start_id, self.cursor - self.overlap_ids)
+        frame = self._fetch(endpoint=self.endpoint, after_id=after_id, limit=self.max_rows, outputs=True)
+        if frame.empty:
+            return 0
+        ids = frame["id"]
+        if len(frame) >= self.max_rows and int(ids.min()) > self.cursor:
+            self.truncated = True
+        new = frame.loc[~ids.isin(self._recent_ids)]
+        self.cursor = max(self.cursor, int(ids.max()))
+        horizon = self.cursor - self.overlap_ids
+        self._recent_ids = {i for i in self._recent_ids if i > horizon}
+        self._recent_ids.update(i for i in new["id"].tolist() if i > horizon)
+        if new.empty:
+            return 0
+        self.update(new)
+        return len(new)
+
+    def update(self, frame: pd.DataFrame) -> None:
+        """
+        Ajoute des logs exportés aux agrégats (compteurs, histogrammes, débit).
+        """
+        inc = rollup_increments(frame).set_index(["metric", "key"])
+        if self._rollup is not None:
+            inc = pd.concat([self._rollup, inc])
+        self._rollup = inc.groupby(level=[0, 1]).sum()
+        self.n_requests += len(frame)
+
+        if "ts" in frame.columns:
+            buckets = frame["ts"].dt.floor(f"{self.bucket_s}s").value_counts()
+            self._throughput = self._throughput.add(buckets, fill_value=0).astype("int64").sort_index()
+            horizon = datetime.now(timezone.utc) - timedelta(seconds=self.history_s)
+            self._throughput = self._throughput[self._throughput.index >= horizon]
+
+    def rollup(self) -> pd.DataFrame:
+        """
+        Agrégats depuis le démarrage (colonnes 'metric', 'key', 'n', 'total'), utilisables par monitoring.lib.ops.
+        """
+        if self._rollup is None:
+            return pd.DataFrame(columns=["metric", "key", "n", "total"])
+        return self._rollup.reset_index()
+
+    def throughput(self) -> pd.DataFrame:
+        """
+        Requêtes par tranche de bucket_s secondes sur l'historique récent (colonnes 'bucket', 'n').
+        """
+        return pd.DataFrame({"bucket": self._throughput.index, "n": self._throughput.to_numpy()})
@@ -9,14 +9,27 @@ Fonctions principales :
 - latency_stats_ms : calcule les percentiles p50, p95, p99 et la moyenne des latences.
 - error_rate : calcule le pourcentage de requêtes en erreur (codes HTTP >= 400).
 - success_rate : calcule le pourcentage de requêtes réussies (codes HTTP == 200).
+- rollup_counts : extrait les comptes d'une métrique (status, decision) des agrégats ops_rollup_1m.
+- latency_bins : index des bins d'histogramme de latence (log-linéaires, partagés avec ops_rollup_1m), vectorisé.
+- rollup_hist : comptes par bin d'une métrique de durée, depuis les agrégats.
+- latency_stats_from_rollup : calcule p50/p95/p99/moyenne depuis les histogrammes fusionnés d'une fenêtre.
+- error_rate_from_counts / success_rate_from_counts : mêmes taux, à partir de comptes par code HTTP.
 """
 
 from __future__ import annotations
 
 from typing import Dict
 
+import numpy as np
 import pandas as pd
 
+from core.db.repo_ops_rollup import (
+    LATENCY_HIST_BINS_PER_OCTAVE,
+    LATENCY_HIST_MIN_MS,
+    LATENCY_HIST_N_BINS,
+    latency_bin_bounds,
+)
+
 
 def latency_stats_ms(lat: pd.Series) -> Dict[str, float]:
     """
@@ -104,4 +117,191 @@ def success_rate(status_code: pd.Series) -> float:
     s = pd.to_numeric(status_code, errors="coerce")
     if s.isna().all():
         return 0.0
-    return float((s == 200).mean()) * 100.0
\ No newline at end of file
+    return float((s == 200).mean()) * 100.0
+
+
+def rollup_counts(rollup_df: pd.DataFrame, metric: str) -> pd.Series:
+    """
+    Extrait les comptes d'une métrique ('status', 'decision', ou bins de latence) des agrégats.
+
+    Paramètres
+    ----------
+    rollup_df : pd.DataFrame
+        Agrégats sommés sur la fenêtre (colonnes 'metric', 'key', 'n', 'total').
+    metric : str
+        Métrique à extraire.
+
+    Retourne
+    -------
+    pd.Series
+        Comptes indexés par clé, triés par index (vide si la métrique est absente).
+
+    Exemple
+    -------
+    >>> import pandas as pd
+    >>> from monitoring.lib.ops import rollup_counts
+    >>> df = pd.DataFrame({"metric": ["status", "status"], "key": ["200", "422"], "n": [8, 2], "total": [0.0, 0.0]})
+    >>> rollup_counts(df, "status").to_dict()
+    {'200': 8, '422': 2}
+    """
+    if rollup_df is None or rollup_df.empty:
+        return pd.Series(dtype="int64")
+    sub = rollup_df[rollup_df["metric"] == metric]
+    return sub.groupby("key")["n"].sum().astype("int64").sort_index()
+
+
+def latency_bins(values) -> np.ndarray:
+    """
+    Version vectorisée de core.db.repo_ops_rollup.latency_bin : index de bin de chaque durée (ms).
+
+    Paramètres
+    ----------
+    values : array-like
+        Durées en millisecondes (NaN et valeurs < LATENCY_HIST_MIN_MS -> bin 0).
+
+    Retourne
+    -------
+    np.ndarray
+        Index entiers dans [0, LATENCY_HIST_N_BINS - 1].
+
+    Exemple
+    -------
+    >>> from monitoring.lib.ops import latency_bins
+    >>> latency_bins([0.0, 0.01, 1e9]).tolist()
+    [0, 1, 94]
+    """
+    v = np.asarray(values, dtype=float)
+    out = np.zeros(v.shape, dtype=np.int64)
+    ok = v >= LATENCY_HIST_MIN_MS
+    out[ok] = np.floor(LATENCY_HIST_BINS_PER_OCTAVE * np.log2(v[ok] / LATENCY_HIST_MIN_MS)) + 1
+    return np.minimum(out, LATENCY_HIST_N_BINS - 1)
+
+
+def rollup_hist(rollup_df: pd.DataFrame, metric: str = "latency_ms") -> np.ndarray:
+    """
+    Comptes par bin (LATENCY_HIST_N_BINS valeurs) d'une métrique de durée, depuis les agrégats.
+
+    Paramètres
+    ----------
+    rollup_df : pd.DataFrame
+        Agrégats (colonnes 'metric', 'key', 'n', 'total').
+    metric : str
+        Métrique de durée ('latency_ms', 'db_ms', 'validation_ms', 'inference_ms', 'total_ms').
+
+    Retourne
+    -------
+    np.ndarray
+        Comptes (float) indexés par bin ; zéros si la métrique est absente.
+    """
+    if rollup_df is None or rollup_df.empty:
+        return np.zeros(LATENCY_HIST_N_BINS)
+    sub, ok = _rollup_bins(rollup_df, metric)
+    return np.bincount(
+        pd.to_numeric(sub.loc[ok, "key"]).astype(int).to_numpy(),
+        weights=sub.loc[ok, "n"].to_numpy(dtype=float),
+        minlength=LATENCY_HIST_N_BINS,
+    )
+
+
+def _rollup_bins(rollup_df: pd.DataFrame, metric: str):
+    """Lignes d'une métrique et masque des clés de bin valides."""
+    sub = rollup_df[rollup_df["metric"] == metric]
+    bins = pd.to_numeric(sub["key"], errors="coerce")
+    return sub, bins.notna() & (bins >= 0) & (bins < LATENCY_HIST_N_BINS)
+
+
+def _rollup_total(rollup_df: pd.DataFrame, metric: str) -> float:
+    """Somme des durées d'une métrique (bins valides)."""
+    sub, ok = _rollup_bins(rollup_df, metric)
+    return float(sub.loc[ok, "total"].sum())
+
+
+def latency_stats_from_rollup(rollup_df: pd.DataFrame, metric: str = "latency_ms") -> Dict[str, float]:
+    """
+    Calcule p50/p95/p99 et moyenne (ms) depuis l'histogramme fusionné d'une métrique de durée.
+
+    Les quantiles sont interpolés linéairement dans le bin (erreur relative < ~19 %, largeur d'un bin
+    log-linéaire à 4 bins par octave) ; la moyenne est exacte (somme des durées / nombre).
+
+    Paramètres
+    ----------
+    rollup_df : pd.DataFrame
+        Agrégats sommés sur la fenêtre (colonnes 'metric', 'key', 'n', 'total').
+    metric : str
+        Métrique de durée ('latency_ms', 'db_ms', 'validation_ms', 'inference_ms', 'total_ms').
+
+    Retourne
+    -------
+    Dict[str, float]
+        Dictionnaire avec les clés 'p50', 'p95', 'p99', 'mean' (0.0 si aucune donnée).
+    """
+    empty = {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+    if rollup_df is None or rollup_df.empty:
+        return empty
+
+    counts = rollup_hist(rollup_df, metric)
+    n = float(counts.sum())
+    if n <= 0:
+        return empty
+
+    cum = np.cumsum(counts)
+
+    def _quantile(q: float) -> float:
+        rank = q * n
+        i = int(np.searchsorted(cum, rank, side="left"))
+        i = min(i, LATENCY_HIST_N_BINS - 1)
+        lo, hi = latency_bin_bounds(i)
+        before = cum[i - 1] if i > 0 else 0.0
+        frac = (rank - before) / counts[i] if counts[i] > 0 else 0.0
+        return float(lo + (hi - lo) * min(max(frac, 0.0), 1.0))
+
+    return {
+        "p50": _quantile(0.50),
+        "p95": _quantile(0.95),
+        "p99": _quantile(0.99),
+        "mean": _rollup_total(rollup_df, metric) / n,
+    }
+
+
+def error_rate_from_counts(status_counts: pd.Series) -> float:
+    """
+    Calcule le taux d'erreur (codes HTTP >= 400) en pourcentage, à partir de comptes par code.
+
+    Paramètres
+    ----------
+    status_counts : pd.Series
+        Comptes indexés par code HTTP (str ou int).
+
+    Retourne
+    -------
+    float
+        Pourcentage de requêtes en erreur.
+    """
+    codes = pd.to_numeric(pd.Series(status_counts.index), errors="coerce").to_numpy()
+    n = status_counts.to_numpy(dtype=float)
+    total = n.sum()
+    if total <= 0:
+        return 0.0
+    return float(n[codes >= 400].sum() / total) * 100.0
+
+
+def success_rate_from_counts(status_counts: pd.Series) -> float:
+    """
+    Calcule le taux de succès (codes HTTP == 200) en pourcentage, à partir de comptes par code.
+
+    Paramètres
+    ----------
+    status_counts : pd.Series
+        Comptes indexés par code HTTP (str ou int).
+
+    Retourne
+    -------
+    float
+        Pourcentage de requêtes réussies.
+    """
+    codes = pd.to_numeric(pd.Series(status_counts.index), errors="coerce").to_numpy()
+    n = status_counts.to_numpy(dtype=float)
+    total = n.sum()
+    if total <= 0:
+        return 0.0
+    return float(n[codes == 200].sum() / total) * 100.0
@@ -13,6 +13,7 @@ Fonctions principales :
     - extract_timings(outputs_df): Extrait et normalise les colonnes de temps à partir d'une colonne 'timing' contenant des dictionnaires JSON.
     - series_stats_ms(s): Calcule des statistiques de base (p50, p95, p99, moyenne) sur une série de temps en millisecondes.
     - compute_timing_stats(timing_df): Calcule les statistiques de temps pour chaque colonne de temps d'un DataFrame.
+    - compute_timing_stats_from_rollup(rollup_df): Même résultat, à partir des histogrammes agrégés (ops_rollup_1m).
 """
 
 from __future__ import annotations
@@ -21,6 +22,8 @@ from typing import Dict
 
 import pandas as pd
 
+from monitoring.lib.ops import latency_stats_from_rollup
+
 
 TIMING_COLS = ["db_ms", "validation_ms", "inference_ms", "total_ms"]
 
@@ -116,4 +119,21 @@ def compute_timing_stats(timing_df: pd.DataFrame) -> Dict[str, Dict[str, float]]
     """
     if timing_df is None or timing_df.empty:
         return {}
-    return {c: series_stats_ms(timing_df[c]) for c in TIMING_COLS if c in timing_df.columns}
\ No newline at end of file
+    return {c: series_stats_ms(timing_df[c]) for c in TIMING_COLS if c in timing_df.columns}
+
+
+def compute_timing_stats_from_rollup(rollup_df: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    """
+    Calcule les statistiques de temps (p50, p95, p99, moyenne) par étape depuis les histogrammes agrégés.
+
+    Args:
+        rollup_df (pd.DataFrame): Agrégats sommés sur la fenêtre (colonnes 'metric', 'key', 'n', 'total').
+
+    Returns:
+        Dict[str, Dict[str, float]]: Statistiques pour chaque étape ({} si aucun timing dans les agrégats).
+    """
+    if rollup_df is None or rollup_df.empty:
+        return {}
+    if not set(TIMING_COLS) & set(rollup_df["metric"]):
+        return {}
+    return {c: latency_stats_from_rollup(rollup_df, c) for c in TIMING_COLS}
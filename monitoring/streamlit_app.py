@@ -11,6 +11,7 @@ from __future__ import annotations
 
 import sys
 from pathlib import Path
+from typing import Dict, List
 
 import numpy as np
 import pandas as pd
@@ -26,11 +27,25 @@ from core.db.conn import init_db
 
 from monitoring.lib.constants import DEFAULTS, TIME_WINDOWS, PSI_THRESHOLDS
 from monitoring.lib.security import EXCLUDED_FEATURES
-from monitoring.lib.data import load_prod_data, load_reference, load_reference_one
-from monitoring.lib.ops import latency_stats_ms, error_rate, success_rate
-from monitoring.lib.timings import extract_timings, compute_timing_stats
+from monitoring.lib.cache import IncrementalFrameCache
+from monitoring.lib.live import LiveTail
+from monitoring.lib import data
+from monitoring.lib.data import drift_population, load_prod_frame
+from monitoring.lib.ops import (
+    latency_stats_ms,
+    error_rate,
+    success_rate,
+    rollup_counts,
+    rollup_hist,
+    latency_stats_from_rollup,
+    error_rate_from_counts,
+    success_rate_from_counts,
+)
+from monitoring.lib.timings import TIMING_COLS, compute_timing_stats, compute_timing_stats_from_rollup
 from monitoring.lib.drift import (
     compute_drift_table,
+    compute_drift_table_from_rollup,
+    compute_psi_series_from_rollup,
     count_drift,
     prod_dist_numeric,
     prod_dist_categorical,
@@ -39,8 +54,11 @@ from monitoring.lib.drift import (
 from monitoring.lib.charts import (
     hist_latency,
     bar_status_codes,
+    bar_latency_bins,
+    line_throughput,
     pie_decisions,
     bar_top_drift,
+    line_psi_series,
     bar_ref_vs_prod,
 )
 
@@ -49,9 +67,64 @@ from monitoring.lib.charts import (
 # (variables d'environnement, connexion DB, config Streamlit)
 ###########################################################
 load_dotenv()
-init_db()
 
 st.set_page_config(page_title="PAD — Monitoring", layout="wide")
+
+
+@st.cache_resource(show_spinner=False)
+def _init_db_once() -> None:
+    """Applique les migrations manquantes une seule fois par process Streamlit (pas à chaque rerun)."""
+    init_db()
+
+
+_init_db_once()
+
+
+###########################################################
+# Cache des lectures : Streamlit ré-exécute le script à chaque interaction.
+# Agrégats (rollups, comptes par bin, référence) : st.cache_data avec TTL, clé = arguments.
+# Logs en colonnes : cache partagé, complété par id croissant à l'expiration du TTL (pas de relecture complète).
+###########################################################
+_cache_data = st.cache_data(ttl=DEFAULTS["cache_ttl_s"], show_spinner=False)
+load_ops_rollup = _cache_data(data.load_ops_rollup)
+load_drift_rollup = _cache_data(data.load_drift_rollup)
+load_drift_bins = _cache_data(data.load_drift_bins)
+load_drift_series = _cache_data(data.load_drift_series)
+load_reference = _cache_data(data.load_reference)
+load_reference_one = _cache_data(data.load_reference_one)
+
+
+@st.cache_resource(show_spinner=False)
+def _frame_cache() -> IncrementalFrameCache:
+    """Cache des logs partagé par les sessions du process."""
+    return IncrementalFrameCache()
+
+
+def cached_prod_frame(
+    *, endpoint: str, limit: int | None, time_window: str, ref_rows: List[Dict] = (),
+    features: List[str] | None = None, outputs: bool = False,
+) -> pd.DataFrame:
+    """Logs d'une fenêtre en colonnes typées (load_prod_frame), en cache par (endpoint, limit, fenêtre, colonnes)."""
+    kinds = tuple(
+        (r.get("feature"), r.get("kind")) for r in ref_rows if features is None or r.get("feature") in features
+    )
+    return _frame_cache().get(
+        ("prod_frame", endpoint, limit, time_window, outputs, kinds),
+        lambda after_id: load_prod_frame(
+            endpoint=endpoint,
+            limit=limit,
+            time_window=time_window,
+            ref_rows=list(ref_rows),
+            excluded_features=EXCLUDED_FEATURES,
+            features=features,
+            outputs=outputs,
+            after_id=after_id,
+        ),
+        time_window=time_window,
+        limit=limit,
+    )
+
+
 st.title("Monitoring — API Ops + Data Drift (référence en DB)")
 
 ###########################################################
@@ -77,27 +150,87 @@ with st.sidebar:
         step=0.01,
     )
 
+    live = st.toggle("Mode live (nouvelles requêtes)", value=False)
+    live_interval = st.number_input(
+        "Rafraîchissement live (s)", min_value=1, value=int(DEFAULTS["live_interval_s"]), step=1
+    )
+
+    if st.button("Rafraîchir (relecture complète)"):
+        st.cache_data.clear()
+        _frame_cache().clear()
+
     st.caption(
         f"PSI: <{PSI_THRESHOLDS['ok']} OK | {PSI_THRESHOLDS['ok']}–{PSI_THRESHOLDS['watch']} à surveiller | >{PSI_THRESHOLDS['watch']} drift fort"
     )
 
 limit_val = None if int(limit) == 0 else int(limit)
 
+###########################################################
+# Mode live : seules les requêtes arrivées depuis l'activation sont lues (curseur sur l'id),
+# agrégées en mémoire (compteurs, histogrammes) ; le fragment se ré-affiche seul à intervalle fixe.
+###########################################################
+def _live_panel() -> None:
+    tail = st.session_state.get("live_tail")
+    if tail is None or tail.endpoint != endpoint:
+        tail = st.session_state["live_tail"] = LiveTail(endpoint)
+    tail.poll()
+
+    live_rollup = tail.rollup()
+    live_status = rollup_counts(live_rollup, "status")
+    live_lat = latency_stats_from_rollup(live_rollup, "latency_ms")
+    st.caption(f"Depuis {tail.started_at:%H:%M:%S} UTC — rafraîchi toutes les {int(live_interval)} s")
+    if tail.truncated:
+        st.warning(
+            f"Plus de {tail.max_rows} requêtes entre deux rafraîchissements : seules les plus récentes ont été "
+            "agrégées, les indicateurs live sont incomplets."
+        )
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("Nb requêtes", tail.n_requests)
+    c2.metric("Succès (200)", round(success_rate_from_counts(live_status), 2), "%")
+    c3.metric("Erreurs (>=400)", round(error_rate_from_counts(live_status), 2), "%")
+    c4.metric("p50 (ms)", round(live_lat["p50"], 2))
+    c5.metric("p95 (ms)", round(live_lat["p95"], 2))
+    if tail.n_requests == 0:
+        st.info("En attente de nouvelles requêtes...")
+        return
+
+    st.plotly_chart(line_throughput(tail.throughput(), f"Requêtes / {tail.bucket_s} s"), use_container_width=True)
+    colL, colR = st.columns(2)
+    with colL:
+        st.plotly_chart(bar_latency_bins(rollup_hist(live_rollup, "latency_ms"), "Latence totale (ms)"), use_container_width=True)
+        st.plotly_chart(bar_status_codes(live_status, "Codes HTTP"), use_container_width=True)
+    with colR:
+        st.plotly_chart(bar_latency_bins(rollup_hist(live_rollup, "inference_ms"), "Inference time (ms)"), use_container_width=True)
+        live_dec = rollup_counts(live_rollup, "decision")
+        if not live_dec.empty:
+            st.plotly_chart(pie_decisions(live_dec, "ACCEPTED / REFUSED"), use_container_width=True)
+
+
+if live:
+    st.subheader("Live — trafic en cours")
+    st.fragment(run_every=f"{int(live_interval)}s")(_live_panel)()
+    st.stop()
+st.session_state.pop("live_tail", None)
+
 ###########################################################
 # Chargement des données de production depuis la base
 ###########################################################
-prod_meta, prod_inputs, prod_outputs, rows = load_prod_data(
-    endpoint=endpoint,
-    limit=limit_val,
-    time_window=time_window,
-    excluded_features=EXCLUDED_FEATURES,
-)
+# Fenêtre filtrée dans la requête ; chaque section ne lit que ses colonnes : métadonnées + outputs ici,
+# inputs (export en colonnes typées) seulement pour le repli du drift (section 2) et la feature détaillée (section 3).
+# Lectures en cache : après le premier chargement, seules les nouvelles requêtes (id > dernier id) sont lues.
+prod_meta = cached_prod_frame(endpoint=endpoint, limit=limit_val, time_window=time_window, outputs=True)
+prod_outputs = prod_meta
 
 if prod_meta.empty:
     st.warning("Aucune requête trouvée en DB (prod_requests) ou DB non accessible.")
     st.stop()
 
-st.success(f"DB chargée: {len(prod_meta)} requêtes | inputs: {prod_inputs.shape[0]}×{prod_inputs.shape[1]}")
+st.success(f"DB chargée: {len(prod_meta)} requêtes")
+
+# Sur toute la fenêtre (limit=0), les KPIs ops viennent des agrégats par minute (ops_rollup_1m)
+# plutôt que d'un recalcul sur les lignes brutes ; repli sur les lignes si la table est vide.
+rollup = load_ops_rollup(endpoint=endpoint, time_window=time_window) if limit_val is None else pd.DataFrame()
+use_rollup = not rollup.empty
 
 ###########################################################
 # Section 1 : Analyse des indicateurs de santé de l'API (OPS)
@@ -105,16 +238,28 @@ st.success(f"DB chargée: {len(prod_meta)} requêtes | inputs: {prod_inputs.shap
 st.subheader("1) Santé API (ops)")
 
 lat_total = pd.to_numeric(prod_meta["latency_ms"], errors="coerce")
-stats_total = latency_stats_ms(lat_total)
+
+if use_rollup:
+    status_counts = rollup_counts(rollup, "status")
+    stats_total = latency_stats_from_rollup(rollup, "latency_ms")
+    n_requests = int(status_counts.sum())
+    ok_pct = success_rate_from_counts(status_counts)
+    err_pct = error_rate_from_counts(status_counts)
+else:
+    status_counts = prod_meta["status_code"].value_counts(dropna=False).sort_index()
+    stats_total = latency_stats_ms(lat_total)
+    n_requests = int(len(prod_meta))
+    ok_pct = success_rate(prod_meta["status_code"])
+    err_pct = error_rate(prod_meta["status_code"])
 
 # KPIs
 c1, c2, c3, c4 = st.columns(4)
 with c1:
-    st.metric("Nb requêtes", int(len(prod_meta)))
+    st.metric("Nb requêtes", n_requests)
 with c2:
-    st.metric("Succès (200)", round(success_rate(prod_meta["status_code"]), 2), "%")
+    st.metric("Succès (200)", round(ok_pct, 2), "%")
 with c3:
-    st.metric("Erreurs (>=400)", round(error_rate(prod_meta["status_code"]), 2), "%")
+    st.metric("Erreurs (>=400)", round(err_pct, 2), "%")
 with c4:
     st.metric("Total p95 (ms)", round(stats_total["p95"], 2))
 
@@ -132,9 +277,15 @@ if float(stats_total["p95"]) > float(p95_threshold):
 else:
     st.success(f"Total p95 ({stats_total['p95']:.2f} ms) sous le seuil ({p95_threshold} ms).")
 
-st.plotly_chart(hist_latency(lat_total, "Distribution latence totale (ms)"), use_container_width=True)
+# Histogrammes pré-binés : bins des agrégats (fenêtre complète) ou binning NumPy log, jamais les valeurs brutes
+def latency_chart(metric: str, values: pd.Series, title: str):
+    if use_rollup:
+        return bar_latency_bins(rollup_hist(rollup, metric), title)
+    return hist_latency(values, title)
+
+
+st.plotly_chart(latency_chart("latency_ms", lat_total, "Distribution latence totale (ms)"), use_container_width=True)
 
-status_counts = prod_meta["status_code"].value_counts(dropna=False).sort_index()
 st.plotly_chart(bar_status_codes(status_counts, "Codes HTTP"), use_container_width=True)
 
 ###########################################################
@@ -142,8 +293,12 @@ st.plotly_chart(bar_status_codes(status_counts, "Codes HTTP"), use_container_wid
 ###########################################################
 st.subheader("Timings détaillés (ms) — DB / Validation / Inference / Total")
 
-timing_df = extract_timings(prod_outputs)
-timing_stats = compute_timing_stats(timing_df)
+timing_df = (
+    prod_outputs[TIMING_COLS].dropna(how="all")
+    if set(TIMING_COLS).issubset(prod_outputs.columns)
+    else pd.DataFrame()
+)
+timing_stats = compute_timing_stats_from_rollup(rollup) if use_rollup else compute_timing_stats(timing_df)
 
 if not timing_stats:
     st.info("Aucun champ 'timing' trouvé dans outputs (logs).")
@@ -180,19 +335,27 @@ else:
     c3.metric("p99", round(timing_stats["total_ms"]["p99"], 2))
     c4.metric("mean", round(timing_stats["total_ms"]["mean"], 2))
     # charts
-    st.plotly_chart(hist_latency(timing_df["db_ms"], "DB time (ms)"), use_container_width=True)
-    st.plotly_chart(hist_latency(timing_df["inference_ms"], "Inference time (ms)"), use_container_width=True)
-    st.plotly_chart(hist_latency(timing_df["validation_ms"], "Validation time (ms)"), use_container_width=True)
-    st.plotly_chart(hist_latency(timing_df["total_ms"], "Total (timing) (ms)"), use_container_width=True)
+    if use_rollup or not timing_df.empty:
+        for metric, label in [
+            ("db_ms", "DB time (ms)"),
+            ("inference_ms", "Inference time (ms)"),
+            ("validation_ms", "Validation time (ms)"),
+            ("total_ms", "Total (timing) (ms)"),
+        ]:
+            values = timing_df[metric] if metric in timing_df.columns else pd.Series(dtype=float)
+            st.plotly_chart(latency_chart(metric, values, label), use_container_width=True)
 
 ###########################################################
 # Analyse des décisions prises par l'API (accepté/refusé)
 ###########################################################
 st.subheader("Décisions (prod)")
 
-if "decision" in prod_outputs.columns:
+dec_counts = rollup_counts(rollup, "decision") if use_rollup else pd.Series(dtype="int64")
+if dec_counts.empty and "decision" in prod_outputs.columns:
     dec = prod_outputs["decision"].fillna("UNKNOWN").astype(str)
     dec_counts = dec.value_counts()
+
+if not dec_counts.empty:
     st.plotly_chart(pie_decisions(dec_counts, "ACCEPTED / REFUSED"), use_container_width=True)
 else:
     st.info("Aucune colonne 'decision' trouvée dans outputs (logs).")
@@ -207,7 +370,32 @@ if not ref_rows:
     st.warning("Aucune référence en DB (ref_feature_dist). Lance build_reference_dist.py d’abord.")
     st.stop()
 
-drift_df = compute_drift_table(prod_inputs=prod_inputs, ref_rows=ref_rows, excluded_features=EXCLUDED_FEATURES)
+# Sur toute la fenêtre (limit=0), le PSI vient des compteurs par heure (drift_rollup_1h) maintenus par l'API ;
+# sinon (N dernières requêtes, compteurs absents ou plus récents que le début de la fenêtre) les inputs loggés sont binés
+# dans Postgres ; repli sur le re-binning des inputs chargés si la requête SQL échoue.
+# Compteurs et binning SQL partent de l'heure pleine (drift_window_start) : même population pour les deux chemins.
+drift_rollup = (
+    load_drift_rollup(endpoint=endpoint, time_window=time_window, ref_rows=ref_rows)
+    if limit_val is None
+    else pd.DataFrame()
+)
+if drift_rollup.empty:
+    drift_rollup = load_drift_bins(endpoint=endpoint, limit=limit_val, time_window=time_window, ref_rows=ref_rows)
+if not drift_rollup.empty:
+    drift_df = compute_drift_table_from_rollup(
+        rollup=drift_rollup, ref_rows=ref_rows, excluded_features=EXCLUDED_FEATURES
+    )
+else:
+    prod_inputs = drift_population(
+        cached_prod_frame(endpoint=endpoint, limit=limit_val, time_window=time_window, ref_rows=ref_rows)
+    )
+    drift_df = compute_drift_table(prod_inputs=prod_inputs, ref_rows=ref_rows, excluded_features=EXCLUDED_FEATURES)
+
+if time_window != "all":
+    st.caption(
+        "Fenêtre du drift alignée sur l'heure pleine (compteurs horaires) : jusqu'à 59 minutes de requêtes en plus "
+        "que la fenêtre des autres sections."
+    )
 
 n_drift = count_drift(drift_df, threshold=float(drift_threshold))
 st.metric(f"Nb features PSI > {drift_threshold}", n_drift)
@@ -218,15 +406,55 @@ topk = drift_df.dropna().head(int(DEFAULTS["topk_drift"])).copy()
 topk = topk.sort_values("psi", ascending=False)
 st.plotly_chart(bar_top_drift(topk, f"Top {DEFAULTS['topk_drift']} PSI (drift)"), use_container_width=True)
 
+# Tendance : comptes binés une seule fois par période (compteurs ou Postgres), PSI glissant par sommes cumulées
+st.markdown("**PSI dans le temps**")
+colP, colW = st.columns(2)
+with colP:
+    period = st.selectbox("Période", ["hour", "day"], index=1, format_func={"hour": "Heure", "day": "Jour"}.get)
+with colW:
+    psi_window = st.number_input("Fenêtre glissante (périodes)", min_value=1, value=1, step=1)
+
+drift_series = load_drift_series(
+    endpoint=endpoint, limit=limit_val, time_window=time_window, ref_rows=ref_rows, period=period
+)
+psi_series = compute_psi_series_from_rollup(
+    rollup=drift_series,
+    ref_rows=ref_rows,
+    excluded_features=EXCLUDED_FEATURES,
+    period=period,
+    window=int(psi_window),
+)
+if psi_series.empty:
+    st.info("Aucun compte de drift daté disponible pour cette fenêtre.")
+else:
+    series_options = sorted(psi_series["feature"].unique())
+    series_features = st.multiselect(
+        "Features suivies",
+        series_options,
+        default=[f for f in topk["feature"] if f in set(series_options)][: int(DEFAULTS["psi_series_features"])],
+    )
+    st.plotly_chart(
+        line_psi_series(
+            psi_series[psi_series["feature"].isin(series_features)],
+            f"PSI par {'jour' if period == 'day' else 'heure'} (fenêtre glissante : {int(psi_window)})",
+            threshold=float(drift_threshold),
+        ),
+        use_container_width=True,
+    )
+
 ###########################################################
 # Section 3 : Détail d'une feature, comparaison distribution référence vs production
 ###########################################################
 st.subheader("3) Détail feature (ref vs prod)")
 
 ref_features = [r["feature"] for r in ref_rows if r.get("feature") not in EXCLUDED_FEATURES]
-common = [c for c in ref_features if c in prod_inputs.columns]
+seen_features = set(drift_df["feature"])
+common = [c for c in ref_features if c in seen_features]
 
 feat = st.selectbox("Choisir une feature", common)
+if feat is None:
+    st.info("Aucune feature de référence présente dans les logs.")
+    st.stop()
 
 ref_one = load_reference_one(feat)
 if ref_one is None:
@@ -238,7 +466,12 @@ labels_ref = ref_dist.get("labels") or []
 ref_p = np.array(ref_dist.get("p") or [], dtype=float)
 kind = ref_one.get("kind")
 
-prod_s = prod_inputs[feat]
+# Projection côté serveur : seule la feature choisie est transférée, en colonne typée (COPY) ;
+# requêtes réussies uniquement, comme la table de drift
+feat_inputs = drift_population(
+    cached_prod_frame(endpoint=endpoint, limit=limit_val, time_window=time_window, ref_rows=ref_rows, features=[feat])
+)
+prod_s = feat_inputs[feat] if feat in feat_inputs.columns else pd.Series(dtype=object)
 
 colA, colB = st.columns(2)
 with colA:
@@ -1,14 +1,32 @@
 """
-Script d'insertion en base des features clients à partir d'un CSV API-ready.
-Pour chaque ligne du CSV, insère ou met à jour les features dans la table features_store.
-Gère la migration SQL si besoin.
+Script d'insertion en base des features clients à partir d'un fichier API-ready (CSV, Parquet ou Arrow IPC).
+Avec --kept, seules SK_ID_CURR et les features conservées par le modèle sont lues (projection de colonnes).
+Les lignes sont chargées par COPY dans une table de staging UNLOGGED, puis :
+- mode "merge" (défaut) : fusion en une seule requête ensembliste (INSERT ... SELECT ... ON CONFLICT),
+  limitée aux clients nouveaux ou dont l'empreinte de contenu (data_hash) a changé ;
+  --delete-missing supprime en plus les clients absents de l'extraction
+- mode "swap" (rechargement complet) : construction d'une nouvelle table, index créés après chargement,
+  puis remplacement atomique de features_store (les clients absents du fichier disparaissent)
+- mode "upsert" : ancien chemin ligne à ligne (executemany), conservé pour comparaison
+La conversion en JSON est vectorisée par colonne (masque NaN, types natifs) et, avec --workers N,
+répartie sur un pool de processus (blocs de lignes CSV, row groups Parquet, record batches IPC)
+pendant que le processus principal envoie les blocs à Postgres.
+Affiche le débit (lignes/s) de chaque phase et les comptes inserted / updated / unchanged / deleted.
+Applique les migrations SQL manquantes si besoin (core.db.conn.apply_migrations).
 """
 from __future__ import annotations
 
 import argparse
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import psycopg
 from psycopg.types.json import Jsonb
@@ -20,90 +38,351 @@ import sys
 REPO_ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(REPO_ROOT))
 
-from core.config import PROJECT_ROOT, DATABASE_URL
+from app.utils.io import load_txt_list
+from core.config import DATABASE_URL, PROJECT_ROOT
+from core.db.conn import apply_migrations
+from core.db.repo_features_store import features_hash, features_json
+from scripts.input_readers import detect_format, has_parts, iter_frames, n_parts, read_part, resolve_columns
 
-from core.config import PROJECT_ROOT, DATABASE_URL
 
+SQL_DIR = PROJECT_ROOT / "core" / "db" / "sql"
+MODES = ("merge", "swap", "upsert")
+BACKSLASH = "\\"
 
-MIGRATIONS_DIR = PROJECT_ROOT / "core" / "db" / "migrations"
+
+def load_sql(name: str) -> str:
+    """
+    Charge le contenu d'un fichier SQL de core/db/sql.
+    """
+    path = SQL_DIR / name
+    if not path.exists():
+        raise FileNotFoundError(f"SQL file not found: {path}")
+    return path.read_text(encoding="utf-8")
 
 
-def run_migration(conn: psycopg.Connection) -> None:
+def execute_script(conn: psycopg.Connection, sql: str) -> int:
     """
-    Exécute la migration SQL pour initialiser la table features_store si besoin.
-    Lève une FileNotFoundError si le fichier de migration est absent.
+    Exécute un fichier SQL de plusieurs requêtes ; retourne le nombre de lignes de la dernière.
     """
-    sql_path = MIGRATIONS_DIR / "002_init_features_store.sql"
-    if not sql_path.exists():
-        raise FileNotFoundError(f"Migration introuvable: {sql_path}")
-    conn.execute(sql_path.read_text(encoding="utf-8"))
+    cur = conn.execute(sql)
+    while cur.nextset():
+        pass
+    return int(cur.rowcount)
 
 
-def to_payload(row: Dict[str, Any]) -> Dict[str, Any]:
+def column_values(s: pd.Series) -> List[Any]:
     """
-    Transforme une ligne du CSV en dictionnaire prêt à être inséré (gère les NaN et types numpy).
+    Convertit une colonne en valeurs Python natives en une passe : NaN (et ±inf, refusés par JSONB) -> None.
     """
-    out: Dict[str, Any] = {}
-    for k, v in row.items():
-        if pd.isna(v):
-            out[k] = None
-        else:
-            out[k] = v.item() if hasattr(v, "item") else v
-    return out
+    values = s.to_numpy()
+    if values.dtype.kind == "f":
+        out = values.astype(object)
+        out[~np.isfinite(values)] = None
+        return out.tolist()
+    if values.dtype.kind in "iub":
+        return values.tolist()
+
+    out = values.astype(object)
+    out[pd.isna(s).to_numpy()] = None
+    return out.tolist()
+
+
+def chunk_payloads(chunk: pd.DataFrame) -> Tuple[List[int], List[Dict[str, Any]]]:
+    """
+    Transforme un bloc du fichier en (identifiants, payloads) prêts à être insérés, colonne par colonne.
+    """
+    if "SK_ID_CURR" not in chunk.columns:
+        raise ValueError("Le fichier doit contenir la colonne SK_ID_CURR.")
+
+    names = [str(c) for c in chunk.columns]
+    columns = [column_values(chunk[c]) for c in chunk.columns]
+    payloads = [dict(zip(names, values)) for values in zip(*columns)]
+    return chunk["SK_ID_CURR"].astype("int64").tolist(), payloads
+
+
+def encode_copy_block(chunk: pd.DataFrame) -> Tuple[int, bytes]:
+    """
+    Encode un bloc du fichier au format texte de COPY (sk_id_curr<TAB>json<TAB>data_hash) ; retourne (n_lignes, octets).
+    Le JSON canonique sert à la fois de contenu et de base à l'empreinte (une seule sérialisation).
+    """
+    sk_ids, payloads = chunk_payloads(chunk)
+    lines = []
+    for sk, p in zip(sk_ids, payloads):
+        text = features_json(p)
+        # Format texte COPY : seul le backslash est à doubler (JSON compact : ni tabulation ni saut de ligne bruts)
+        lines.append(f"{sk}\t{text.replace(BACKSLASH, BACKSLASH * 2)}\t{features_hash(text)}\n")
+    return len(lines), "".join(lines).encode("utf-8")
+
+
+def _encode_csv_lines(header: bytes, lines: bytes, columns: Optional[List[str]] = None) -> Tuple[int, bytes]:
+    """
+    Tâche d'un worker : parse un bloc de lignes CSV brutes puis l'encode pour COPY.
+    """
+    return encode_copy_block(pd.read_csv(io.BytesIO(header + lines), usecols=columns))
+
+
+def _encode_part(path: Path, i: int, columns: Optional[List[str]] = None) -> Tuple[int, bytes]:
+    """
+    Tâche d'un worker : lit le bloc i (row group Parquet / record batch IPC, fichier mappé) puis l'encode.
+    """
+    return encode_copy_block(read_part(path, i, columns))
+
+
+def iter_csv_line_blocks(csv_path: Path, chunksize: int) -> Iterator[Tuple[bytes, bytes]]:
+    """
+    Découpe le CSV en blocs de `chunksize` lignes brutes (en-tête répété pour chaque bloc).
+    Suppose une ligne CSV par enregistrement (pas de saut de ligne dans un champ, cas des CSV API-ready).
+    """
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        while True:
+            lines = list(islice(f, chunksize))
+            if not lines:
+                break
+            yield header, b"".join(lines)
+
+
+def iter_copy_blocks(
+    path: Path, chunksize: int, workers: int, columns: Optional[List[str]] = None
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    Produit les blocs encodés pour COPY, dans l'ordre du fichier.
+
+    workers <= 1 : lecture par blocs dans le processus courant (scripts.input_readers.iter_frames).
+    workers > 1  : lecture + encodage dans un pool de processus ; au plus 2 blocs par worker en vol
+                   (mémoire bornée), le processus principal ne fait que découper et envoyer.
+                   CSV : blocs de lignes brutes ; Parquet / IPC : chaque worker relit son row group /
+                   record batch dans le fichier mappé (rien d'autre que l'index ne transite).
+                   Un IPC au format stream n'a pas de blocs adressables : il est lu séquentiellement.
+    """
+    fmt = detect_format(path)
+    if workers <= 1 or (fmt != "csv" and not has_parts(path)):
+        for chunk in iter_frames(path, columns=columns, chunksize=chunksize):
+            yield encode_copy_block(chunk)
+        return
+
+    if fmt == "csv":
+        tasks = ((_encode_csv_lines, header, lines, columns) for header, lines in iter_csv_line_blocks(path, chunksize))
+    else:
+        tasks = ((_encode_part, path, i, columns) for i in range(n_parts(path)))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        for fn, *task_args in tasks:
+            pending.append(pool.submit(fn, *task_args))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def report(phase: str, n_rows: int, seconds: float) -> None:
+    """
+    Affiche la durée et le débit d'une phase de chargement.
+    """
+    rate = n_rows / seconds if seconds > 0 else float("inf")
+    print(f"  {phase:<12} {n_rows:>9} lignes  {seconds:8.2f} s  {rate:>12,.0f} lignes/s")
+
+
+def copy_to_staging(
+    conn: psycopg.Connection,
+    path: Path,
+    chunksize: int,
+    workers: int = 1,
+    columns: Optional[List[str]] = None,
+) -> Tuple[int, float, float]:
+    """
+    Crée la table de staging (UNLOGGED : pas de WAL) et y charge le fichier par un seul COPY.
+
+    Retourne :
+        (n_rows, parse_s, copy_s) : nombre de lignes, temps passé à attendre les blocs convertis
+        (lecture + encodage, en parallèle de l'envoi si workers > 1), temps d'envoi COPY
+    """
+    execute_script(conn, load_sql("features_store_staging_create.sql"))
+
+    n_rows = 0
+    parse_s = 0.0
+    t0 = time.perf_counter()
+    with conn.cursor() as cur:
+        with cur.copy("COPY features_store_staging (sk_id_curr, data, data_hash) FROM STDIN") as copy:
+            t_parse = time.perf_counter()
+            for n, block in iter_copy_blocks(path, chunksize, workers, columns):
+                parse_s += time.perf_counter() - t_parse
+                copy.write(block)
+                n_rows += n
+                t_parse = time.perf_counter()
+
+    return n_rows, parse_s, time.perf_counter() - t0 - parse_s
+
+
+def merge_staging(conn: psycopg.Connection, delete_missing: bool = False) -> Dict[str, int]:
+    """
+    Fusionne la staging dans features_store en une requête (dernière occurrence d'un client gagnante).
+    Seuls les clients nouveaux ou dont l'empreinte a changé sont écrits (ni WAL ni trigger pour les autres).
+
+    Paramètres :
+        delete_missing (bool) : Supprime aussi les clients absents de la staging (même transaction).
+
+    Retourne :
+        dict : comptes inserted / updated / unchanged / deleted
+    """
+    with conn.transaction():
+        inserted, updated, unchanged = conn.execute(load_sql("features_store_merge_staging.sql")).fetchone()
+        deleted = 0
+        if delete_missing:
+            deleted = int(conn.execute(load_sql("features_store_delete_missing.sql")).rowcount)
+
+    return {"inserted": int(inserted), "updated": int(updated), "unchanged": int(unchanged), "deleted": deleted}
+
+
+def swap_diff(conn: psycopg.Connection) -> Dict[str, int]:
+    """
+    Compte, avant un swap, les clients inserted / updated / unchanged / deleted par rapport à la table en place.
+    """
+    inserted, updated, unchanged, deleted = conn.execute(load_sql("features_store_swap_diff.sql")).fetchone()
+    return {"inserted": int(inserted), "updated": int(updated), "unchanged": int(unchanged), "deleted": int(deleted)}
+
+
+def swap_from_staging(conn: psycopg.Connection) -> Dict[str, Tuple[int, float]]:
+    """
+    Reconstruit features_store à partir de la staging et la remplace atomiquement.
+
+    - build : nouvelle table remplie sans index (created_at conservé pour les clients déjà connus,
+      updated_at aussi si l'empreinte est inchangée)
+    - index : clé primaire + index GIN créés après chargement (une passe chacun, pas de maintenance ligne à ligne)
+    - swap  : DROP / RENAME + recréation du trigger updated_at dans une transaction courte
+      (les lectures concurrentes attendent le verrou, sans jamais voir une table vide)
+
+    Retourne :
+        dict : {phase: (n_rows, secondes)}
+    """
+    phases: Dict[str, Tuple[int, float]] = {}
+
+    t0 = time.perf_counter()
+    n_rows = execute_script(conn, load_sql("features_store_swap_build.sql"))
+    phases["build"] = (n_rows, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    execute_script(conn, load_sql("features_store_swap_index.sql"))
+    phases["index"] = (n_rows, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with conn.transaction():
+        execute_script(conn, load_sql("features_store_swap.sql"))
+    phases["swap"] = (n_rows, time.perf_counter() - t0)
+
+    return phases
+
+
+def upsert_rows(
+    conn: psycopg.Connection, path: Path, chunksize: int, columns: Optional[List[str]] = None
+) -> int:
+    """
+    Ancien chemin : upsert ligne à ligne par executemany (trigger et index GIN mis à jour à chaque ligne).
+    """
+    upsert_sql = load_sql("features_store_upsert.sql")
+
+    inserted = 0
+    for chunk in iter_frames(path, columns=columns, chunksize=chunksize):
+        sk_ids, payloads = chunk_payloads(chunk)
+        rows = [
+            {"sk_id_curr": sk, "data": Jsonb(p), "data_hash": features_hash(p)}
+            for sk, p in zip(sk_ids, payloads)
+        ]
+
+        with conn.cursor() as cur:
+            cur.executemany(upsert_sql, rows)
+
+        inserted += len(rows)
+    return inserted
 
 
 def main() -> None:
     """
     Point d'entrée principal du script :
-    - Charge un CSV API-ready
-    - Exécute la migration si besoin
-    - Insère ou met à jour les features en base par batch
+    - Charge un fichier API-ready (CSV / Parquet / Arrow IPC), colonnes projetées si --kept
+    - Applique les migrations manquantes
+    - Charge les features en base selon le mode choisi et affiche le débit de chaque phase
     """
     ap = argparse.ArgumentParser()
-    ap.add_argument("--csv", required=True, help="CSV API-ready (ex: data/processed/X_api.csv)")
+    ap.add_argument(
+        "--input",
+        "--csv",
+        dest="input",
+        required=True,
+        help="Fichier API-ready .csv / .parquet / .arrow|.feather (ex: data/processed/X_api.parquet)",
+    )
+    ap.add_argument(
+        "--kept",
+        default=None,
+        help="Liste des features conservées (txt, une par ligne) : seules ces colonnes + SK_ID_CURR sont lues",
+    )
     ap.add_argument("--chunksize", type=int, default=2000)
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=max(1, (os.cpu_count() or 2) - 1),
+        help="Processus de conversion -> JSON en parallèle de l'envoi COPY (1 = pas de pool)",
+    )
+    ap.add_argument(
+        "--mode",
+        choices=MODES,
+        default="merge",
+        help="merge (COPY + fusion), swap (COPY + rechargement complet atomique) ou upsert (ligne à ligne)",
+    )
+    ap.add_argument(
+        "--delete-missing",
+        action="store_true",
+        help="Mode merge : supprime les clients absents du fichier (le mode swap le fait toujours)",
+    )
     args = ap.parse_args()
 
     if not DATABASE_URL:
         raise RuntimeError("DATABASE_URL manquante (core.config).")
 
-    # 1) Vérification et chargement du CSV
-    csv_path = Path(args.csv)
-    if not csv_path.exists():
-        raise FileNotFoundError(f"CSV introuvable: {csv_path}")
+    # 1) Vérification du fichier d'entrée et des colonnes à lire
+    path = Path(args.input)
+    if not path.exists():
+        raise FileNotFoundError(f"Fichier introuvable: {path}")
 
-    # 2) Préparation de la requête SQL d'upsert
-    upsert_sql = """
-    INSERT INTO features_store (sk_id_curr, data)
-    VALUES (%s, %s::jsonb)
-    ON CONFLICT (sk_id_curr) DO UPDATE SET
-      data = EXCLUDED.data,
-      updated_at = now();
-    """
+    columns = None
+    if args.kept:
+        columns = resolve_columns(path, ["SK_ID_CURR", *load_txt_list(Path(args.kept))])
 
-    inserted = 0
-    # 3) Connexion à la base, migration et insertion par batch
+    # 2) Connexion à la base, migration et chargement
+    t_start = time.perf_counter()
     with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
-        run_migration(conn)
+        apply_migrations(conn)
 
-        for chunk in pd.read_csv(csv_path, chunksize=args.chunksize):
-            if "SK_ID_CURR" not in chunk.columns:
-                raise ValueError("Le CSV doit contenir la colonne SK_ID_CURR.")
+        print(f"Mode {args.mode} :")
+        if args.mode == "upsert":
+            t0 = time.perf_counter()
+            n_rows = upsert_rows(conn, path, args.chunksize, columns)
+            report("upsert", n_rows, time.perf_counter() - t0)
+        else:
+            n_rows, parse_s, copy_s = copy_to_staging(conn, path, args.chunksize, args.workers, columns)
+            report("parse", n_rows, parse_s)
+            report("copy", n_rows, copy_s)
 
-            rows = []
-            for _, r in chunk.iterrows():
-                sk_id = int(r["SK_ID_CURR"])
-                payload = to_payload(r.to_dict())
-                rows.append((sk_id, Jsonb(payload)))
+            if args.mode == "merge":
+                t0 = time.perf_counter()
+                counts = merge_staging(conn, delete_missing=args.delete_missing)
+                report("merge", n_rows, time.perf_counter() - t0)
+            else:
+                t0 = time.perf_counter()
+                counts = swap_diff(conn)
+                report("diff", n_rows, time.perf_counter() - t0)
+                for phase, (n, seconds) in swap_from_staging(conn).items():
+                    report(phase, n, seconds)
 
-            with conn.cursor() as cur:
-                cur.executemany(upsert_sql, rows)
+            print("  " + "  ".join(f"{k}={v}" for k, v in counts.items()))
 
-            inserted += len(rows)
+            conn.execute("DROP TABLE IF EXISTS features_store_staging;")
 
-    # 4) Affichage du résultat
-    print(f"OK: {inserted} lignes upsert dans features_store.")
+    # 3) Affichage du résultat
+    report("total", n_rows, time.perf_counter() - t_start)
+    print(f"OK: {n_rows} lignes chargées dans features_store ({args.mode}).")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,12 +1,29 @@
 """
-Script de génération et d'insertion des distributions de référence (ref_feature_dist) en base à partir d'un CSV.
+Script de génération et d'insertion des distributions de référence (ref_feature_dist) en base
+à partir d'un fichier de référence (CSV, Parquet ou Arrow IPC).
 Pour chaque feature, calcule la distribution de référence (numérique ou catégorielle) et l'insère/maj en base.
+Parquet / IPC : les features sont lues une par une (fichier mappé en mémoire), seule la colonne en cours
+est décodée ; --kept limite la lecture aux features conservées par le modèle.
+Mode --streaming : le fichier est lu par blocs (--chunksize lignes), en deux passes à mémoire bornée :
+1) un sketch de quantiles KLL par feature numérique, des compteurs top-k bornés par feature catégorielle
+2) comptage exact des bins (bornes issues des sketches) et des modalités candidates
+Les lignes produites ont le même format bins_json / ref_dist_json que le mode par défaut.
+Mode exact avec --workers N : les features numériques sont réparties sur un pool de processus,
+chaque colonne étant passée par un segment de mémoire partagée (pas de sérialisation de la série).
+Mode --from-db : les distributions sont calculées dans Postgres à partir de features_store
+(percentile_cont, width_bucket, top-k par fenêtre) ; seul le résumé transite. --parity-check FICHIER
+compare le résultat au calcul pandas sur un fichier de référence.
+Les distributions sont écrites en une seule requête d'upsert (tableaux + unnest).
 """
 from __future__ import annotations
 
 import argparse
 import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
@@ -18,18 +35,23 @@ import sys
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(REPO_ROOT))
-from core.config import PROJECT_ROOT, DATABASE_URL
+from app.utils.io import load_txt_list
+from core.config import DATABASE_URL, PROJECT_ROOT
+from core.db.conn import apply_migrations
+from core.db.repo_ref_dist import upsert_ref_feature_dists
+from scripts.input_readers import read_columns, iter_columns, iter_frames, resolve_columns
+from scripts.sketches import KllSketch, TopKCounter
 
 
-MIGRATIONS_DIR = PROJECT_ROOT / "core" / "db" / "migrations"
 SQL_DIR = PROJECT_ROOT / "core" / "db" / "sql"
 EXCLUDED_FEATURES = {"SK_ID_CURR"}
 
-def load_sql(path: Path) -> str:
+
+def load_sql(name: str) -> str:
     """
-    Charge le contenu d'un fichier SQL depuis le disque.
-    Lève une FileNotFoundError si le fichier n'existe pas.
+    Charge le contenu d'un fichier SQL de core/db/sql.
     """
+    path = SQL_DIR / name
     if not path.exists():
         raise FileNotFoundError(f"SQL file not found: {path}")
     return path.read_text(encoding="utf-8")
@@ -114,57 +136,464 @@ def categorical_ref_dist(s: pd.Series, topk: int):
     return {"topk": topk}, {"labels": labels, "p": p}, n
 
 
+def exact_ref_dists(path: Path, columns: Sequence[str], bins: int, topk: int) -> List[Dict[str, Any]]:
+    """
+    Calcule les distributions de référence exactes, feature par feature (une colonne en mémoire à la fois).
+    Retourne une liste de dictionnaires {feature, kind, bins_json, ref_dist_json, n_ref} (JSON non sérialisés).
+    """
+    out: List[Dict[str, Any]] = []
+    for col, s in iter_columns(path, columns):
+        kind = infer_kind(s)
+        if kind == "numeric":
+            bins_json, dist_json, n_ref = numeric_ref_dist(s, bins)
+        else:
+            bins_json, dist_json, n_ref = categorical_ref_dist(s, topk)
+        out.append({"feature": col, "kind": kind, "bins_json": bins_json, "ref_dist_json": dist_json, "n_ref": n_ref})
+    return out
+
+
+def _numeric_ref_dist_shm(shm_name: str, n: int, bins: int):
+    """
+    Tâche du pool : numeric_ref_dist sur une colonne lue depuis un segment de mémoire partagée.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        values = np.ndarray((n,), dtype=np.float64, buffer=shm.buf)
+        result = numeric_ref_dist(pd.Series(values, copy=True), bins)
+        del values
+    finally:
+        shm.close()
+    return result
+
+
+def parallel_ref_dists(path: Path, columns: Sequence[str], bins: int, topk: int, workers: int) -> List[Dict[str, Any]]:
+    """
+    Variante de exact_ref_dists répartissant les features numériques sur `workers` processus.
+
+    Le processus principal lit les colonnes une à une et copie les valeurs numériques non manquantes
+    dans un segment de mémoire partagée ; le worker s'y attache par son nom (seuls le nom, la taille
+    et le nombre de bins sont sérialisés). Au plus 2 colonnes en vol par worker (mémoire bornée).
+    Les features catégorielles, peu coûteuses, sont calculées dans le processus principal pendant ce temps.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    pending: deque = deque()
+
+    def _collect() -> None:
+        col, shm, fut = pending.popleft()
+        try:
+            bins_json, dist_json, n_ref = fut.result()
+        finally:
+            shm.close()
+            shm.unlink()
+        out[col] = {"feature": col, "kind": "numeric", "bins_json": bins_json, "ref_dist_json": dist_json, "n_ref": n_ref}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            for col, s in iter_columns(path, columns):
+                kind = infer_kind(s)
+                if kind != "numeric":
+                    bins_json, dist_json, n_ref = categorical_ref_dist(s, topk)
+                    out[col] = {"feature": col, "kind": kind, "bins_json": bins_json, "ref_dist_json": dist_json, "n_ref": n_ref}
+                    continue
+
+                values = _numeric_values(s)
+                shm = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+                np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+                pending.append((col, shm, pool.submit(_numeric_ref_dist_shm, shm.name, len(values), bins)))
+                while len(pending) >= 2 * workers:
+                    _collect()
+
+            while pending:
+                _collect()
+        finally:
+            for _, shm, fut in pending:
+                fut.cancel()
+                shm.close()
+                shm.unlink()
+
+    return [out[c] for c in columns]
+
+
+def _numeric_values(s: pd.Series) -> np.ndarray:
+    """
+    Valeurs numériques non manquantes d'un bloc (mêmes conversions que numeric_ref_dist).
+    """
+    if pd.api.types.is_bool_dtype(s) or str(s.dtype).lower() == "boolean":
+        s = s.astype("Int64")
+    x = pd.to_numeric(s, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return x[~np.isnan(x)]
+
+
+def _categorical_values(s: pd.Series) -> pd.Series:
+    """
+    Modalités d'un bloc (mêmes conversions que categorical_ref_dist).
+    """
+    return s.fillna("__MISSING__").astype(str)
+
+
+def _interval_labels(edges: np.ndarray) -> List[str]:
+    """
+    Libellés des intervalles tels que produits par pd.cut(include_lowest=True) pour ces bornes.
+    """
+    cut = pd.cut(pd.Series(edges), bins=edges, include_lowest=True, duplicates="drop")
+    return [str(c) for c in cut.cat.categories]
+
+
+def sketch_edges(sketch: KllSketch, bins: int) -> Optional[np.ndarray]:
+    """
+    Bornes des bins d'une feature numérique à partir de son sketch (mêmes replis que numeric_ref_dist).
+    Retourne None si la feature est vide ou constante (distribution à un seul libellé).
+    """
+    if sketch.n == 0 or sketch.min == sketch.max:
+        return None
+
+    edges = np.unique(np.sort(sketch.quantiles(np.linspace(0, 1, bins + 1))))
+    if len(edges) < 3:
+        mn, mx = float(sketch.min), float(sketch.max)
+        edges = np.array([mn, (mn + mx) / 2, mx], dtype=float)
+    return edges
+
+
+def streaming_ref_dists(
+    path: Path,
+    columns: Sequence[str],
+    bins: int,
+    topk: int,
+    chunksize: int = 20_000,
+    sketch_k: int = 400,
+    topk_capacity: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Calcule les distributions de référence en lisant le fichier par blocs (mémoire bornée).
+
+    Passe 1 : un KllSketch par feature numérique, un TopKCounter par feature catégorielle
+    (type déduit bloc par bloc : une feature devient catégorielle dès qu'un bloc l'est, à condition que les
+    blocs précédents n'aient contenu que des manquants ; sinon ValueError, le comptage serait faux).
+    Passe 2 : comptage exact des bins (bornes tirées des sketches, min / max exacts)
+    et des modalités candidates, puis normalisation.
+
+    Paramètres :
+        path (Path) : Fichier de référence (CSV / Parquet / IPC).
+        columns (list[str]) : Features à traiter.
+        bins (int) : Nombre de bins numériques (quantiles).
+        topk (int) : Nombre de modalités conservées par feature catégorielle.
+        chunksize (int) : Lignes par bloc.
+        sketch_k (int) : Paramètre de précision KLL (erreur de rang ~ 1/k).
+        topk_capacity (int|None) : Modalités suivies en passe 1 (défaut : 10 x topk).
+
+    Retour :
+        Liste de dictionnaires {feature, kind, bins_json, ref_dist_json, n_ref} (JSON non sérialisés).
+    """
+    columns = list(columns)
+    capacity = int(topk_capacity or 10 * topk)
+    kinds: Dict[str, str] = {}
+    sketches: Dict[str, KllSketch] = {}
+    counters: Dict[str, TopKCounter] = {}
+    rows_seen: Dict[str, int] = {c: 0 for c in columns}
+
+    # 1) Passe 1 : sketches / compteurs bornés
+    for chunk in iter_frames(path, columns=columns, chunksize=chunksize):
+        for col in columns:
+            s = chunk[col]
+            if infer_kind(s) == "categorical" and kinds.get(col) != "categorical":
+                if col in sketches and sketches[col].n:
+                    # Les valeurs déjà vues ont été résumées comme nombres : leurs modalités sont perdues
+                    raise ValueError(
+                        f"{col} : valeurs numériques puis catégorielles dans le fichier (bloc de {chunksize} lignes "
+                        f"après {rows_seen[col]}) ; relancer sans --streaming ou fournir un fichier typé (Parquet / IPC)."
+                    )
+                kinds[col] = "categorical"
+                counters[col] = TopKCounter(capacity)
+                sketches.pop(col, None)
+                if rows_seen[col]:
+                    # Blocs précédents lus comme numériques mais entièrement manquants (cas courant en CSV)
+                    counters[col].counts["__MISSING__"] = rows_seen[col]
+            kinds.setdefault(col, "numeric")
+
+            if kinds[col] == "numeric":
+                sketches.setdefault(col, KllSketch(sketch_k, seed=0)).update(_numeric_values(s))
+            else:
+                counters[col].update(_categorical_values(s))
+            rows_seen[col] += int(len(s))
+
+    edges = {col: sketch_edges(sk, bins) for col, sk in sketches.items()}
+    candidates = {col: counter.candidates() for col, counter in counters.items()}
+
+    # 2) Passe 2 : comptages exacts
+    bin_counts = {col: np.zeros(len(e) - 1, dtype=np.int64) for col, e in edges.items() if e is not None}
+    cat_counts = {col: np.zeros(len(c), dtype=np.int64) for col, c in candidates.items()}
+    cat_n: Dict[str, int] = {col: 0 for col in candidates}
+    if bin_counts or cat_counts:
+        for chunk in iter_frames(path, columns=columns, chunksize=chunksize):
+            for col, counts in bin_counts.items():
+                x = _numeric_values(chunk[col])
+                e = edges[col]
+                # Intervalles fermés à droite (pd.cut), le premier inclut sa borne basse
+                idx = np.clip(np.searchsorted(e, x, side="left") - 1, 0, len(counts) - 1)
+                counts += np.bincount(idx, minlength=len(counts))
+            for col, counts in cat_counts.items():
+                x = _categorical_values(chunk[col])
+                cat_n[col] += int(len(x))
+                counts += x.value_counts().reindex(candidates[col], fill_value=0).to_numpy(dtype=np.int64)
+
+    # 3) Mise en forme (format identique à numeric_ref_dist / categorical_ref_dist)
+    out: List[Dict[str, Any]] = []
+    for col in columns:
+        if kinds.get(col, "numeric") == "numeric":
+            sk = sketches.get(col) or KllSketch(sketch_k)
+            e = edges.get(col)
+            if sk.n == 0:
+                bins_json, dist_json = {"edges": [0.0, 0.0]}, {"labels": ["__EMPTY__"], "p": [1.0]}
+            elif e is None:
+                v = float(sk.min)
+                bins_json, dist_json = {"edges": [v, v]}, {"labels": [f"[{v},{v}]"], "p": [1.0]}
+            else:
+                counts = bin_counts[col]
+                bins_json = {"edges": [float(v) for v in e]}
+                dist_json = {"labels": _interval_labels(e), "p": [float(c) for c in counts / counts.sum()]}
+            out.append({"feature": col, "kind": "numeric", "bins_json": bins_json, "ref_dist_json": dist_json, "n_ref": sk.n})
+            continue
+
+        n = cat_n[col]
+        ranked = sorted(zip(candidates[col], cat_counts[col]), key=lambda kv: -kv[1])[:topk]
+        ranked = [(label, int(c)) for label, c in ranked if c > 0]
+        labels = [label for label, _ in ranked]
+        p = [c / n for _, c in ranked] if n else []
+        other_p = float(max(0.0, 1.0 - sum(p)))
+        if other_p > 0:
+            labels.append("__OTHER__")
+            p.append(other_p)
+        out.append({"feature": col, "kind": "categorical", "bins_json": {"topk": topk}, "ref_dist_json": {"labels": labels, "p": p}, "n_ref": n})
+
+    return out
+
+
+def db_feature_names(conn: psycopg.Connection) -> List[str]:
+    """
+    Liste des clés présentes dans features_store.data (hors EXCLUDED_FEATURES).
+    """
+    rows = conn.execute(load_sql("ref_feature_dist_db_features.sql")).fetchall()
+    return [r[0] for r in rows if r[0] not in EXCLUDED_FEATURES]
+
+
+def json_kind(n_num: int, n_str: int, n_bool: int, n_rows: int) -> str:
+    """
+    Type d'une feature d'après les types de ses valeurs JSON, comme infer_kind sur la colonne pandas décodée :
+    numérique pour des nombres (avec null / absents => float64) ou des booléens sur toutes les lignes (bool) ;
+    catégorielle (object) dès qu'il y a une chaîne ou des booléens mêlés à des nombres, null ou absents.
+    Sans aucune valeur non nulle : numérique (colonne vide lue en float64).
+
+    Paramètres :
+        n_num (int) : Valeurs numériques, booléens compris.
+        n_str (int) : Chaînes.
+        n_bool (int) : Booléens.
+        n_rows (int) : Lignes de features_store.
+    """
+    if n_str:
+        return "categorical"
+    if n_bool:
+        return "numeric" if n_bool == n_rows else "categorical"
+    return "numeric"
+
+
+def db_ref_dists(conn: psycopg.Connection, columns: Sequence[str], bins: int, topk: int) -> List[Dict[str, Any]]:
+    """
+    Calcule les distributions de référence dans Postgres, à partir de features_store.
+
+    - Profil (1 passe) : type des valeurs JSON, min / max et quantiles percentile_cont (interpolation linéaire,
+      comme pd.Series.quantile) ; catégorielle quand pandas inférerait une colonne object (json_kind)
+    - Bins (1 passe) : width_bucket sur valeurs / bornes négées => intervalles fermés à droite (pd.cut)
+    - Top-k (1 passe) : comptes par modalité, row_number par feature ; manquants = lignes - non nulles
+
+    Retour :
+        Liste de dictionnaires {feature, kind, bins_json, ref_dist_json, n_ref} (JSON non sérialisés),
+        même format que exact_ref_dists.
+    """
+    columns = list(columns)
+    qs = [float(q) for q in np.linspace(0, 1, bins + 1)]
+    profile = {
+        r[0]: r[1:]
+        for r in conn.execute(load_sql("ref_feature_dist_db_profile.sql"), {"features": columns, "qs": qs}).fetchall()
+    }
+    n_rows = int(next(iter(profile.values()))[6]) if profile else 0
+
+    kinds: Dict[str, str] = {}
+    edges: Dict[str, np.ndarray] = {}
+    for col in columns:
+        n_num, n_str, n_bool, mn, mx, quantiles, _ = profile.get(col, (0, 0, 0, None, None, None, n_rows))
+        kinds[col] = json_kind(n_num, n_str, n_bool, n_rows)
+        if kinds[col] == "numeric" and n_num and mn != mx:
+            e = np.unique(np.sort(np.asarray(quantiles, dtype=float)))
+            if len(e) < 3:
+                e = np.array([mn, (mn + mx) / 2, mx], dtype=float)
+            edges[col] = e
+
+    counts: Dict[str, np.ndarray] = {col: np.zeros(len(e) - 1, dtype=np.int64) for col, e in edges.items()}
+    if edges:
+        params = {"edges": json.dumps({col: [float(v) for v in e] for col, e in edges.items()})}
+        for col, b, n in conn.execute(load_sql("ref_feature_dist_db_bins.sql"), params).fetchall():
+            counts[col][int(b)] += int(n)
+
+    cats = [col for col in columns if kinds[col] == "categorical"]
+    top: Dict[str, List[Tuple[str, int]]] = {col: [] for col in cats}
+    non_null: Dict[str, int] = {col: 0 for col in cats}
+    if cats:
+        for col, label, n, n_non_null in conn.execute(
+            load_sql("ref_feature_dist_db_topk.sql"), {"features": cats, "topk": topk}
+        ).fetchall():
+            top[col].append((str(label), int(n)))
+            non_null[col] = int(n_non_null)
+
+    out: List[Dict[str, Any]] = []
+    for col in columns:
+        n_num, _, _, mn, _, _, _ = profile.get(col, (0, 0, 0, None, None, None, n_rows))
+        if kinds[col] == "numeric":
+            if not n_num:
+                bins_json, dist_json = {"edges": [0.0, 0.0]}, {"labels": ["__EMPTY__"], "p": [1.0]}
+            elif col not in edges:
+                v = float(mn)
+                bins_json, dist_json = {"edges": [v, v]}, {"labels": [f"[{v},{v}]"], "p": [1.0]}
+            else:
+                c = counts[col]
+                bins_json = {"edges": [float(v) for v in edges[col]]}
+                dist_json = {"labels": _interval_labels(edges[col]), "p": [float(v) for v in c / c.sum()]}
+            out.append({"feature": col, "kind": "numeric", "bins_json": bins_json, "ref_dist_json": dist_json, "n_ref": int(n_num)})
+            continue
+
+        ranked = list(top[col])
+        if n_rows > non_null[col]:
+            ranked.append(("__MISSING__", n_rows - non_null[col]))
+        ranked = sorted(ranked, key=lambda kv: -kv[1])[:topk]
+        labels = [label for label, _ in ranked]
+        p = [c / n_rows for _, c in ranked]
+        other_p = float(max(0.0, 1.0 - sum(p)))
+        if other_p > 0:
+            labels.append("__OTHER__")
+            p.append(other_p)
+        out.append({"feature": col, "kind": "categorical", "bins_json": {"topk": topk}, "ref_dist_json": {"labels": labels, "p": p}, "n_ref": n_rows})
+
+    return out
+
+
+def compare_ref_dists(a: Sequence[Dict[str, Any]], b: Sequence[Dict[str, Any]], tol: float = 1e-9) -> List[str]:
+    """
+    Compare deux jeux de distributions (ex. Postgres vs pandas) ; retourne la liste des écarts (vide = parité).
+
+    Bornes comparées en relatif (tol), probabilités par libellé en absolu (tol) ; l'ordre des libellés
+    n'est pas comparé (départage des ex aequo différent entre SQL et pandas).
+    """
+    diffs: List[str] = []
+    by_feature = {d["feature"]: d for d in b}
+    for da in a:
+        col = da["feature"]
+        db = by_feature.get(col)
+        if db is None:
+            diffs.append(f"{col}: absente")
+            continue
+        if da["kind"] != db["kind"] or int(da["n_ref"]) != int(db["n_ref"]):
+            diffs.append(f"{col}: kind/n_ref {da['kind']}/{da['n_ref']} != {db['kind']}/{db['n_ref']}")
+            continue
+        ea, eb = da["bins_json"].get("edges"), db["bins_json"].get("edges")
+        if ea is not None and (len(ea) != len(eb) or not np.allclose(ea, eb, rtol=tol, atol=0.0)):
+            diffs.append(f"{col}: edges {ea} != {eb}")
+            continue
+        pa_ = dict(zip(da["ref_dist_json"]["labels"], da["ref_dist_json"]["p"]))
+        pb_ = dict(zip(db["ref_dist_json"]["labels"], db["ref_dist_json"]["p"]))
+        if pa_.keys() != pb_.keys() or any(abs(pa_[k] - pb_[k]) > tol for k in pa_):
+            diffs.append(f"{col}: distribution {pa_} != {pb_}")
+    return diffs
+
+
 def main() -> None:
     """
     Point d'entrée principal du script :
-    - Charge un CSV de données de référence
+    - Lit le fichier de données de référence, feature par feature (ou par blocs avec --streaming),
+      ou délègue le calcul à Postgres (--from-db)
     - Calcule la distribution de chaque feature (numérique/catégorielle)
     - Insère ou met à jour les distributions en base
     """
     ap = argparse.ArgumentParser()
-    ap.add_argument("--csv", required=True)
+    source = ap.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--input",
+        "--csv",
+        dest="input",
+        help="Données de référence .csv / .parquet / .arrow|.feather",
+    )
+    source.add_argument(
+        "--from-db",
+        action="store_true",
+        help="Calcul dans Postgres à partir de features_store (seul le résumé transite)",
+    )
+    ap.add_argument(
+        "--kept",
+        default=None,
+        help="Liste des features conservées (txt, une par ligne) : seules ces colonnes sont lues",
+    )
     ap.add_argument("--bins", type=int, default=10)
     ap.add_argument("--topk", type=int, default=30)
+    ap.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Lecture par blocs en deux passes (sketches KLL / top-k bornés), mémoire indépendante de la taille du fichier",
+    )
+    ap.add_argument("--chunksize", type=int, default=20_000, help="Lignes par bloc en mode --streaming")
+    ap.add_argument("--sketch-k", type=int, default=400, help="Précision des sketches KLL (erreur de rang ~ 1/k)")
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processus de calcul des features numériques en mode exact (1 = séquentiel)",
+    )
+    ap.add_argument(
+        "--parity-check",
+        default=None,
+        help="Avec --from-db : fichier de référence recalculé avec pandas et comparé au résultat SQL",
+    )
     args = ap.parse_args()
 
     if not DATABASE_URL:
         raise RuntimeError("DATABASE_URL manquante (core.config).")
 
-    # 1) Chargement du CSV de données de référence
-    df = pd.read_csv(Path(args.csv))
-
-    # 2) Chargement des requêtes SQL nécessaires
-    migration_sql = load_sql(MIGRATIONS_DIR / "003_init_ref_feature_dist.sql")
-    upsert_sql = load_sql(SQL_DIR / "ref_feature_dist_upsert.sql")
-
-    # 3) Calcul des distributions de référence pour chaque feature
-    rows = []
-    for col in df.columns:
-        if col in EXCLUDED_FEATURES:
-            continue
-        kind = infer_kind(df[col])
-        if kind == "numeric":
-            bins_json, dist_json, n_ref = numeric_ref_dist(df[col], args.bins)
-        else:
-            bins_json, dist_json, n_ref = categorical_ref_dist(df[col], args.topk)
-
-        rows.append(
-            {
-                "feature": col,
-                "kind": kind,
-                "bins_json": json.dumps(bins_json),
-                "ref_dist_json": json.dumps(dist_json),
-                "n_ref": n_ref,
-            }
-        )
-
-    # 4) Insertion ou mise à jour des distributions en base
     with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
-        conn.execute(migration_sql)
-        with conn.cursor() as cur:
-            cur.executemany(upsert_sql, rows)
+        apply_migrations(conn)
 
-    # 5) Affichage du résultat
+        # 1) Features à traiter (projection)
+        kept = [c for c in load_txt_list(Path(args.kept)) if c not in EXCLUDED_FEATURES] if args.kept else None
+        if args.from_db:
+            columns = kept if kept is not None else db_feature_names(conn)
+        else:
+            path = Path(args.input)
+            columns = resolve_columns(path, kept) if kept is not None else [
+                c for c in read_columns(path) if c not in EXCLUDED_FEATURES
+            ]
+
+        # 2) Calcul des distributions de référence pour chaque feature
+        if args.from_db:
+            dists = db_ref_dists(conn, columns, args.bins, args.topk)
+        elif args.streaming:
+            dists = streaming_ref_dists(path, columns, args.bins, args.topk, args.chunksize, args.sketch_k)
+        elif args.workers > 1:
+            dists = parallel_ref_dists(path, columns, args.bins, args.topk, args.workers)
+        else:
+            dists = exact_ref_dists(path, columns, args.bins, args.topk)
+
+        if args.parity_check:
+            diffs = compare_ref_dists(dists, exact_ref_dists(Path(args.parity_check), columns, args.bins, args.topk))
+            for d in diffs:
+                print(f"ÉCART {d}")
+            print(f"Parité : {len(columns) - len(diffs)}/{len(columns)} features identiques.")
+            if diffs:
+                raise SystemExit(1)
+
+        # 3) Insertion ou mise à jour des distributions en base (une seule requête)
+        rows = [
+            {**d, "bins_json": json.dumps(d["bins_json"]), "ref_dist_json": json.dumps(d["ref_dist_json"])}
+            for d in dists
+        ]
+        upsert_ref_feature_dists(rows, conn=conn)
+
+    # 4) Affichage du résultat
     print(f"OK: {len(rows)} features insérées/mises à jour.")
 
 
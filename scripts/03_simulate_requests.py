@@ -1,77 +1,308 @@
 """
-Script de simulation de requêtes API pour tester l'endpoint /predict.
-Envoie en série des requêtes POST à partir d'un CSV de SK_ID_CURR, mesure la latence et compte les succès/échecs.
+Générateur de charge asynchrone pour l'endpoint /predict (asyncio + httpx, connexions réutilisées).
+- Boucle ouverte (--rate R > 0) : les envois suivent un calendrier fixe (R requêtes/s), indépendamment des
+  réponses ; la latence est mesurée depuis l'instant prévu d'envoi, ce qui évite l'omission coordonnée
+  (un serveur lent n'espace pas les envois et ne masque pas ses propres files d'attente).
+- Boucle fermée (--rate 0) : --concurrency clients envoient chacun leur requête suivante dès la réponse reçue.
+- --concurrency borne les requêtes en vol (et la taille du pool de connexions).
+- Choix des SK_ID_CURR : séquentiel (cyclique), uniforme ou Zipf (--zipf-s) pour solliciter les caches.
+Bilan final : débit, répartition des erreurs, percentiles p50 / p90 / p99 / p99.9 (histogramme de type HDR,
+3 chiffres significatifs), exportable en JSON (--out).
 """
 from __future__ import annotations
 
 import argparse
+import asyncio
+import json
 import time
+from collections import Counter
 from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
 
+import httpx
+import numpy as np
 import pandas as pd
-import requests
 from dotenv import load_dotenv
 load_dotenv()
 
+import sys
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+from scripts.input_readers import iter_frames
+
+
+DISTRIBUTIONS = ("seq", "uniform", "zipf")
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """
+    Histogramme de latences à précision relative bornée (principe HDR, 3 chiffres significatifs).
+
+    Valeurs entières en microsecondes : exactes sous 2048 µs, puis 1024 sous-bins par puissance de 2
+    (erreur relative < 0.1 %). Mémoire indépendante du nombre de valeurs ; fusionnable (merge).
+    """
+
+    _SUB_BITS = 10  # 1024 sous-bins par octave
+    _EXACT = 1 << (_SUB_BITS + 1)  # 2048 : valeurs exactes en dessous
+
+    def __init__(self) -> None:
+        self.counts: Counter = Counter()
+        self.n = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def _index(self, v: int) -> int:
+        if v < self._EXACT:
+            return v
+        shift = v.bit_length() - (self._SUB_BITS + 1)
+        return self._EXACT + (shift - 1) * (1 << self._SUB_BITS) + ((v >> shift) - (1 << self._SUB_BITS))
+
+    def _highest_value(self, idx: int) -> int:
+        if idx < self._EXACT:
+            return idx
+        k = idx - self._EXACT
+        shift = k // (1 << self._SUB_BITS) + 1
+        top = k % (1 << self._SUB_BITS) + (1 << self._SUB_BITS)
+        return ((top + 1) << shift) - 1
+
+    def record(self, seconds: float) -> None:
+        """
+        Enregistre une durée (en secondes).
+        """
+        v = max(0, int(round(seconds * 1e6)))
+        self.counts[self._index(v)] += 1
+        self.n += 1
+        self.total_us += v
+        self.max_us = max(self.max_us, v)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """
+        Fusionne un autre histogramme dans celui-ci.
+        """
+        self.counts.update(other.counts)
+        self.n += other.n
+        self.total_us += other.total_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, q: float) -> float:
+        """
+        Retourne le percentile q (0-100) en ms (plus grande valeur équivalente du bin, bornée par le max).
+        """
+        if self.n == 0:
+            return 0.0
+        rank = max(1, int(np.ceil(q / 100.0 * self.n)))
+        seen = 0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            if seen >= rank:
+                return min(self._highest_value(idx), self.max_us) / 1000.0
+        return self.max_us / 1000.0
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Résumé : n, moyenne, percentiles (PERCENTILES) et max, en ms.
+        """
+        out: Dict[str, float] = {"n": self.n, "mean_ms": (self.total_us / self.n / 1000.0) if self.n else 0.0}
+        for q in PERCENTILES:
+            out[f"p{q:g}_ms"] = self.percentile(q)
+        out["max_ms"] = self.max_us / 1000.0
+        return out
+
+
+def load_ids(path: Path) -> np.ndarray:
+    """
+    Charge la colonne SK_ID_CURR d'un fichier (CSV / Parquet / Arrow IPC), sans lire les autres colonnes.
+    """
+    if not path.exists():
+        raise FileNotFoundError(f"Fichier introuvable: {path}")
+    try:
+        frames = list(iter_frames(path, columns=["SK_ID_CURR"], chunksize=100_000))
+    except ValueError as e:
+        raise ValueError("Le fichier doit contenir la colonne SK_ID_CURR.") from e
+    ids = pd.concat(frames, ignore_index=True)["SK_ID_CURR"].dropna().astype("int64").to_numpy()
+    if len(ids) == 0:
+        raise ValueError("Aucun SK_ID_CURR dans le fichier.")
+    return ids
+
+
+def pick_ids(ids: np.ndarray, n: int, distribution: str, zipf_s: float = 1.1, seed: int = 42) -> np.ndarray:
+    """
+    Tire n identifiants selon la distribution demandée.
+
+    - seq : ids dans l'ordre du fichier, cycliquement
+    - uniform : tirage uniforme avec remise
+    - zipf : rang k tiré avec une probabilité ~ 1 / k**zipf_s ; les rangs sont attribués aux ids
+      dans un ordre aléatoire (quelques clients "chauds" concentrent le trafic)
+    """
+    if distribution == "seq":
+        return ids[np.arange(n) % len(ids)]
+
+    rng = np.random.default_rng(seed)
+    if distribution == "uniform":
+        return ids[rng.integers(0, len(ids), size=n)]
+    if distribution == "zipf":
+        weights = 1.0 / np.arange(1, len(ids) + 1, dtype=float) ** zipf_s
+        ranks = rng.choice(len(ids), size=n, p=weights / weights.sum())
+        return rng.permutation(ids)[ranks]
+    raise ValueError(f"Distribution inconnue: {distribution} (attendu : {', '.join(DISTRIBUTIONS)})")
+
+
+async def run_load(
+    url: str,
+    ids: Iterable[int],
+    *,
+    rate: float = 0.0,
+    concurrency: int = 16,
+    timeout: float = 60.0,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    max_error_logs: int = 5,
+) -> Dict[str, Any]:
+    """
+    Envoie un POST {"SK_ID_CURR": id} par identifiant et retourne le bilan.
+
+    Paramètres :
+        url (str) : URL complète de l'endpoint.
+        ids (iterable[int]) : Identifiants, dans l'ordre d'envoi.
+        rate (float) : Requêtes/s en boucle ouverte ; 0 = boucle fermée à `concurrency` clients.
+        concurrency (int) : Requêtes en vol maximum (taille du pool de connexions).
+        timeout (float) : Timeout par requête (s).
+        transport (httpx.AsyncBaseTransport|None) : Transport httpx (ex. httpx.ASGITransport pour un test
+            en processus) ; None = réseau.
+
+    Retour :
+        dict : sent, ok, errors {cause: n}, duration_s, throughput_rps, latency (depuis l'instant prévu),
+        service (depuis l'envoi effectif), max_in_flight.
+    """
+    ids = [int(i) for i in ids]
+    latency = LatencyHistogram()
+    service = LatencyHistogram()
+    errors: Counter = Counter()
+    state = {"ok": 0, "in_flight": 0, "max_in_flight": 0, "logged": 0}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout, transport=transport) as client:
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _one(i: int, sk_id: int, intended: float) -> None:
+            async with sem:
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+                sent = time.perf_counter()
+                cause = None
+                try:
+                    r = await client.post(url, json={"SK_ID_CURR": sk_id})
+                    if r.status_code == 200:
+                        state["ok"] += 1
+                    else:
+                        cause = f"http_{r.status_code}"
+                        detail = r.text[:200]
+                except Exception as e:
+                    cause = type(e).__name__
+                    detail = repr(e)
+                done = time.perf_counter()
+                state["in_flight"] -= 1
+
+            latency.record(done - intended)
+            service.record(done - sent)
+            if cause is not None:
+                errors[cause] += 1
+                if state["logged"] < max_error_logs:
+                    state["logged"] += 1
+                    print(f"[{i + 1}/{len(ids)}] KO {cause} ({(done - sent) * 1000:.2f}ms): {detail}")
+
+        start = time.perf_counter()
+        if rate > 0:
+            # Boucle ouverte : calendrier fixe, une tâche par requête à son instant prévu
+            tasks: List[asyncio.Task] = []
+            for i, sk_id in enumerate(ids):
+                intended = start + i / rate
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(_one(i, sk_id, intended)))
+            await asyncio.gather(*tasks)
+        else:
+            # Boucle fermée : `concurrency` clients, chacun enchaîne ses requêtes
+            queue = iter(enumerate(ids))
+
+            async def _client() -> None:
+                for i, sk_id in queue:
+                    await _one(i, sk_id, time.perf_counter())
+
+            await asyncio.gather(*[_client() for _ in range(concurrency)])
+        duration = time.perf_counter() - start
+
+    return {
+        "url": url,
+        "mode": "open" if rate > 0 else "closed",
+        "target_rate_rps": rate,
+        "concurrency": concurrency,
+        "sent": len(ids),
+        "ok": state["ok"],
+        "errors": dict(errors),
+        "duration_s": duration,
+        "throughput_rps": state["ok"] / duration if duration > 0 else 0.0,
+        "max_in_flight": state["max_in_flight"],
+        "latency": latency.summary(),
+        "service": service.summary(),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """
+    Affiche le bilan lisible d'un run_load.
+    """
+    print(
+        f"Done. OK={report['ok']}  KO={report['sent'] - report['ok']}  "
+        f"({report['mode']} loop, {report['duration_s']:.1f} s, {report['throughput_rps']:.1f} req/s, "
+        f"max en vol {report['max_in_flight']})"
+    )
+    for cause, n in sorted(report["errors"].items(), key=lambda kv: -kv[1]):
+        print(f"  erreurs {cause}: {n}")
+    for name in ("latency", "service"):
+        s = report[name]
+        pcts = "  ".join(f"p{q:g}={s[f'p{q:g}_ms']:.2f}" for q in PERCENTILES)
+        print(f"  {name:<8} ms  mean={s['mean_ms']:.2f}  {pcts}  max={s['max_ms']:.2f}")
+
+
 def main():
     """
     Point d'entrée principal du script :
-    - Charge un CSV de SK_ID_CURR
-    - Envoie des requêtes POST à l'API /predict
-    - Affiche les erreurs, la latence et le bilan final
+    - Charge les SK_ID_CURR du fichier (colonne seule)
+    - Tire la séquence d'identifiants (seq / uniform / zipf)
+    - Envoie les requêtes POST à l'API (boucle ouverte ou fermée)
+    - Affiche le bilan et l'exporte en JSON si demandé
     """
     parser = argparse.ArgumentParser()
     parser.add_argument("--base-url", default="http://127.0.0.1:8000")
-    parser.add_argument("--csv", default="examples/X_api.csv")
+    parser.add_argument("--csv", "--input", dest="input", default="examples/X_api.csv")
     parser.add_argument("--n", type=int, default=300)
-    parser.add_argument("--sleep", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, default=0.0, help="Requêtes/s en boucle ouverte (0 = boucle fermée)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requêtes en vol maximum")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="seq")
+    parser.add_argument("--zipf-s", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=42)
     parser.add_argument("--timeout", type=float, default=60.0)
     parser.add_argument("--endpoint", default="/predict")
+    parser.add_argument("--out", default=None, help="Chemin du rapport JSON")
     args = parser.parse_args()
 
-    # 1) Chargement du CSV de SK_ID_CURR
-    csv_path = Path(args.csv)
-    if not csv_path.exists():
-        raise FileNotFoundError(f"CSV introuvable: {csv_path}")
+    # 1) Chargement des SK_ID_CURR et tirage de la séquence
+    ids = pick_ids(load_ids(Path(args.input)), args.n, args.distribution, args.zipf_s, args.seed)
 
-    df = pd.read_csv(csv_path)
-    if "SK_ID_CURR" not in df.columns:
-        raise ValueError("Le CSV doit contenir la colonne SK_ID_CURR.")
-
-    # 2) Préparation des paramètres de simulation
-    n = min(args.n, len(df))
+    # 2) Envoi des requêtes
     url = f"{args.base_url.rstrip('/')}{args.endpoint}"
+    report = asyncio.run(run_load(url, ids, rate=args.rate, concurrency=args.concurrency, timeout=args.timeout))
+    report.update({"distribution": args.distribution, "distinct_ids": int(len(np.unique(ids)))})
 
-    ok = 0
-    ko = 0
-
-    # 3) Boucle d'envoi des requêtes POST
-    for i in range(n):
-        sk_id = int(df.iloc[i]["SK_ID_CURR"])
-        payload = {"SK_ID_CURR": sk_id}
-
-        t0 = time.time()
-        try:
-            r = requests.post(url, json=payload, timeout=args.timeout)
-            latency_ms = round((time.time() - t0) * 1000, 2)
-
-            if r.status_code == 200:
-                ok += 1
-            else:
-                ko += 1
-                if ko <= 5:
-                    print(f"[{i+1}/{n}] KO {r.status_code} ({latency_ms}ms): {r.text[:200]}")
-        except Exception as e:
-            ko += 1
-            if ko <= 5:
-                print(f"[{i+1}/{n}] EXC: {e!r}")
-
-        if args.sleep > 0:
-            time.sleep(args.sleep)
-
-    # 4) Affichage du bilan final
-    print(f"Done. OK={ok}  KO={ko}")
+    # 3) Bilan final
+    print_report(report)
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"OK: écrit {args.out}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,144 +2,119 @@
 Script d'analyse des logs de production API :
 - Calcule les métriques d'exploitation (latence, taux d'erreur)
 - Calcule le drift PSI entre les distributions de features en production et les distributions de référence
+  (moteur vectorisé partagé avec le dashboard : monitoring/lib/drift.DriftReference)
 - Génère des rapports JSON et CSV pour le monitoring
+Les logs sont lus par lots (curseur serveur) et agrégés au fil de l'eau (comptes par bin),
+la mémoire ne dépend donc pas de la taille de la fenêtre analysée (hors latences, 8 octets/requête).
+Par défaut (--drift-mode pushdown) les inputs sont binés dans Postgres (une requête, features x bins lignes)
+et les lots ne transportent que les métadonnées ; --drift-mode python re-bine les inputs côté client.
+Avec --series hour|day, les comptes sont aussi ventilés par période (toujours un seul binning des données) et
+psi_timeseries.csv donne le PSI de chaque période sur une fenêtre glissante de --series-window périodes.
 """
 from __future__ import annotations
 from dotenv import load_dotenv
 load_dotenv()
 import argparse
 import json
-import math
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List
 
+import numpy as np
 import pandas as pd
 
-from core.db.repo_prod_requests import select_prod_requests
+from core.db.repo_drift_rollup import select_prod_drift_bins
+from core.db.repo_prod_requests import DEFAULT_BATCH_SIZE, iter_prod_request_batches
 from core.db.repo_ref_dist import load_all_ref
-
-
-def _psi(p: List[float], q: List[float], eps: float = 1e-6) -> float:
-    """
-    PSI = Σ (p - q) * ln(p/q)
-    - p : distribution prod
-    - q : distribution ref
-    """
-    """
-    Calcule le Population Stability Index (PSI) entre deux distributions p et q.
-    - p : distribution production
-    - q : distribution référence
-    Retourne :
-        float : valeur du PSI
-    """
-    s = 0.0
-    for pi, qi in zip(p, q):
-        pi2 = max(eps, float(pi))
-        qi2 = max(eps, float(qi))
-        s += (pi2 - qi2) * math.log(pi2 / qi2)
-    return float(s)
-
-
-def _prod_dist_numeric(values: pd.Series, edges: List[float]) -> Tuple[List[str], List[float]]:
-    """
-    Calcule la distrib prod sur les bins (edges) de la ref.
-    Retourne labels + p (normalisé).
-    """
-    """
-    Calcule la distribution de la production sur les bins numériques de la référence.
-    Retourne :
-        (labels, p) : labels des bins et proportions normalisées
-    """
-    x = pd.to_numeric(values, errors="coerce").dropna()
-    if len(x) == 0:
-        return ["__EMPTY__"], [1.0]
-
-    edges_sorted = sorted(set(float(e) for e in edges))
-    if len(edges_sorted) < 2:
-        return ["__EMPTY__"], [1.0]
-
-    binned = pd.cut(x, bins=edges_sorted, include_lowest=True, duplicates="drop")
-    dist = binned.value_counts(normalize=True).sort_index()
-
-    labels = [str(idx) for idx in dist.index]
-    p = [float(v) for v in dist.values]
-    if not p:
-        return ["__EMPTY__"], [1.0]
-
-    return labels, p
-
-
-def _prod_dist_categorical(values: pd.Series, ref_labels: List[str]) -> Tuple[List[str], List[float]]:
-    """
-    Calcule la distrib prod sur les labels de la ref.
-    - Toute modalité inconnue -> "__OTHER__" si présent dans la ref.
-    - NaN -> "__MISSING__"
-    """
-    """
-    Calcule la distribution de la production sur les labels catégoriels de la référence.
-    - Modalités inconnues mappées sur '__OTHER__' si présent dans la ref
-    - NaN mappé sur '__MISSING__'
-    Retourne :
-        (labels, p) : labels de la ref et proportions normalisées
-    """
-    x = values.fillna("__MISSING__").astype(str)
-    if len(x) == 0:
-        return ["__EMPTY__"], [1.0]
-
-    ref_set = set(ref_labels)
-    has_other = "__OTHER__" in ref_set
-
-    mapped = []
-    for v in x.tolist():
-        if v in ref_set:
-            mapped.append(v)
-        else:
-            mapped.append("__OTHER__" if has_other else v)
-
-    vc = pd.Series(mapped).value_counts(normalize=True)
-
-    labels = list(ref_labels)
-    p = [float(vc.get(lbl, 0.0)) for lbl in labels]
-
-    s = sum(p)
-    if s <= 0:
-        return ["__EMPTY__"], [1.0]
-    p = [v / s for v in p]
-
-    return labels, p
+from monitoring.lib.drift import PERIOD_FREQS, DriftReference, psi_series_table
 
 
 def main() -> None:
     """
     Point d'entrée principal du script :
-    - Charge les logs de production depuis la base
+    - Lit les logs de production depuis la base, par lots
     - Calcule les métriques d'exploitation (latence, erreurs)
     - Calcule le drift PSI pour chaque feature
     - Génère les rapports de monitoring (JSON, CSV)
     """
     ap = argparse.ArgumentParser()
     ap.add_argument("--endpoint", default="/predict")
-    ap.add_argument("--limit", type=int, default=5000)
+    ap.add_argument("--limit", type=int, default=5000, help="Nb de requêtes les plus récentes (0 = toutes)")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Taille des lots lus en streaming")
+    ap.add_argument("--drift-mode", choices=["pushdown", "python"], default="pushdown",
+                    help="pushdown : binning dans Postgres ; python : inputs transférés et binés côté client")
+    ap.add_argument("--series", choices=["none", *PERIOD_FREQS], default="none",
+                    help="Séries PSI par heure / jour (psi_timeseries.csv)")
+    ap.add_argument("--series-window", type=int, default=1, help="Fenêtre glissante des séries PSI (en périodes)")
     ap.add_argument("--outdir", default="reports/monitoring_prod")
     args = ap.parse_args()
 
     outdir = Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
 
-    # 1) Récupération des logs de production depuis la base de données
-    logs = select_prod_requests(endpoint=args.endpoint, limit=int(args.limit))
-    if not logs:
-        raise RuntimeError("Aucun log trouvé (ou DB non connectée).")
+    refs = load_all_ref()
+    if not refs:
+        raise RuntimeError("ref_feature_dist est vide (build_reference_dist pas exécuté).")
 
-    df = pd.DataFrame(logs)
+    # Références chargées une fois ; comptes cumulés F x (L+1) (les lots sont agrégés au fil de l'eau)
+    engine = DriftReference(refs)
+    counts = np.zeros((len(engine.features), engine.max_bins + 1), dtype=np.int64)
+    limit = int(args.limit) if args.limit else None
+    pushdown = args.drift_mode == "pushdown"
+
+    period = None if args.series == "none" else args.series
+    # Comptes par période (mode python) : début de période -> matrice F x (L+1)
+    counts_by_bucket: Dict[pd.Timestamp, np.ndarray] = {}
+    drift_bins = pd.DataFrame(columns=["bucket", "feature", "bin", "n"])
+
+    if pushdown:
+        # Une requête : comptes par (période,) feature, bin ; le total de la fenêtre en est la somme
+        drift_bins = pd.DataFrame(
+            select_prod_drift_bins(refs, endpoint=args.endpoint, limit=limit, period=period),
+            columns=["bucket", "feature", "bin", "n"],
+        )
+        counts += engine.counts_from_rollup(drift_bins)
+
+    total = 0
+    errors = 0
+    latencies: List[np.ndarray] = []
+
+    # 1) Lecture en streaming des logs de production (mémoire bornée par --batch-size)
+    for batch in iter_prod_request_batches(
+        endpoint=args.endpoint,
+        limit=limit,
+        batch_size=int(args.batch_size),
+        with_inputs=not pushdown,
+    ):
+        # 2) Métriques d'exploitation (latence, taux d'erreur)
+        total += len(batch)
+        status = pd.to_numeric(pd.Series([r.get("status_code") for r in batch]), errors="coerce").fillna(0)
+        errors += int((status >= 400).sum())
+        lat = pd.to_numeric(pd.Series([r.get("latency_ms") for r in batch]), errors="coerce").dropna()
+        latencies.append(lat.to_numpy(dtype=float))
+
+        # 3) Comptes par bin pour le drift PSI des requêtes réussies (déjà calculés dans Postgres en mode pushdown)
+        if pushdown:
+            continue
+        ok = [r for r in batch if int(r.get("status_code") or 0) == 200]
+        prod_inputs = pd.DataFrame([r.get("inputs") or {} for r in ok])
 
-    # 2) Calcul des métriques d'exploitation (latence, taux d'erreur)
-    total = int(len(df))
-    status = pd.to_numeric(df["status_code"], errors="coerce").fillna(0).astype(int)
-    errors = int((status >= 400).sum())
-    error_rate = float(errors / total) if total else 0.0
+        if period is None:
+            counts += engine.counts(prod_inputs)
+            continue
+        ts = pd.to_datetime(pd.Series([r.get("ts") for r in ok]), errors="coerce", utc=True)
+        # Un binning par période du lot (lots chronologiques : quelques périodes par lot)
+        for bucket, sub in prod_inputs.groupby(ts.dt.floor(PERIOD_FREQS[period]), dropna=False):
+            c = engine.counts(sub)
+            counts += c
+            if not pd.isna(bucket):
+                key = pd.Timestamp(bucket)
+                counts_by_bucket[key] = counts_by_bucket.get(key, 0) + c
+
+    if total == 0:
+        raise RuntimeError("Aucun log trouvé (ou DB non connectée).")
 
-    lat = pd.to_numeric(df["latency_ms"], errors="coerce").dropna()
+    error_rate = float(errors / total) if total else 0.0
+    lat = pd.Series(np.concatenate(latencies) if latencies else np.zeros(0), dtype=float)
     ops_report = {
         "endpoint": args.endpoint,
         "n_requests": total,
@@ -157,85 +132,21 @@ def main() -> None:
         json.dumps(ops_report, indent=2, ensure_ascii=False), encoding="utf-8"
     )
 
-    # 3) Calcul du drift PSI entre  la production et la référence pour chaque feature
-    inputs_series = df.get("inputs")
-    if inputs_series is None:
-        raise RuntimeError("La colonne 'inputs' est absente des logs.")
-
-    inputs_series = inputs_series.dropna()
-    prod_inputs = pd.json_normalize(inputs_series.tolist()) if len(inputs_series) else pd.DataFrame()
-
-    refs = load_all_ref()
-    if not refs:
-        raise RuntimeError("ref_feature_dist est vide (build_reference_dist pas exécuté).")
-
+    # Calcul de tous les PSI à partir des comptes cumulés
+    psi_by_feature = dict(zip(engine.features, engine.psi(counts)))
+    observed = engine.observed(counts)
     rows_out: List[Dict[str, Any]] = []
 
     for ref in refs:
         feat = ref["feature"]
         kind = ref["kind"]
-        bins_json = ref.get("bins_json") or {}
-        ref_dist = ref.get("ref_dist_json") or {}
-
-        ref_labels = list(ref_dist.get("labels", []))
-        ref_p = list(ref_dist.get("p", []))
-
-        if feat not in prod_inputs.columns:
-            rows_out.append(
-                {
-                    "feature": feat,
-                    "kind": kind,
-                    "psi": None,
-                    "note": "missing_in_prod_inputs",
-                }
-            )
-            continue
-
-        s = prod_inputs[feat]
-
-        if kind == "numeric":
-            edges = bins_json.get("edges", [])
-            if not isinstance(edges, list) or len(edges) < 2 or len(ref_p) == 0:
-                rows_out.append({"feature": feat, "kind": kind, "psi": None, "note": "bad_ref_bins"})
-                continue
-
-            prod_labels, prod_p = _prod_dist_numeric(s, edges)
-
-            # important: si le binning produit ne matche pas la ref -> on signale
-            if len(prod_p) != len(ref_p):
-                rows_out.append(
-                    {
-                        "feature": feat,
-                        "kind": kind,
-                        "psi": None,
-                        "note": "bin_mismatch_ref_vs_prod",
-                    }
-                )
-                continue
-
-            psi_val = _psi(prod_p, ref_p)
-            rows_out.append({"feature": feat, "kind": kind, "psi": round(psi_val, 6), "note": ""})
 
+        if feat in engine.notes:
+            rows_out.append({"feature": feat, "kind": kind, "psi": None, "note": engine.notes[feat]})
+        elif feat not in observed:
+            rows_out.append({"feature": feat, "kind": kind, "psi": None, "note": "missing_in_prod_inputs"})
         else:
-            if len(ref_labels) == 0 or len(ref_p) == 0:
-                rows_out.append({"feature": feat, "kind": kind, "psi": None, "note": "bad_ref_labels"})
-                continue
-
-            prod_labels, prod_p = _prod_dist_categorical(s, ref_labels)
-
-            if len(prod_p) != len(ref_p):
-                rows_out.append(
-                    {
-                        "feature": feat,
-                        "kind": kind,
-                        "psi": None,
-                        "note": "label_mismatch_ref_vs_prod",
-                    }
-                )
-                continue
-
-            psi_val = _psi(prod_p, ref_p)
-            rows_out.append({"feature": feat, "kind": kind, "psi": round(psi_val, 6), "note": ""})
+            rows_out.append({"feature": feat, "kind": kind, "psi": round(float(psi_by_feature[feat]), 6), "note": ""})
 
     # 4) Génération des rapports de drift PSI (CSV, JSON)
     psi_df = pd.DataFrame(rows_out)
@@ -259,10 +170,24 @@ def main() -> None:
         json.dumps(psi_summary, indent=2, ensure_ascii=False), encoding="utf-8"
     )
 
-    # 5) Affichage des chemins des rapports générés
+    # 5) Séries PSI (fenêtres glissantes calculées sur les comptes par période)
+    if period is not None:
+        if counts_by_bucket:
+            buckets = pd.date_range(min(counts_by_bucket), max(counts_by_bucket), freq=PERIOD_FREQS[period])
+            counts_t = np.zeros((len(buckets), len(engine.features), engine.max_bins + 1), dtype=np.int64)
+            for bucket, c in counts_by_bucket.items():
+                counts_t[buckets.get_loc(bucket)] = c
+        else:
+            buckets, counts_t = engine.counts_series_from_rollup(drift_bins, freq=PERIOD_FREQS[period])
+        series = psi_series_table(engine, buckets, counts_t, window=args.series_window, features=observed)
+        series.to_csv(outdir / "psi_timeseries.csv", index=False)
+
+    # 6) Affichage des chemins des rapports générés
     print(f"OK: écrit {outdir / 'monitoring_report.json'}")
     print(f"OK: écrit {outdir / 'psi_table.csv'}")
     print(f"OK: écrit {outdir / 'psi_summary.json'}")
+    if period is not None:
+        print(f"OK: écrit {outdir / 'psi_timeseries.csv'}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,191 @@
+"""
+Lecture des fichiers d'entrée des scripts de données (CSV, Parquet, Arrow IPC / Feather v2) :
+- Détection du format par extension
+- Projection de colonnes (seules les colonnes demandées sont lues / décodées)
+- Itération par blocs (chunks CSV, batches de row groups Parquet, record batches IPC)
+- Lectures mappées en mémoire (memory_map) pour Parquet et IPC
+pyarrow est optionnel (extra "loader") : il n'est requis que pour les formats Parquet / IPC.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # optionnel : seul le CSV est alors disponible
+    pa = pa_ipc = pq = None
+
+FORMATS = ("csv", "parquet", "ipc")
+
+_SUFFIXES = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "ipc",
+    ".ipc": "ipc",
+    ".feather": "ipc",
+}
+
+
+def detect_format(path: Path) -> str:
+    """
+    Retourne le format d'un fichier d'entrée ('csv', 'parquet' ou 'ipc') d'après son extension.
+    """
+    fmt = _SUFFIXES.get(Path(path).suffix.lower())
+    if fmt is None:
+        raise ValueError(f"Format non reconnu pour {path} (attendu : .csv, .parquet, .arrow/.feather)")
+    if fmt != "csv" and pa is None:
+        raise RuntimeError(f"pyarrow est requis pour lire {path} (pip install -e \".[loader]\").")
+    return fmt
+
+
+def _open_ipc(path: Path):
+    """
+    Ouvre un fichier Arrow IPC mappé en mémoire (format fichier, repli sur le format stream).
+    """
+    source = pa.memory_map(str(path), "r")
+    try:
+        return pa_ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa_ipc.open_stream(source)
+
+
+def read_columns(path: Path) -> List[str]:
+    """
+    Retourne les noms de colonnes du fichier (lecture du seul schéma / en-tête).
+    """
+    fmt = detect_format(path)
+    if fmt == "csv":
+        return [str(c) for c in pd.read_csv(path, nrows=0).columns]
+    if fmt == "parquet":
+        return list(pq.read_schema(path, memory_map=True).names)
+    return list(_open_ipc(path).schema.names)
+
+
+def resolve_columns(path: Path, wanted: Optional[Sequence[str]]) -> Optional[List[str]]:
+    """
+    Vérifie que les colonnes demandées existent et les retourne dans l'ordre du fichier.
+
+    Paramètres :
+        wanted (list[str]|None) : Colonnes à lire ; None = toutes.
+
+    Retour :
+        list[str] ou None (toutes les colonnes).
+    """
+    if wanted is None:
+        return None
+    available = read_columns(path)
+    missing = sorted(set(wanted) - set(available))
+    if missing:
+        raise ValueError(f"Colonnes absentes de {path}: {missing[:10]}{' ...' if len(missing) > 10 else ''}")
+    wanted_set = set(wanted)
+    return [c for c in available if c in wanted_set]
+
+
+def has_parts(path: Path) -> bool:
+    """
+    Indique si le fichier se découpe en blocs adressables (Parquet, IPC au format fichier) ;
+    False pour un CSV ou un IPC au format stream (lecture séquentielle uniquement).
+    """
+    fmt = detect_format(path)
+    if fmt == "parquet":
+        return True
+    return fmt == "ipc" and isinstance(_open_ipc(path), pa_ipc.RecordBatchFileReader)
+
+
+def n_parts(path: Path) -> int:
+    """
+    Nombre de blocs indépendants du fichier (row groups Parquet, record batches IPC), pour répartir le travail.
+    """
+    fmt = detect_format(path)
+    if fmt == "parquet":
+        return pq.ParquetFile(path, memory_map=True).num_row_groups
+    if fmt == "ipc":
+        reader = _open_ipc(path)
+        if isinstance(reader, pa_ipc.RecordBatchFileReader):
+            return reader.num_record_batches
+    raise ValueError(f"{path} ne se découpe pas en blocs adressables (CSV ou IPC stream).")
+
+
+def read_part(path: Path, i: int, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Lit le bloc i (row group Parquet / record batch IPC) en ne décodant que les colonnes demandées.
+    """
+    fmt = detect_format(path)
+    if fmt == "parquet":
+        table = pq.ParquetFile(path, memory_map=True).read_row_group(i, columns=columns)
+        return table.to_pandas()
+    batch = _open_ipc(path).get_batch(i)
+    if columns is not None:
+        batch = batch.select(list(columns))
+    return batch.to_pandas()
+
+
+def iter_frames(
+    path: Path,
+    columns: Optional[Sequence[str]] = None,
+    chunksize: int = 2000,
+) -> Iterator[pd.DataFrame]:
+    """
+    Parcourt le fichier par blocs d'au plus `chunksize` lignes, en ne lisant que les colonnes demandées.
+
+    - CSV : pd.read_csv(usecols=..., chunksize=...)
+    - Parquet : iter_batches sur les row groups (mémoire bornée par le batch, pas par le fichier)
+    - IPC : record batches d'un fichier mappé en mémoire (zéro copie avant conversion pandas)
+    """
+    fmt = detect_format(path)
+    if fmt == "csv":
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+        return
+
+    if fmt == "parquet":
+        pf = pq.ParquetFile(path, memory_map=True)
+        for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    reader = _open_ipc(path)
+    batches = (
+        (reader.get_batch(i) for i in range(reader.num_record_batches))
+        if isinstance(reader, pa_ipc.RecordBatchFileReader)
+        else reader
+    )
+    for batch in batches:
+        if columns is not None:
+            batch = batch.select(list(columns))
+        for start in range(0, batch.num_rows, chunksize):
+            yield batch.slice(start, chunksize).to_pandas()
+
+
+def iter_columns(path: Path, columns: Optional[Sequence[str]] = None) -> Iterator[Tuple[str, pd.Series]]:
+    """
+    Parcourt le fichier colonne par colonne : (nom, série complète).
+
+    Parquet / IPC : une seule colonne est décodée à la fois (mémoire ~ une colonne).
+    CSV : le texte doit être parsé en entier, les colonnes projetées sont lues d'un bloc.
+    """
+    fmt = detect_format(path)
+    names = list(columns) if columns is not None else read_columns(path)
+
+    if fmt == "csv":
+        df = pd.read_csv(path, usecols=names)
+        for name in names:
+            yield name, df[name]
+        return
+
+    if fmt == "parquet":
+        pf = pq.ParquetFile(path, memory_map=True)
+        for name in names:
+            yield name, pf.read(columns=[name]).column(0).to_pandas().rename(name)
+        return
+
+    reader = _open_ipc(path)
+    table = reader.read_all()  # mappé en mémoire : pas de copie tant qu'une colonne n'est pas convertie
+    for name in names:
+        yield name, table.column(name).to_pandas().rename(name)
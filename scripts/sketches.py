@@ -0,0 +1,146 @@
+"""
+Résumés de flux fusionnables pour le calcul des distributions de référence en une passe de lecture :
+- KllSketch : sketch de quantiles KLL (mémoire O(k log n), erreur de rang ~ 1/k), min / max exacts
+- TopKCounter : compteurs bornés (Misra-Gries) des modalités fréquentes d'une feature catégorielle
+Les deux sont mis à jour par blocs (tableaux numpy / séries pandas) et fusionnables (merge),
+ce qui permet de les construire par morceaux ou dans plusieurs processus.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class KllSketch:
+    """
+    Sketch de quantiles KLL (Karnin, Lang, Liberty, 2016), version vectorisée par blocs.
+
+    Le niveau h contient des échantillons de poids 2**h ; quand un niveau dépasse sa capacité,
+    il est trié et un élément sur deux (décalage aléatoire) est promu au niveau supérieur.
+    Les capacités décroissent géométriquement (facteur 2/3) vers les niveaux bas.
+    """
+
+    _C = 2.0 / 3.0
+
+    def __init__(self, k: int = 400, seed: Optional[int] = None) -> None:
+        self.k = int(k)
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._levels: List[np.ndarray] = [np.empty(0, dtype=float)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self._levels) - h - 1
+        return max(2, int(np.ceil(self.k * self._C ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(level) for level in self._levels)
+
+    def _compress(self) -> None:
+        while self._size() > sum(self._capacity(h) for h in range(len(self._levels))):
+            for h, level in enumerate(self._levels):
+                if len(level) < self._capacity(h):
+                    continue
+                if h + 1 == len(self._levels):
+                    self._levels.append(np.empty(0, dtype=float))
+                level = np.sort(level)
+                keep = len(level) % 2  # un élément impair reste au niveau h
+                rest = level[keep:]
+                promoted = rest[int(self._rng.integers(2)) :: 2]
+                self._levels[h] = level[:keep]
+                self._levels[h + 1] = np.concatenate([self._levels[h + 1], promoted])
+                break
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Ajoute un bloc de valeurs (les NaN doivent avoir été retirés par l'appelant).
+        """
+        x = np.asarray(values, dtype=float)
+        if x.size == 0:
+            return
+        self.n += int(x.size)
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        self._levels[0] = np.concatenate([self._levels[0], x])
+        self._compress()
+
+    def merge(self, other: "KllSketch") -> None:
+        """
+        Fusionne un autre sketch (même k conseillé) dans celui-ci.
+        """
+        if other.n == 0:
+            return
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0, dtype=float))
+        for h, level in enumerate(other._levels):
+            self._levels[h] = np.concatenate([self._levels[h], level])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """
+        Retourne les quantiles approchés pour les rangs qs (dans [0, 1]) ; q=0 / q=1 donnent min / max exacts.
+        """
+        qs = np.asarray(qs, dtype=float)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self._levels)])
+        order = np.argsort(items, kind="stable")
+        items, cum = items[order], np.cumsum(weights[order])
+
+        idx = np.searchsorted(cum, qs * cum[-1], side="left")
+        out = items[np.clip(idx, 0, len(items) - 1)]
+        out[qs <= 0.0] = self.min
+        out[qs >= 1.0] = self.max
+        return out
+
+
+class TopKCounter:
+    """
+    Compteurs bornés de Misra-Gries : au plus `capacity` modalités suivies.
+    Toute modalité de fréquence > n / (capacity + 1) est garantie d'être conservée ;
+    les comptes sont des minorants, à recompter exactement lors d'une seconde passe.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = int(capacity)
+        self.n = 0
+        self.counts: Dict[str, int] = {}
+
+    def _prune(self) -> None:
+        if len(self.counts) <= self.capacity:
+            return
+        ordered = sorted(self.counts.values(), reverse=True)
+        cut = ordered[self.capacity]  # (capacity + 1)-ième plus grand compte
+        self.counts = {key: c - cut for key, c in self.counts.items() if c > cut}
+
+    def update(self, values: pd.Series) -> None:
+        """
+        Ajoute un bloc de modalités (déjà converties en str, manquants compris).
+        """
+        self.n += int(len(values))
+        for key, c in values.value_counts(sort=False).items():
+            self.counts[key] = self.counts.get(key, 0) + int(c)
+        self._prune()
+
+    def merge(self, other: "TopKCounter") -> None:
+        """
+        Fusionne un autre compteur dans celui-ci.
+        """
+        self.n += other.n
+        for key, c in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + c
+        self._prune()
+
+    def candidates(self) -> List[str]:
+        """
+        Modalités candidates, de la plus à la moins fréquente (comptes approchés).
+        """
+        return [key for key, _ in sorted(self.counts.items(), key=lambda kv: -kv[1])]
@@ -0,0 +1,65 @@
+"""
+Tests unitaires pour le module background (tâches périodiques du log writer).
+Vérifie l'échéancement des tâches et le report d'une tâche en échec à l'intervalle suivant.
+"""
+import pytest
+
+import core.db.background as bg
+
+
+@pytest.fixture(autouse=True)
+def _no_worker(monkeypatch):
+    """
+    Registre vide et pas de thread de fond : les tâches sont exécutées à la main.
+    """
+    monkeypatch.setattr(bg, "_TASKS", {})
+    monkeypatch.setattr(bg, "_ensure_worker", lambda: None)
+
+
+def test_run_due_tasks_respects_interval():
+    """
+    Vérifie qu'une tâche s'exécute au premier réveil puis seulement une fois son intervalle écoulé.
+    """
+    calls = []
+    bg.register_task("t", lambda: calls.append(1), lambda: 10.0)
+    bg.register_task("t", lambda: calls.append(2), lambda: 1.0)  # déjà enregistrée : ignorée
+
+    assert bg.run_due_tasks(now=0.0) == ["t"]
+    assert bg.run_due_tasks(now=9.0) == []
+    assert bg.run_due_tasks(now=10.0) == ["t"]
+    assert calls == [1, 1]
+
+
+def test_failed_task_waits_for_next_interval():
+    """
+    Vérifie qu'une tâche en échec n'est pas retentée avant son intervalle (pas de boucle de réessai).
+    """
+    calls = []
+
+    def boom():
+        calls.append(1)
+        raise RuntimeError("db down")
+
+    bg.register_task("t", boom, lambda: 30.0)
+
+    assert bg.run_due_tasks(now=0.0) == []
+    assert bg.run_due_tasks(now=1.0) == []
+    assert len(calls) == 1
+    bg.run_due_tasks(now=30.0)
+    assert len(calls) == 2
+
+
+def test_interval_is_read_after_the_run():
+    """
+    Vérifie que l'intervalle est relu après l'exécution (délai de réessai raccourci après un échec).
+    """
+    state = {"failed": False}
+
+    def load():
+        state["failed"] = True
+        raise RuntimeError("db down")
+
+    bg.register_task("t", load, lambda: 5.0 if state["failed"] else 300.0)
+
+    bg.run_due_tasks(now=0.0)
+    assert bg._TASKS["t"]["next_at"] == 5.0
@@ -3,21 +3,40 @@
 Tests unitaires pour la gestion de la connexion à la base de données (core.db.conn).
 Vérifie le cache, la reconnexion, et l'initialisation de la base.
 """
+from contextlib import nullcontext
+
+import pytest
+
 import core.db.conn as connmod
 
 
 class FakeConn:
     """
     Faux objet de connexion pour simuler une base de données lors des tests.
+    `applied` simule le contenu de schema_migrations (None = table absente).
     """
-    def __init__(self, closed=False):
+    def __init__(self, closed=False, applied=None):
         self.closed = closed
         self.executed = []
+        self.applied = applied
 
     def execute(self, sql, params=None):
         self.executed.append(sql)
+        if "FROM schema_migrations" in sql and self.applied is None:
+            raise connmod.psycopg.errors.UndefinedTable("schema_migrations")
+        if "CREATE TABLE IF NOT EXISTS schema_migrations" in sql and self.applied is None:
+            self.applied = {}
+        if "INSERT INTO schema_migrations" in sql:
+            version, checksum = params
+            self.applied[version] = checksum
         return self
 
+    def fetchall(self):
+        return list((self.applied or {}).items())
+
+    def transaction(self):
+        return nullcontext()
+
 
 def test_get_conn_returns_none_if_no_db_url(monkeypatch):
     """
@@ -106,4 +125,233 @@ def test_init_db_executes_expected_sql(monkeypatch):
     sql_all = "\n".join(fake.executed)
 
     assert "CREATE TABLE IF NOT EXISTS prod_requests" in sql_all
-    assert "CREATE INDEX IF NOT EXISTS idx_prod_requests_ts" in sql_all
\ No newline at end of file
+    assert "CREATE INDEX IF NOT EXISTS idx_prod_requests_ts" in sql_all
+
+def test_init_db_records_applied_migrations(monkeypatch):
+    """
+    Vérifie qu'au premier démarrage chaque migration est enregistrée avec son checksum, sous verrou consultatif.
+    """
+    fake = FakeConn()
+    monkeypatch.setattr(connmod, "get_conn", lambda: fake)
+
+    connmod.init_db()
+
+    expected = {v: c for (v, c, _) in connmod._list_migrations()}
+    assert fake.applied == expected
+    assert any("pg_advisory_xact_lock" in sql for sql in fake.executed)
+
+
+def test_init_db_steady_state_is_single_query(monkeypatch):
+    """
+    Vérifie qu'une fois toutes les migrations appliquées, init_db n'exécute qu'une seule requête légère.
+    """
+    applied = {v: c for (v, c, _) in connmod._list_migrations()}
+    fake = FakeConn(applied=dict(applied))
+    monkeypatch.setattr(connmod, "get_conn", lambda: fake)
+
+    connmod.init_db()
+
+    assert len(fake.executed) == 1
+    assert "FROM schema_migrations" in fake.executed[0]
+
+
+def test_apply_migrations_runs_only_missing(monkeypatch):
+    """
+    Vérifie que seules les migrations absentes de schema_migrations sont exécutées.
+    """
+    migrations = connmod._list_migrations()
+    first_version, first_checksum, first_sql = migrations[0]
+    fake = FakeConn(applied={first_version: first_checksum})
+
+    done = connmod.apply_migrations(fake)
+
+    assert done == [v for (v, _, _) in migrations[1:]]
+    assert first_sql not in fake.executed
+
+
+def test_apply_migrations_warns_on_checksum_change():
+    """
+    Vérifie qu'une migration modifiée après application est signalée mais pas rejouée.
+    """
+    applied = {v: c for (v, c, _) in connmod._list_migrations()}
+    first_version = next(iter(applied))
+    applied[first_version] = "old-checksum"
+    fake = FakeConn(applied=applied)
+
+    with pytest.warns(RuntimeWarning, match=first_version):
+        assert connmod.apply_migrations(fake) == []
+
+
+class FakeReplica:
+    """
+    Fausse réplique : renvoie un retard de réplication donné, ou échoue sur les requêtes applicatives.
+    """
+    def __init__(self, lag_s=0.0, fail_queries=False):
+        self.closed = False
+        self.lag_s = lag_s
+        self.fail_queries = fail_queries
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+        if "pg_is_in_recovery" not in sql and self.fail_queries:
+            raise connmod.psycopg.OperationalError("replica down")
+        return self
+
+    def fetchone(self):
+        return (self.lag_s,)
+
+    def close(self):
+        self.closed = True
+
+
+def _setup_replica(monkeypatch, replica, primary):
+    """
+    Configure DATABASE_READ_URL et remplace les connexions primaire/réplique par des faux objets.
+    """
+    monkeypatch.setenv("DATABASE_READ_URL", "postgresql://replica")
+    monkeypatch.setenv("DATABASE_READ_MAX_LAG_S", "5")
+    monkeypatch.setattr(connmod, "_READ_CONN", None)
+    monkeypatch.setattr(connmod, "_PROBE_CONN", None)
+    monkeypatch.setattr(connmod, "_READ_STATE", {"checked_at": float("-inf"), "usable": False})
+    monkeypatch.setattr(connmod, "get_conn", lambda: primary)
+    monkeypatch.setattr(connmod.psycopg, "connect", lambda *a, **k: replica)
+    monkeypatch.setattr(connmod, "_ensure_replica_monitor", lambda: None)
+
+
+class FakeReplicas:
+    """
+    Fabrique de fausses répliques : une nouvelle connexion par psycopg.connect (contrôle, lectures, flux).
+    """
+    def __init__(self, lag_s=0.0):
+        self.lag_s = lag_s
+        self.opened = []
+        self.urls = []
+
+    def __call__(self, url, **kwargs):
+        conn = FakeReplica(lag_s=self.lag_s)
+        self.opened.append(conn)
+        self.urls.append(url)
+        return conn
+
+
+def test_get_read_conn_defaults_to_primary(monkeypatch):
+    """
+    Vérifie que sans DATABASE_READ_URL les lectures utilisent la connexion primaire.
+    """
+    primary = FakeConn()
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    monkeypatch.setattr(connmod, "get_conn", lambda: primary)
+    assert connmod.get_read_conn() is primary
+
+
+def test_get_read_conn_uses_fresh_replica_and_caches_probe(monkeypatch):
+    """
+    Vérifie que les lectures ne contrôlent jamais la réplique elles-mêmes : primaire avant le premier contrôle,
+    puis réplique tant que le verdict du contrôle de fond est favorable.
+    """
+    primary, replica = FakeConn(), FakeReplica(lag_s=0.5)
+    _setup_replica(monkeypatch, replica, primary)
+
+    assert connmod.get_read_conn() is primary
+    assert replica.executed == []
+
+    assert connmod.refresh_replica_state() is True
+    assert connmod.get_read_conn() is replica
+    assert connmod.get_read_conn() is replica
+    assert len(replica.executed) == 1
+
+
+def test_replica_not_receiving_wal_is_stale(monkeypatch):
+    """
+    Vérifie qu'une réplique sans WAL receiver actif (retard NULL) est écartée, même si receive = replay.
+    """
+    primary, replica = FakeConn(), FakeReplica(lag_s=None)
+    _setup_replica(monkeypatch, replica, primary)
+
+    assert connmod.refresh_replica_state() is False
+    assert connmod.get_read_conn() is primary
+    assert "pg_stat_wal_receiver" in replica.executed[0]
+
+
+def test_get_read_conn_falls_back_when_replica_too_stale(monkeypatch):
+    """
+    Vérifie que les lectures repassent sur le primaire si la réplique dépasse la tolérance de retard.
+    """
+    primary, replica = FakeConn(), FakeReplica(lag_s=60.0)
+    _setup_replica(monkeypatch, replica, primary)
+
+    assert connmod.refresh_replica_state() is False
+    assert connmod.get_read_conn() is primary
+
+
+def test_execute_read_retries_on_primary_when_replica_fails(monkeypatch):
+    """
+    Vérifie qu'une erreur de connexion sur la réplique écarte celle-ci et rejoue la requête sur le primaire.
+    """
+    primary, replica = FakeConn(), FakeReplica(fail_queries=True)
+    _setup_replica(monkeypatch, replica, primary)
+    connmod.refresh_replica_state()
+
+    cur = connmod.execute_read("SELECT 1", {"x": 1})
+
+    assert cur is primary
+    assert primary.executed == ["SELECT 1"]
+    assert replica.closed
+    assert connmod.get_read_conn() is primary
+
+
+def test_replica_probe_uses_its_own_connection(monkeypatch):
+    """
+    Vérifie que la requête de retard passe par une connexion de contrôle distincte de celle des lectures,
+    et qu'un échec du contrôle ne ferme pas la connexion des lectures.
+    """
+    primary, replicas = FakeConn(), FakeReplicas(lag_s=0.5)
+    _setup_replica(monkeypatch, None, primary)
+    monkeypatch.setattr(connmod.psycopg, "connect", replicas)
+
+    assert connmod.refresh_replica_state() is True
+    probe, read = replicas.opened
+    assert connmod.get_read_conn() is read
+    assert read.executed == [] and len(probe.executed) == 1
+
+    def broken(sql, params=None):
+        raise connmod.psycopg.OperationalError("probe down")
+
+    probe.execute = broken
+    assert connmod.refresh_replica_state() is False
+    assert probe.closed and not read.closed
+    assert connmod.get_read_conn() is primary
+
+
+def test_read_url_same_as_primary_skips_replica(monkeypatch):
+    """
+    Vérifie qu'un DATABASE_READ_URL identique à DATABASE_URL sert les lectures sur le primaire, sans contrôle,
+    et qu'une instance hors recovery est jugée inutilisable (retard NULL).
+    """
+    primary, replica = FakeConn(), FakeReplica()
+    _setup_replica(monkeypatch, replica, primary)
+    monkeypatch.setenv("DATABASE_URL", "postgresql://replica")
+
+    assert connmod.refresh_replica_state() is False
+    assert connmod.get_read_conn() is primary
+    assert replica.executed == []
+    assert "WHEN NOT pg_is_in_recovery() THEN NULL" in connmod._REPLICA_LAG_SQL
+
+
+def test_open_read_conn_opens_a_dedicated_connection(monkeypatch):
+    """
+    Vérifie que open_read_conn ouvre une connexion propre à l'appelant : réplique si utilisable, sinon primaire.
+    """
+    primary, replicas = FakeConn(), FakeReplicas()
+    _setup_replica(monkeypatch, None, primary)
+    monkeypatch.setenv("DATABASE_URL", "postgresql://primary")
+    monkeypatch.setattr(connmod.psycopg, "connect", replicas)
+
+    first = connmod.open_read_conn()
+    assert first is replicas.opened[-1] and replicas.urls[-1] == "postgresql://primary"
+
+    connmod.refresh_replica_state()
+    stream = connmod.open_read_conn()
+    assert stream is replicas.opened[-1] and replicas.urls[-1] == "postgresql://replica"
+    assert stream is not connmod.get_read_conn() and stream is not first
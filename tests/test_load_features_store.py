@@ -0,0 +1,46 @@
+"""
+Tests unitaires pour le script de chargement des features (scripts/01_load_features_store.py).
+Vérifie que l'encodage des blocs COPY est identique quel que soit le format et le nombre de workers.
+"""
+import importlib
+
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.ipc as pa_ipc  # noqa: E402
+
+load = importlib.import_module("scripts.01_load_features_store")
+
+
+def _frame():
+    return pd.DataFrame({"SK_ID_CURR": [100001, 100002, 100003], "A": [1.5, None, 3.0], "B": ["x", "y", None]})
+
+
+def _write_ipc_stream(path, frame):
+    """
+    Écrit un fichier Arrow IPC au format stream (pas de blocs adressables), en deux record batches.
+    """
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    with pa_ipc.new_stream(str(path), table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=2):
+            writer.write_batch(batch)
+
+
+def test_iter_copy_blocks_ipc_stream_with_workers_falls_back_to_sequential(tmp_path):
+    """
+    Vérifie qu'un IPC stream avec --workers > 1 est lu séquentiellement (au lieu d'échouer sur n_parts)
+    et donne les mêmes lignes COPY que le CSV équivalent.
+    """
+    frame = _frame()
+    stream = tmp_path / "features.arrow"
+    _write_ipc_stream(stream, frame)
+    csv = tmp_path / "features.csv"
+    frame.to_csv(csv, index=False)
+
+    assert not load.has_parts(stream)
+    blocks = list(load.iter_copy_blocks(stream, chunksize=2, workers=4))
+    expected = list(load.iter_copy_blocks(csv, chunksize=2, workers=1))
+
+    assert sum(n for n, _ in blocks) == 3
+    assert b"".join(b for _, b in blocks) == b"".join(b for _, b in expected)
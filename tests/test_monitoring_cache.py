@@ -0,0 +1,121 @@
+"""
+Tests unitaires pour le module cache du monitoring (cache des logs avec TTL et rafraîchissement incrémental).
+"""
+import pandas as pd
+
+from monitoring.lib.cache import IncrementalFrameCache, merge_new_rows, trim_frame
+
+
+def _logs(ids, ts=None):
+    """
+    Logs factices (id, ts, latency_ms) ; ts = maintenant par défaut.
+    """
+    ts = pd.Timestamp.now(tz="UTC") if ts is None else ts
+    return pd.DataFrame({"id": ids, "ts": ts, "latency_ms": [float(i) for i in ids]})
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_hit_within_ttl():
+    """
+    Vérifie qu'aucune lecture n'a lieu avant l'expiration du TTL et que les clés sont distinctes.
+    """
+    clock = _Clock()
+    cache = IncrementalFrameCache(ttl_s=30, clock=clock)
+    calls = []
+
+    def load(after_id):
+        calls.append(after_id)
+        return _logs([1, 2])
+
+    first = cache.get(("/predict", None, "all"), load, time_window="all", limit=None)
+    clock.now = 29.0
+    again = cache.get(("/predict", None, "all"), load, time_window="all", limit=None)
+    cache.get(("/predict", None, "7d"), load, time_window="7d", limit=None)
+
+    assert again is first
+    assert calls == [None, None]
+
+
+def test_cache_refresh_appends_rows_after_last_id_and_keeps_limit():
+    """
+    Vérifie qu'à l'expiration du TTL (sans recouvrement) seules les requêtes d'id > dernier id sont lues, ajoutées,
+    puis que seules les `limit` plus récentes sont conservées.
+    """
+    clock = _Clock()
+    cache = IncrementalFrameCache(ttl_s=30, clock=clock, overlap_ids=0)
+    batches = {None: _logs([1, 2, 3]), 3: _logs([4, 5]), 5: _logs([])}
+    calls = []
+
+    def load(after_id):
+        calls.append(after_id)
+        return batches[after_id]
+
+    cache.get("k", load, time_window="all", limit=4)
+    clock.now = 31.0
+    out = cache.get("k", load, time_window="all", limit=4)
+    clock.now = 62.0
+    again = cache.get("k", load, time_window="all", limit=4)
+
+    assert calls == [None, 3, 5]
+    assert out["id"].tolist() == [2, 3, 4, 5]
+    assert out.index.tolist() == [0, 1, 2, 3]
+    assert again is out
+
+
+def test_cache_refresh_rereads_overlap_for_late_commits():
+    """
+    Vérifie que le recouvrement rattrape une requête validée après une requête d'id supérieur
+    (id 3 visible après 4), sans doublon, dans l'ordre des id et sur les colonnes du cache.
+    """
+    clock = _Clock()
+    cache = IncrementalFrameCache(ttl_s=30, clock=clock, overlap_ids=2)
+    late = _logs([3, 4, 5]).assign(extra="x")
+    batches = {None: _logs([1, 2, 4]), 2: late.drop(columns="latency_ms")}
+    calls = []
+
+    def load(after_id):
+        calls.append(after_id)
+        return batches[after_id]
+
+    cache.get("k", load, time_window="all", limit=None)
+    clock.now = 31.0
+    out = cache.get("k", load, time_window="all", limit=None)
+
+    assert calls == [None, 2]
+    assert out["id"].tolist() == [1, 2, 3, 4, 5]
+    assert list(out.columns) == ["id", "ts", "latency_ms"]
+    assert out["latency_ms"].isna().tolist() == [False, False, True, False, True]
+
+
+def test_merge_new_rows_keeps_frame_when_nothing_new():
+    """
+    Vérifie qu'une relecture ne contenant que des id déjà en cache renvoie le DataFrame en cache lui-même.
+    """
+    frame = _logs([1, 2, 3])
+    assert merge_new_rows(frame, _logs([2, 3]), after_id=1) is frame
+    assert merge_new_rows(frame, _logs([]), after_id=3) is frame
+
+
+def test_trim_frame_drops_rows_outside_window_and_clear_reloads():
+    """
+    Vérifie que la fenêtre glissante écarte les requêtes trop anciennes et que clear() force une relecture complète.
+    """
+    old = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=2)
+    frame = pd.concat([_logs([1], ts=old), _logs([2])], ignore_index=True)
+
+    assert trim_frame(frame, "24h", None)["id"].tolist() == [2]
+    assert trim_frame(frame, "all", None) is frame
+
+    cache = IncrementalFrameCache(ttl_s=30, clock=_Clock())
+    calls = []
+    cache.get("k", lambda after_id: calls.append(after_id) or frame, time_window="all", limit=None)
+    cache.clear()
+    cache.get("k", lambda after_id: calls.append(after_id) or frame, time_window="all", limit=None)
+    assert calls == [None, None]
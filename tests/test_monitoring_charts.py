@@ -3,6 +3,7 @@
 Tests unitaires pour les fonctions de génération de graphiques de monitoring (latence, statuts, décisions, drift, distributions).
 Vérifie que chaque fonction retourne bien un objet plotly Figure.
 """
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
@@ -12,6 +13,11 @@ from monitoring.lib.charts import (
     pie_decisions,
     bar_top_drift,
     bar_ref_vs_prod,
+    line_psi_series,
+    bar_latency_bins,
+    line_throughput,
+    log_bins,
+    downsample_series,
 )
 
 
@@ -24,6 +30,27 @@ def test_hist_latency_returns_figure():
     assert isinstance(fig, go.Figure)
 
 
+def test_hist_latency_payload_independent_of_size():
+    """
+    Vérifie que hist_latency ne transmet que nbins comptes (binning NumPy log), quel que soit le nombre de valeurs.
+    """
+    lat = pd.Series(np.random.default_rng(0).lognormal(3.0, 0.6, size=200_000))
+    fig = hist_latency(lat, "Latency", nbins=20)
+    assert len(fig.data[0].x) <= 20
+    assert sum(fig.data[0].y) == len(lat)
+
+
+def test_log_bins_edges_and_counts():
+    """
+    Vérifie les bornes géométriques, la prise en compte des valeurs nulles et le cas vide.
+    """
+    edges, counts = log_bins([0.0, 1.0, 10.0, 100.0, "x"], nbins=2)
+    assert edges.tolist() == [1.0, 10.0, 100.0]
+    assert counts.tolist() == [2, 2]
+    edges, counts = log_bins([])
+    assert edges.size == 0 and counts.size == 0
+
+
 def test_bar_status_codes_returns_figure():
     """
     Vérifie que bar_status_codes retourne bien un objet Figure pour une série de statuts HTTP.
@@ -57,4 +84,51 @@ def test_bar_ref_vs_prod_returns_figure():
     """
     df = pd.DataFrame({"label": ["x", "y"], "ref": [0.6, 0.4], "prod": [0.5, 0.5]})
     fig = bar_ref_vs_prod(df, "feat")
-    assert isinstance(fig, go.Figure)
\ No newline at end of file
+    assert isinstance(fig, go.Figure)
+
+
+def test_line_psi_series_returns_figure():
+    """
+    Vérifie que line_psi_series retourne bien un objet Figure pour une série PSI par feature.
+    """
+    df = pd.DataFrame(
+        {"bucket": pd.to_datetime(["2026-01-01", "2026-01-02"]), "feature": ["a", "a"], "psi": [0.05, 0.3]}
+    )
+    fig = line_psi_series(df, "PSI", threshold=0.25)
+    assert isinstance(fig, go.Figure)
+
+
+def test_bar_latency_bins_keeps_only_occupied_range():
+    """
+    Vérifie que bar_latency_bins ne trace que les bins entre le premier et le dernier bin non vide.
+    """
+    counts = np.zeros(95)
+    counts[[60, 63]] = [4, 1]
+    fig = bar_latency_bins(counts, "Latence")
+    assert isinstance(fig, go.Figure)
+    assert list(fig.data[0].y) == [4, 0, 0, 1]
+    assert isinstance(bar_latency_bins(np.zeros(95), "Vide"), go.Figure)
+
+
+def test_line_throughput_returns_figure():
+    """
+    Vérifie que line_throughput retourne bien un objet Figure pour un débit par tranche.
+    """
+    df = pd.DataFrame({"bucket": pd.to_datetime(["2026-01-01 10:00:00", "2026-01-01 10:00:10"]), "n": [3, 5]})
+    assert isinstance(line_throughput(df, "Débit"), go.Figure)
+
+
+def test_downsample_series_caps_points_per_group():
+    """
+    Vérifie que downsample_series limite le nombre de points par courbe en conservant les pics (agg='max').
+    """
+    buckets = pd.date_range("2026-01-01", periods=2000, freq="h", tz="UTC")
+    psi = np.zeros(2000)
+    psi[1234] = 0.9
+    df = pd.DataFrame({"bucket": np.tile(buckets, 2), "feature": np.repeat(["a", "b"], 2000), "psi": np.tile(psi, 2)})
+
+    out = downsample_series(df, "bucket", "psi", max_points=100, by="feature", agg="max")
+
+    assert out.groupby("feature").size().tolist() == [100, 100]
+    assert out["psi"].max() == 0.9
+    assert len(downsample_series(df.head(50), "bucket", "psi", max_points=100)) == 50
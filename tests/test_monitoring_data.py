@@ -1,60 +1,172 @@
 
 """
-Tests unitaires pour la fonction load_prod_data (chargement et transformation des logs de production).
-Vérifie le comportement avec ou sans données, et l'exclusion de features.
+Tests unitaires du chargement des données du dashboard (monitoring/lib/data.py) : export typé des logs,
+agrégats opérationnels, compteurs et binning SQL du drift.
 """
+from unittest.mock import Mock
+
 import pandas as pd
 
-from monitoring.lib.data import load_prod_data
+from monitoring.lib.data import drift_population, load_drift_bins, load_drift_rollup, load_drift_series, load_prod_frame, load_ops_rollup
+
+
+def test_load_ops_rollup_passes_window_start(monkeypatch):
+    """
+    Vérifie que load_ops_rollup convertit la fenêtre en date de début et retourne un DataFrame typé.
+    """
+    calls = {}
+
+    def fake_select(endpoint, since=None, until=None):
+        calls.update(endpoint=endpoint, since=since)
+        return [{"metric": "status", "key": "200", "n": 3, "total": 0.0}]
+
+    monkeypatch.setattr("monitoring.lib.data.select_ops_rollup", fake_select)
+
+    out = load_ops_rollup(endpoint="/predict", time_window="24h")
+
+    assert list(out.columns) == ["metric", "key", "n", "total"]
+    assert out["n"].tolist() == [3]
+    assert calls["endpoint"] == "/predict"
+    assert calls["since"] is not None
+
+    empty = load_ops_rollup(endpoint="/predict", time_window="all")
+    assert calls["since"] is None
+    assert list(empty.columns) == ["metric", "key", "n", "total"]
+
+
+def test_load_drift_rollup_uses_reference_version(monkeypatch):
+    """
+    Vérifie que load_drift_rollup interroge les compteurs de la version de référence courante.
+    """
+    calls = {}
+
+    def fake_select(ref_version, endpoint, since=None, until=None):
+        calls.update(ref_version=ref_version, since=since)
+        return [{"feature": "num", "bin": 0, "n": 4}]
+
+    monkeypatch.setattr("monitoring.lib.data.select_drift_rollup", fake_select)
+    monkeypatch.setattr("monitoring.lib.data.drift_rollup_covers", lambda *a, **kw: True)
+    monkeypatch.setattr("monitoring.lib.data.ref_version", lambda rows: "v1")
+
+    out = load_drift_rollup(endpoint="/predict", time_window="all", ref_rows=[{"feature": "num"}])
+
+    assert list(out.columns) == ["feature", "bin", "n"]
+    assert out["n"].tolist() == [4]
+    assert calls == {"ref_version": "v1", "since": None}
+    assert load_drift_rollup(endpoint="/predict", time_window="all", ref_rows=[]).empty
+
+
+def test_load_drift_rollup_ignores_partial_counters(monkeypatch):
+    """
+    Vérifie que load_drift_rollup renvoie un DataFrame vide (repli sur le binning SQL) si les compteurs
+    ne couvrent pas toute la fenêtre, sans les lire.
+    """
+    select = Mock()
+    monkeypatch.setattr("monitoring.lib.data.select_drift_rollup", select)
+    monkeypatch.setattr("monitoring.lib.data.drift_rollup_covers", lambda *a, **kw: False)
+    monkeypatch.setattr("monitoring.lib.data.ref_version", lambda rows: "v1")
+
+    out = load_drift_rollup(endpoint="/predict", time_window="30d", ref_rows=[{"feature": "num"}])
 
+    assert out.empty
+    assert list(out.columns) == ["feature", "bin", "n"]
+    select.assert_not_called()
 
-def test_load_prod_data_empty(monkeypatch):
+
+def test_load_drift_bins_passes_window(monkeypatch):
+    """
+    Vérifie que load_drift_bins transmet la limite et retourne les comptes calculés dans Postgres.
+    """
+    calls = {}
+
+    def fake_select(ref_rows, endpoint, since=None, limit=None):
+        calls.update(limit=limit, since=since)
+        return [{"feature": "num", "bin": -1, "n": 3}]
+
+    monkeypatch.setattr("monitoring.lib.data.select_prod_drift_bins", fake_select)
+
+    out = load_drift_bins(endpoint="/predict", limit=500, time_window="all", ref_rows=[{"feature": "num"}])
+
+    assert list(out.columns) == ["feature", "bin", "n"]
+    assert out["bin"].tolist() == [-1]
+    assert calls == {"limit": 500, "since": None}
+
+
+def test_load_drift_series_falls_back_to_logs(monkeypatch):
     """
-    Vérifie que load_prod_data retourne des DataFrames vides et une liste vide si aucun log n'est présent.
+    Vérifie que load_drift_series bine les logs dans Postgres si aucun compteur n'existe pour la référence.
     """
-    # mock DB read to return no logs
-    monkeypatch.setattr("monitoring.lib.data.select_prod_requests", lambda endpoint, limit: [])
+    calls = {}
 
-    meta, inputs, outputs, rows = load_prod_data(
-        endpoint="/predict",
-        limit=None,
-        time_window="all",
-        excluded_features=set(),
-    )
+    def fake_logs(ref_rows, endpoint, since=None, limit=None, period=None):
+        calls.update(period=period)
+        return [{"bucket": "2026-01-02", "feature": "num", "bin": 0, "n": 2}]
 
-    assert meta.empty
-    assert inputs.empty
-    assert outputs.empty
-    assert rows == []
+    monkeypatch.setattr("monitoring.lib.data.select_drift_rollup_series", lambda *a, **kw: [])
+    monkeypatch.setattr("monitoring.lib.data.drift_rollup_covers", lambda *a, **kw: True)
+    monkeypatch.setattr("monitoring.lib.data.select_prod_drift_bins", fake_logs)
+    monkeypatch.setattr("monitoring.lib.data.ref_version", lambda rows: "v1")
 
+    out = load_drift_series(endpoint="/predict", limit=None, time_window="90d", ref_rows=[{"feature": "num"}],
+                            period="day")
 
-def test_load_prod_data_ok(monkeypatch):
+    assert list(out.columns) == ["bucket", "feature", "bin", "n"]
+    assert out["n"].tolist() == [2]
+    assert calls == {"period": "day"}
+
+
+def test_load_prod_frame_types_features_from_reference(monkeypatch):
     """
-    Vérifie que load_prod_data retourne des DataFrames non vides et filtre bien les features exclues.
+    Vérifie que load_prod_frame exporte les features de référence non exclues, typées d'après la référence,
+    en gardant le schéma complet (feature sans valeur conservée).
     """
-    fake_rows = [
-        {
-            "ts": pd.Timestamp.now(),
-            "endpoint": "/predict",
-            "status_code": 200,
-            "latency_ms": 123.0,
-            "inputs": {"A": 1, "SK_ID_CURR": 100001},
-            "outputs": {"decision": "ACCEPTED"},
-            "error": None,
-            "message": None,
-        }
+    calls = {}
+
+    def fake_export(**kw):
+        calls.update(kw)
+        return pd.DataFrame({"ts": [1], "AMT": [1.5], "CODE": ["M"], "GONE": [float("nan")]})
+
+    monkeypatch.setattr("monitoring.lib.data.export_prod_frame", fake_export)
+    ref_rows = [
+        {"feature": "AMT", "kind": "numeric"},
+        {"feature": "CODE", "kind": "categorical"},
+        {"feature": "GONE", "kind": "numeric"},
+        {"feature": "SK_ID_CURR", "kind": "numeric"},
     ]
 
-    monkeypatch.setattr("monitoring.lib.data.select_prod_requests", lambda endpoint, limit: fake_rows)
+    out = load_prod_frame(endpoint="/predict", limit=None, time_window="all", ref_rows=ref_rows,
+                          excluded_features={"SK_ID_CURR"})
+
+    assert calls["features"] == ["AMT", "CODE", "GONE"]
+    assert calls["categorical"] == {"CODE"}
+    assert list(out.columns) == ["ts", "AMT", "CODE", "GONE"]
+    assert out["GONE"].isna().all()
+
+
+def test_drift_population_keeps_successful_requests():
+    """
+    Vérifie que seules les requêtes de status 200 entrent dans les calculs de drift.
+    """
+    frame = pd.DataFrame({"status_code": [200, 422, 200, 500], "AMT": [1.0, 2.0, 3.0, 4.0]})
+
+    assert drift_population(frame)["AMT"].tolist() == [1.0, 3.0]
+    no_status = pd.DataFrame({"AMT": [1.0]})
+    assert drift_population(no_status) is no_status
+
+
+def test_drift_paths_share_hour_aligned_window(monkeypatch):
+    """
+    Vérifie que compteurs et binning SQL des logs reçoivent le même début de fenêtre, arrondi à l'heure.
+    """
+    seen = []
+    monkeypatch.setattr("monitoring.lib.data.ref_version", lambda rows: "v1")
+    monkeypatch.setattr("monitoring.lib.data.drift_rollup_covers", lambda *a, since=None, **kw: seen.append(since) or True)
+    monkeypatch.setattr("monitoring.lib.data.select_drift_rollup", lambda *a, since=None, **kw: seen.append(since) or [])
+    monkeypatch.setattr("monitoring.lib.data.select_prod_drift_bins", lambda *a, since=None, **kw: seen.append(since) or [])
+    ref_rows = [{"feature": "num"}]
 
-    meta, inputs, outputs, rows = load_prod_data(
-        endpoint="/predict",
-        limit=100,
-        time_window="all",
-        excluded_features={"SK_ID_CURR"},
-    )
+    load_drift_rollup(endpoint="/predict", time_window="24h", ref_rows=ref_rows)
+    load_drift_bins(endpoint="/predict", limit=None, time_window="24h", ref_rows=ref_rows)
 
-    assert not meta.empty
-    assert "SK_ID_CURR" not in inputs.columns
-    assert "decision" in outputs.columns
-    assert len(rows) == 1
\ No newline at end of file
+    assert len(seen) == 3 and len(set(seen)) == 1
+    assert (seen[0].minute, seen[0].second, seen[0].microsecond) == (0, 0, 0)
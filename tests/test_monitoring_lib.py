@@ -4,20 +4,38 @@ Tests unitaires pour les fonctions de monitoring : statistiques, timings, drift,
 Vérifie la robustesse et la cohérence des calculs sur des cas simples ou limites.
 """
 import numpy as np
+import pytest
 import pandas as pd
 
-from monitoring.lib.ops import latency_stats_ms, success_rate, error_rate
-from monitoring.lib.timings import extract_timings, compute_timing_stats
+from core.db.repo_ops_rollup import latency_bin
+from monitoring.lib.ops import (
+    latency_stats_ms,
+    success_rate,
+    error_rate,
+    rollup_counts,
+    latency_bins,
+    latency_stats_from_rollup,
+    success_rate_from_counts,
+    error_rate_from_counts,
+)
+from monitoring.lib.timings import extract_timings, compute_timing_stats, compute_timing_stats_from_rollup
 from monitoring.lib.drift import (
     psi_from_dists,
     prod_dist_numeric,
     prod_dist_categorical,
     count_drift,
     compute_drift_table,
+    compute_drift_table_from_rollup,
+    compute_psi_series_from_rollup,
+    numeric_counts,
+    categorical_counts,
+    label_code_table,
+    DriftReference,
 )
+import monitoring.lib.drift as drift_mod
 from monitoring.lib.constants import DEFAULTS, TIME_WINDOWS, PSI_THRESHOLDS
 from monitoring.lib.security import EXCLUDED_FEATURES
-from monitoring.lib.filters import apply_time_filter
+from monitoring.lib.filters import apply_time_filter, drift_window_start, time_window_start
 
 
 # -----------------------
@@ -193,6 +211,183 @@ def test_compute_drift_table_basic():
     assert len(drift) == 2
 
 
+def test_numeric_counts_bounds_and_overflow():
+    """
+    Vérifie numeric_counts : bins fermés à droite, borne basse incluse, NaN et hors bornes en dernière case.
+    """
+    x = np.array([0.0, 0.5, 1.0, 1.5, 3.0, -1.0, 4.0, np.nan])
+    c = numeric_counts(x, np.array([0.0, 1.0, 2.0, 3.0]))
+    assert c.tolist() == [3, 1, 1, 3]
+
+
+def test_categorical_counts_code_table():
+    """
+    Vérifie le codage via la table libellé -> code : manquants -> '__MISSING__', valeurs non textuelles
+    comparées sous forme de texte, inconnues en dernière case en l'absence de '__OTHER__'.
+    """
+    s = pd.Series(["A", None, 1, "Z", "A", np.nan], dtype=object)
+    c = categorical_counts(s, label_code_table(["A", "1", "__MISSING__"]))
+    assert c.tolist() == [2, 1, 2, 1]
+
+    c_other = categorical_counts(s, label_code_table(["A", "__OTHER__"]))
+    assert c_other.tolist() == [2, 4, 0]
+
+
+def test_categorical_counts_high_cardinality_matches_dict_path(monkeypatch):
+    """
+    Vérifie que le codage vectorisé (beaucoup de modalités distinctes) donne les mêmes comptes que le dictionnaire.
+    """
+    rng = np.random.default_rng(0)
+    values = [f"v{i}" for i in rng.integers(0, 500, size=5000)] + [None, np.nan, 7, "7"]
+    s = pd.Series(values, dtype=object)
+    for labels in (["v1", "v2", "7", "__MISSING__"], ["v1", "v3", "__OTHER__"]):
+        table = label_code_table(labels)
+        vectorized = categorical_counts(s, table)
+        monkeypatch.setattr(drift_mod, "DICT_LOOKUP_MAX_KEYS", 10**9)
+        assert vectorized.tolist() == categorical_counts(s, table).tolist()
+        monkeypatch.undo()
+
+
+def test_drift_reference_counts_are_additive_and_match_table():
+    """
+    Vérifie que les comptes de DriftReference s'additionnent d'un lot à l'autre et donnent le même PSI
+    que compute_drift_table sur l'ensemble des lots.
+    """
+    ref_rows = [
+        {
+            "feature": "num",
+            "kind": "numeric",
+            "bins_json": {"edges": [0, 1, 2, 3, 4]},
+            "ref_dist_json": {"labels": ["a", "b", "c", "d"], "p": [0.25, 0.25, 0.25, 0.25]},
+        },
+        {
+            "feature": "cat",
+            "kind": "categorical",
+            "bins_json": None,
+            "ref_dist_json": {"labels": ["A", "__MISSING__", "__OTHER__"], "p": [0.6, 0.2, 0.2]},
+        },
+    ]
+    prod = pd.DataFrame({"num": [0.5, 1.5, 1.7, 3.5, np.nan, 9.0], "cat": ["A", "A", None, "Z", "A", "B"]})
+    engine = DriftReference(ref_rows)
+
+    counts = engine.counts(prod.iloc[:3]) + engine.counts(prod.iloc[3:])
+    assert counts.tolist() == engine.counts(prod).tolist()
+    assert counts[1].tolist() == [3, 1, 2, 0, 0]  # Z et B -> __OTHER__
+
+    psi = dict(zip(engine.features, engine.psi(counts)))
+    table = compute_drift_table(prod_inputs=prod, ref_rows=ref_rows, excluded_features=set())
+    for feat, value in zip(table["feature"], table["psi"]):
+        assert np.isclose(value, psi[feat])
+
+
+def test_compute_drift_table_from_rollup_matches_raw_inputs():
+    """
+    Vérifie que le PSI calculé depuis les compteurs (feature, bin, n) est celui des inputs bruts correspondants.
+    """
+    ref_rows = [
+        {"feature": "num", "kind": "numeric", "bins_json": {"edges": [0, 1, 2]},
+         "ref_dist_json": {"labels": ["a", "b"], "p": [0.5, 0.5]}},
+        {"feature": "cat", "kind": "categorical", "bins_json": None,
+         "ref_dist_json": {"labels": ["A", "B"], "p": [0.9, 0.1]}},
+    ]
+    prod = pd.DataFrame({"num": [0.5, 1.5, 1.7, 5.0], "cat": ["A", "B", "B", "Z"]})
+    rollup = pd.DataFrame(
+        {"feature": ["num", "num", "num", "cat", "cat", "cat"], "bin": [0, 1, -1, 0, 1, -1], "n": [1, 2, 1, 1, 2, 1]}
+    )
+
+    raw = compute_drift_table(prod_inputs=prod, ref_rows=ref_rows, excluded_features=set())
+    agg = compute_drift_table_from_rollup(rollup=rollup, ref_rows=ref_rows, excluded_features=set())
+
+    assert agg["feature"].tolist() == raw["feature"].tolist()
+    assert np.allclose(agg["psi"], raw["psi"])
+
+
+def test_absent_features_are_missing_in_table_and_rollup():
+    """
+    Vérifie qu'une colonne absente du lot est comptée manquante pour chaque requête, comme une feature absente
+    des compteurs, et qu'une feature sans aucune valeur comptée n'a pas de PSI (des deux côtés).
+    """
+    ref_rows = [
+        {"feature": "num", "kind": "numeric", "bins_json": {"edges": [0, 1, 2]},
+         "ref_dist_json": {"labels": ["a", "b"], "p": [0.5, 0.5]}},
+        {"feature": "cat", "kind": "categorical", "bins_json": None,
+         "ref_dist_json": {"labels": ["A", "__MISSING__"], "p": [0.9, 0.1]}},
+        {"feature": "gone", "kind": "numeric", "bins_json": {"edges": [0, 1]},
+         "ref_dist_json": {"labels": ["a"], "p": [1.0]}},
+    ]
+    prod = pd.DataFrame({"num": [0.5, 1.5, np.nan]})
+    rollup = pd.DataFrame(
+        {"feature": ["num", "num", "num", "cat", "gone"], "bin": [0, 1, -1, 1, -1], "n": [1, 1, 1, 3, 3]}
+    )
+    engine = DriftReference(ref_rows)
+
+    counts = engine.counts(prod)
+    assert counts.tolist() == engine.counts_from_rollup(rollup).tolist()
+    assert counts[1].tolist() == [0, 3, 0]
+    assert counts[2].tolist() == [0, 0, 3]
+    assert engine.observed(counts) == {"num", "cat"}
+
+    raw = compute_drift_table(prod_inputs=prod, ref_rows=ref_rows, excluded_features=set())
+    agg = compute_drift_table_from_rollup(rollup=rollup, ref_rows=ref_rows, excluded_features=set())
+    assert sorted(raw["feature"]) == sorted(agg["feature"]) == ["cat", "num"]
+    assert np.allclose(raw.sort_values("feature")["psi"], agg.sort_values("feature")["psi"])
+
+
+def test_drift_reference_notes_unscorable_refs():
+    """
+    Vérifie que les références inexploitables sont écartées du moteur avec un motif.
+    """
+    ref_rows = [
+        {"feature": "bad_num", "kind": "numeric", "bins_json": {"edges": [0, 1, 2]},
+         "ref_dist_json": {"labels": ["a"], "p": [1.0]}},
+        {"feature": "bad_cat", "kind": "categorical", "bins_json": None, "ref_dist_json": {"labels": [], "p": []}},
+        {"feature": "empty", "kind": "numeric", "bins_json": {"edges": []},
+         "ref_dist_json": {"labels": ["__EMPTY__"], "p": [1.0]}},
+        {"feature": "const", "kind": "numeric", "bins_json": {"edges": [5.0, 5.0]},
+         "ref_dist_json": {"labels": ["[5,5]"], "p": [1.0]}},
+    ]
+    engine = DriftReference(ref_rows)
+    assert engine.notes == {"bad_num": "bad_ref_bins", "bad_cat": "bad_ref_labels", "empty": "empty_ref"}
+    assert engine.features == ["const"]
+    counts = engine.counts(pd.DataFrame({"const": [5.0, 5.0, 6.0]}))
+    assert counts.tolist() == [[2, 1]]
+    assert engine.psi(counts)[0] == pytest.approx(0.0)
+
+
+def test_psi_series_rolling_window_matches_direct_window():
+    """
+    Vérifie que le PSI glissant (sommes cumulées) est celui des comptes sommés directement sur chaque fenêtre,
+    et qu'une période sans trafic, comblée par des zéros, donne NaN.
+    """
+    ref_rows = [
+        {"feature": "num", "kind": "numeric", "bins_json": {"edges": [0, 1, 2]},
+         "ref_dist_json": {"labels": ["a", "b"], "p": [0.5, 0.5]}},
+    ]
+    rollup = pd.DataFrame(
+        {
+            "bucket": pd.to_datetime(["2026-01-01", "2026-01-01", "2026-01-02", "2026-01-04"], utc=True),
+            "feature": ["num"] * 4,
+            "bin": [0, 1, 0, 1],
+            "n": [3, 1, 2, 5],
+        }
+    )
+    engine = DriftReference(ref_rows)
+    buckets, counts_t = engine.counts_series_from_rollup(rollup, freq="D")
+    assert len(buckets) == 4 and counts_t[2].sum() == 0
+
+    psi = engine.psi_series(counts_t, window=2)
+    for t in range(4):
+        direct = counts_t[max(0, t - 1) : t + 1].sum(axis=0)
+        assert psi[t, 0] == pytest.approx(engine.psi(direct)[0])
+    assert np.isnan(engine.psi_series(counts_t, window=1)[2, 0])
+
+    table = compute_psi_series_from_rollup(
+        rollup=rollup, ref_rows=ref_rows, excluded_features=set(), period="day", window=2
+    )
+    assert list(table.columns) == ["bucket", "feature", "psi", "type"]
+    assert np.allclose(table["psi"], psi[:, 0])
+
+
 # -----------------------
 # CONSTANTS / SECURITY / FILTERS
 # -----------------------
@@ -231,4 +426,94 @@ def test_apply_time_filter_24h_filters():
     now = pd.Timestamp.now()
     df = pd.DataFrame({"ts": [now - pd.Timedelta(hours=1), now - pd.Timedelta(days=3)]})
     out = apply_time_filter(df, "24h")
-    assert len(out) == 1
\ No newline at end of file
+    assert len(out) == 1
+
+
+def _rollup_from_values(metric, values):
+    """Construit des agrégats (metric, key, n, total) à partir de durées brutes."""
+    df = pd.DataFrame({"v": values})
+    df["key"] = [str(latency_bin(v)) for v in values]
+    g = df.groupby("key")["v"].agg(["count", "sum"]).reset_index()
+    return pd.DataFrame({"metric": metric, "key": g["key"], "n": g["count"], "total": g["sum"]})
+
+
+def test_latency_stats_from_rollup_close_to_exact():
+    """
+    Vérifie que les percentiles issus de l'histogramme restent proches des percentiles exacts et que la moyenne est exacte.
+    """
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(mean=2.0, sigma=0.8, size=5000)
+    rollup = _rollup_from_values("latency_ms", values)
+
+    approx = latency_stats_from_rollup(rollup, "latency_ms")
+    exact = latency_stats_ms(pd.Series(values))
+
+    for k in ["p50", "p95", "p99"]:
+        assert abs(approx[k] - exact[k]) / exact[k] < 0.2
+    assert approx["mean"] == pytest.approx(exact["mean"])
+
+
+def test_latency_bins_matches_scalar_binning():
+    """
+    Vérifie que la version vectorisée donne les mêmes bins que latency_bin (NaN et valeurs nulles -> bin 0).
+    """
+    values = np.array([0.0, 0.005, 0.01, 0.0119, 1.0, 12.5, 250.0, 1e9])
+    assert latency_bins(values).tolist() == [latency_bin(v) for v in values]
+    assert latency_bins([float("nan")]).tolist() == [0]
+
+
+def test_latency_stats_from_rollup_empty():
+    """
+    Vérifie que latency_stats_from_rollup retourne des zéros sans données.
+    """
+    empty = pd.DataFrame(columns=["metric", "key", "n", "total"])
+    assert latency_stats_from_rollup(empty) == {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+
+
+def test_rollup_counts_and_rates():
+    """
+    Vérifie l'extraction des comptes par code HTTP et les taux succès/erreur associés.
+    """
+    rollup = pd.DataFrame(
+        {
+            "metric": ["status", "status", "status", "decision"],
+            "key": ["200", "422", "500", "ACCEPTED"],
+            "n": [6, 2, 2, 6],
+            "total": [0.0, 0.0, 0.0, 0.0],
+        }
+    )
+    counts = rollup_counts(rollup, "status")
+    assert counts.to_dict() == {"200": 6, "422": 2, "500": 2}
+    assert success_rate_from_counts(counts) == pytest.approx(60.0)
+    assert error_rate_from_counts(counts) == pytest.approx(40.0)
+    assert rollup_counts(rollup, "decision").to_dict() == {"ACCEPTED": 6}
+
+
+def test_compute_timing_stats_from_rollup():
+    """
+    Vérifie que compute_timing_stats_from_rollup retourne les 4 étapes dès qu'un timing est présent.
+    """
+    rollup = _rollup_from_values("db_ms", [1.0, 2.0, 3.0])
+    out = compute_timing_stats_from_rollup(rollup)
+    assert set(out) == {"db_ms", "validation_ms", "inference_ms", "total_ms"}
+    assert out["db_ms"]["mean"] == pytest.approx(2.0)
+    assert out["total_ms"]["p95"] == 0.0
+    assert compute_timing_stats_from_rollup(pd.DataFrame()) == {}
+
+
+def test_time_window_start():
+    """
+    Vérifie que time_window_start retourne None pour 'all' et la bonne date de début sinon.
+    """
+    now = pd.Timestamp("2024-01-08T00:00:00Z").to_pydatetime()
+    assert time_window_start("all", now=now) is None
+    assert time_window_start("7d", now=now) == pd.Timestamp("2024-01-01T00:00:00Z").to_pydatetime()
+
+
+def test_drift_window_start_aligns_to_hour():
+    """
+    Vérifie que la fenêtre de drift part de l'heure pleine, comme les compteurs horaires.
+    """
+    now = pd.Timestamp("2024-01-02T10:42:17Z").to_pydatetime()
+    assert drift_window_start("all", now=now) is None
+    assert drift_window_start("24h", now=now) == pd.Timestamp("2024-01-01T10:00:00Z").to_pydatetime()
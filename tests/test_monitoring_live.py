@@ -0,0 +1,98 @@
+"""
+Tests unitaires pour le module live du monitoring (agrégats en mémoire des nouvelles requêtes).
+"""
+import numpy as np
+import pandas as pd
+
+from monitoring.lib.live import LiveTail, rollup_increments
+from monitoring.lib.ops import latency_stats_from_rollup, rollup_counts
+
+
+def _logs(ids, status, latency, decision):
+    """
+    Logs exportés factices (colonnes de export_prod_frame avec outputs).
+    """
+    return pd.DataFrame({
+        "id": ids,
+        "ts": pd.Timestamp.now(tz="UTC"),
+        "status_code": status,
+        "latency_ms": latency,
+        "decision": decision,
+        "inference_ms": 2.0,
+    })
+
+
+def test_rollup_increments_matches_rollup_keys():
+    """
+    Vérifie les incréments : comptes par code HTTP et décision, bins de latence avec somme des durées.
+    """
+    inc = rollup_increments(_logs([1, 2, 3], [200, 200, 422], [10.0, 10.0, np.nan], ["ACCEPTED", "REFUSED", None]))
+
+    assert rollup_counts(inc, "status").to_dict() == {"200": 2, "422": 1}
+    assert rollup_counts(inc, "decision").to_dict() == {"ACCEPTED": 1, "REFUSED": 1}
+    lat = inc[inc["metric"] == "latency_ms"]
+    assert lat["n"].tolist() == [2] and lat["total"].tolist() == [20.0]
+
+
+def test_live_tail_starts_at_last_id_and_accumulates():
+    """
+    Vérifie que le live démarre au dernier id loggé, ne lit ensuite (sans recouvrement) que les id > curseur
+    et cumule les agrégats.
+    """
+    calls = []
+    batches = [_logs([11, 12], [200, 500], [5.0, 50.0], ["ACCEPTED", None]), _logs([13], [200], [5.0], ["REFUSED"])]
+
+    def fetch(**kw):
+        calls.append(kw["after_id"])
+        return batches.pop(0) if batches else pd.DataFrame()
+
+    tail = LiveTail("/predict", fetch=fetch, last_id=lambda endpoint: 10, overlap_ids=0)
+
+    assert tail.poll() == 0 and tail.cursor == 10
+    assert tail.poll() == 2 and tail.poll() == 1 and tail.poll() == 0
+    assert calls == [10, 12, 13]
+    assert tail.cursor == 13 and tail.n_requests == 3
+
+    rollup = tail.rollup()
+    assert rollup_counts(rollup, "status").to_dict() == {"200": 2, "500": 1}
+    assert latency_stats_from_rollup(rollup)["mean"] == 20.0
+    assert tail.throughput()["n"].sum() == 3
+
+
+def test_live_tail_overlap_catches_late_commits_once():
+    """
+    Vérifie que le recouvrement agrège une requête validée après une requête d'id supérieur (12 visible après 13),
+    une seule fois, sans relire les requêtes antérieures au démarrage.
+    """
+    calls = []
+    batches = [
+        _logs([11, 13], [200, 200], [5.0, 5.0], ["ACCEPTED", "ACCEPTED"]),
+        _logs([12, 13, 14], [500, 200, 200], [5.0, 5.0, 5.0], [None, None, None]),
+        _logs([13, 14], [200, 200], [5.0, 5.0], [None, None]),
+    ]
+
+    def fetch(**kw):
+        calls.append(kw["after_id"])
+        return batches.pop(0)
+
+    tail = LiveTail("/predict", fetch=fetch, last_id=lambda endpoint: 10, overlap_ids=2)
+
+    assert tail.poll() == 0
+    assert [tail.poll(), tail.poll(), tail.poll()] == [2, 2, 0]
+    assert calls == [10, 11, 12]
+    assert tail.n_requests == 4 and tail.cursor == 14
+    assert rollup_counts(tail.rollup(), "status").to_dict() == {"200": 3, "500": 1}
+    assert not tail.truncated
+
+
+def test_live_tail_flags_truncated_backlog():
+    """
+    Vérifie que `truncated` signale un rafraîchissement limité à max_rows ayant pu écarter des requêtes récentes.
+    """
+    batches = [_logs([30, 31], [200, 200], [5.0, 5.0], ["ACCEPTED", "ACCEPTED"]),
+               _logs([31, 32], [200, 200], [5.0, 5.0], ["ACCEPTED", "ACCEPTED"])]
+    tail = LiveTail("/predict", fetch=lambda **kw: batches.pop(0), last_id=lambda endpoint: 10, max_rows=2)
+
+    tail.poll()
+    assert tail.poll() == 2 and tail.truncated
+    assert tail.poll() == 1
@@ -0,0 +1,101 @@
+"""
+Test de parité des distributions de référence calculées dans Postgres (scripts/02_build_reference_dist.py
+--from-db) avec le calcul pandas, sur des valeurs JSON de types mélangés (chaînes, nombres, booléens, null,
+clés absentes). Le test en base nécessite PostgreSQL (DATABASE_URL, job CI 'db-parity') ; ignoré sinon.
+Tout est fait dans une transaction annulée : features_store est masquée par une table temporaire.
+"""
+import importlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.db.conn import _MIGRATIONS_DIR
+
+build = importlib.import_module("scripts.02_build_reference_dist")
+
+psycopg = pytest.importorskip("psycopg")
+requires_db = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL non définie")
+
+
+def _rows(n=60, seed=0):
+    """
+    Lignes features_store : NUM numérique (avec null / absents), CAT de types mélangés (dont des nombres
+    écrits en notation scientifique par Python), FLAG booléen avec null (colonne object pour pandas),
+    BOOL booléen sur toutes les lignes (colonne bool).
+    """
+    rng = np.random.default_rng(seed)
+    modalities = ["A", "B", 1, 1.5, 1e20, 1.5e-7, True, False, None]
+    rows = []
+    for i in range(n):
+        data = {"NUM": None if i % 9 == 0 else float(rng.normal(10.0, 3.0))}
+        if i % 7:
+            data["CAT"] = modalities[int(rng.integers(len(modalities)))]
+        data["FLAG"] = None if i % 5 == 0 else bool(i % 2)
+        data["BOOL"] = bool(i % 3)
+        rows.append(data)
+    return rows
+
+
+def test_json_kind_matches_pandas_inference():
+    """
+    Vérifie que le type déduit des comptes par type JSON (profil SQL) est celui qu'infère pandas
+    sur les valeurs décodées (infer_kind).
+    """
+    cases = [
+        [1.5, None, 2],
+        [True, False],
+        [True, None],
+        [True, 1],
+        ["A", 1],
+        [None, None],
+    ]
+    for values in cases:
+        rows = [{} if v is None and i % 2 else {"X": v} for i, v in enumerate(values)]
+        counts = {
+            "n_num": sum(isinstance(v, (int, float)) for v in values),
+            "n_str": sum(isinstance(v, str) for v in values),
+            "n_bool": sum(isinstance(v, bool) for v in values),
+        }
+        expected = build.infer_kind(pd.DataFrame(rows, columns=["X"])["X"])
+        assert build.json_kind(n_rows=len(values), **counts) == expected, values
+
+
+@requires_db
+def test_db_ref_dists_match_pandas_on_mixed_json():
+    """
+    Vérifie que les types, libellés (booléens 'True' / 'False', nombres), manquants et probabilités calculés
+    dans Postgres sont ceux de pandas (infer_kind, astype(str)) sur les mêmes valeurs décodées.
+    """
+    rows = _rows()
+    frame = pd.DataFrame(rows)
+    columns = ["NUM", "CAT", "FLAG", "BOOL"]
+    expected = []
+    for col in columns:
+        kind = build.infer_kind(frame[col])
+        if kind == "numeric":
+            bins_json, dist_json, n = build.numeric_ref_dist(frame[col], 5)
+        else:
+            bins_json, dist_json, n = build.categorical_ref_dist(frame[col], 10)
+        expected.append({"feature": col, "kind": kind, "bins_json": bins_json, "ref_dist_json": dist_json, "n_ref": n})
+
+    with psycopg.connect(os.environ["DATABASE_URL"]) as conn:
+        try:
+            for migration in sorted(_MIGRATIONS_DIR.glob("*_json_label*.sql")):
+                conn.execute(migration.read_text(encoding="utf-8"))
+            conn.execute("CREATE TEMP TABLE features_store (sk_id_curr BIGINT, data JSONB) ON COMMIT DROP")
+            with conn.cursor() as cur:
+                cur.executemany(
+                    "INSERT INTO features_store (sk_id_curr, data) VALUES (%s, %s::jsonb)",
+                    [(i, json.dumps(r)) for i, r in enumerate(rows)],
+                )
+            got = build.db_ref_dists(conn, columns, bins=5, topk=10)
+        finally:
+            conn.rollback()
+
+    assert build.compare_ref_dists(got, expected) == []
+    assert [d["kind"] for d in got] == ["numeric", "categorical", "categorical", "numeric"]
+    labels = set(got[1]["ref_dist_json"]["labels"])
+    assert {"True", "False", "1", "1.5", "1e+20", "1.5e-07", "__MISSING__"} <= labels
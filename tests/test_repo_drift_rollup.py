@@ -0,0 +1,300 @@
+"""
+Tests unitaires pour le module repo_drift_rollup (compteurs de drift par heure).
+Vérifie le binning à la volée (identique au moteur PSI), le tampon, son écriture par lots et la relecture.
+"""
+import json
+from datetime import datetime, timezone
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import core.db.repo_drift_rollup as repo
+from monitoring.lib.drift import DriftReference
+
+REF_ROWS = [
+    {
+        "feature": "num",
+        "kind": "numeric",
+        "bins_json": {"edges": [0, 1, 2, 3]},
+        "ref_dist_json": {"labels": ["a", "b", "c"], "p": [0.3, 0.4, 0.3]},
+    },
+    {
+        "feature": "cat",
+        "kind": "categorical",
+        "bins_json": None,
+        "ref_dist_json": {"labels": ["A", "__MISSING__", "__OTHER__"], "p": [0.6, 0.2, 0.2]},
+    },
+    {
+        "feature": "strict",
+        "kind": "categorical",
+        "bins_json": None,
+        "ref_dist_json": {"labels": ["X", "Y"], "p": [0.5, 0.5]},
+    },
+]
+
+
+@pytest.fixture(autouse=True)
+def _reset_state(monkeypatch):
+    """
+    Tampon vide, aucun binner chargé, pas de thread de fond pendant les tests.
+    """
+    monkeypatch.setattr(repo, "_BUFFER", {})
+    monkeypatch.setattr(repo, "_STATE", {"binner": None, "loaded_at": float("-inf"), "load_failed": False})
+    monkeypatch.setattr(repo, "register_task", Mock())
+
+
+def test_bin_payload_matches_drift_engine():
+    """
+    Vérifie que les bins calculés requête par requête (clés absentes comprises) reconstituent exactement
+    les comptes du moteur PSI.
+    """
+    payloads = [
+        {"num": 0.0, "cat": "A", "strict": "X"},
+        {"num": 1.5, "cat": None, "strict": "Z"},
+        {"num": 3.0, "cat": "B", "strict": "Y"},
+        {"num": 7.0, "cat": "A", "strict": None},
+        {"num": None, "cat": float("nan"), "strict": "X"},
+        {"num": "abc", "cat": 1, "strict": "X"},
+        {"num": 2.5},
+        {"cat": "A", "strict": "Y"},
+    ]
+    binner = repo.DriftBinner(REF_ROWS)
+    counters = {}
+    for payload in payloads:
+        for feat, b in zip(*binner.bin_payload(payload)):
+            counters[(feat, b)] = counters.get((feat, b), 0) + 1
+    rollup = pd.DataFrame([{"feature": f, "bin": b, "n": n} for (f, b), n in counters.items()])
+
+    engine = DriftReference(REF_ROWS)
+    expected = engine.counts(pd.DataFrame(payloads))
+    assert engine.counts_from_rollup(rollup).tolist() == expected.tolist()
+
+
+def test_bin_payload_overflow_and_skipped_refs():
+    """
+    Vérifie le bin -1 (hors bornes, inconnue sans __OTHER__), les features absentes du payload comptées
+    manquantes et l'absence des références inexploitables.
+    """
+    refs = REF_ROWS + [{"feature": "bad", "kind": "numeric", "bins_json": {"edges": [0]},
+                        "ref_dist_json": {"labels": ["a", "b"], "p": [0.5, 0.5]}}]
+    features, bins = repo.DriftBinner(refs).bin_payload({"num": -1.0, "strict": "Z", "bad": 1.0})
+    assert features == ["num", "cat", "strict"]
+    assert bins == [repo.OVERFLOW_BIN, 1, repo.OVERFLOW_BIN]
+
+
+def test_ref_version_changes_with_edges():
+    """
+    Vérifie que la version de référence ne dépend pas de l'ordre des lignes mais change avec les bornes.
+    """
+    v = repo.ref_version(REF_ROWS)
+    assert repo.ref_version(list(reversed(REF_ROWS))) == v
+    changed = [dict(REF_ROWS[0], bins_json={"edges": [0, 1, 2, 4]})] + REF_ROWS[1:]
+    assert repo.ref_version(changed) != v
+
+
+def test_record_drift_counts_buffers_successful_requests(monkeypatch):
+    """
+    Vérifie que seules les requêtes 200 avec inputs incrémentent le tampon, par heure.
+    """
+    monkeypatch.setattr(repo, "load_all_ref", lambda: REF_ROWS)
+    repo.reload_drift_binner()
+    ts = datetime(2026, 1, 2, 10, 42, tzinfo=timezone.utc)
+
+    repo.record_drift_counts({"endpoint": "/predict", "status_code": 200, "inputs": {"num": 0.5}}, ts=ts)
+    repo.record_drift_counts({"endpoint": "/predict", "status_code": 200, "inputs": {"num": 0.7}}, ts=ts)
+    repo.record_drift_counts({"endpoint": "/predict", "status_code": 404, "inputs": {"num": 0.7}}, ts=ts)
+
+    bucket, version = datetime(2026, 1, 2, 10, tzinfo=timezone.utc), repo.ref_version(REF_ROWS)
+    assert repo._BUFFER == {
+        (bucket, "/predict", version, "num", 0): 2,
+        (bucket, "/predict", version, "cat", 1): 2,
+        (bucket, "/predict", version, "strict", repo.OVERFLOW_BIN): 2,
+    }
+
+
+def test_record_drift_counts_disabled(monkeypatch):
+    """
+    Vérifie que DRIFT_COUNTERS=0 désactive les compteurs (aucune lecture de la référence).
+    """
+    monkeypatch.setenv("DRIFT_COUNTERS", "0")
+    load = Mock(return_value=REF_ROWS)
+    monkeypatch.setattr(repo, "load_all_ref", load)
+
+    repo.record_drift_counts({"endpoint": "/predict", "status_code": 200, "inputs": {"num": 0.5}})
+
+    assert repo._BUFFER == {}
+    load.assert_not_called()
+
+
+def test_record_drift_counts_never_reads_the_database(monkeypatch):
+    """
+    Vérifie que le chemin des requêtes ne recharge pas les références ni n'écrit le tampon :
+    il enregistre les tâches de fond et ne compte rien tant qu'aucun binner n'est chargé.
+    """
+    load = Mock(return_value=REF_ROWS)
+    monkeypatch.setattr(repo, "load_all_ref", load)
+    monkeypatch.setattr(repo, "get_conn", Mock(side_effect=AssertionError("accès base")))
+
+    repo.record_drift_counts({"endpoint": "/predict", "status_code": 200, "inputs": {"num": 0.5}})
+
+    load.assert_not_called()
+    assert repo._BUFFER == {}
+    names = [c.args[0] for c in repo.register_task.call_args_list]
+    assert names == ["drift_ref_reload", "drift_flush"]
+
+
+def test_reload_drift_binner_failure_keeps_binner_and_backs_off(monkeypatch):
+    """
+    Vérifie qu'un rechargement en échec conserve le binner précédent et raccourcit le délai avant
+    le prochain essai (DRIFT_REF_RETRY_S), puis revient au TTL après un succès.
+    """
+    monkeypatch.setenv("DRIFT_REF_TTL_S", "300")
+    monkeypatch.setenv("DRIFT_REF_RETRY_S", "20")
+    monkeypatch.setattr(repo, "load_all_ref", lambda: REF_ROWS)
+    binner = repo.reload_drift_binner()
+    assert repo._reload_interval_s() == 300.0
+
+    monkeypatch.setattr(repo, "load_all_ref", Mock(side_effect=RuntimeError("db down")))
+    with pytest.raises(RuntimeError):
+        repo.reload_drift_binner()
+    assert repo._STATE["binner"] is binner
+    assert repo._reload_interval_s() == 20.0
+
+
+def test_flush_drift_counts_writes_arrays():
+    """
+    Vérifie que le tampon est écrit en une requête (tableaux alignés) puis vidé.
+    """
+    bucket = datetime(2026, 1, 2, 10, tzinfo=timezone.utc)
+    repo._BUFFER[(bucket, "/predict", "v1", "num", 0)] = 3
+    repo._BUFFER[(bucket, "/predict", "v1", "cat", -1)] = 1
+    conn = Mock()
+
+    assert repo.flush_drift_counts(conn=conn) == 2
+
+    _, params = conn.execute.call_args[0]
+    assert params["features"] == ["num", "cat"]
+    assert params["bins"] == [0, -1]
+    assert params["counts"] == [3, 1]
+    assert repo._BUFFER == {}
+
+
+def test_flush_drift_counts_restores_buffer_on_error():
+    """
+    Vérifie qu'une erreur d'écriture remet les compteurs dans le tampon.
+    """
+    key = (datetime(2026, 1, 2, 10, tzinfo=timezone.utc), "/predict", "v1", "num", 0)
+    repo._BUFFER[key] = 3
+    conn = Mock()
+    conn.execute.side_effect = RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        repo.flush_drift_counts(conn=conn)
+    assert repo._BUFFER == {key: 3}
+
+
+def test_select_drift_rollup_maps_rows(monkeypatch):
+    """
+    Vérifie que select_drift_rollup filtre sur la version de référence et mappe les lignes SQL.
+    """
+    fake_conn = Mock()
+    fake_cur = Mock()
+    fake_cur.fetchall.return_value = [("num", 0, 5), ("cat", -1, np.int64(2))]
+    fake_conn.execute.return_value = fake_cur
+    monkeypatch.setattr(repo, "execute_read", fake_conn.execute)
+
+    out = repo.select_drift_rollup("v1", endpoint="/predict")
+
+    assert out == [{"feature": "num", "bin": 0, "n": 5}, {"feature": "cat", "bin": -1, "n": 2}]
+    _, params = fake_conn.execute.call_args[0]
+    assert params["ref_version"] == "v1"
+    assert params["since"] is None
+
+
+@pytest.mark.parametrize(
+    "row, expected",
+    [
+        ((None, None), False),
+        ((datetime(2026, 1, 2, 10, tzinfo=timezone.utc), None), True),
+        ((datetime(2026, 1, 2, 10, tzinfo=timezone.utc), datetime(2026, 1, 2, 10, tzinfo=timezone.utc)), True),
+        ((datetime(2026, 1, 2, 11, tzinfo=timezone.utc), datetime(2026, 1, 2, 10, tzinfo=timezone.utc)), False),
+    ],
+)
+def test_drift_rollup_covers_compares_first_bucket_and_first_log(monkeypatch, row, expected):
+    """
+    Vérifie que les compteurs ne couvrent la fenêtre que s'ils précèdent (à l'heure près) la première requête loggée.
+    """
+    fake_cur = Mock()
+    fake_cur.fetchone.return_value = row
+    execute = Mock(return_value=fake_cur)
+    monkeypatch.setattr(repo, "execute_read", execute)
+
+    assert repo.drift_rollup_covers("v1", endpoint="/predict") is expected
+    _, params = execute.call_args[0]
+    assert params == {"ref_version": "v1", "endpoint": "/predict", "since": None}
+
+
+def test_drift_rollup_covers_without_db(monkeypatch):
+    """
+    Vérifie que sans base les compteurs sont considérés comme absents.
+    """
+    monkeypatch.setattr(repo, "execute_read", lambda *a, **kw: None)
+    assert repo.drift_rollup_covers("v1") is False
+
+
+def test_select_prod_drift_bins_payload(monkeypatch):
+    """
+    Vérifie les références envoyées à Postgres (bornes négées triées, libellés, bin des inconnues)
+    et le mapping des comptes renvoyés.
+    """
+    fake_conn = Mock()
+    fake_cur = Mock()
+    fake_cur.fetchall.return_value = [("num", 1, 7, None), ("strict", -1, 2, None)]
+    fake_conn.execute.return_value = fake_cur
+    monkeypatch.setattr(repo, "execute_read", fake_conn.execute)
+
+    out = repo.select_prod_drift_bins(REF_ROWS, endpoint="/predict", limit=100)
+
+    assert out == [{"feature": "num", "bin": 1, "n": 7}, {"feature": "strict", "bin": -1, "n": 2}]
+    sql, params = fake_conn.execute.call_args[0]
+    assert "width_bucket" in sql
+    assert params["limit"] == 100 and params["offset"] == 99
+    refs = {r["feature"]: r for r in json.loads(params["refs"])}
+    assert refs["num"]["neg_edges"] == [-3.0, -2.0, -1.0, 0.0]
+    assert refs["num"]["lo"] == 0.0 and refs["num"]["n_bins"] == 3
+    assert refs["cat"]["unknown_bin"] == 2
+    assert refs["strict"]["unknown_bin"] == repo.OVERFLOW_BIN
+
+
+def test_select_prod_drift_bins_without_usable_ref(monkeypatch):
+    """
+    Vérifie qu'aucune requête n'est envoyée sans référence exploitable.
+    """
+    read = Mock()
+    monkeypatch.setattr(repo, "execute_read", read)
+    empty = [{"feature": "e", "kind": "categorical", "ref_dist_json": {"labels": ["__EMPTY__"], "p": [1.0]}}]
+
+    assert repo.select_prod_drift_bins(empty) == []
+    read.assert_not_called()
+
+
+def test_select_drift_rollup_series_maps_rows(monkeypatch):
+    """
+    Vérifie la période transmise à date_trunc, le mapping des lignes et le refus d'une période inconnue.
+    """
+    bucket = datetime(2026, 1, 2, tzinfo=timezone.utc)
+    fake_conn = Mock()
+    fake_cur = Mock()
+    fake_cur.fetchall.return_value = [(bucket, "num", 0, 5)]
+    fake_conn.execute.return_value = fake_cur
+    monkeypatch.setattr(repo, "execute_read", fake_conn.execute)
+
+    out = repo.select_drift_rollup_series("v1", period="day")
+
+    assert out == [{"bucket": bucket, "feature": "num", "bin": 0, "n": 5}]
+    _, params = fake_conn.execute.call_args[0]
+    assert params["period"] == "day"
+    with pytest.raises(ValueError):
+        repo.select_drift_rollup_series("v1", period="minute")
@@ -0,0 +1,63 @@
+"""
+Tests unitaires pour le module repo_feature_schemas (schémas de features de l'encodage compact des inputs).
+Vérifie l'enregistrement avec cache, la relecture des schémas et la reconstitution des inputs.
+"""
+from unittest.mock import Mock
+
+import core.db.repo_feature_schemas as repo
+
+
+def _reset_cache(monkeypatch):
+    monkeypatch.setattr(repo, "_ID_BY_COLUMNS", {})
+    monkeypatch.setattr(repo, "_COLUMNS_BY_ID", {})
+
+
+def test_register_feature_schema_no_conn(monkeypatch):
+    """
+    Vérifie que register_feature_schema retourne None si la connexion à la base est absente.
+    """
+    _reset_cache(monkeypatch)
+    monkeypatch.setattr(repo, "get_conn", lambda: None)
+    assert repo.register_feature_schema(["A", "B"]) is None
+
+
+def test_register_feature_schema_is_cached(monkeypatch):
+    """
+    Vérifie qu'un schéma n'est enregistré en base qu'une fois par process.
+    """
+    _reset_cache(monkeypatch)
+    fake_conn = Mock()
+    fake_conn.execute.return_value.fetchone.return_value = (5,)
+    monkeypatch.setattr(repo, "get_conn", lambda: fake_conn)
+
+    assert repo.register_feature_schema(["A", "B"]) == 5
+    assert repo.register_feature_schema(["A", "B"]) == 5
+    fake_conn.execute.assert_called_once()
+
+    _, params = fake_conn.execute.call_args[0]
+    assert params["columns_hash"] == repo.columns_hash(["A", "B"])
+    assert params["columns"].obj == ["A", "B"]
+    assert repo.columns_hash(["B", "A"]) != params["columns_hash"]
+
+
+def test_get_feature_schemas_reads_missing_once(monkeypatch):
+    """
+    Vérifie que get_feature_schemas ne relit en base que les identifiants absents du cache.
+    """
+    _reset_cache(monkeypatch)
+    fake_conn = Mock()
+    fake_conn.execute.return_value.fetchall.return_value = [(1, ["A", "B"])]
+    monkeypatch.setattr(repo, "execute_read", fake_conn.execute)
+    monkeypatch.setattr(repo, "get_conn", lambda: None)
+
+    assert repo.get_feature_schemas([1]) == {1: ["A", "B"]}
+    assert repo.get_feature_schemas([1, None]) == {1: ["A", "B"]}
+    fake_conn.execute.assert_called_once()
+
+
+def test_inputs_from_values():
+    """
+    Vérifie la reconstitution du dictionnaire d'inputs à partir du schéma et des valeurs.
+    """
+    assert repo.inputs_from_values(["A", "B"], [1, None]) == {"A": 1, "B": None}
+    assert repo.inputs_from_values(None, [1]) == {}
@@ -11,7 +11,7 @@ def test_get_features_by_id_returns_none_if_no_conn(monkeypatch):
     """
     Vérifie que get_features_by_id retourne None si la connexion à la base est absente.
     """
-    monkeypatch.setattr(repo_fs, "get_conn", lambda: None)
+    monkeypatch.setattr(repo_fs, "execute_read", lambda sql, params=None: None)
     assert repo_fs.get_features_by_id(100001) is None
 
 
@@ -21,7 +21,7 @@ def test_get_features_by_id_returns_none_if_not_found(monkeypatch):
     """
     fake_conn = Mock()
     fake_conn.execute.return_value.fetchone.return_value = None
-    monkeypatch.setattr(repo_fs, "get_conn", lambda: fake_conn)
+    monkeypatch.setattr(repo_fs, "execute_read", fake_conn.execute)
 
     result = repo_fs.get_features_by_id(100001)
 
@@ -37,7 +37,7 @@ def test_get_features_by_id_returns_data(monkeypatch):
 
     fake_conn = Mock()
     fake_conn.execute.return_value.fetchone.return_value = (fake_data,)
-    monkeypatch.setattr(repo_fs, "get_conn", lambda: fake_conn)
+    monkeypatch.setattr(repo_fs, "execute_read", fake_conn.execute)
 
     result = repo_fs.get_features_by_id(100001)
 
@@ -65,4 +65,17 @@ def test_upsert_features_executes(monkeypatch):
     sql, params = fake_conn.execute.call_args[0]
     assert "sk_id_curr" in params
     assert int(params["sk_id_curr"]) == 100001
-    assert "data" in params
\ No newline at end of file
+    assert "data" in params
+    assert params["data_hash"] == repo_fs.features_hash({"A": 1})
+    assert "data_hash" in sql
+
+
+def test_features_hash_is_stable_and_content_based():
+    """
+    Vérifie que l'empreinte ne dépend pas de l'ordre des clés, mais change avec les valeurs.
+    """
+    h = repo_fs.features_hash({"A": 1, "B": None, "C": "x"})
+    assert h == repo_fs.features_hash({"C": "x", "B": None, "A": 1})
+    assert h == repo_fs.features_hash(repo_fs.features_json({"C": "x", "A": 1, "B": None}))
+    assert h != repo_fs.features_hash({"A": 2, "B": None, "C": "x"})
+    assert len(h) == 64
@@ -0,0 +1,199 @@
+"""
+Tests unitaires pour le module repo_ops_rollup (agrégats opérationnels par minute).
+Vérifie les bins de latence (et leur parité avec la fonction SQL), la traduction d'un événement en incréments,
+le tampon, son écriture par lots et la relecture des agrégats.
+"""
+import math
+import re
+from datetime import datetime, timezone
+from decimal import Decimal, getcontext
+from pathlib import Path
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+import core.db.repo_ops_rollup as repo
+
+MIGRATION_004 = Path(repo.__file__).resolve().parent / "migrations" / "004_init_ops_rollup.sql"
+
+
+@pytest.fixture(autouse=True)
+def _reset_buffer(monkeypatch):
+    """
+    Tampon vide et pas de thread de fond pendant les tests.
+    """
+    monkeypatch.setattr(repo, "_BUFFER", {})
+    monkeypatch.setattr(repo, "register_task", lambda *a, **k: None)
+
+
+def _sql_function_constants():
+    """
+    Constantes de la fonction SQL ops_latency_bin (migration 004) : seuil, bins par octave, dernier bin.
+    """
+    sql = MIGRATION_004.read_text(encoding="utf-8")
+    body = re.search(r"FUNCTION ops_latency_bin.*?\$f\$(.*?)\$f\$", sql, re.S).group(1)
+    m = re.search(
+        r"WHEN x < ([0-9.]+) THEN 0\s+ELSE LEAST\(floor\((\d+) \* log\(2\.0, \(x / ([0-9.]+)\)::numeric\)\)"
+        r"::integer \+ 1, (\d+)\)",
+        body,
+    )
+    assert m is not None, "Forme de ops_latency_bin inattendue : mettre à jour ce test et latency_bin ensemble"
+    return float(m.group(1)), int(m.group(2)), float(m.group(3)), int(m.group(4))
+
+
+def _sql_latency_bin(x, threshold, per_octave, base, last):
+    """
+    Transcription de ops_latency_bin : division en double précision, puis log en numeric (Decimal).
+    """
+    if x < threshold:
+        return 0
+    getcontext().prec = 40
+    q = Decimal(repr(x / base))
+    log2 = q.ln() / Decimal(2).ln()
+    return min(math.floor(per_octave * log2) + 1, last)
+
+
+def test_latency_bin_bounds_contain_value():
+    """
+    Vérifie que chaque durée tombe dans les bornes du bin retourné.
+    """
+    for v in [0.02, 0.5, 1.0, 12.34, 250.0, 9999.0]:
+        lo, hi = repo.latency_bin_bounds(repo.latency_bin(v))
+        assert lo <= v < hi
+
+
+def test_latency_bin_edges():
+    """
+    Vérifie les cas limites : valeurs nulles/négatives dans le bin 0, très grandes valeurs dans le dernier bin.
+    """
+    assert repo.latency_bin(0.0) == 0
+    assert repo.latency_bin(-5.0) == 0
+    assert repo.latency_bin(1e9) == repo.LATENCY_HIST_N_BINS - 1
+
+
+def test_latency_bin_matches_sql_function():
+    """
+    Vérifie que la fonction SQL de la migration 004 utilise les mêmes constantes que latency_bin
+    et donne les mêmes bins (centres de bins, valeurs aléatoires, extrêmes).
+    """
+    threshold, per_octave, base, last = _sql_function_constants()
+    assert (threshold, per_octave, base, last) == (
+        repo.LATENCY_HIST_MIN_MS, repo.LATENCY_HIST_BINS_PER_OCTAVE, repo.LATENCY_HIST_MIN_MS,
+        repo.LATENCY_HIST_N_BINS - 1,
+    )
+
+    centers = [repo.LATENCY_HIST_MIN_MS * 2 ** ((i - 0.5) / per_octave) for i in range(1, repo.LATENCY_HIST_N_BINS)]
+    randoms = np.random.default_rng(0).lognormal(2.0, 3.0, size=2000).tolist()
+    for v in centers + randoms + [0.0, 0.005, 1e7]:
+        assert repo.latency_bin(v) == _sql_latency_bin(v, threshold, per_octave, base, last), v
+
+
+def test_rollup_entries_from_event():
+    """
+    Vérifie qu'un événement produit un incrément status, decision et un bin par durée présente.
+    """
+    event = {
+        "status_code": 200,
+        "latency_ms": 12.34,
+        "outputs": {"decision": "ACCEPTED", "timing": {"db_ms": 1.0, "inference_ms": 8.0}},
+    }
+    metrics, keys, totals = repo.rollup_entries(event)
+
+    assert metrics == ["status", "decision", "latency_ms", "db_ms", "inference_ms"]
+    assert keys[:2] == ["200", "ACCEPTED"]
+    assert keys[2] == str(repo.latency_bin(12.34))
+    assert totals == [0.0, 0.0, 12.34, 1.0, 8.0]
+
+
+def test_rollup_entries_error_event():
+    """
+    Vérifie qu'un événement d'erreur (sans outputs) ne produit que status et latence.
+    """
+    metrics, keys, _ = repo.rollup_entries({"status_code": 422, "latency_ms": 3.0, "outputs": None})
+    assert metrics == ["status", "latency_ms"]
+    assert keys[0] == "422"
+
+
+def test_rollup_entries_skips_invalid_durations():
+    """
+    Vérifie qu'une durée non numérique ou non finie est ignorée seule (le reste de l'événement est compté).
+    """
+    event = {
+        "status_code": 200,
+        "latency_ms": "12.5",
+        "outputs": {"decision": "ACCEPTED", "timing": {"db_ms": "n/a", "inference_ms": float("inf"), "total_ms": [1]}},
+    }
+    metrics, keys, totals = repo.rollup_entries(event)
+
+    assert metrics == ["status", "decision", "latency_ms"]
+    assert totals == [0.0, 0.0, 12.5]
+
+
+def test_record_ops_rollup_accumulates_per_minute():
+    """
+    Vérifie que les incréments sont additionnés en mémoire par (minute, endpoint, métrique, clé).
+    """
+    ts = datetime(2026, 1, 2, 10, 42, 17, tzinfo=timezone.utc)
+    event = {"endpoint": "/predict", "status_code": 200, "latency_ms": 2.0, "outputs": None}
+
+    repo.record_ops_rollup(event, ts=ts)
+    repo.record_ops_rollup(dict(event, latency_ms=2.1), ts=ts)
+
+    bucket = datetime(2026, 1, 2, 10, 42, tzinfo=timezone.utc)
+    assert repo._BUFFER[(bucket, "/predict", "status", "200")] == [2, 0.0]
+    key = (bucket, "/predict", "latency_ms", str(repo.latency_bin(2.0)))
+    assert repo._BUFFER[key][0] == 2 and repo._BUFFER[key][1] == pytest.approx(4.1)
+
+
+def test_flush_ops_rollup_writes_arrays_and_restores_on_error():
+    """
+    Vérifie l'écriture du tampon en une requête (tableaux alignés), puis la remise en tampon sur erreur.
+    """
+    bucket = datetime(2026, 1, 2, 10, 42, tzinfo=timezone.utc)
+    repo._BUFFER[(bucket, "/predict", "status", "200")] = [3, 0.0]
+    repo._BUFFER[(bucket, "/predict", "latency_ms", "27")] = [2, 4.1]
+    conn = Mock()
+
+    assert repo.flush_ops_rollup(conn=conn) == 2
+    sql, params = conn.execute.call_args[0]
+    assert "ON CONFLICT" in sql
+    assert params["metrics"] == ["status", "latency_ms"]
+    assert params["counts"] == [3, 2]
+    assert params["totals"] == [0.0, 4.1]
+    assert repo._BUFFER == {}
+
+    repo._BUFFER[(bucket, "/predict", "status", "200")] = [1, 0.0]
+    conn.execute.side_effect = RuntimeError("db down")
+    with pytest.raises(RuntimeError):
+        repo.flush_ops_rollup(conn=conn)
+    assert repo._BUFFER == {(bucket, "/predict", "status", "200"): [1, 0.0]}
+
+
+def test_select_ops_rollup_no_conn(monkeypatch):
+    """
+    Vérifie que select_ops_rollup retourne une liste vide si la connexion à la base est absente.
+    """
+    monkeypatch.setattr(repo, "execute_read", lambda sql, params=None: None)
+    assert repo.select_ops_rollup(endpoint="/predict") == []
+
+
+def test_select_ops_rollup_maps_rows(monkeypatch):
+    """
+    Vérifie que select_ops_rollup mappe les lignes SQL en dictionnaires.
+    """
+    fake_conn = Mock()
+    fake_cur = Mock()
+    fake_cur.fetchall.return_value = [("status", "200", 5, None), ("latency_ms", "27", 2, 2.1)]
+    fake_conn.execute.return_value = fake_cur
+    monkeypatch.setattr(repo, "execute_read", fake_conn.execute)
+
+    out = repo.select_ops_rollup(endpoint="/predict")
+
+    assert out == [
+        {"metric": "status", "key": "200", "n": 5, "total": 0.0},
+        {"metric": "latency_ms", "key": "27", "n": 2, "total": 2.1},
+    ]
+    _, params = fake_conn.execute.call_args[0]
+    assert params["endpoint"] == "/predict"
+    assert params["since"] is None
@@ -0,0 +1,87 @@
+"""
+Tests unitaires pour le module repo_prod_export (export COPY TO STDOUT des logs en colonnes typées).
+"""
+import io
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+import core.db.repo_prod_export as repo
+
+
+def _fake_conn(blocks):
+    """
+    Connexion factice : cursor().copy() renvoie le flux CSV par blocs.
+    """
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.copy.return_value.__enter__.return_value = iter(blocks)
+    return conn, cur
+
+
+def test_export_prod_frame_no_conn(monkeypatch):
+    """
+    Vérifie que l'export retourne un DataFrame vide sans base configurée.
+    """
+    monkeypatch.setattr(repo, "get_read_conn", lambda: None)
+    assert repo.export_prod_frame(features=["A"]).empty
+
+
+def test_export_prod_frame_parses_typed_columns(monkeypatch):
+    """
+    Vérifie la lecture du flux CSV en colonnes typées (ts UTC, numériques float64, catégorielles texte),
+    y compris un flux découpé au milieu d'une ligne, et la fenêtre transmise à la requête.
+    """
+    csv = (
+        b'id,ts,status_code,latency_ms,sk_id_curr,in.AMT,in.CODE\n'
+        b'41,1767261600.5,200,12.5,100001,1500.0,M\n'
+        b'42,1767261601,422,\\N,\\N,\\N,\\N\n'
+    )
+    conn, cur = _fake_conn([csv[:50], csv[50:]])
+    monkeypatch.setattr(repo, "get_read_conn", lambda: conn)
+
+    df = repo.export_prod_frame(features=["AMT", "CODE"], categorical={"CODE"}, outputs=False, limit=10, after_id=40)
+
+    assert list(df.columns) == ["id", "ts", "status_code", "latency_ms", "sk_id_curr", "AMT", "CODE"]
+    assert df["id"].tolist() == [41, 42]
+    assert str(df["ts"].dt.tz) == "UTC"
+    assert df["status_code"].tolist() == [200, 422]
+    assert df["AMT"].dtype == "float64" and pd.isna(df["AMT"].iloc[1])
+    assert df["CODE"].iloc[0] == "M" and pd.isna(df["CODE"].iloc[1])
+    assert df["sk_id_curr"].iloc[0] == "100001"
+
+    _, params = cur.copy.call_args[0]
+    assert params["limit"] == 10 and params["offset"] == 9
+    assert params["after_id"] == 40
+
+
+def test_build_export_query_projects_each_value_once():
+    """
+    Vérifie la projection côté serveur : une valeur extraite par champ (JSON ou compact), conversion numérique
+    pour les features non catégorielles, texte pour les catégorielles.
+    """
+    q = repo.build_export_query(["AMT", "CODE"], categorical={"CODE"}, outputs=True).as_string(None)
+
+    assert q.count("p.inputs -> 'AMT'") == 1
+    assert "sp.pos ->> 'AMT'" in q
+    assert "p.outputs #> '{timing,db_ms}'" in q
+    assert '("v"."v' in q and 'AS "in.CODE"' in q
+    assert q.strip().endswith("TO STDOUT WITH (FORMAT csv, HEADER true, NULL '\\N')")
+
+
+
+def test_frame_from_export_csv_only_export_null_is_missing():
+    """
+    Vérifie que seul \\N (NULL de l'export) est lu comme manquant : '', 'NA', 'null' restent des modalités.
+    """
+    csv = (
+        b'id,ts,status_code,latency_ms,sk_id_curr,in.CODE\n'
+        b'1,1767261600,200,1.0,1,NA\n'
+        b'2,1767261600,200,1.0,2,\n'
+        b'3,1767261600,200,1.0,3,null\n'
+        b'4,1767261600,200,1.0,\\N,\\N\n'
+    )
+    df = repo.frame_from_export_csv(io.BytesIO(csv), ["CODE"], {"CODE"}, outputs=False)
+
+    assert df["CODE"].iloc[:3].tolist() == ["NA", "", "null"]
+    assert pd.isna(df["CODE"].iloc[3]) and pd.isna(df["sk_id_curr"].iloc[3])
@@ -21,6 +21,8 @@ def test_insert_prod_request_executes(monkeypatch):
     """
     fake_conn = Mock()
     monkeypatch.setattr(repo_pr, "get_conn", lambda: fake_conn)
+    record = Mock()
+    monkeypatch.setattr(repo_pr, "record_ops_rollup", record)
 
     event = {
         "endpoint": "/predict",
@@ -47,16 +49,37 @@ def test_insert_prod_request_executes(monkeypatch):
     assert params["latency_ms"] == 12.34
     assert params["sk_id_curr"] == "100001" or params["sk_id_curr"] == 100001
 
+    # agrégats tamponnés en mémoire : pas d'écriture ops_rollup_1m dans la requête d'insertion
+    assert "ops_rollup_1m" not in sql
+    record.assert_called_once_with(event)
+
 
 def test_select_prod_requests_no_conn(monkeypatch):
     """
     Vérifie que select_prod_requests retourne une liste vide si la connexion à la base est absente.
     """
-    monkeypatch.setattr(repo_pr, "get_conn", lambda: None)
+    monkeypatch.setattr(repo_pr, "execute_read", lambda sql, params=None: None)
     out = repo_pr.select_prod_requests(endpoint="/predict", limit=10)
     assert out == []
 
 
+def test_select_last_prod_request_id(monkeypatch):
+    """
+    Vérifie que select_last_prod_request_id renvoie l'id maximal, None sans requête ni base.
+    """
+    fake_conn = Mock()
+    fake_conn.execute.return_value.fetchone.return_value = (42,)
+    monkeypatch.setattr(repo_pr, "execute_read", fake_conn.execute)
+    assert repo_pr.select_last_prod_request_id("/predict") == 42
+    assert fake_conn.execute.call_args[0][1] == {"endpoint": "/predict"}
+
+    fake_conn.execute.return_value.fetchone.return_value = (None,)
+    assert repo_pr.select_last_prod_request_id("/predict") is None
+
+    monkeypatch.setattr(repo_pr, "execute_read", lambda sql, params=None: None)
+    assert repo_pr.select_last_prod_request_id("/predict") is None
+
+
 def test_select_prod_requests_maps_rows_and_chrono_order(monkeypatch):
     """
     Vérifie que select_prod_requests mappe correctement les lignes SQL en dictionnaires et respecte l'ordre chronologique.
@@ -69,7 +92,7 @@ def test_select_prod_requests_maps_rows_and_chrono_order(monkeypatch):
         ("2026-01-01T10:00:00", "/predict", 500, 99.0, "100001", {"x": 1}, {"y": 1}, "INTERNAL_ERROR", "boom"),
     ]
 
-    monkeypatch.setattr(repo_pr, "get_conn", lambda: fake_conn)
+    monkeypatch.setattr(repo_pr, "execute_read", fake_conn.execute)
 
     out = repo_pr.select_prod_requests(endpoint="/predict", limit=2)
 
@@ -83,4 +106,150 @@ def test_select_prod_requests_maps_rows_and_chrono_order(monkeypatch):
     assert out[1]["ts"] == "2026-01-01T10:00:01"
     assert out[1]["status_code"] == 200
 
-    fake_conn.execute.assert_called_once()
\ No newline at end of file
+    fake_conn.execute.assert_called_once()
+
+class _FakeServerCursor:
+    """
+    Faux curseur serveur (nommé) : renvoie les lignes par paquets via fetchmany.
+    """
+    def __init__(self, rows):
+        self._rows = list(rows)
+        self.itersize = None
+        self.executed = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed = (sql, params)
+
+    def fetchmany(self, size):
+        out, self._rows = self._rows[:size], self._rows[size:]
+        return out
+
+
+class _FakeStreamConn:
+    """
+    Fausse connexion supportant transaction() et cursor(name=...).
+    """
+    def __init__(self, rows):
+        self.cur = _FakeServerCursor(rows)
+        self.cursor_names = []
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def transaction(self):
+        return _FakeServerCursor([])
+
+    def cursor(self, name=None):
+        self.cursor_names.append(name)
+        return self.cur
+
+
+def test_iter_prod_request_batches_no_conn(monkeypatch):
+    """
+    Vérifie que iter_prod_request_batches ne produit aucun lot si la connexion est absente.
+    """
+    monkeypatch.setattr(repo_pr, "open_read_conn", lambda: None)
+    assert list(repo_pr.iter_prod_request_batches(endpoint="/predict")) == []
+
+
+def test_iter_prod_request_batches_streams_by_batch(monkeypatch):
+    """
+    Vérifie que iter_prod_request_batches utilise un curseur nommé et découpe les lignes par lots.
+    """
+    rows = [
+        (f"2026-01-01T10:00:0{i}", "/predict", 200, float(i), str(i), {"x": i}, None, None, None)
+        for i in range(5)
+    ]
+    fake_conn = _FakeStreamConn(rows)
+    monkeypatch.setattr(repo_pr, "open_read_conn", lambda: fake_conn)
+
+    batches = list(repo_pr.iter_prod_request_batches(endpoint="/predict", limit=5, batch_size=2))
+
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert batches[0][0]["inputs"] == {"x": 0}
+    assert batches[0][0]["outputs"] == {}
+    assert fake_conn.cursor_names[0]  # curseur serveur nommé
+    assert fake_conn.cur.itersize == 2
+    assert fake_conn.closed  # connexion dédiée au flux, fermée en fin de parcours
+
+    sql, params = fake_conn.cur.executed
+    assert "ORDER BY p.id ASC" in sql
+    assert params["limit"] == 5 and params["offset"] == 4
+    assert params["since"] is None and params["features"] is None
+
+
+def test_iter_prod_request_batches_without_inputs(monkeypatch):
+    """
+    Vérifie que with_inputs=False demande des inputs NULL côté serveur.
+    """
+    rows = [("2026-01-01T10:00:00", "/predict", 200, 1.0, None, None, None, None, None, None, None)]
+    fake_conn = _FakeStreamConn(rows)
+    monkeypatch.setattr(repo_pr, "open_read_conn", lambda: fake_conn)
+
+    batches = list(repo_pr.iter_prod_request_batches(endpoint="/predict", with_inputs=False))
+
+    assert batches[0][0]["inputs"] == {}
+    _, params = fake_conn.cur.executed
+    assert params["with_inputs"] is False and params["with_outputs"] is True
+
+
+def test_insert_prod_request_compact_inputs(monkeypatch):
+    """
+    Vérifie qu'avec LOG_INPUTS_ENCODING=compact, les inputs sont loggés en tableau de valeurs + id de schéma.
+    """
+    fake_conn = Mock()
+    monkeypatch.setattr(repo_pr, "get_conn", lambda: fake_conn)
+    monkeypatch.setattr(repo_pr, "register_feature_schema", lambda cols: 7 if cols == ["A", "B"] else None)
+    monkeypatch.setenv("LOG_INPUTS_ENCODING", "compact")
+
+    repo_pr.insert_prod_request({"endpoint": "/predict", "status_code": 200, "inputs": {"A": 1, "B": "x"}})
+
+    _, params = fake_conn.execute.call_args[0]
+    assert params["inputs"] is None
+    assert params["inputs_schema_id"] == 7
+    assert params["inputs_values"].obj == [1, "x"]
+
+
+def test_insert_prod_request_compact_falls_back_to_json(monkeypatch):
+    """
+    Vérifie le repli sur l'encodage JSON si le schéma ne peut pas être enregistré.
+    """
+    fake_conn = Mock()
+    monkeypatch.setattr(repo_pr, "get_conn", lambda: fake_conn)
+    monkeypatch.setattr(repo_pr, "register_feature_schema", lambda cols: None)
+    monkeypatch.setenv("LOG_INPUTS_ENCODING", "compact")
+
+    repo_pr.insert_prod_request({"endpoint": "/predict", "status_code": 200, "inputs": {"A": 1}})
+
+    _, params = fake_conn.execute.call_args[0]
+    assert params["inputs"].obj == {"A": 1}
+    assert params["inputs_schema_id"] is None
+
+
+def test_iter_prod_request_batches_decodes_compact_inputs(monkeypatch):
+    """
+    Vérifie que les inputs compacts sont reconstitués en dictionnaires, ou laissés bruts si decode_inputs=False.
+    """
+    rows = [
+        ("2026-01-01T10:00:00", "/predict", 200, 1.0, "1", None, None, None, None, 3, [1.5, "x"]),
+        ("2026-01-01T10:00:01", "/predict", 200, 1.0, "2", {"A": 2.0}, None, None, None, None, None),
+    ]
+    monkeypatch.setattr(repo_pr, "get_feature_schemas", lambda ids, conn=None: {3: ["A", "B"]})
+
+    monkeypatch.setattr(repo_pr, "open_read_conn", lambda: _FakeStreamConn(rows))
+    out = next(repo_pr.iter_prod_request_batches(endpoint="/predict"))
+    assert out[0]["inputs"] == {"A": 1.5, "B": "x"}
+    assert out[1]["inputs"] == {"A": 2.0}
+
+    monkeypatch.setattr(repo_pr, "open_read_conn", lambda: _FakeStreamConn(rows))
+    raw = next(repo_pr.iter_prod_request_batches(endpoint="/predict", decode_inputs=False))
+    assert raw[0]["inputs_schema_id"] == 3
+    assert raw[0]["inputs_values"] == [1.5, "x"]
+    assert "inputs_schema_id" not in raw[1]
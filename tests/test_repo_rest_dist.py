@@ -11,7 +11,7 @@ def test_load_all_ref_no_conn(monkeypatch):
     """
     Vérifie que load_all_ref retourne une liste vide si la connexion à la base est absente.
     """
-    monkeypatch.setattr(repo, "get_conn", lambda: None)
+    monkeypatch.setattr(repo, "execute_read", lambda sql, params=None: None)
     assert repo.load_all_ref() == []
 
 
@@ -19,7 +19,7 @@ def test_load_one_ref_no_conn(monkeypatch):
     """
     Vérifie que load_one_ref retourne None si la connexion à la base est absente.
     """
-    monkeypatch.setattr(repo, "get_conn", lambda: None)
+    monkeypatch.setattr(repo, "execute_read", lambda sql, params=None: None)
     assert repo.load_one_ref("AMT_CREDIT") is None
 
 
@@ -40,7 +40,7 @@ def test_load_all_ref_returns_rows(monkeypatch):
         )
     ]
 
-    monkeypatch.setattr(repo, "get_conn", lambda: fake_conn)
+    monkeypatch.setattr(repo, "execute_read", fake_conn.execute)
 
     result = repo.load_all_ref()
 
@@ -65,7 +65,7 @@ def test_load_one_ref_returns_dict(monkeypatch):
         "2026-01-01",
     )
 
-    monkeypatch.setattr(repo, "get_conn", lambda: fake_conn)
+    monkeypatch.setattr(repo, "execute_read", fake_conn.execute)
 
     result = repo.load_one_ref("AMT_CREDIT")
 
@@ -89,4 +89,41 @@ def test_upsert_executes_sql(monkeypatch):
         n_ref=100,
     )
 
-    fake_conn.execute.assert_called_once()
\ No newline at end of file
+    fake_conn.execute.assert_called_once()
+
+def test_upsert_ref_feature_dists_single_query(monkeypatch):
+    """
+    Vérifie que upsert_ref_feature_dists envoie toutes les distributions en une seule requête (tableaux alignés).
+    """
+    fake_conn = Mock()
+    fake_conn.execute.return_value.rowcount = 2
+    monkeypatch.setattr(repo, "get_conn", lambda: fake_conn)
+
+    n = repo.upsert_ref_feature_dists(
+        [
+            {"feature": "AMT_CREDIT", "kind": "numeric", "bins_json": {"edges": [0, 1]},
+             "ref_dist_json": {"labels": ["bin1"], "p": [1.0]}, "n_ref": 100},
+            {"feature": "NAME_CONTRACT_TYPE", "kind": "categorical", "bins_json": '{"topk": 30}',
+             "ref_dist_json": '{"labels": ["Cash loans"], "p": [1.0]}', "n_ref": 50},
+        ]
+    )
+
+    assert n == 2
+    fake_conn.execute.assert_called_once()
+    params = fake_conn.execute.call_args[0][1]
+    assert params["features"] == ["AMT_CREDIT", "NAME_CONTRACT_TYPE"]
+    assert params["bins_json"] == ['{"edges": [0, 1]}', '{"topk": 30}']
+    assert params["n_ref"] == [100, 50]
+
+
+def test_upsert_ref_feature_dists_no_conn_or_empty(monkeypatch):
+    """
+    Vérifie que upsert_ref_feature_dists ne fait rien sans connexion ou sans lignes.
+    """
+    monkeypatch.setattr(repo, "get_conn", lambda: None)
+    assert repo.upsert_ref_feature_dists([{"feature": "A", "kind": "numeric", "bins_json": None,
+                                           "ref_dist_json": {}, "n_ref": 0}]) == 0
+
+    fake_conn = Mock()
+    assert repo.upsert_ref_feature_dists([], conn=fake_conn) == 0
+    fake_conn.execute.assert_not_called()
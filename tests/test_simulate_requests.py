@@ -0,0 +1,109 @@
+"""
+Tests unitaires du générateur de charge (scripts/03_simulate_requests.py).
+Vérifie les percentiles de l'histogramme de latences face à numpy, les plages des tirages d'identifiants
+(seq / uniform / zipf) et une courte boucle ouverte contre l'API en processus (httpx.ASGITransport) :
+nombre de requêtes et latence mesurée depuis l'instant prévu (pas d'omission coordonnée).
+"""
+import asyncio
+import importlib
+import time
+
+import httpx
+import numpy as np
+import pytest
+
+import app.main as main
+from app.main import create_app
+
+sim = importlib.import_module("scripts.03_simulate_requests")
+
+
+def test_latency_histogram_percentiles_match_numpy():
+    """
+    Vérifie que les percentiles de l'histogramme restent dans la précision d'un bin (< 0.1 %, 1 µs près)
+    du percentile exact (méthode 'inverted_cdf' : même rang que l'histogramme).
+    """
+    rng = np.random.default_rng(0)
+    values_us = np.round(rng.lognormal(mean=8.0, sigma=1.5, size=20_000))
+    hist = sim.LatencyHistogram()
+    for v in values_us:
+        hist.record(v / 1e6)
+
+    assert hist.n == len(values_us)
+    for q in sim.PERCENTILES:
+        expected_ms = np.percentile(values_us, q, method="inverted_cdf") / 1000.0
+        assert hist.percentile(q) == pytest.approx(expected_ms, rel=1e-3, abs=1e-3)
+    assert hist.summary()["max_ms"] == pytest.approx(values_us.max() / 1000.0)
+
+
+def test_latency_histogram_merge():
+    """
+    Vérifie que la fusion de deux histogrammes équivaut à un histogramme unique.
+    """
+    a, b, both = sim.LatencyHistogram(), sim.LatencyHistogram(), sim.LatencyHistogram()
+    for i, s in enumerate(np.linspace(0.0001, 0.5, 1000)):
+        (a if i % 2 else b).record(s)
+        both.record(s)
+    a.merge(b)
+
+    assert a.summary() == both.summary()
+
+
+def test_pick_ids_ranges():
+    """
+    Vérifie que seq parcourt les ids cycliquement, et qu'uniform / zipf ne tirent que des ids du fichier,
+    zipf concentrant le trafic sur quelques ids.
+    """
+    ids = np.arange(100, 200)
+
+    seq = sim.pick_ids(ids, 250, "seq")
+    assert seq[:100].tolist() == ids.tolist()
+    assert seq[100:200].tolist() == ids.tolist()
+    assert seq[200:].tolist() == ids[:50].tolist()
+
+    uniform = sim.pick_ids(ids, 5000, "uniform")
+    zipf = sim.pick_ids(ids, 5000, "zipf", zipf_s=1.2)
+    for picked in (uniform, zipf):
+        assert len(picked) == 5000
+        assert set(picked.tolist()) <= set(ids.tolist())
+    assert len(np.unique(uniform)) == len(ids)
+    top = np.sort(np.unique(zipf, return_counts=True)[1])[::-1]
+    assert top[:5].sum() > 0.4 * len(zipf)
+    assert np.bincount(uniform - 100).max() < 0.05 * len(uniform)
+
+    with pytest.raises(ValueError):
+        sim.pick_ids(ids, 10, "pareto")
+
+
+def test_run_load_open_loop_counts_queueing_delay(monkeypatch):
+    """
+    Vérifie qu'en boucle ouverte contre l'API, chaque requête est envoyée une fois et que la latence inclut
+    l'attente : un service de ~10 ms pour 1000 req/s prévues (une requête en vol) accumule une file,
+    visible dans la latence depuis l'instant prévu mais pas dans le temps de service.
+    """
+    def slow_predict_score(model, payload, kept=None, cat=None, threshold=None, **kwargs):
+        time.sleep(0.01)
+        return {"SK_ID_CURR": payload["SK_ID_CURR"], "proba_default": 0.42, "score": 0, "decision": "ACCEPTED",
+                "threshold": threshold}
+
+    monkeypatch.setattr(main, "get_features_by_id", lambda sk_id: {"SK_ID_CURR": sk_id, "EXT_SOURCE_1": 0.5})
+    monkeypatch.setattr(main, "predict_score", slow_predict_score)
+    monkeypatch.setattr(main, "insert_prod_request", lambda event: None)
+    monkeypatch.setattr(main, "MODEL", object())
+    monkeypatch.setattr(main, "KEPT_FEATURES", ["SK_ID_CURR", "EXT_SOURCE_1"])
+    monkeypatch.setattr(main, "CAT_FEATURES", [])
+    monkeypatch.setattr(main, "THRESHOLD", 0.5)
+
+    transport = httpx.ASGITransport(app=create_app(enable_lifespan=False))
+    report = asyncio.run(
+        sim.run_load("http://test/predict", range(1, 21), rate=1000.0, concurrency=1, transport=transport)
+    )
+
+    assert report["mode"] == "open"
+    assert report["sent"] == 20 and report["ok"] == 20 and report["errors"] == {}
+    assert report["latency"]["n"] == report["service"]["n"] == 20
+    assert report["max_in_flight"] == 1
+    # 20 requêtes en série à ~10 ms : la dernière attend ~190 ms après son instant prévu
+    assert report["service"]["p50_ms"] >= 10.0
+    assert report["latency"]["max_ms"] >= 150.0
+    assert report["latency"]["p90_ms"] > 5 * report["service"]["p90_ms"]
@@ -0,0 +1,115 @@
+"""
+Tests unitaires pour les résumés de flux (scripts/sketches.py) et leur usage par la lecture par blocs
+des distributions de référence (scripts/02_build_reference_dist.py, --streaming).
+Vérifie l'erreur de rang des quantiles KLL, la fusion, le rappel des modalités fréquentes et le refus
+d'une feature qui passe de numérique à catégorielle en cours de lecture.
+"""
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.sketches import KllSketch, TopKCounter
+
+build = importlib.import_module("scripts.02_build_reference_dist")
+
+QS = np.linspace(0.01, 0.99, 99)
+
+
+def _max_rank_error(sketch, data):
+    """
+    Plus grand écart entre le rang demandé et le rang exact (dans data) du quantile renvoyé.
+    """
+    data = np.sort(data)
+    ranks = np.searchsorted(data, sketch.quantiles(QS), side="right") / len(data)
+    return float(np.max(np.abs(ranks - QS)))
+
+
+def test_kll_rank_error_within_bound():
+    """
+    Vérifie qu'avec k=400 l'erreur de rang reste de l'ordre de 1/k (< 2 %) sur 200 000 valeurs,
+    avec min / max exacts et une mémoire bien inférieure au nombre de valeurs.
+    """
+    data = np.random.default_rng(0).lognormal(3.0, 1.5, size=200_000)
+    sketch = KllSketch(k=400, seed=0)
+    for start in range(0, len(data), 7_000):
+        sketch.update(data[start:start + 7_000])
+
+    assert sketch.n == len(data)
+    assert _max_rank_error(sketch, data) < 0.02
+    assert sketch.quantiles([0.0, 1.0]).tolist() == [data.min(), data.max()]
+    assert sketch._size() < 2_000
+
+
+def test_kll_merge_matches_single_sketch_accuracy():
+    """
+    Vérifie que la fusion de sketches construits sur des morceaux disjoints garde n, min, max exacts
+    et la même borne d'erreur de rang.
+    """
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(loc, 1.0, size=50_000) for loc in (0.0, 5.0, -3.0)]
+    merged = KllSketch(k=400, seed=0)
+    for i, part in enumerate(parts):
+        sk = KllSketch(k=400, seed=i)
+        sk.update(part)
+        merged.merge(sk)
+    merged.merge(KllSketch(k=400))  # sketch vide : sans effet
+
+    data = np.concatenate(parts)
+    assert merged.n == len(data)
+    assert (merged.min, merged.max) == (data.min(), data.max())
+    assert _max_rank_error(merged, data) < 0.02
+
+
+def test_topk_keeps_every_heavy_hitter_after_merge():
+    """
+    Vérifie que toute modalité de fréquence > n / (capacity + 1) est conservée (par blocs puis après fusion),
+    que les comptes sont des minorants et que les vraies top-k sont en tête des candidates.
+    """
+    rng = np.random.default_rng(2)
+    values = pd.Series(rng.zipf(1.3, size=60_000).astype(str))
+    exact = values.value_counts()
+    capacity = 50
+
+    a, b = TopKCounter(capacity), TopKCounter(capacity)
+    for start in range(0, 30_000, 4_000):
+        a.update(values.iloc[start:min(start + 4_000, 30_000)])
+    b.update(values.iloc[30_000:])
+    a.merge(b)
+
+    assert a.n == len(values)
+    assert len(a.counts) <= capacity
+    heavy = exact[exact > len(values) / (capacity + 1)].index
+    assert set(heavy) <= set(a.counts)
+    assert all(a.counts[key] <= exact[key] for key in a.counts)
+    assert set(a.candidates()[:5]) == set(exact.index[:5])
+
+
+def test_streaming_rejects_numeric_then_categorical_column(tmp_path):
+    """
+    Vérifie qu'une colonne lue comme numérique dans un bloc puis catégorielle dans un autre est refusée,
+    au lieu d'être comptée à tort (valeurs numériques déjà vues perdues).
+    """
+    path = tmp_path / "ref.csv"
+    pd.DataFrame({"A": ["1", "2", "3", "x", "y", "x"]}).to_csv(path, index=False)
+
+    with pytest.raises(ValueError, match="A"):
+        build.streaming_ref_dists(path, ["A"], bins=2, topk=3, chunksize=3)
+
+
+def test_streaming_accepts_missing_then_categorical_column(tmp_path):
+    """
+    Vérifie qu'une colonne entièrement manquante dans les premiers blocs puis catégorielle donne
+    la même distribution que le calcul exact.
+    """
+    path = tmp_path / "ref.csv"
+    pd.DataFrame({"A": [None, None, None, "x", "y", "x"]}).to_csv(path, index=False)
+
+    [streamed] = build.streaming_ref_dists(path, ["A"], bins=2, topk=3, chunksize=3)
+    [exact] = build.exact_ref_dists(path, ["A"], bins=2, topk=3)
+
+    assert streamed["kind"] == exact["kind"] == "categorical"
+    assert dict(zip(streamed["ref_dist_json"]["labels"], streamed["ref_dist_json"]["p"])) == pytest.approx(
+        dict(zip(exact["ref_dist_json"]["labels"], exact["ref_dist_json"]["p"]))
+    )